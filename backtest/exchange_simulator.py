@@ -0,0 +1,627 @@
+# backtest/exchange_simulator.py
+"""
+Local exchange simulator for end-to-end load tests of the bot.
+
+It serves, for every simulated venue:
+  - the public WebSocket book stream the connectors read (Binance `/ws/<symbol>@depth@100ms` diffs,
+    OKX `/ws/v5/public` `books` channel, starting with a snapshot), at a configurable message rate per
+    stream; every connection to a stream receives the same frames, as with the real venues. Trades
+    (Binance `<symbol>@aggTrade` SUBSCRIBE, OKX `trades` channel) are sent to the connections that ask.
+    A connection that falls more than `max_queue` frames behind is closed, as real venues drop slow consumers;
+  - the REST endpoints ccxt uses for markets, balances and limit orders, backed by an in-memory
+    matching engine that fills against the simulated books;
+  - the REST history endpoints (Binance `aggTrades` and `klines`, OKX `history-trades` and candles), serving
+    a deterministic synthetic trade history, so that backtest.history_downloader can be tested locally.
+
+Books come from a synthetic market (a shared random-walk reference price with per-venue noise, so
+cross-venue spreads open and close) or from a recording made with RECORD_MARKET_DATA_PATH, replayed
+in a loop. Point the bot at it with SIMULATOR_REST_URL / SIMULATOR_WS_URL in config.py.
+
+Usage: python -m backtest.exchange_simulator [--rate 20000] [--recording logs/market_data.jsonl.gz]
+"""
+import argparse, asyncio, itertools, json, logging, math, random, time
+from urllib.parse import urlsplit, urlunsplit
+from engine.data_engine import OrderBook
+from utils.http_server import JsonHttpServer
+from backtest.recording import read_recording
+from utils.log_setup import setup_logging
+
+VENUES = ("Binance", "OKX")
+
+def point_exchange_at(instance, rest_url: str):
+    """Rewrites a ccxt exchange's API URLs to the simulator and limits market loading to spot."""
+    target = urlsplit(rest_url)
+    def rewrite(urls):
+        if isinstance(urls, dict): return {key: rewrite(value) for key, value in urls.items()}
+        if isinstance(urls, str) and urls.startswith('http'):
+            parts = urlsplit(urls)
+            return urlunsplit((target.scheme, target.netloc, parts.path, parts.query, parts.fragment))
+        return urls
+    instance.urls['api'] = rewrite(instance.urls['api'])
+    instance.options['fetchMarkets'] = {'types': ['spot']} if isinstance(instance.options.get('fetchMarkets'), dict) else ['spot']
+    instance.options['fetchCurrencies'] = False
+    # Le simulateur ne sert ni la marge ni les ordres groupés (versions récentes de ccxt).
+    instance.options['fetchMargins'] = False
+    if instance.id == 'okx': instance.options['createOrder'] = 'privatePostTradeOrder'
+
+
+class SimulatedMarket:
+    """Synthetic book for one venue and symbol. `step()` moves it and returns the (bids, asks) diff as exchange strings."""
+    def __init__(self, reference: dict, tick: float = 0.01, depth: int = 200, noise_bps: float = 2.0, seed: int = 0):
+        self.reference = reference
+        self.tick, self.depth = tick, depth
+        self.noise = noise_bps / 10_000
+        self.rng = random.Random(seed)
+        self.offset = 0.0
+        self.book = OrderBook()
+        self.update_id = 0
+        self.trade_id = 0
+
+    def step(self):
+        rng, tick = self.rng, self.tick
+        self.offset += -0.05 * self.offset + rng.gauss(0, self.noise * self.reference["price"] * 0.01)
+        mid = round((self.reference["price"] + self.offset) / tick) * tick
+        bids = [[p, 0.0] for p in self.book.bids.keys() if p >= mid or p < mid - self.depth * tick]
+        asks = [[p, 0.0] for p in self.book.asks.keys() if p <= mid or p > mid + self.depth * tick]
+        for _ in range(rng.randint(1, 6)):
+            bids.append([round(mid - tick * rng.randint(1, self.depth), 2), 0.0 if rng.random() < 0.15 else round(rng.uniform(0.001, 2), 5)])
+            asks.append([round(mid + tick * rng.randint(1, self.depth), 2), 0.0 if rng.random() < 0.15 else round(rng.uniform(0.001, 2), 5)])
+        self.book.update(bids, asks)
+        self.update_id += 1
+        return [[f"{p:.2f}", f"{q:.5f}"] for p, q in bids], [[f"{p:.2f}", f"{q:.5f}"] for p, q in asks]
+
+
+class SimulatedVenue:
+    """
+    Balances, orders and a matching engine for one venue, filling against the venue's simulated book.
+    Open orders lock the funds they may spend (quote with taker fee for a buy, base for a sell), like the
+    real venues: an order exceeding the free balance is rejected, cancels and fills release the lock.
+    """
+    def __init__(self, name: str, balances: dict, taker_fee: float = 0.001, maker_fee: float = 0.0008):
+        self.name = name
+        self.balances = {currency: float(amount) for currency, amount in balances.items()}
+        self.locked = {}
+        self.taker_fee, self.maker_fee = taker_fee, maker_fee
+        self.orders = {}
+        self._open = {}
+        self._ids = itertools.count(1)
+        self._client_ids = {}
+        self.books = {}
+
+    def free(self, currency: str) -> float:
+        return self.balances.get(currency, 0.0) - self.locked.get(currency, 0.0)
+
+    def free_balances(self) -> dict:
+        return {currency: self.free(currency) for currency in self.balances}
+
+    def _lock_needed(self, order, price: float = None, amount: float = None):
+        """(currency, amount) an open order keeps locked for its remaining quantity, at `price`/`amount` if given."""
+        base, quote = order["symbol"].split('/')
+        remaining = max((order["amount"] if amount is None else amount) - order["filled"], 0.0)
+        if order["side"] == 'buy': return quote, remaining * (order["price"] if price is None else price) * (1 + self.taker_fee)
+        return base, remaining
+
+    def _relock(self, order):
+        currency, needed = self._lock_needed(order) if order["status"] == "open" else (order["lock"][0], 0.0)
+        self.locked[currency] = self.locked.get(currency, 0.0) - order["lock"][1] + needed
+        if self.locked[currency] <= 1e-9: self.locked.pop(currency)
+        order["lock"] = (currency, needed)
+
+    def create_order(self, symbol: str, side: str, amount: float, price: float, post_only: bool = False, client_id: str = None):
+        book = self.books.get(symbol)
+        best = (book.get_asks(1) if side == 'buy' else book.get_bids(1)) if book else []
+        crosses = bool(best) and (price >= best[0][0] if side == 'buy' else price <= best[0][0])
+        if post_only and crosses: return None, "post-only order would take liquidity"
+        base, quote = symbol.split('/')
+        needed, currency = (amount * price * (1 + self.taker_fee), quote) if side == 'buy' else (amount, base)
+        if self.free(currency) < needed: return None, f"insufficient {currency} balance"
+        if client_id and client_id in self._client_ids: return None, "duplicate client order id"
+        order_id = str(next(self._ids))
+        order = {"id": order_id, "client_id": client_id or f"sim{order_id}", "symbol": symbol, "side": side, "price": price, "amount": amount,
+                 "filled": 0.0, "cost": 0.0, "status": "open", "timestamp": int(time.time() * 1000), "post_only": post_only, "lock": (currency, 0.0)}
+        self.orders[order_id] = self._open[order_id] = order
+        self._relock(order)
+        self._client_ids[order["client_id"]] = order_id
+        if crosses: self._fill_against_book(order, book.get_asks(50) if side == 'buy' else book.get_bids(50), self.taker_fee)
+        return order, None
+
+    def _fill_against_book(self, order, levels, fee: float):
+        for level_price, level_qty in levels:
+            if order["status"] != "open": break
+            if (order["side"] == 'buy' and level_price > order["price"]) or (order["side"] == 'sell' and level_price < order["price"]): break
+            self._execute(order, min(level_qty, order["amount"] - order["filled"]), level_price, fee)
+
+    def _execute(self, order, qty: float, price: float, fee: float):
+        if qty <= 0: return
+        base, quote = order["symbol"].split('/')
+        if order["side"] == 'buy':
+            self.balances[quote] = self.balances.get(quote, 0.0) - qty * price * (1 + fee)
+            self.balances[base] = self.balances.get(base, 0.0) + qty
+        else:
+            self.balances[base] = self.balances.get(base, 0.0) - qty
+            self.balances[quote] = self.balances.get(quote, 0.0) + qty * price * (1 - fee)
+        order["filled"] += qty
+        order["cost"] += qty * price
+        if order["amount"] - order["filled"] <= 1e-12:
+            order["status"] = "closed"
+            self._open.pop(order["id"], None)
+        self._relock(order)
+
+    def on_book_update(self, symbol: str):
+        """Fills resting orders the market has traded through (best opposite price at or beyond our limit)."""
+        book = self.books[symbol]
+        best_ask, best_bid = book.get_asks(1), book.get_bids(1)
+        for order in list(self._open.values()):
+            if order["symbol"] != symbol: continue
+            if order["side"] == 'buy' and best_ask and best_ask[0][0] <= order["price"]:
+                self._execute(order, order["amount"] - order["filled"], order["price"], self.maker_fee)
+            elif order["side"] == 'sell' and best_bid and best_bid[0][0] >= order["price"]:
+                self._execute(order, order["amount"] - order["filled"], order["price"], self.maker_fee)
+
+    def cancel_order(self, order_id: str):
+        order = self.orders.get(order_id)
+        if not order or order["status"] != "open": return None
+        order["status"] = "canceled"
+        self._open.pop(order_id, None)
+        self._relock(order)
+        return order
+
+    def amend_order(self, order_id: str, price: float = None, amount: float = None):
+        """Reprices/resizes a resting order in place (same id); a post-only order that would cross is rejected and left untouched."""
+        order = self._open.get(order_id)
+        if not order: return None, "order is not open"
+        price = order["price"] if price is None else price
+        book = self.books.get(order["symbol"])
+        best = (book.get_asks(1) if order["side"] == 'buy' else book.get_bids(1)) if book else []
+        if order["post_only"] and best and (price >= best[0][0] if order["side"] == 'buy' else price <= best[0][0]): return None, "post-only order would take liquidity"
+        currency, needed = self._lock_needed(order, price, None if amount is None else max(amount, order["filled"]))
+        if self.free(currency) + order["lock"][1] < needed: return None, f"insufficient {currency} balance"
+        order["price"] = price
+        if amount is not None: order["amount"] = max(amount, order["filled"])
+        self._relock(order)
+        return order, None
+
+    def find(self, order_id=None, client_id: str = None):
+        """Order by venue id, or by client order id when no venue id is given."""
+        if order_id: return self.orders.get(str(order_id))
+        return self.orders.get(self._client_ids.get(client_id)) if client_id else None
+
+    def open_orders(self, symbol: str = None):
+        return [o for o in self._open.values() if symbol is None or o["symbol"] == symbol]
+
+
+class SimulatedHistory:
+    """
+    Deterministic synthetic trade history of one venue and symbol, generated an hour at a time on demand
+    (same seed, same trades). Trades are (id, timestamp_ms, price, qty, side), ids increasing with time;
+    some share a millisecond, as bursts do on the real venues. Nothing is served after the current time.
+    """
+    HOUR_MS = 3_600_000
+
+    def __init__(self, seed: int, trades_per_hour: int = 600, price: float = 60000.0):
+        self.seed, self.trades_per_hour, self.price = seed, trades_per_hour, price
+        self._hours = {}
+
+    def _hour(self, hour: int) -> list:
+        trades = self._hours.get(hour)
+        if trades is not None: return trades
+        if len(self._hours) > 256: self._hours.clear()
+        rng = random.Random(self.seed * 1_000_003 + hour)
+        price = self.price * (1 + 0.05 * math.sin(hour / 24))
+        timestamps = sorted(rng.randrange(self.HOUR_MS) for _ in range(self.trades_per_hour))
+        trades = []
+        for i, offset in enumerate(timestamps):
+            if i and rng.random() < 0.1: offset = timestamps[i - 1]
+            timestamps[i] = offset
+            price = round(price * (1 + rng.gauss(0, 0.0002)), 2)
+            trades.append((hour * 1_000_000 + i + 1, hour * self.HOUR_MS + offset, price, round(rng.uniform(0.0001, 0.5), 5), rng.choice(('buy', 'sell'))))
+        self._hours[hour] = trades
+        return trades
+
+    def trades(self, start_ms: int, end_ms: int):
+        """Trades with start_ms <= timestamp < end_ms, oldest first."""
+        end_ms = min(end_ms, int(time.time() * 1000))
+        for hour in range(max(start_ms, 0) // self.HOUR_MS, (end_ms - 1) // self.HOUR_MS + 1):
+            for trade in self._hour(hour):
+                if start_ms <= trade[1] < end_ms: yield trade
+
+    def trades_before(self, end_ms: int, limit: int, before_id: int = None) -> list:
+        """The `limit` latest trades before end_ms (and before the trade id `before_id`), latest first."""
+        end_ms, result = min(end_ms, int(time.time() * 1000)), []
+        for hour in range((end_ms - 1) // self.HOUR_MS, -1, -1):
+            for trade in reversed(self._hour(hour)):
+                if trade[1] < end_ms and (before_id is None or trade[0] < before_id): result.append(trade)
+                if len(result) == limit: return result
+        return result
+
+    def candles(self, interval_ms: int, start_ms: int, end_ms: int) -> list:
+        """[open time, open, high, low, close, volume, quote volume, buy volume, trades] of the intervals with trades opening in [start_ms, end_ms), oldest first."""
+        candles = {}
+        for _, timestamp, price, qty, side in self.trades(start_ms - start_ms % interval_ms, end_ms + interval_ms):
+            start = timestamp - timestamp % interval_ms
+            if not start_ms <= start < end_ms: continue
+            candle = candles.get(start)
+            if candle is None: candle = candles[start] = [start, price, price, price, price, 0.0, 0.0, 0.0, 0]
+            candle[2], candle[3], candle[4] = max(candle[2], price), min(candle[3], price), price
+            candle[5] += qty; candle[6] += qty * price; candle[7] += qty if side == 'buy' else 0.0; candle[8] += 1
+        return [candles[start] for start in sorted(candles)]
+
+
+def _interval_ms(interval: str) -> int:
+    """Milliseconds of a Binance ('1m', '1h', '1d') or OKX ('1m', '1H', '1D') candle interval."""
+    units = {'s': 1000, 'm': 60_000, 'h': 3_600_000, 'H': 3_600_000, 'd': 86_400_000, 'D': 86_400_000, 'w': 604_800_000, 'W': 604_800_000}
+    interval = interval.removesuffix('utc')
+    return int(interval[:-1]) * units[interval[-1]]
+
+
+class ExchangeSimulator:
+    def __init__(self, symbols=("BTC/USDC",), rate: float = 1000, recording: str = None, balances: dict = None, seed: int = 0,
+                 max_queue: int = 10_000):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.symbols = list(symbols)
+        self.rate = rate
+        self.recording = recording
+        self.reference = {symbol: {"price": 60000.0} for symbol in self.symbols}
+        self.venues = {name: SimulatedVenue(name, balances or {"BTC": 1.0, "USDC": 100000.0}) for name in VENUES}
+        self.markets = {}
+        for i, (venue, symbol) in enumerate((v, s) for v in VENUES for s in self.symbols):
+            market = SimulatedMarket(self.reference[symbol], seed=seed + i)
+            self.markets[(venue, symbol)] = market
+            self.venues[venue].books[symbol] = market.book
+        self._recorded = self._load_recording() if recording else None
+        self._ref_rng = random.Random(seed)
+        self._trade_rng = random.Random(seed + 1)
+        self.history = {(venue, symbol): SimulatedHistory(seed + i) for i, (venue, symbol) in enumerate(self.markets)}
+        self.messages_sent = 0
+        self.max_queue = max_queue
+        self.slow_disconnects = 0
+        self._feeds = {}
+        # File d'une connexion -> sa WebSocket, pour fermer les connexions trop lentes.
+        self._sockets = {}
+
+    # --- market data ---
+
+    def _load_recording(self):
+        frames = {}
+        for _, platform, symbol, kind, raw in read_recording(self.recording, kinds={'depth', 'trade'}):
+            frames.setdefault((platform, symbol), []).append((kind, raw))
+        self.logger.info(f"Loaded {sum(map(len, frames.values()))} recorded frames for {sorted(frames)}.")
+        return frames
+
+    def _frames(self, venue: str, symbol: str):
+        """Endless iterator of (kind, raw WebSocket frame) for one venue and symbol; also keeps the matching book in sync."""
+        market = self.markets[(venue, symbol)]
+        if self._recorded is not None:
+            for kind, raw in itertools.cycle(self._recorded.get((venue, symbol), [])):
+                data = json.loads(raw)
+                if kind == 'trade':
+                    # Identifiants de transaction renumérotés aussi, sinon les connecteurs écartent la boucle suivante comme doublons.
+                    for trade in (data["data"] if venue == "OKX" else [data]):
+                        market.trade_id += 1
+                        if venue == "OKX": trade["tradeId"] = str(market.trade_id)
+                        else: trade["a"] = market.trade_id
+                    yield kind, json.dumps(data)
+                    continue
+                if venue == "OKX" and "data" not in data: continue
+                payload = data["data"][0] if venue == "OKX" else data
+                if data.get("action") == "snapshot" or "lastUpdateId" in data: market.book.bids.clear(); market.book.asks.clear()
+                market.book.update(payload.get("bids", payload.get("b", [])), payload.get("asks", payload.get("a", [])))
+                self.venues[venue].on_book_update(symbol)
+                # Identifiants renumérotés : la boucle sur l'enregistrement reste une séquence continue pour les connecteurs.
+                market.update_id += 1
+                if "lastUpdateId" in data: continue
+                if venue == "OKX": payload["seqId"], payload["prevSeqId"] = market.update_id, market.update_id - 1
+                else: data["U"] = data["u"] = market.update_id
+                yield 'depth', json.dumps(data)
+            return
+        reference = self.reference[symbol]
+        while True:
+            reference["price"] *= 1 + self._ref_rng.gauss(0, 0.0000005)
+            bids, asks = market.step()
+            self.venues[venue].on_book_update(symbol)
+            now_ms = int(time.time() * 1000)
+            if venue == "Binance":
+                yield 'depth', json.dumps({"e": "depthUpdate", "E": now_ms, "s": symbol.replace('/', ''), "U": market.update_id, "u": market.update_id, "b": bids, "a": asks})
+            else:
+                yield 'depth', json.dumps({"arg": {"channel": "books", "instId": symbol.replace('/', '-')}, "action": "update",
+                                           "data": [{"bids": [b + ["0", "1"] for b in bids], "asks": [a + ["0", "1"] for a in asks], "ts": str(now_ms), "seqId": market.update_id, "prevSeqId": market.update_id - 1}]})
+            trade = self._synthetic_trade(venue, symbol, market, now_ms)
+            if trade: yield 'trade', trade
+
+    def _synthetic_trade(self, venue: str, symbol: str, market: SimulatedMarket, now_ms: int):
+        """A taker trade at the touch after one book update in five, as a raw frame (or None)."""
+        rng = self._trade_rng
+        if rng.random() >= 0.2 or not market.book.bids or not market.book.asks: return None
+        side = rng.choice(('buy', 'sell'))
+        price = market.book.asks.peekitem(0)[0] if side == 'buy' else market.book.bids.peekitem(-1)[0]
+        qty = round(rng.uniform(0.0001, 0.05), 5)
+        market.trade_id += 1
+        if venue == "Binance":
+            return json.dumps({"e": "aggTrade", "E": now_ms, "s": symbol.replace('/', ''), "a": market.trade_id, "p": f"{price:.2f}", "q": f"{qty:.5f}",
+                               "f": market.trade_id, "l": market.trade_id, "T": now_ms, "m": side == 'sell'})
+        inst_id = symbol.replace('/', '-')
+        return json.dumps({"arg": {"channel": "trades", "instId": inst_id},
+                           "data": [{"instId": inst_id, "tradeId": str(market.trade_id), "px": f"{price:.2f}", "sz": f"{qty:.5f}", "side": side, "ts": str(now_ms)}]})
+
+    def _okx_snapshot(self, arg: dict, symbol: str, depth: int = 400) -> str:
+        """First frame of an OKX `books` subscription: the full book at the current update id."""
+        market = self.markets[("OKX", symbol)]
+        levels = lambda side: [[f"{p:.2f}", f"{q:.5f}", "0", "1"] for p, q in side]
+        return json.dumps({"arg": arg, "action": "snapshot", "data": [{"bids": levels(market.book.get_bids(depth)), "asks": levels(market.book.get_asks(depth)),
+                                                                     "ts": str(int(time.time() * 1000)), "seqId": market.update_id, "prevSeqId": -1}]})
+
+    def _subscribe(self, venue: str, symbol: str, trades: bool = False) -> asyncio.Queue:
+        """Registers a connection on the stream of (venue, symbol), with or without its trades; the stream starts with its first subscriber."""
+        feed = self._feeds.get((venue, symbol))
+        if feed is None:
+            feed = self._feeds[(venue, symbol)] = {}
+            asyncio.create_task(self._produce(venue, symbol, feed))
+        queue = asyncio.Queue(self.max_queue)
+        feed[queue] = trades
+        return queue
+
+    async def _produce(self, venue: str, symbol: str, subscribers: dict):
+        # Une seule source par flux : toutes les connexions abonnées reçoivent les mêmes trames, comme chez les vraies plateformes.
+        frames = self._frames(venue, symbol)
+        start, produced = time.monotonic(), 0
+        while True:
+            due = min(int((time.monotonic() - start) * self.rate) - produced, max(int(self.rate * 0.1), 1))
+            for _ in range(due):
+                kind, frame = next(frames, (None, None))
+                if frame is None:
+                    self.logger.warning(f"No frames to stream for {venue} {symbol}.")
+                    return
+                for queue, trades in list(subscribers.items()):
+                    if not trades and kind != 'depth': continue
+                    if queue.full(): self._drop_slow(venue, symbol, queue)
+                    else: queue.put_nowait(frame)
+            produced += due
+            await asyncio.sleep(0.001)
+
+    def _drop_slow(self, venue: str, symbol: str, queue: asyncio.Queue):
+        """Unsubscribes a connection whose queue is full and closes it: memory stays bounded and the client sees the disconnect."""
+        self._feeds[(venue, symbol)].pop(queue, None)
+        websocket = self._sockets.pop(queue, None)
+        self.slow_disconnects += 1
+        self.logger.warning(f"{venue} {symbol} connection more than {self.max_queue} frames behind; closing it.")
+        if websocket is not None: asyncio.create_task(websocket.close(1008, "slow consumer"))
+
+    async def _stream(self, websocket, venue: str, symbol: str, queue: asyncio.Queue):
+        self._sockets[queue] = websocket
+        try:
+            while True:
+                await websocket.send(await queue.get())
+                self.messages_sent += 1
+        finally:
+            self._feeds[(venue, symbol)].pop(queue, None)
+            self._sockets.pop(queue, None)
+
+    async def _ws_handler(self, websocket, path: str = None):
+        path = path or getattr(websocket, 'path', None) or websocket.request.path
+        try:
+            if path.startswith("/ws/v5/public"):
+                args = json.loads(await websocket.recv())["args"]
+                books = next(arg for arg in args if arg["channel"] == "books")
+                symbol = books["instId"].replace('-', '/')
+                queue = self._subscribe("OKX", symbol, trades=any(arg["channel"] == "trades" for arg in args))
+                snapshot = self._okx_snapshot(books, symbol)
+                for arg in args: await websocket.send(json.dumps({"event": "subscribe", "arg": arg}))
+                await websocket.send(snapshot)
+                await self._stream(websocket, "OKX", symbol, queue)
+            elif path.startswith("/ws/"):
+                stream = path.split('/')[2].split('@')[0].upper()
+                symbol = next(s for s in self.symbols if s.replace('/', '') == stream)
+                queue = self._subscribe("Binance", symbol)
+                listener = asyncio.create_task(self._binance_requests(websocket, symbol, queue))
+                try: await self._stream(websocket, "Binance", symbol, queue)
+                finally: listener.cancel()
+        except StopIteration:
+            self.logger.warning(f"Unknown stream requested: {path}")
+        except Exception as e:
+            self.logger.info(f"WebSocket client on {path} disconnected: {type(e).__name__}")
+
+    async def _binance_requests(self, websocket, symbol: str, queue: asyncio.Queue):
+        """Answers the SUBSCRIBE requests of a Binance connection; `<symbol>@aggTrade` adds the trades to its stream."""
+        async for message in websocket:
+            request = json.loads(message)
+            if request.get("method") == "SUBSCRIBE" and f"{symbol.replace('/', '').lower()}@aggTrade" in request.get("params", []):
+                feed = self._feeds[("Binance", symbol)]
+                if queue in feed: feed[queue] = True
+            await websocket.send(json.dumps({"result": None, "id": request.get("id")}))
+
+    # --- REST: Binance ---
+
+    def _binance_symbol(self, raw: str):
+        return next((s for s in self.symbols if s.replace('/', '') == raw), None)
+
+    def _binance_order(self, order):
+        status = {"open": "NEW", "closed": "FILLED", "canceled": "CANCELED"}[order["status"]]
+        if order["status"] == "open" and order["filled"] > 0: status = "PARTIALLY_FILLED"
+        return {"symbol": order["symbol"].replace('/', ''), "orderId": int(order["id"]), "clientOrderId": order["client_id"], "transactTime": order["timestamp"],
+                "time": order["timestamp"], "updateTime": int(time.time() * 1000), "price": f"{order['price']:.8f}", "origQty": f"{order['amount']:.8f}",
+                "executedQty": f"{order['filled']:.8f}", "cummulativeQuoteQty": f"{order['cost']:.8f}", "status": status, "timeInForce": "GTC",
+                "type": "LIMIT_MAKER" if order["post_only"] else "LIMIT", "side": order["side"].upper(), "fills": []}
+
+    def _binance_routes(self):
+        venue = self.venues["Binance"]
+        def exchange_info(_):
+            symbols = [{"symbol": s.replace('/', ''), "status": "TRADING", "baseAsset": s.split('/')[0], "quoteAsset": s.split('/')[1],
+                        "baseAssetPrecision": 8, "quotePrecision": 8, "quoteAssetPrecision": 8, "orderTypes": ["LIMIT", "LIMIT_MAKER", "MARKET"],
+                        "isSpotTradingAllowed": True, "isMarginTradingAllowed": False, "permissions": ["SPOT"],
+                        "filters": [{"filterType": "PRICE_FILTER", "minPrice": "0.01", "maxPrice": "1000000.00", "tickSize": "0.01"},
+                                    {"filterType": "LOT_SIZE", "minQty": "0.00001", "maxQty": "9000", "stepSize": "0.00001"},
+                                    {"filterType": "NOTIONAL", "minNotional": "5"}]} for s in self.symbols]
+            return 200, {"timezone": "UTC", "serverTime": int(time.time() * 1000), "rateLimits": [], "symbols": symbols}
+        def account(_):
+            return 200, {"accountType": "SPOT", "canTrade": True, "updateTime": int(time.time() * 1000),
+                         "balances": [{"asset": c, "free": f"{venue.free(c):.8f}", "locked": f"{venue.locked.get(c, 0.0):.8f}"} for c in venue.balances]}
+        def new_order(params):
+            symbol = self._binance_symbol(params.get("symbol", ""))
+            if not symbol: return 400, {"code": -1121, "msg": "Invalid symbol."}
+            order, error = venue.create_order(symbol, params["side"].lower(), float(params["quantity"]), float(params["price"]), params.get("type") == "LIMIT_MAKER",
+                                              params.get("newClientOrderId"))
+            if error: return 400, {"code": -2010, "msg": error}
+            return 200, self._binance_order(order)
+        def get_order(params):
+            order = venue.find(params.get("orderId"), params.get("origClientOrderId"))
+            return (200, self._binance_order(order)) if order else (400, {"code": -2013, "msg": "Order does not exist."})
+        def cancel_order(params):
+            order = venue.find(params.get("orderId"), params.get("origClientOrderId"))
+            order = order and venue.cancel_order(order["id"])
+            return (200, self._binance_order(order)) if order else (400, {"code": -2011, "msg": "Unknown order sent."})
+        def cancel_replace(params):
+            symbol = self._binance_symbol(params.get("symbol", ""))
+            cancelled = venue.cancel_order(str(params.get("cancelOrderId")))
+            if not cancelled: return 400, {"code": -2021, "msg": "Order cancel-replace failed.", "data": {"cancelResult": "FAILURE", "newOrderResult": "NOT_ATTEMPTED"}}
+            order, error = venue.create_order(symbol, params["side"].lower(), float(params["quantity"]), float(params["price"]), params.get("type") == "LIMIT_MAKER",
+                                              params.get("newClientOrderId"))
+            if error: return 400, {"code": -2021, "msg": "Order cancel-replace partially failed.", "data": {"cancelResult": "SUCCESS", "newOrderResult": "FAILURE"}}
+            return 200, {"cancelResult": "SUCCESS", "newOrderResult": "SUCCESS", "cancelResponse": self._binance_order(cancelled), "newOrderResponse": self._binance_order(order)}
+        def open_orders(params):
+            symbol = self._binance_symbol((params or {}).get("symbol", ""))
+            return 200, [self._binance_order(o) for o in venue.open_orders(symbol)]
+        def depth(params):
+            symbol = self._binance_symbol(params.get("symbol", ""))
+            book, limit = venue.books[symbol], int(params.get("limit", 100))
+            return 200, {"lastUpdateId": self.markets[("Binance", symbol)].update_id,
+                         "bids": [[f"{p:.2f}", f"{q:.5f}"] for p, q in book.get_bids(limit)], "asks": [[f"{p:.2f}", f"{q:.5f}"] for p, q in book.get_asks(limit)]}
+        def agg_trades(params):
+            symbol = self._binance_symbol(params.get("symbol", ""))
+            if not symbol: return 400, {"code": -1121, "msg": "Invalid symbol."}
+            history, limit = self.history[("Binance", symbol)], min(int(params.get("limit", 500)), 1000)
+            if "startTime" not in params:
+                trades = history.trades_before(int(time.time() * 1000), limit)[::-1]
+            else:
+                start, end = int(params["startTime"]), int(params.get("endTime", int(params["startTime"]) + SimulatedHistory.HOUR_MS))
+                if end - start > SimulatedHistory.HOUR_MS: return 400, {"code": -1127, "msg": "More than 1 hours between startTime and endTime."}
+                trades = list(itertools.islice(history.trades(start, end + 1), limit))
+            return 200, [{"a": trade_id, "p": f"{price:.2f}", "q": f"{qty:.5f}", "f": trade_id, "l": trade_id, "T": timestamp, "m": side == 'sell', "M": True}
+                         for trade_id, timestamp, price, qty, side in trades]
+        def klines(params):
+            symbol = self._binance_symbol(params.get("symbol", ""))
+            if not symbol: return 400, {"code": -1121, "msg": "Invalid symbol."}
+            interval, limit = _interval_ms(params.get("interval", "1m")), min(int(params.get("limit", 500)), 1000)
+            now = int(time.time() * 1000)
+            start = int(params.get("startTime", now - now % interval - (limit - 1) * interval))
+            end = min(int(params.get("endTime", start + limit * interval - 1)) + 1, start + limit * interval)
+            return 200, [[c[0], f"{c[1]:.2f}", f"{c[2]:.2f}", f"{c[3]:.2f}", f"{c[4]:.2f}", f"{c[5]:.5f}", c[0] + interval - 1, f"{c[6]:.2f}", c[8], f"{c[7]:.5f}", "0", "0"]
+                         for c in self.history[("Binance", symbol)].candles(interval, start, end)]
+        return {("GET", "/api/v3/ping"): lambda _: (200, {}), ("GET", "/api/v3/time"): lambda _: (200, {"serverTime": int(time.time() * 1000)}),
+                ("GET", "/api/v3/exchangeInfo"): exchange_info, ("GET", "/api/v3/account"): account, ("POST", "/api/v3/order"): new_order,
+                ("GET", "/api/v3/order"): get_order, ("DELETE", "/api/v3/order"): cancel_order, ("GET", "/api/v3/openOrders"): open_orders,
+                ("POST", "/api/v3/order/cancelReplace"): cancel_replace, ("GET", "/api/v3/depth"): depth,
+                ("GET", "/api/v3/aggTrades"): agg_trades, ("GET", "/api/v3/klines"): klines}
+
+    # --- REST: OKX ---
+
+    def _okx_order(self, order):
+        state = {"open": "partially_filled" if order["filled"] > 0 else "live", "closed": "filled", "canceled": "canceled"}[order["status"]]
+        avg = order["cost"] / order["filled"] if order["filled"] else 0
+        return {"instType": "SPOT", "instId": order["symbol"].replace('/', '-'), "ordId": order["id"], "clOrdId": order["client_id"], "px": f"{order['price']}",
+                "sz": f"{order['amount']}", "accFillSz": f"{order['filled']}", "avgPx": f"{avg}", "state": state, "side": order["side"],
+                "ordType": "post_only" if order["post_only"] else "limit", "tdMode": "cash", "fee": "0", "feeCcy": order["symbol"].split('/')[1],
+                "cTime": str(order["timestamp"]), "uTime": str(int(time.time() * 1000))}
+
+    def _okx_routes(self):
+        venue = self.venues["OKX"]
+        ok = lambda data: (200, {"code": "0", "msg": "", "data": data})
+        def instruments(_):
+            return ok([{"instType": "SPOT", "instId": s.replace('/', '-'), "baseCcy": s.split('/')[0], "quoteCcy": s.split('/')[1], "settleCcy": "",
+                        "ctVal": "", "ctMult": "", "ctValCcy": "", "tickSz": "0.01", "lotSz": "0.00000001", "minSz": "0.00001", "state": "live",
+                        "listTime": "1600000000000", "maxLmtSz": "9999999999", "maxMktSz": "1000000"} for s in self.symbols])
+        def balance(_):
+            return ok([{"uTime": str(int(time.time() * 1000)), "totalEq": "0",
+                        "details": [{"ccy": c, "availBal": f"{venue.free(c)}", "cashBal": f"{b}", "frozenBal": f"{venue.locked.get(c, 0.0)}", "eq": f"{b}", "availEq": f"{venue.free(c)}"} for c, b in venue.balances.items()]}])
+        def place_order(params):
+            symbol = params.get("instId", "").replace('-', '/')
+            if symbol not in self.symbols: return ok([{"ordId": "", "clOrdId": "", "sCode": "51001", "sMsg": "Instrument ID does not exist"}])
+            order, error = venue.create_order(symbol, params["side"], float(params["sz"]), float(params["px"]), params.get("ordType") == "post_only", params.get("clOrdId"))
+            if error: return 200, {"code": "1", "msg": "Operation failed.", "data": [{"ordId": "", "clOrdId": params.get("clOrdId", ""), "sCode": "51008", "sMsg": error}]}
+            return ok([{"ordId": order["id"], "clOrdId": order["client_id"], "tag": "", "sCode": "0", "sMsg": "Order placed"}])
+        def get_order(params):
+            order = venue.find(params.get("ordId"), params.get("clOrdId"))
+            return ok([self._okx_order(order)]) if order else (200, {"code": "51603", "msg": "Order does not exist", "data": []})
+        def cancel_order(params):
+            order = venue.find(params.get("ordId"), params.get("clOrdId"))
+            order = order and venue.cancel_order(order["id"])
+            if not order: return 200, {"code": "1", "msg": "", "data": [{"ordId": str(params.get("ordId")), "sCode": "51400", "sMsg": "Cancellation failed"}]}
+            return ok([{"ordId": order["id"], "clOrdId": order["client_id"], "sCode": "0", "sMsg": ""}])
+        def amend_order(params):
+            new_px, new_sz = params.get("newPx"), params.get("newSz")
+            order, error = venue.amend_order(str(params.get("ordId")), float(new_px) if new_px else None, float(new_sz) if new_sz else None)
+            if error: return 200, {"code": "1", "msg": "", "data": [{"ordId": str(params.get("ordId")), "clOrdId": "", "reqId": "", "sCode": "51503", "sMsg": error}]}
+            return ok([{"ordId": order["id"], "clOrdId": "", "reqId": params.get("reqId", ""), "sCode": "0", "sMsg": ""}])
+        def pending(params):
+            symbol = (params or {}).get("instId", "").replace('-', '/') or None
+            return ok([self._okx_order(o) for o in venue.open_orders(symbol)])
+        unknown_instrument = (200, {"code": "51001", "msg": "Instrument ID does not exist", "data": []})
+        history = lambda params: self.history.get(("OKX", params.get("instId", "").replace('-', '/')))
+        def trades(params):
+            # type 1 (défaut) : `after` est un identifiant de transaction ; type 2 : un horodatage.
+            source = history(params)
+            if source is None: return unknown_instrument
+            after, by_time = params.get("after"), str(params.get("type", "1")) == "2"
+            trades = source.trades_before(int(after) if after and by_time else int(time.time() * 1000), min(int(params.get("limit", 100)), 100),
+                                          int(after) if after and not by_time else None)
+            return ok([{"instId": params["instId"], "side": side, "sz": f"{qty:.5f}", "px": f"{price:.2f}", "tradeId": str(trade_id), "ts": str(timestamp)}
+                       for trade_id, timestamp, price, qty, side in trades])
+        def candles(params):
+            # `after` : bougies antérieures à cet horodatage ; `before` : postérieures. Les plus récentes d'abord.
+            source = history(params)
+            if source is None: return unknown_instrument
+            interval, limit = _interval_ms(params.get("bar", "1m")), min(int(params.get("limit", 100)), 300)
+            end = int(params.get("after", int(time.time() * 1000)))
+            start = int(params["before"]) + 1 if params.get("before") else end - limit * interval
+            rows = source.candles(interval, start, end)[::-1][:limit]
+            return ok([[str(c[0]), f"{c[1]:.2f}", f"{c[2]:.2f}", f"{c[3]:.2f}", f"{c[4]:.2f}", f"{c[5]:.5f}", f"{c[6]:.2f}", f"{c[6]:.2f}", "1"] for c in rows])
+        return {("GET", "/api/v5/public/time"): lambda _: ok([{"ts": str(int(time.time() * 1000))}]),
+                ("GET", "/api/v5/public/instruments"): instruments, ("GET", "/api/v5/asset/currencies"): lambda _: ok([]),
+                ("GET", "/api/v5/account/balance"): balance, ("POST", "/api/v5/trade/order"): place_order,
+                ("GET", "/api/v5/trade/order"): get_order, ("POST", "/api/v5/trade/cancel-order"): cancel_order, ("POST", "/api/v5/trade/amend-order"): amend_order,
+                ("GET", "/api/v5/trade/orders-pending"): pending, ("GET", "/api/v5/market/trades"): trades, ("GET", "/api/v5/market/history-trades"): trades,
+                ("GET", "/api/v5/market/candles"): candles, ("GET", "/api/v5/market/history-candles"): candles}
+
+    # --- lifecycle ---
+
+    def rest_routes(self) -> dict:
+        return {**self._binance_routes(), **self._okx_routes(), ("GET", "/simulator/stats"): lambda _: (200, self.stats())}
+
+    def stats(self) -> dict:
+        return {"messages_sent": self.messages_sent, "slow_disconnects": self.slow_disconnects, "balances": {name: venue.balances for name, venue in self.venues.items()},
+                "open_orders": {name: len(venue.open_orders()) for name, venue in self.venues.items()}}
+
+    async def run(self, host: str = "127.0.0.1", rest_port: int = 8800, ws_port: int = 8801):
+        import websockets
+        rest = JsonHttpServer(host, rest_port, self.rest_routes(), name="SimulatorREST")
+        await rest.start()
+        try:
+            async with websockets.serve(self._ws_handler, host, ws_port, max_size=None):
+                self.logger.info(f"Exchange simulator up: REST http://{host}:{rest_port}, WebSocket ws://{host}:{ws_port} ({self.rate:,.0f} msg/s per stream).")
+                last_sent, last_time = 0, time.monotonic()
+                while True:
+                    await asyncio.sleep(5)
+                    now = time.monotonic()
+                    self.logger.info(f"Sent {(self.messages_sent - last_sent) / (now - last_time):,.0f} msg/s. Open orders: {self.stats()['open_orders']}")
+                    last_sent, last_time = self.messages_sent, now
+        finally:
+            # Libère le port REST quand la tâche est annulée (simulateur lancé dans le même processus).
+            await rest.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", nargs="+", default=["BTC/USDC"])
+    parser.add_argument("--rate", type=float, default=1000, help="messages per second per WebSocket stream")
+    parser.add_argument("--recording", help="replay this recording instead of the synthetic market")
+    parser.add_argument("--max-queue", type=int, default=10_000, help="frames a connection may fall behind before it is closed")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--rest-port", type=int, default=8800)
+    parser.add_argument("--ws-port", type=int, default=8801)
+    args = parser.parse_args()
+    setup_logging('INFO')
+    simulator = ExchangeSimulator(args.symbols, args.rate, args.recording, max_queue=args.max_queue)
+    try: asyncio.run(simulator.run(args.host, args.rest_port, args.ws_port))
+    except KeyboardInterrupt: pass
+
+if __name__ == "__main__":
+    main()
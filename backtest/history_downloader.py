@@ -0,0 +1,234 @@
+# backtest/history_downloader.py
+"""
+Historical trades and OHLCV downloader, writing the recording format the replay tools read.
+
+Each (venue, symbol, kind) job pages through its time range in chunks (an hour of trades, a page of
+candles): forward from `since` with ccxt's fetch_trades / fetch_ohlcv, except OKX trades, paged backward
+from the end of each chunk through its history endpoint. Jobs run concurrently, at most
+HISTORY_MAX_CONCURRENT_REQUESTS requests in flight per venue on top of ccxt's rate limiter, and network
+errors are retried with backoff. Overlapping pages (trades sharing the millisecond at a page boundary are
+asked for again) are deduplicated by trade id or candle time.
+
+Each chunk is appended in chronological order as its own gzip member, then the job's checkpoint is advanced
+past it. After an interruption, whatever follows the last checkpoint in the file is cut off and the jobs
+resume from their checkpoints; a later run with a later --until extends the same file. Trades are written
+as the venue's WebSocket trade frames (kind 'trade'), so the exchange simulator and the connectors replay
+them unchanged; candles as kind 'ohlcv'.
+
+Usage: python -m backtest.history_downloader --symbols BTC/USDC --since 2024-05-01 [--until 2024-05-02] [--venues Binance OKX]
+       [--kinds trade ohlcv] [--timeframe 1m] [--output logs/history.jsonl.gz]
+Set SIMULATOR_REST_URL to download the simulator's synthetic history instead of the venues'.
+"""
+import argparse, asyncio, datetime, gzip, json, logging, os, time
+import ccxt.async_support as ccxt
+from config import HISTORY_OUTPUT_PATH, HISTORY_MAX_CONCURRENT_REQUESTS, HISTORY_RETRIES
+from backtest.recording import recording_line
+from execution.live_order_manager import create_exchange
+from utils.log_setup import setup_logging
+
+TRADE_CHUNK_MS = 3_600_000
+# Taille de page maximale par plateforme et type de données.
+PAGE_LIMITS = {"Binance": {"trade": 1000, "ohlcv": 1000}, "OKX": {"trade": 100, "ohlcv": 300}}
+
+# Transaction ccxt -> trame WebSocket de la plateforme (à partir de la réponse brute, mêmes champs que le flux).
+TRADE_FRAMES = {
+    "Binance": lambda market_id, info: {"e": "aggTrade", "E": info["T"], "s": market_id, **info},
+    "OKX": lambda market_id, info: {"arg": {"channel": "trades", "instId": market_id}, "data": [info]},
+}
+
+
+class HistoryDownloader:
+    """
+    Downloads history from ccxt exchanges (name -> instance with markets loaded) into `output_path`.
+    `download` takes (venue, symbol, kind, since_ms, until_ms, timeframe) jobs, kind 'trade' or 'ohlcv'.
+    """
+    def __init__(self, exchanges: dict, output_path: str = HISTORY_OUTPUT_PATH, checkpoint_path: str = None,
+                 max_concurrent_requests: int = HISTORY_MAX_CONCURRENT_REQUESTS, retries: int = HISTORY_RETRIES):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.exchanges = exchanges
+        self.output_path = output_path
+        self.checkpoint_path = checkpoint_path or f"{output_path}.checkpoint.json"
+        self.retries = retries
+        self._slots = {venue: asyncio.Semaphore(max_concurrent_requests) for venue in exchanges}
+        self.state = self._load_checkpoint()
+        self.requests = 0
+        self.retried = 0
+        self.records = 0
+
+    # --- points de contrôle ---
+
+    def _load_checkpoint(self) -> dict:
+        size = os.path.getsize(self.output_path) if os.path.exists(self.output_path) else 0
+        try:
+            with open(self.checkpoint_path, encoding='utf-8') as f: state = json.load(f)
+        except FileNotFoundError:
+            return {"bytes": size, "jobs": {}}
+        if size > state["bytes"]:
+            # Morceau écrit sans point de contrôle, ou coupé en cours d'écriture : il sera retéléchargé.
+            with open(self.output_path, 'r+b') as f: f.truncate(state["bytes"])
+            self.logger.warning(f"Cut {size - state['bytes']} bytes written after the last checkpoint from {self.output_path}.")
+        return state
+
+    def _save_checkpoint(self):
+        temporary = f"{self.checkpoint_path}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.checkpoint_path)
+
+    def _commit(self, key: str, lines: list, cursor_ms: int):
+        """Appends a chunk as one gzip member, synced, then advances the job's checkpoint past it."""
+        if lines:
+            with open(self.output_path, 'ab') as raw:
+                with gzip.GzipFile(fileobj=raw, mode='wb') as f: f.write(''.join(lines).encode('utf-8'))
+                raw.flush()
+                os.fsync(raw.fileno())
+            self.state["bytes"] = os.path.getsize(self.output_path)
+        job = self.state["jobs"][key]
+        job["cursor_ms"] = cursor_ms
+        job["records"] += len(lines)
+        self.records += len(lines)
+        self._save_checkpoint()
+
+    # --- requêtes ---
+
+    async def _request(self, venue: str, method: str, *args):
+        for attempt in range(self.retries + 1):
+            try:
+                async with self._slots[venue]:
+                    self.requests += 1
+                    return await getattr(self.exchanges[venue], method)(*args)
+            except ccxt.NetworkError as e:
+                if attempt == self.retries: raise
+                self.retried += 1
+                delay = min(2 ** attempt, 30)
+                self.logger.warning(f"{venue} {method} failed ({type(e).__name__}: {e}); retrying in {delay}s.")
+                await asyncio.sleep(delay)
+
+    async def _trade_chunk(self, venue: str, symbol: str, start: int, end: int) -> list:
+        """Trades with start <= timestamp < end, oldest first, without duplicates."""
+        limit, trades = PAGE_LIMITS[venue]["trade"], {}
+        if venue == "OKX":
+            # Historique OKX : pages du plus récent au plus ancien, curseur en horodatage (type 2, `after` exclu).
+            cursor = end
+            while True:
+                page = await self._request(venue, 'fetch_trades', symbol, None, limit, {'method': 'publicGetMarketHistoryTrades', 'type': '2', 'after': cursor})
+                new = [trade for trade in page if start <= trade['timestamp'] < end and trade['id'] not in trades]
+                trades.update((trade['id'], trade) for trade in new)
+                if len(page) < limit or min(trade['timestamp'] for trade in page) < start: break
+                # +1 : la milliseconde du bord de page est redemandée (doublons écartés) ; sans nouveauté, on passe en dessous.
+                oldest = min(trade['timestamp'] for trade in page)
+                cursor = oldest + 1 if new and oldest + 1 < cursor else oldest
+        else:
+            cursor = start
+            while True:
+                page = await self._request(venue, 'fetch_trades', symbol, cursor, limit, {'until': end - 1})
+                new = [trade for trade in page if start <= trade['timestamp'] < end and trade['id'] not in trades]
+                trades.update((trade['id'], trade) for trade in new)
+                if len(page) < limit: break
+                latest = max(trade['timestamp'] for trade in page)
+                cursor = latest if new and latest > cursor else latest + 1
+        return sorted(trades.values(), key=lambda trade: (trade['timestamp'], int(trade['id'])))
+
+    async def _ohlcv_chunk(self, venue: str, symbol: str, timeframe: str, start: int, end: int) -> list:
+        """Candles opening in [start, end), oldest first."""
+        limit, step, candles = PAGE_LIMITS[venue]["ohlcv"], self.exchanges[venue].parse_timeframe(timeframe) * 1000, {}
+        cursor = start
+        while cursor < end:
+            page = await self._request(venue, 'fetch_ohlcv', symbol, timeframe, cursor, limit, {'until': end - 1})
+            new = [candle for candle in page if start <= candle[0] < end]
+            candles.update((candle[0], candle) for candle in new)
+            if not new or len(page) < limit: break
+            cursor = max(candle[0] for candle in new) + step
+        return [candles[open_time] for open_time in sorted(candles)]
+
+    # --- tâches ---
+
+    async def _run_job(self, venue: str, symbol: str, kind: str, since_ms: int, until_ms: int, timeframe: str):
+        key = f"{venue} {symbol} {kind}" + (f" {timeframe}" if kind == 'ohlcv' else "")
+        job = self.state["jobs"].setdefault(key, {"cursor_ms": since_ms, "records": 0})
+        market_id = self.exchanges[venue].market(symbol)['id']
+        if kind == 'ohlcv':
+            step = self.exchanges[venue].parse_timeframe(timeframe) * 1000
+            since_ms -= since_ms % step
+            chunk = step * PAGE_LIMITS[venue]["ohlcv"]
+        else:
+            chunk = TRADE_CHUNK_MS
+        cursor = max(since_ms, job["cursor_ms"])
+        if cursor > since_ms: self.logger.info(f"{key}: resuming from {_iso(cursor)} ({job['records']} records already written).")
+        last_log = time.monotonic()
+        while cursor < until_ms:
+            end = min(cursor + chunk, until_ms)
+            if kind == 'trade':
+                lines = [recording_line(trade['timestamp'] / 1000, venue, symbol, 'trade', json.dumps(TRADE_FRAMES[venue](market_id, trade['info']), separators=(',', ':')))
+                         for trade in await self._trade_chunk(venue, symbol, cursor, end)]
+            else:
+                lines = [recording_line(candle[0] / 1000, venue, symbol, 'ohlcv', json.dumps([timeframe, *candle], separators=(',', ':')))
+                         for candle in await self._ohlcv_chunk(venue, symbol, timeframe, cursor, end)]
+            # Écriture synchrone : l'ordre fichier / point de contrôle est garanti sans verrou, et un morceau ne pèse que quelques ms.
+            self._commit(key, lines, end)
+            cursor = end
+            if time.monotonic() - last_log > 10:
+                self.logger.info(f"{key}: {_iso(cursor)} reached, {job['records']} records.")
+                last_log = time.monotonic()
+        return key, job["records"]
+
+    async def download(self, jobs) -> dict:
+        """Runs the jobs concurrently; returns the records written per job, or the error of a job that failed."""
+        jobs = list(jobs)
+        results = await asyncio.gather(*(self._run_job(*job) for job in jobs), return_exceptions=True)
+        summary = {}
+        for job, result in zip(jobs, results):
+            if isinstance(result, Exception):
+                self.logger.error(f"{job[0]} {job[1]} {job[2]} failed: {type(result).__name__}: {result} (rerun to resume).")
+                summary[f"{job[0]} {job[1]} {job[2]}"] = f"failed: {result}"
+            else: summary[result[0]] = result[1]
+        return summary
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "retried": self.retried, "records": self.records, "bytes": self.state["bytes"]}
+
+
+def _iso(timestamp_ms: int) -> str:
+    return datetime.datetime.fromtimestamp(timestamp_ms / 1000, datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+def _parse_time(value: str) -> int:
+    """Milliseconds since the epoch from an integer (ms) or an ISO date/time (UTC unless stated)."""
+    if value.isdigit(): return int(value)
+    moment = datetime.datetime.fromisoformat(value)
+    if moment.tzinfo is None: moment = moment.replace(tzinfo=datetime.timezone.utc)
+    return int(moment.timestamp() * 1000)
+
+async def run(venues, symbols, kinds, since_ms: int, until_ms: int, timeframe: str = '1m', output: str = HISTORY_OUTPUT_PATH, **options) -> dict:
+    """Downloads the history of every (venue, symbol, kind) into `output` with public ccxt clients; returns the downloader's summary and stats."""
+    exchanges = {}
+    try:
+        for venue in venues:
+            # Données publiques : pas de clés, ni de testnet (dont l'historique est vide).
+            exchanges[venue] = create_exchange(venue, paper_trading=False)
+            await exchanges[venue].load_markets()
+        downloader = HistoryDownloader(exchanges, output, **options)
+        jobs = [(venue, symbol, kind, since_ms, until_ms, timeframe) for venue in venues for symbol in symbols for kind in kinds]
+        return {"jobs": await downloader.download(jobs), **downloader.stats()}
+    finally:
+        for exchange in exchanges.values(): await exchange.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--venues", nargs="+", default=list(PAGE_LIMITS), choices=list(PAGE_LIMITS))
+    parser.add_argument("--symbols", nargs="+", default=["BTC/USDC"])
+    parser.add_argument("--kinds", nargs="+", default=["trade", "ohlcv"], choices=["trade", "ohlcv"])
+    parser.add_argument("--timeframe", default="1m", help="OHLCV timeframe (ccxt notation)")
+    parser.add_argument("--since", required=True, help="ISO date/time (UTC) or milliseconds")
+    parser.add_argument("--until", help="ISO date/time (UTC) or milliseconds; now by default")
+    parser.add_argument("--output", default=HISTORY_OUTPUT_PATH)
+    args = parser.parse_args()
+    setup_logging('INFO')
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    until_ms = _parse_time(args.until) if args.until else int(time.time() * 1000)
+    result = asyncio.run(run(args.venues, args.symbols, args.kinds, _parse_time(args.since), until_ms, args.timeframe, args.output))
+    logging.getLogger("HistoryDownloader").info(f"Done: {result}")
+
+if __name__ == "__main__":
+    main()
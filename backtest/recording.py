@@ -0,0 +1,57 @@
+# backtest/recording.py
+import gzip, json, logging, threading, time
+from queue import Queue, Empty
+
+def recording_line(timestamp: float, platform: str, symbol: str, kind: str, raw: str) -> str:
+    """One line of a recording. Kinds: 'depth' and 'trade' (raw WebSocket frames), 'ohlcv' ([timeframe, open time ms, o, h, l, c, volume])."""
+    return json.dumps((timestamp, platform, symbol, kind, raw), separators=(',', ':')) + '\n'
+
+
+class MarketDataRecorder:
+    """
+    Records raw market data frames to a gzip JSON-lines file, one `[timestamp, platform, symbol, kind, raw]`
+    array per line. `record` only enqueues; compression and disk I/O happen on a background thread.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.queue = Queue()
+        self._file = gzip.open(path, 'at', encoding='utf-8')
+        self._running = True
+        self.worker_thread = threading.Thread(target=self._process_queue, daemon=True)
+        self.worker_thread.start()
+        self.logger.info(f"Recording market data to {path}")
+
+    def record(self, platform: str, symbol: str, kind: str, raw: str):
+        self.queue.put((time.time(), platform, symbol, kind, raw))
+
+    def _process_queue(self):
+        while self._running or not self.queue.empty():
+            try: item = self.queue.get(timeout=1)
+            except Empty: continue
+            try: self._file.write(recording_line(*item))
+            except Exception as e: self.logger.error(f"Error writing market data record: {e}")
+            finally: self.queue.task_done()
+
+    def close(self):
+        self._running = False
+        self.worker_thread.join()
+        self._file.close()
+        self.logger.info(f"Market data recording closed: {self.path}")
+
+
+def read_recording(path: str, kinds=None):
+    """Yields (timestamp, platform, symbol, kind, raw) tuples from a recording, optionally filtered by kind."""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip(): continue
+            timestamp, platform, symbol, kind, raw = json.loads(line)
+            if kinds is None or kind in kinds: yield timestamp, platform, symbol, kind, raw
+
+
+def replay_connectors(data_engine, keys):
+    """{(platform, symbol): connector} feeding `data_engine`, to replay the recorded frames of those books through `handle_message`."""
+    from connectors.binance_connector import BinanceConnector
+    from connectors.okx_connector import OkxConnector
+    classes = {"Binance": BinanceConnector, "OKX": OkxConnector}
+    return {(platform, symbol): classes[platform](data_engine, symbol=symbol) for platform, symbol in keys}
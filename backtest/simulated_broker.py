@@ -0,0 +1,137 @@
+# backtest/simulated_broker.py
+import asyncio, logging, time
+from execution.balance_ledger import BalanceLedger
+from execution.market_metadata import MarketMetadataRegistry, SymbolMetadata
+from backtest.exchange_simulator import SimulatedVenue
+
+class JournalRecorder:
+    """In-memory stand-in for TradeLogger."""
+    def __init__(self):
+        self.records = []
+
+    def log_trade(self, **kwargs):
+        self.records.append(kwargs)
+
+    def log_trades(self, records):
+        self.records.extend(records)
+
+
+class SimulatedBroker:
+    """
+    In-process stand-in for LiveOrderManager (same methods, ccxt-shaped order dicts), backed by the exchange
+    simulator's matching engine. Each venue matches against the order books it is given, e.g. a DataEngine's
+    or the simulator's SimulatedMarket books: crossing orders fill against the levels, resting orders fill when
+    the market trades through them (`on_book_update`, usable as a DataEngine listener). Lets the strategy,
+    the router and the hedge engine run without network; `latency_s` delays every call like a round trip.
+    """
+    def __init__(self, order_books: dict, venues=("Binance", "OKX"), balances: dict = None, fees: dict = None, latency_s: float = 0.0,
+                 notifier=None, trade_logger=None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._order_books = order_books
+        self.fees = {venue: (fees or {}).get(venue, {'maker': 0.08, 'taker': 0.1}) for venue in venues}
+        self.exchanges = {venue: SimulatedVenue(venue, (balances or {}).get(venue, {"BTC": 1.0, "USDC": 100000.0}),
+                                                self.fees[venue]['taker'] / 100, self.fees[venue]['maker'] / 100) for venue in venues}
+        self.latency_s = latency_s
+        self.notifier = notifier
+        self.trade_logger = trade_logger or JournalRecorder()
+        self.ledger = BalanceLedger()
+        self.journal = None
+        # Mêmes règles que l'exchangeInfo du simulateur.
+        self.metadata = MarketMetadataRegistry()
+
+    async def _round_trip(self):
+        if self.latency_s > 0: await asyncio.sleep(self.latency_s)
+
+    def _venue(self, platform: str, symbol: str = None):
+        venue = self.exchanges.get(platform)
+        if venue is not None and symbol is not None and symbol not in venue.books:
+            book = self._order_books.get((platform, symbol))
+            if book is not None:
+                venue.books[symbol] = book
+                self.metadata.set(platform, symbol, SymbolMetadata(self.fees[platform]['maker'], self.fees[platform]['taker'], 0.01, 0.00001, 0.00001, 5.0))
+        return venue
+
+    @staticmethod
+    def _ccxt_order(order) -> dict:
+        return {"id": order["id"], "symbol": order["symbol"], "type": "limit", "side": order["side"], "price": order["price"],
+                "amount": order["amount"], "filled": order["filled"], "remaining": order["amount"] - order["filled"], "cost": order["cost"],
+                "average": order["cost"] / order["filled"] if order["filled"] else None, "status": order["status"],
+                "timestamp": order["timestamp"], "postOnly": order["post_only"]}
+
+    def on_book_update(self, platform: str, symbol: str, bids=None, asks=None):
+        venue = self._venue(platform, symbol)
+        if venue is not None and symbol in venue.books: venue.on_book_update(symbol)
+
+    # --- interface LiveOrderManager ---
+
+    def get_fees(self, platform: str, symbol: str = None) -> dict:
+        # Enregistre aussi les règles du symbole : le routeur les consulte avant le premier ordre.
+        if symbol is not None: self._venue(platform, symbol)
+        return self.fees.get(platform, {'maker': 0.1, 'taker': 0.1})
+
+    async def get_balance(self, platform: str, currency: str):
+        await self._round_trip()
+        venue = self.exchanges.get(platform)
+        return venue.free(currency) if venue else None
+
+    async def refresh_balances(self, platforms=None):
+        await self._round_trip()
+        for platform in (platforms or self.exchanges.keys()):
+            if platform in self.exchanges: self.ledger.update_balances(platform, self.exchanges[platform].free_balances())
+
+    async def create_limit_order(self, platform: str, symbol: str, side: str, amount: float, price: float, post_only: bool = False, reduce_only: bool = False):
+        await self._round_trip()
+        venue = self._venue(platform, symbol)
+        if venue is None or symbol not in venue.books:
+            self.logger.error(f"Attempted to place order on unknown platform or symbol: {platform} {symbol}")
+            return None
+        amount, price, error = self.metadata.validate(platform, symbol, side, amount, price)
+        if error:
+            self.logger.warning(f"{side} order on {platform} ({symbol}) rejected locally: {error}")
+            return None
+        order, error = venue.create_order(symbol, side, amount, price, post_only)
+        if error:
+            self.logger.error(f"Failed to place order on {platform}: {error}")
+            return None
+        return self._ccxt_order(order)
+
+    async def amend_order(self, platform: str, order_id: str, symbol: str, side: str, amount: float, price: float, post_only: bool = True, filled: float = 0.0):
+        await self._round_trip()
+        venue = self._venue(platform, symbol)
+        # Amendement sur place : la taille totale inclut ce que l'ordre a déjà rempli.
+        current = venue.orders.get(str(order_id)) if venue else None
+        order, error = venue.amend_order(order_id, price, amount + current["filled"]) if current else (None, "unknown order")
+        if error:
+            self.logger.error(f"Failed to amend order {order_id} on {platform}: {error}")
+            return None
+        return self._ccxt_order(order)
+
+    async def cancel_order(self, platform: str, order_id: str, symbol: str):
+        await self._round_trip()
+        venue = self.exchanges.get(platform)
+        return bool(venue and venue.cancel_order(order_id))
+
+    async def fetch_order_status(self, platform: str, order_id: str, symbol: str):
+        await self._round_trip()
+        venue = self.exchanges.get(platform)
+        order = venue.orders.get(order_id) if venue else None
+        return self._ccxt_order(order) if order else None
+
+    async def settle_order(self, platform: str, order_id: str, symbol: str, timeout_s: float = 0.0):
+        deadline = time.monotonic() + timeout_s
+        order = None
+        while True:
+            order = await self.fetch_order_status(platform, order_id, symbol) or order
+            if order and order["status"] != "open": return order
+            if time.monotonic() >= deadline: break
+            await asyncio.sleep(0.01)
+        await self.cancel_order(platform, order_id, symbol)
+        return await self.fetch_order_status(platform, order_id, symbol) or order
+
+    async def cancel_all_orders(self):
+        await self._round_trip()
+        for venue in self.exchanges.values():
+            for order in list(venue.open_orders()): venue.cancel_order(order["id"])
+
+    async def close_all(self):
+        pass
@@ -0,0 +1,56 @@
+# backtest/threshold_replay.py
+"""
+Replays a market data recording through the adaptive thresholds, at the recorded timestamps.
+
+Every depth frame goes through the connector's handle_message into a DataEngine, with AdaptiveThresholds
+registered as a listener (as in main.py). Starts from an exported state when given (e.g. the live bot's
+THRESHOLD_STATE_PATH), prints the thresholds of every pair at a fixed interval of recorded time and
+writes the final state, so a backtest can start from exactly what the live bot had learned.
+
+Usage: python -m backtest.threshold_replay logs/market_data.jsonl.gz [--state in.json] [--out out.json] [--every-s 60]
+"""
+import argparse
+from backtest.recording import read_recording, replay_connectors
+from engine.data_engine import DataEngine
+from engine.adaptive_thresholds import AdaptiveThresholds
+
+def replay(path: str, state: dict = None, every_s: float = 60.0, **params):
+    """Yields (recorded timestamp, {pair: thresholds}) every `every_s` seconds of recording; returns the AdaptiveThresholds at the end."""
+    now = [0.0]
+    data_engine = DataEngine()
+    thresholds = AdaptiveThresholds(data_engine.order_books, clock=lambda: now[0], **params)
+    if state: thresholds.load_state(state, load_params=not params)
+    data_engine.add_listener(thresholds.on_book_update)
+    connectors, next_sample = {}, None
+    for timestamp, platform, symbol, _, raw in read_recording(path, kinds={'depth'}):
+        if (platform, symbol) not in connectors: connectors.update(replay_connectors(data_engine, [(platform, symbol)]))
+        now[0] = timestamp
+        connectors[(platform, symbol)].handle_message(raw)
+        if next_sample is None: next_sample = timestamp + every_s
+        elif timestamp >= next_sample:
+            yield timestamp, thresholds.summary()
+            next_sample = timestamp + every_s
+    return thresholds
+
+def main():
+    import json, time
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording")
+    parser.add_argument("--state", help="exported state to start from")
+    parser.add_argument("--out", help="where to write the final state")
+    parser.add_argument("--every-s", type=float, default=60.0)
+    args = parser.parse_args()
+    state = None
+    if args.state:
+        with open(args.state) as f: state = json.load(f)
+    samples = replay(args.recording, state, args.every_s)
+    try:
+        while True:
+            timestamp, summary = next(samples)
+            for pair, values in summary.items():
+                print(f"{time.strftime('%H:%M:%S', time.gmtime(timestamp))} {pair:<28} taker {values['taker_pct']:.4f}% maker {values['maker_pct']:.4f}%")
+    except StopIteration as done:
+        if args.out and done.value: done.value.save(args.out)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# benchmarks/feed_bench.py
+"""
+Throughput of the shared market data feed with several subscribers.
+
+A MarketDataPublisher is fed exchange frames (from a recording, or the simulator's synthetic market,
+trades included) through the connectors' handle_message at --rate frames per second; --clients
+subscriber processes each run a MarketDataFeedClient into their own DataEngine. The first half of the
+clients connect before publishing starts, the rest join late (from snapshots). Reports the publisher's CPU
+per frame, and per client the frames and bytes received, the publisher-to-apply latency and whether its
+books match the publisher's at the end.
+
+Usage: python -m benchmarks.feed_bench [--clients 10] [--rate 20000] [--seconds 10] [--recording logs/market_data.jsonl.gz]
+"""
+import argparse, asyncio, itertools, multiprocessing, os, tempfile, time
+from engine.market_data_feed import MarketDataPublisher, MarketDataFeedClient
+from engine.data_engine import DataEngine
+
+def _source_frames(count: int, recording: str = None):
+    """Up to `count` (platform, symbol, raw frame) from a recording or the synthetic market (alternating venues), generated up front."""
+    from backtest.exchange_simulator import ExchangeSimulator
+    from backtest.recording import read_recording
+    if recording:
+        frames = [(platform, symbol, raw) for _, platform, symbol, _, raw in itertools.islice(read_recording(recording, kinds={'depth', 'trade'}), count)]
+        if not frames: raise SystemExit(f"No frames in {recording}.")
+        return frames
+    simulator = ExchangeSimulator()
+    streams = {venue: simulator._frames(venue, "BTC/USDC") for venue in ("Binance", "OKX")}
+    return [(venue, "BTC/USDC", next(streams[venue])[1]) for _, venue in zip(range(count), itertools.cycle(streams))]
+
+def _client_process(address: str, results, idle_s: float):
+    async def run():
+        data_engine = DataEngine()
+        client = MarketDataFeedClient(data_engine, address)
+        task = asyncio.create_task(client.run())
+        last, idle_since, first_frame = -1, time.monotonic(), None
+        # Fin quand plus rien n'arrive pendant idle_s.
+        while True:
+            await asyncio.sleep(0.05)
+            if client.frames and first_frame is None: first_frame = time.monotonic()
+            if client.frames != last: last, idle_since = client.frames, time.monotonic()
+            elif client.frames and time.monotonic() - idle_since > idle_s: break
+        task.cancel()
+        books = {key: (book.get_bids(10), book.get_asks(10)) for key, book in data_engine.order_books.items()}
+        results.put({"pid": os.getpid(), "frames": client.frames, "bytes": client.bytes_received, "seconds": idle_since - first_frame,
+                     "latency_ms_avg": data_engine.latency_ms_avg, "latency_ms_max": data_engine.latency_ms_max,
+                     "reconnects": client.reconnects, "books": books})
+    asyncio.run(run())
+
+async def _publish(publisher: MarketDataPublisher, address: str, clients, rate: float, seconds: float, recording: str = None):
+    from connectors.binance_connector import BinanceConnector
+    from connectors.okx_connector import OkxConnector
+    connectors = {}
+    def connector(platform, symbol):
+        if (platform, symbol) not in connectors:
+            connectors[(platform, symbol)] = {"Binance": BinanceConnector, "OKX": OkxConnector}[platform](publisher, symbol=symbol)
+        return connectors[(platform, symbol)]
+    server = asyncio.create_task(publisher.serve(address))
+    # Au-delà, les trames reviennent en boucle (les diffs rejoués restent applicables, sans séquencement hors `run`).
+    frames = itertools.cycle(_source_frames(min(int(rate * seconds), 200_000), recording))
+    late = clients[len(clients) // 2:]
+    for process in clients[:len(clients) // 2]: process.start()
+    while len(publisher._clients) < len(clients) // 2: await asyncio.sleep(0.01)
+    start, cpu_start, published = time.monotonic(), time.process_time(), 0
+    while (elapsed := time.monotonic() - start) < seconds:
+        if late and elapsed >= seconds / 2:
+            for process in late: process.start()
+            late = []
+        due = min(int(elapsed * rate) - published, max(int(rate * 0.1), 1))
+        for _ in range(due):
+            platform, symbol, raw = next(frames)
+            connector(platform, symbol).handle_message(raw)
+        published += due
+        await asyncio.sleep(0.001)
+    cpu = time.process_time() - cpu_start
+    books = {key: (book.get_bids(10), book.get_asks(10)) for key, book in publisher.order_books.items()}
+    return server, published, time.monotonic() - start, cpu, books
+
+def run(clients: int = 10, rate: float = 20000, seconds: float = 10.0, recording: str = None, idle_s: float = 1.0):
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    with tempfile.TemporaryDirectory() as tmp:
+        address = f"unix:{os.path.join(tmp, 'feed.sock')}"
+        processes = [ctx.Process(target=_client_process, args=(address, results, idle_s)) for _ in range(clients)]
+        publisher = MarketDataPublisher(snapshot_interval_s=3600)
+        async def main():
+            server, published, elapsed, cpu, books = await _publish(publisher, address, processes, rate, seconds, recording)
+            reports = []
+            for _ in processes:
+                while results.empty(): await asyncio.sleep(0.05)
+                reports.append(results.get())
+            server.cancel()
+            return published, elapsed, cpu, books, reports
+        published, elapsed, cpu, books, reports = asyncio.run(main())
+        for process in processes: process.join()
+    return publisher, published, elapsed, cpu, books, reports
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--rate", type=float, default=20000, help="exchange frames per second fed to the publisher")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--recording")
+    args = parser.parse_args()
+    publisher, published, elapsed, cpu, books, reports = run(args.clients, args.rate, args.seconds, args.recording)
+    print(f"Publisher: {published / elapsed:,.0f} exchange frames/s in, {publisher.frames_published / elapsed:,.0f} feed frames/s out, "
+          f"{cpu / published * 1e6:.1f} us CPU per exchange frame ({args.clients} clients), {publisher.bytes_sent / elapsed / 2 ** 20:.1f} MiB/s sent, "
+          f"{publisher.clients_dropped} client(s) dropped")
+    print(f"{'client':>8} {'frames':>9} {'frames/s':>10} {'MiB':>7} {'lat avg ms':>10} {'lat max ms':>10} {'books':>6}")
+    for report in sorted(reports, key=lambda r: r["pid"]):
+        match = "match" if report["books"] == books else "DIFFER"
+        print(f"{report['pid']:>8} {report['frames']:>9} {report['frames'] / report['seconds'] if report['seconds'] > 0.5 else float('nan'):>10,.0f} {report['bytes'] / 2 ** 20:>7.1f} "
+              f"{report['latency_ms_avg']:>10.2f} {report['latency_ms_max']:>10.2f} {match:>6}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# benchmarks/logging_bench.py
+"""
+Per-call cost of a hot-path log call on the calling (trading loop) thread.
+
+sync        : logging.basicConfig-style StreamHandler, f-string message (the previous setup)
+queue       : utils.log_setup pipeline, lazy %-style arguments, every record emitted
+queue+limit : same pipeline with the rate limiter, the same template repeated (the hot-path case)
+json        : queue pipeline with the JSON formatter
+
+Output goes to os.devnull so the sync numbers are a lower bound: a blocked stdout (Docker logs) only
+hurts the sync handler.
+Usage: python -m benchmarks.logging_bench [--calls 100000]
+"""
+import argparse, logging, os, time
+from utils.log_setup import setup_logging, stop_logging, TEXT_FORMAT, RATE_LIMITED
+
+def _time_calls(logger, calls: int, lazy: bool) -> float:
+    spread, fees = 0.1234, 0.2
+    start = time.perf_counter()
+    if lazy:
+        for i in range(calls): logger.info("[MAKER STRATEGY] Favorable spread (%.4f%%). Fees %.4f%%.", spread + i * 1e-6, fees, extra=RATE_LIMITED)
+    else:
+        for i in range(calls): logger.info(f"[MAKER STRATEGY] Favorable spread ({spread + i * 1e-6:.4f}%). Fees {fees:.4f}%.")
+    return (time.perf_counter() - start) / calls * 1e9
+
+def run(calls: int) -> dict:
+    results = {}
+    with open(os.devnull, 'w') as devnull:
+        root = logging.getLogger()
+        stop_logging()
+        for handler in list(root.handlers): root.removeHandler(handler)
+        sync_handler = logging.StreamHandler(devnull)
+        sync_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        root.addHandler(sync_handler); root.setLevel(logging.INFO)
+        results["sync"] = _time_calls(logging.getLogger("StrategyEngine"), calls, lazy=False)
+        root.removeHandler(sync_handler)
+        for name, fmt, limit in (("queue", "text", 0.0), ("queue+limit", "text", 5.0), ("json", "json", 0.0)):
+            setup_logging('INFO', fmt, limit, stream=devnull)
+            results[name] = _time_calls(logging.getLogger("StrategyEngine"), calls, lazy=True)
+            stop_logging()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=100_000)
+    args = parser.parse_args()
+    for name, ns in run(args.calls).items():
+        print(f"{name:<12} : {ns / 1000:>8.2f} us/call")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+# benchmarks/loop_bench.py
+"""
+Message throughput of the connector -> DataEngine path on a market data recording, for each available
+event loop implementation. Every frame goes through the connector's handle_message (JSON parsing included)
+and the replay yields to the loop after each frame, as ws.recv() does.
+
+Usage: python -m benchmarks.loop_bench logs/market_data.jsonl.gz [--limit 200000]
+"""
+import argparse, asyncio, time
+from itertools import islice
+from backtest.recording import read_recording, replay_connectors
+from engine.data_engine import DataEngine
+from utils.loop_monitor import event_loop_factories
+
+async def _replay(frames):
+    data_engine = DataEngine()
+    connectors = replay_connectors(data_engine, {(platform, symbol) for platform, symbol, _ in frames})
+    start = time.perf_counter()
+    for platform, symbol, raw in frames:
+        connectors[(platform, symbol)].handle_message(raw)
+        await asyncio.sleep(0)
+    return len(frames) / (time.perf_counter() - start)
+
+def benchmark_event_loops(path: str, limit: int = 100_000) -> dict:
+    """Returns {loop name: messages per second} for the first `limit` depth frames of the recording."""
+    frames = [(platform, symbol, raw) for _, platform, symbol, _, raw in islice(read_recording(path, kinds={'depth'}), limit)]
+    if not frames: return {}
+    results = {}
+    for name, factory in event_loop_factories().items():
+        with asyncio.Runner(loop_factory=factory) as runner:
+            results[name] = runner.run(_replay(frames))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording")
+    parser.add_argument("--limit", type=int, default=200_000)
+    args = parser.parse_args()
+    for name, rate in benchmark_event_loops(args.recording, args.limit).items():
+        print(f"{name:<8} : {rate:>12,.0f} msg/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# benchmarks/router_bench.py
+"""
+Smart order router against single-venue execution, through the simulated broker.
+
+Three venues (different fees) quote synthetic books around a shared reference price. Each random
+taker order is sent twice from identical book states: routed across all venues, and entirely on the
+venue with the best top of book (what execute_arbitrage used to do). Books keep moving while the
+orders are in flight (`--latency-ms` per call), so the routed fills show slippage against the
+pre-trade estimate.
+
+Usage: python -m benchmarks.router_bench [--orders 200] [--latency-ms 2]
+"""
+import argparse, asyncio, copy, random
+from backtest.exchange_simulator import SimulatedMarket
+from backtest.simulated_broker import SimulatedBroker
+from execution.smart_order_router import SmartOrderRouter
+
+VENUE_FEES = {"Binance": {'maker': 0.08, 'taker': 0.1}, "OKX": {'maker': 0.08, 'taker': 0.08}, "Kraken": {'maker': 0.16, 'taker': 0.26}}
+SYMBOL = "BTC/USDC"
+
+async def _move(markets, broker, stop: asyncio.Event):
+    while not stop.is_set():
+        for venue, market in markets.items():
+            bids, asks = market.step()
+            broker.on_book_update(venue, SYMBOL, bids, asks)
+        await asyncio.sleep(0.001)
+
+async def _execute(markets, side: str, qty: float, latency_s: float, venues=None):
+    order_books = {(venue, SYMBOL): market.book for venue, market in markets.items()}
+    rich = {venue: {"BTC": 100.0, "USDC": 10_000_000.0} for venue in markets}
+    broker = SimulatedBroker(order_books, venues=tuple(markets), balances=rich, fees=VENUE_FEES, latency_s=latency_s)
+    router = SmartOrderRouter(broker, order_books)
+    stop = asyncio.Event()
+    mover = asyncio.create_task(_move(markets, broker, stop))
+    try: return await router.route(SYMBOL, side, qty, venues=venues, timeout_s=0.05)
+    finally:
+        stop.set(); await mover
+
+async def run(orders: int, latency_s: float, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    reference = {"price": 60000.0}
+    markets = {venue: SimulatedMarket(reference, seed=seed + i) for i, venue in enumerate(VENUE_FEES)}
+    for _ in range(500):
+        for market in markets.values(): market.step()
+    saving_bps, slippage_bps, children = [], [], []
+    for _ in range(orders):
+        for market in markets.values(): market.step()
+        side, qty = rng.choice(('buy', 'sell')), round(rng.uniform(0.05, 3.0), 5)
+        top = {venue: (m.book.get_asks(1) if side == 'buy' else m.book.get_bids(1))[0][0] for venue, m in markets.items()}
+        best_venue = (min if side == 'buy' else max)(top, key=top.get)
+        routed = await _execute(copy.deepcopy(markets), side, qty, latency_s)
+        single = await _execute(copy.deepcopy(markets), side, qty, latency_s, venues=[best_venue])
+        if not routed or not single or not routed["filled"] or not single["filled"]: continue
+        routed_unit, single_unit = routed["cost"] / routed["filled"], single["cost"] / single["filled"]
+        saving_bps.append((single_unit - routed_unit) / single_unit * 10_000 * (1 if side == 'buy' else -1))
+        if routed["slippage_bps"] is not None: slippage_bps.append(routed["slippage_bps"])
+        children.append(len(routed["children"]))
+    mean = lambda values: sum(values) / len(values) if values else float('nan')
+    return {"orders": len(saving_bps), "cost_saving_bps_avg": mean(saving_bps), "slippage_bps_avg": mean(slippage_bps),
+            "slippage_bps_max": max(slippage_bps, default=float('nan')), "children_avg": mean(children)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=2.0)
+    args = parser.parse_args()
+    for name, value in asyncio.run(run(args.orders, args.latency_ms / 1000)).items():
+        print(f"{name:<20} : {value:>10.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# benchmarks/shared_book_bench.py
+"""
+Single-process vs sharded deployment of the book pipeline.
+
+single : DataEngine updates and a strategy-like reader share one asyncio loop; the producer yields after
+         every update, as a connector does on each ws.recv().
+sharded: a publisher process applies the updates and writes the top levels to a SharedBookTable while a
+         reader process spins on the slot's sequence and reads both sides on every change.
+
+Reports producer throughput and update-to-read latency percentiles for each mode.
+Usage: python -m benchmarks.shared_book_bench [--updates 200000] [--depth 10]
+"""
+import argparse, asyncio, multiprocessing, time
+from engine.data_engine import DataEngine
+from engine.shared_book import SharedBookTable, SharedBookPublisher
+from benchmarks.synthetic import synthetic_updates
+
+KEY = ("Binance", "BTC/USDC")
+
+def _summary(latencies, updates: int, elapsed: float):
+    latencies.sort()
+    pick = lambda q: latencies[min(int(q * len(latencies)), len(latencies) - 1)] * 1e6 if latencies else float('nan')
+    return {"updates_per_s": updates / elapsed, "reads": len(latencies), "p50_us": pick(0.50), "p99_us": pick(0.99), "max_us": pick(1.0)}
+
+def run_single(updates, depth: int):
+    async def bench():
+        data_engine, state, latencies = DataEngine(), {"version": 0, "stamp": 0.0, "done": False}, []
+        async def producer():
+            for update in updates:
+                data_engine.process_update(update)
+                state["version"] += 1; state["stamp"] = time.monotonic()
+                await asyncio.sleep(0)
+            state["done"] = True
+        async def reader():
+            seen = 0
+            while not state["done"]:
+                if state["version"] != seen:
+                    seen = state["version"]
+                    book = data_engine.order_books[KEY]
+                    book.get_bids(depth); book.get_asks(depth)
+                    latencies.append(time.monotonic() - state["stamp"])
+                await asyncio.sleep(0)
+        start = time.perf_counter()
+        await asyncio.gather(producer(), reader())
+        return _summary(latencies, len(updates), time.perf_counter() - start)
+    return asyncio.run(bench())
+
+def _publisher(table_name, depth, count, ready, done, results):
+    updates = synthetic_updates(*KEY, count)
+    table = SharedBookTable([KEY], depth, name=table_name)
+    publisher = SharedBookPublisher(table)
+    ready.wait()
+    start = time.perf_counter()
+    for update in updates: publisher.process_update(update)
+    results.put(("publisher", time.perf_counter() - start))
+    done.set()
+    table.close()
+
+def _reader(table_name, depth, ready, done, results):
+    table = SharedBookTable([KEY], depth, name=table_name)
+    latencies, seen, spins = [], 0, 0
+    ready.set()
+    while True:
+        spins += 1
+        # Event.is_set() is a semaphore syscall: poll it rarely so the reader spins on shared memory only.
+        if spins % 1024 == 0 and done.is_set(): break
+        seq = table.sequence(0)
+        if seq != seen and not seq & 1:
+            seen = seq
+            _, stamp, _, _ = table.read(0, depth)
+            if stamp is not None: latencies.append(time.monotonic() - stamp)
+    results.put(("reader", latencies))
+    table.close()
+
+def run_sharded(count: int, depth: int):
+    ctx = multiprocessing.get_context("spawn")
+    table = SharedBookTable([KEY], depth, create=True)
+    ready, done, results = ctx.Event(), ctx.Event(), ctx.Queue()
+    processes = [ctx.Process(target=_publisher, args=(table.name, depth, count, ready, done, results)),
+                 ctx.Process(target=_reader, args=(table.name, depth, ready, done, results))]
+    for process in processes: process.start()
+    collected = dict(results.get() for _ in processes)
+    for process in processes: process.join()
+    table.close(); table.unlink()
+    return _summary(collected["reader"], count, collected["publisher"])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=200_000)
+    parser.add_argument("--depth", type=int, default=10)
+    args = parser.parse_args()
+    results = {"single": run_single(synthetic_updates(*KEY, args.updates), args.depth), "sharded": run_sharded(args.updates, args.depth)}
+    print(f"{'mode':<8} | {'updates/s':>12} | {'reads':>8} | {'p50 (us)':>9} | {'p99 (us)':>9} | {'max (us)':>9}")
+    for mode, r in results.items():
+        print(f"{mode:<8} | {r['updates_per_s']:>12,.0f} | {r['reads']:>8} | {r['p50_us']:>9.1f} | {r['p99_us']:>9.1f} | {r['max_us']:>9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# benchmarks/soak.py
+"""
+Memory soak test of the order books: many simulated hours of depth diffs through the DataEngine, with
+the book depth limits of config.py (or unbounded books with --unbounded).
+
+Diffs come from a recording, replayed in a loop, or from a synthetic stream. The recording's prices are
+scaled by a random-walk factor that moves every simulated minute, so over the day the books keep meeting
+new price levels and some deletions land on other prices, as happens with the far levels of real diff
+streams. Levels the market trades through are deleted (the venue would), so books never stay crossed.
+Prints per simulated hour the retained levels, the estimated book memory (DataEngine stats)
+and the process RSS; bounded books stay flat.
+
+Usage: python -m benchmarks.soak [--recording logs/market_data.jsonl.gz] [--hours 24] [--rate 10] [--unbounded]
+"""
+import argparse, json, math, os, random
+from backtest.recording import read_recording
+from engine.data_engine import DataEngine
+from config import BOOK_MAX_DEPTH, BOOK_PRICE_BAND_PCT
+
+def _rss_mb():
+    try:
+        with open('/proc/self/statm') as f: return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError, AttributeError): return None
+
+def _recorded_diffs(path: str, seed: int = 0):
+    """Endless (simulated seconds, platform, symbol, bids, asks) from a recording, with drifting prices."""
+    frames = []
+    for timestamp, platform, symbol, _, raw in read_recording(path, kinds={'depth'}):
+        data = json.loads(raw)
+        if platform == "OKX":
+            if 'data' not in data: continue
+            data = data['data'][0]
+        bids, asks = data.get('bids', data.get('b')), data.get('asks', data.get('a'))
+        if bids is not None and asks is not None: frames.append((timestamp, platform, symbol, bids, asks))
+    if not frames: raise SystemExit(f"No depth frames in {path}.")
+    rng = random.Random(seed)
+    now, previous, factor, minute = 0.0, frames[0][0], 1.0, 0
+    while True:
+        for timestamp, platform, symbol, bids, asks in frames:
+            # Temps simulé : écarts entre trames bornés à 1 s (sessions ajoutées au même fichier, retour au début de la boucle).
+            now += min(max(timestamp - previous, 0.0), 1.0)
+            previous = timestamp
+            while now >= (minute + 1) * 60:
+                minute += 1
+                factor *= math.exp(rng.gauss(0, 0.0008))
+            scale = lambda levels: [[f"{float(level[0]) * factor:.2f}", level[1]] for level in levels]
+            yield now, platform, symbol, scale(bids), scale(asks)
+
+def _synthetic_diffs(rate: float, venues=("Binance", "OKX"), symbol: str = "BTC/USDC", seed: int = 0):
+    """Endless diffs within 100 ticks of a random-walk mid; levels left behind by the mid are never deleted."""
+    rng = random.Random(seed)
+    mids = {venue: 6_000_000 for venue in venues}
+    step, now = 1.0 / rate, 0.0
+    while True:
+        now += step
+        for venue in venues:
+            mid = mids[venue] = mids[venue] + round(rng.gauss(0, 10))
+            bids = [[f"{(mid - rng.randint(1, 100)) / 100:.2f}", "0" if rng.random() < 0.2 else f"{rng.uniform(0.001, 2):.5f}"] for _ in range(5)]
+            asks = [[f"{(mid + rng.randint(1, 100)) / 100:.2f}", "0" if rng.random() < 0.2 else f"{rng.uniform(0.001, 2):.5f}"] for _ in range(5)]
+            yield now, venue, symbol, bids, asks
+
+def _uncross(data_engine, platform: str, symbol: str, asks):
+    """Deletes the stale side's levels the latest diff traded through."""
+    book = data_engine.order_books.get((platform, symbol))
+    if not book or not book.bids or not book.asks: return
+    best_bid, best_ask = book.bids.peekitem(-1)[0], book.asks.peekitem(0)[0]
+    if best_bid < best_ask: return
+    if best_ask in {float(level[0]) for level in asks}: diff = {"b": [[price, "0"] for price in book.bids.irange(minimum=best_ask)], "a": []}
+    else: diff = {"b": [], "a": [[price, "0"] for price in book.asks.irange(maximum=best_bid)]}
+    data_engine.process_update({"platform": platform, "symbol": symbol, "data": diff})
+
+def run(hours: float, recording: str = None, rate: float = 10.0, max_depth: int = BOOK_MAX_DEPTH, band_pct: float = BOOK_PRICE_BAND_PCT):
+    """Yields one sample per simulated hour: (hour, levels, book memory KB, RSS MB)."""
+    data_engine = DataEngine(max_depth, band_pct)
+    diffs = _recorded_diffs(recording) if recording else _synthetic_diffs(rate)
+    next_hour = 1
+    for now, platform, symbol, bids, asks in diffs:
+        data_engine.process_update({"platform": platform, "symbol": symbol, "data": {"b": bids, "a": asks}})
+        _uncross(data_engine, platform, symbol, asks)
+        if now >= next_hour * 3600:
+            books = data_engine.order_books.values()
+            yield next_hour, sum(len(b.bids) + len(b.asks) for b in books), sum(b.memory_bytes() for b in books) / 1024, _rss_mb()
+            if next_hour >= hours: return
+            next_hour += 1
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recording")
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--rate", type=float, default=10.0, help="synthetic diffs per second and book")
+    parser.add_argument("--unbounded", action="store_true", help="no depth limit or price band")
+    args = parser.parse_args()
+    limits = (None, None) if args.unbounded else (BOOK_MAX_DEPTH, BOOK_PRICE_BAND_PCT)
+    print(f"{'hour':>4} {'levels':>8} {'books KB':>10} {'RSS MB':>8}")
+    samples = []
+    for hour, levels, memory_kb, rss_mb in run(args.hours, args.recording, args.rate, *limits):
+        samples.append(memory_kb)
+        print(f"{hour:>4} {levels:>8} {memory_kb:>10.1f} {rss_mb if rss_mb is not None else float('nan'):>8.1f}")
+    if len(samples) > 1:
+        # La première heure remplit les carnets ; la croissance se mesure ensuite.
+        print(f"Book memory growth after the first hour: {(samples[-1] - samples[0]) / samples[0] * 100:+.1f}%")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+# benchmarks/suite.py
+"""
+Benchmarks of the data and strategy hot paths, with JSON results and regression tracking.
+
+  python -m benchmarks.suite run [--output bench.json] [--recording logs/market_data.jsonl.gz] [--quick]
+  python -m benchmarks.suite compare baseline.json candidate.json [--threshold 10]
+
+Each case reports the best (lowest) time per operation over several repeats. DataEngine cases use the
+depth frames of a recording when one is given, otherwise exchange-format frames from the simulator's
+synthetic market. `compare` flags every case slower than the threshold (in %) and exits with status 1
+if there is any regression.
+"""
+import argparse, asyncio, json, os, platform, subprocess, sys, tempfile, time
+from itertools import islice
+from engine.data_engine import OrderBook, DataEngine
+from engine.strategy_engine import StrategyEngine, calculate_real_profit_sync
+from engine.trade_aggregator import TradeAggregator
+from backtest.exchange_simulator import ExchangeSimulator
+from backtest.recording import read_recording
+from utils.trade_logger import TradeLogger
+
+def _measure(run, ops: int, repeat: int) -> float:
+    """Calls `run()` (which performs `ops` operations) `repeat` times; returns the best ns per operation."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best / ops * 1e9
+
+def _filled_book(levels: int, mid: float = 60000.0) -> OrderBook:
+    book = OrderBook()
+    book.update([[mid - 0.01 * i, 1.0] for i in range(1, levels + 1)], [[mid + 0.01 * i, 1.0] for i in range(1, levels + 1)])
+    return book
+
+def bench_order_book(results: dict, ops: int, repeat: int):
+    for depth in (10, 100, 1000):
+        book = _filled_book(depth)
+        diffs = [([[f"{60000 - 0.01 * (i % depth + 1):.2f}", "0" if i % 5 == 0 else "1.5"]], [[f"{60000 + 0.01 * (i % depth + 1):.2f}", "2.5"]]) for i in range(ops)]
+        results[f"orderbook.update[depth={depth}]"] = _measure(lambda: [book.update(b, a) for b, a in diffs], ops, repeat)
+        book = _filled_book(depth)
+        results[f"orderbook.get_bids(10)[depth={depth}]"] = _measure(lambda: [book.get_bids(10) for _ in range(ops)], ops, repeat)
+        results[f"orderbook.get_asks(10)[depth={depth}]"] = _measure(lambda: [book.get_asks(10) for _ in range(ops)], ops, repeat)
+
+def _frames(venue: str, recording: str, count: int):
+    if recording:
+        raws = [raw for _, platform_name, _, _, raw in islice(read_recording(recording, kinds={'depth'}), count * 10) if platform_name == venue][:count]
+        if raws: return raws, "recorded"
+    simulator_frames = (raw for kind, raw in ExchangeSimulator()._frames(venue, "BTC/USDC") if kind == 'depth')
+    return list(islice(simulator_frames, count)), "synthetic"
+
+def bench_data_engine(results: dict, ops: int, repeat: int, recording: str = None):
+    for venue in ("Binance", "OKX"):
+        raws, source = _frames(venue, recording, ops)
+        payloads = [json.loads(raw) for raw in raws]
+        if venue == "OKX": payloads = [p["data"][0] for p in payloads if "data" in p]
+        updates = [{"platform": venue, "symbol": "BTC/USDC", "data": payload} for payload in payloads]
+        def run():
+            engine = DataEngine()
+            for update in updates: engine.process_update(update)
+        results[f"data_engine.process_update[{venue},{source}]"] = _measure(run, len(updates), repeat)
+
+def bench_trade_aggregator(results: dict, ops: int, repeat: int):
+    # Environ 20 transactions par seconde : la plupart mettent à jour les barres ouvertes, une sur vingt en ouvre une.
+    trades = [(60000.0 + (i % 7) * 0.01, 0.001 * (i % 5 + 1), 'buy' if i % 3 else 'sell', 1_700_000_000.0 + i * 0.05) for i in range(ops)]
+    def run():
+        aggregator = TradeAggregator()
+        for price, qty, side, timestamp in trades: aggregator.on_trade("Binance", "BTC/USDC", price, qty, side, timestamp)
+    results["trade_aggregator.on_trade"] = _measure(run, ops, repeat)
+    aggregator = TradeAggregator()
+    for price, qty, side, timestamp in trades: aggregator.on_trade("Binance", "BTC/USDC", price, qty, side, timestamp)
+    now = trades[-1][3]
+    results["trade_aggregator.vwap"] = _measure(lambda: [aggregator.vwap("Binance", "BTC/USDC", now) for _ in range(ops)], ops, repeat)
+
+def bench_profit_calculation(results: dict, ops: int, repeat: int):
+    shapes = {
+        "no_cross": ([(60001.0 + i, 1.0) for i in range(10)], [(60000.0 - i, 1.0) for i in range(10)]),
+        "cross_1_level": ([(59990.0, 0.0001)] + [(60001.0 + i, 1.0) for i in range(9)], [(60100.0, 1.0)] + [(60000.0 - i, 1.0) for i in range(9)]),
+        "cross_10_levels": ([(59900.0 + i, 0.00002) for i in range(10)], [(60100.0 - i, 0.00002) for i in range(10)]),
+    }
+    for shape, (asks, bids) in shapes.items():
+        results[f"calculate_real_profit_sync[{shape}]"] = _measure(lambda: [calculate_real_profit_sync(asks, bids, 0.1, 0.1, 15.0) for _ in range(ops)], ops, repeat)
+
+
+class _FeesOnly:
+    """Order manager stand-in: evaluate_market_pair only reads fees when no opportunity is found."""
+    metadata = None
+
+    def get_fees(self, platform_name, symbol=None):
+        return {'maker': 0.1, 'taker': 0.1}
+
+def bench_strategy_tick(results: dict, ops: int, repeat: int):
+    async def run_case():
+        engine = StrategyEngine({}, _FeesOnly(), notifier=None)
+        engine.maker_spread_threshold_pct = float('inf')
+        book_a, book_b = _filled_book(100), _filled_book(100, mid=60000.5)
+        async def run():
+            for _ in range(ops): await engine.evaluate_market_pair(book_a, book_b, "Binance", "OKX", "BTC/USDC")
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            await run()
+            best = min(best, time.perf_counter() - start)
+        engine.process_pool.shutdown()
+        return best / ops * 1e9
+    results["strategy.evaluate_market_pair[no_opportunity]"] = asyncio.run(run_case())
+
+def bench_trade_logger(results: dict, ops: int, repeat: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        trade_logger = TradeLogger(db_path=os.path.join(tmp, "bench.db"))
+        def run():
+            for i in range(ops):
+                trade_logger.log_trade(event_type='BENCH', platform_buy='Binance', platform_sell='OKX', symbol='BTC/USDC', volume=0.001, buy_price=60000.0, sell_price=60010.0, profit_usd=0.01, profit_pct=0.01)
+            trade_logger.queue.join()
+        results["trade_logger.write_throughput"] = _measure(run, ops, repeat)
+        trade_logger.close()
+
+def run_suite(recording: str = None, quick: bool = False) -> dict:
+    ops, repeat = (2_000, 3) if quick else (20_000, 5)
+    results = {}
+    bench_order_book(results, ops, repeat)
+    bench_data_engine(results, ops, repeat, recording)
+    bench_trade_aggregator(results, ops, repeat)
+    bench_profit_calculation(results, ops, repeat)
+    bench_strategy_tick(results, ops, repeat)
+    bench_trade_logger(results, max(ops // 10, 200), repeat)
+    try: commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception: commit = None
+    meta = {"timestamp": time.time(), "commit": commit, "python": sys.version.split()[0], "platform": platform.platform(), "ops": ops, "repeat": repeat}
+    return {"meta": meta, "results": {name: {"ns_per_op": ns} for name, ns in results.items()}}
+
+def compare(baseline: dict, candidate: dict, threshold_pct: float):
+    """Returns (rows, regressions); a row is (name, baseline ns, candidate ns, change %)."""
+    rows, regressions = [], []
+    for name, base in baseline["results"].items():
+        if name not in candidate["results"]: continue
+        old, new = base["ns_per_op"], candidate["results"][name]["ns_per_op"]
+        change = (new - old) / old * 100 if old else 0.0
+        rows.append((name, old, new, change))
+        if change > threshold_pct: regressions.append(name)
+    return rows, regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run")
+    run_parser.add_argument("--output", default="bench.json")
+    run_parser.add_argument("--recording")
+    run_parser.add_argument("--quick", action="store_true")
+    compare_parser = commands.add_parser("compare")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("candidate")
+    compare_parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        report = run_suite(args.recording, args.quick)
+        with open(args.output, "w") as f: json.dump(report, f, indent=2)
+        for name, result in report["results"].items(): print(f"{name:<58} {result['ns_per_op'] / 1000:>10.3f} us/op")
+        print(f"\nResults written to {args.output}")
+        return
+    with open(args.baseline) as f: baseline = json.load(f)
+    with open(args.candidate) as f: candidate = json.load(f)
+    rows, regressions = compare(baseline, candidate, args.threshold)
+    for name, old, new, change in rows:
+        flag = "REGRESSION" if name in regressions else ("improved" if change < -args.threshold else "")
+        print(f"{name:<58} {old / 1000:>10.3f} -> {new / 1000:>10.3f} us/op  {change:>+7.1f}%  {flag}")
+    print(f"\n{len(regressions)} regression(s) above {args.threshold:.0f}%.")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
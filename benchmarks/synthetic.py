@@ -0,0 +1,16 @@
+# benchmarks/synthetic.py
+import random
+
+def synthetic_updates(platform: str, symbol: str, count: int, levels_per_update: int = 5, mid: float = 60000.0, seed: int = 0):
+    """
+    Deterministic stream of depth diffs in the packaged format DataEngine.process_update expects.
+    Prices random-walk around `mid` on a 0.01 tick; about one level in five is a deletion (qty 0).
+    """
+    rng = random.Random(seed)
+    updates = []
+    for _ in range(count):
+        mid += rng.choice((-0.01, 0.0, 0.01)) * rng.randint(1, 5)
+        bids = [[f"{mid - 0.01 * rng.randint(1, 50):.2f}", "0" if rng.random() < 0.2 else f"{rng.uniform(0.001, 2):.5f}"] for _ in range(levels_per_update)]
+        asks = [[f"{mid + 0.01 * rng.randint(1, 50):.2f}", "0" if rng.random() < 0.2 else f"{rng.uniform(0.001, 2):.5f}"] for _ in range(levels_per_update)]
+        updates.append({"platform": platform, "symbol": symbol, "data": {"b": bids, "a": asks}})
+    return updates
@@ -0,0 +1,117 @@
+# benchmarks/warm_start_bench.py
+"""
+Time to the first valid Binance book after a restart, from a REST snapshot (cold) and from a book checkpoint (warm).
+
+An in-process exchange simulator streams diffs at each --rates frames per second. Per trial, a connector
+runs until its book is valid, saves the checkpoint as main.py does at shutdown and stops; after --gap-ms,
+one connector starts cold (no checkpoint) and one warm (checkpoint loaded), one after the other. Reports
+the median time from `run` to a valid book, how often the checkpoint was spliced, and whether the warm
+books matched the simulator's once the stream was paused. A checkpoint only splices when no update was
+published between the save and the first live diff, so quiet streams and short restarts gain the most.
+
+Usage: python -m benchmarks.warm_start_bench [--rates 2 20 200 1000] [--trials 5] [--gap-ms 0]
+"""
+import argparse, asyncio, logging, os, socket, statistics, tempfile, time
+import config
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _until_valid(connector, timeout_s: float = 10.0):
+    deadline = time.monotonic() + timeout_s
+    while connector.first_sync_ms is None:
+        if time.monotonic() > deadline: raise TimeoutError(f"no valid book within {timeout_s}s")
+        await asyncio.sleep(0.001)
+
+
+async def _start(connector):
+    task = asyncio.create_task(connector.run())
+    await _until_valid(connector)
+    return task
+
+
+async def _stop(task):
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+def _matches(data_engine, simulator, symbol: str) -> bool:
+    book = data_engine.order_books[("Binance", symbol)]
+    reference = simulator.venues["Binance"].books[symbol]
+    rounded = lambda levels: [(round(p, 2), round(q, 5)) for p, q in levels]
+    return (rounded(book.get_bids(len(book.bids))) == rounded(reference.get_bids(len(reference.bids)))
+            and rounded(book.get_asks(len(book.asks))) == rounded(reference.get_asks(len(reference.asks))))
+
+
+async def _bench_rate(rate: float, trials: int, gap_s: float, path: str, symbol: str = "BTC/USDC"):
+    from backtest.exchange_simulator import ExchangeSimulator
+    from connectors.binance_connector import BinanceConnector
+    from engine.data_engine import DataEngine
+    simulator = ExchangeSimulator(symbols=(symbol,), rate=rate)
+    server = asyncio.create_task(simulator.run(rest_port=int(config.SIMULATOR_REST_URL.rsplit(':', 1)[1]), ws_port=int(config.SIMULATOR_WS_URL.rsplit(':', 1)[1])))
+    await asyncio.sleep(0.2)
+    cold, warm, spliced, matched = [], [], 0, 0
+    try:
+        for _ in range(trials):
+            # Arrêt comme dans main.py : point de contrôle puis arrêt du connecteur.
+            data_engine = DataEngine()
+            task = await _start(BinanceConnector(data_engine, symbol))
+            await asyncio.sleep(0.2)
+            data_engine.save_checkpoint(path)
+            await _stop(task)
+            await asyncio.sleep(gap_s)
+
+            data_engine = DataEngine()
+            data_engine.load_checkpoints(path, 60)
+            connector = BinanceConnector(data_engine, symbol)
+            task = await _start(connector)
+            warm.append(connector.first_sync_ms)
+            spliced += connector.syncs["checkpoint"]
+            # Flux suspendu : le carnet doit rejoindre celui du simulateur une fois les trames en vol appliquées.
+            simulator.rate = 0
+            await asyncio.sleep(0.3)
+            matched += _matches(data_engine, simulator, symbol)
+            simulator.rate = rate
+            await _stop(task)
+
+            data_engine = DataEngine()
+            connector = BinanceConnector(data_engine, symbol)
+            task = await _start(connector)
+            cold.append(connector.first_sync_ms)
+            await _stop(task)
+    finally:
+        server.cancel()
+        await asyncio.gather(server, return_exceptions=True)
+        # Les flux du simulateur continuent après l'arrêt du serveur : suspendus pour ne pas fausser les mesures suivantes.
+        simulator.rate = 0
+    return {"rate": rate, "cold_ms": statistics.median(cold), "warm_ms": statistics.median(warm), "spliced": spliced, "matched": matched, "trials": trials}
+
+
+async def _main(rates, trials: int, gap_s: float):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "book_checkpoint.bin")
+        print(f"{'diffs/s':>8} {'cold ms':>9} {'warm ms':>9} {'spliced':>8} {'book ok':>8}")
+        for rate in rates:
+            result = await _bench_rate(rate, trials, gap_s, path)
+            print(f"{result['rate']:>8g} {result['cold_ms']:>9.1f} {result['warm_ms']:>9.1f} {result['spliced']:>5}/{result['trials']:<2} {result['matched']:>5}/{result['trials']:<2}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rates", nargs="+", type=float, default=[2, 20, 200, 1000], help="diffs per second of the simulated stream")
+    parser.add_argument("--trials", type=int, default=5)
+    parser.add_argument("--gap-ms", type=float, default=0.0, help="pause between the shutdown and the restart")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    # Les connecteurs lisent les URL du simulateur à l'import : à fixer avant.
+    config.SIMULATOR_REST_URL, config.SIMULATOR_WS_URL = f"http://127.0.0.1:{_free_port()}", f"ws://127.0.0.1:{_free_port()}"
+    config.TRADE_STREAMS = False
+    asyncio.run(_main(args.rates, args.trials, args.gap_ms / 1000))
+
+
+if __name__ == "__main__":
+    main()
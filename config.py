@@ -27,4 +27,215 @@ TELEGRAM_CHAT_ID = '5763218219'
 
 # --- SAFETY & RISK MANAGEMENT ---
 # Maximum size in USD for a single arbitrage trade. This is your most important risk control.
-MAX_TRADE_SIZE_USD = 15.0
\ No newline at end of file
+MAX_TRADE_SIZE_USD = 15.0
+# Pre-trade limits checked in memory before every order (None disables one): order notional, inventory
+# accumulated on one venue (worst case: its open orders on the same side filled), the day's loss (UTC;
+# reaching it trips the kill switch, which cancels all open orders and halts trading), orders sent per
+# second and orders open per venue. Open positions are marked to the book mids as they move; without a
+# book listener (sharded mode), every RISK_MARK_INTERVAL_S seconds.
+RISK_ENGINE = True
+RISK_MAX_ORDER_USD = 50.0
+RISK_MAX_VENUE_INVENTORY_USD = 150.0
+RISK_MAX_DAILY_LOSS_USD = 25.0
+RISK_MAX_ORDERS_PER_S = 10
+RISK_MAX_OPEN_ORDERS = 20
+RISK_MARK_INTERVAL_S = 1.0
+
+# --- CONCURRENCY ---
+# Maximum number of trades (taker or maker) in flight at the same time, across all venue pairs and symbols.
+MAX_CONCURRENT_TRADES = 3
+# Seconds a (venue pair, symbol) stays idle after one of its trades completes. Other pairs keep trading.
+PAIR_COOLDOWN_SECONDS = 5
+
+# --- STRATEGIES ---
+# Strategies share one book-update fan-out (StrategyDispatcher): each receives the updates of the books it subscribes to,
+# coalesced while it is busy. A delivery taking longer than STRATEGY_BUDGET_MS (wall time, unless the strategy sets its
+# own budget) is counted as an overrun and logged; per-strategy figures are in the "strategies" status source.
+STRATEGY_BUDGET_MS = 5.0
+
+# --- HEDGING ---
+# One-sided or partial fills are flattened with taker orders split across the connected venues by depth.
+# A hedge order may pay HEDGE_MAX_SLIPPAGE_PCT beyond the last book level it was sized on and has
+# HEDGE_FILL_TIMEOUT_S to fill before the rest is cancelled and re-hedged (at most HEDGE_MAX_ATTEMPTS rounds).
+# Incidents taking longer than HEDGE_LATENCY_BUDGET_S to get flat are reported.
+HEDGE_MAX_SLIPPAGE_PCT = 0.2
+HEDGE_FILL_TIMEOUT_S = 2.0
+HEDGE_MAX_ATTEMPTS = 5
+HEDGE_LATENCY_BUDGET_S = 3.0
+
+# --- MARKET METADATA ---
+# Fees (account tier where the venue exposes it), tick/lot sizes and minimums of every traded symbol
+# are reloaded in the background every METADATA_REFRESH_INTERVAL_S seconds.
+METADATA_REFRESH_INTERVAL_S = 3600
+
+# --- ORDER JOURNAL ---
+# Every order intent, acknowledgement and final fill is appended to ORDER_JOURNAL_PATH (None: no journal)
+# before and after it is sent. On startup, orders left open by a crash are cancelled and the exposure of
+# unfinished trades is flattened once a book is live (giving up after RECOVERY_BOOK_WAIT_S); open orders are
+# cancelled on shutdown. ORDER_JOURNAL_FSYNC also protects against a machine crash, at a disk write per order.
+# INSTANCE_ID (up to 8 letters or digits) is part of every client order id and of the journal's name: bot
+# instances trading the same accounts need distinct ids, or each would cancel and reconcile the other's orders.
+INSTANCE_ID = 'main'
+ORDER_JOURNAL_PATH = f'logs/order_journal.{INSTANCE_ID}.jsonl'
+ORDER_JOURNAL_FSYNC = False
+RECOVERY_BOOK_WAIT_S = 30.0
+
+# --- ORDER ROUTING ---
+# Taker legs are split across the connected venues by fee-inclusive price; each child order has
+# ROUTER_CHILD_TIMEOUT_S to fill before its remainder is cancelled.
+ROUTER_CHILD_TIMEOUT_S = 2.0
+
+# --- ADAPTIVE THRESHOLDS ---
+# When enabled, the taker/maker thresholds of each pair follow streaming statistics of its spread,
+# volatility and fill history instead of the fixed values. The taker threshold never leaves
+# [THRESHOLD_FLOOR_PCT, THRESHOLD_CEILING_PCT]; it grows with the adverse move expected over
+# THRESHOLD_LATENCY_S (THRESHOLD_VOL_MULTIPLIER standard deviations). Statistics decay with a
+# THRESHOLD_HALF_LIFE_S half-life and are saved to THRESHOLD_STATE_PATH at shutdown (None: not persisted).
+ADAPTIVE_THRESHOLDS = True
+THRESHOLD_FLOOR_PCT = 0.05
+THRESHOLD_CEILING_PCT = 0.5
+THRESHOLD_LATENCY_S = 0.2
+THRESHOLD_VOL_MULTIPLIER = 2.0
+THRESHOLD_HALF_LIFE_S = 60.0
+THRESHOLD_STATE_PATH = 'logs/threshold_state.json'
+
+# --- OPPORTUNITY TRACKING ---
+# Records every episode of positive net-of-fees spread between two venues (lifetime, peak, depth).
+# Episodes are journaled in batches of OPPORTUNITY_JOURNAL_BATCH, or every OPPORTUNITY_JOURNAL_FLUSH_S seconds.
+OPPORTUNITY_TRACKER = True
+OPPORTUNITY_JOURNAL_BATCH = 100
+OPPORTUNITY_JOURNAL_FLUSH_S = 30.0
+
+# --- DEPLOYMENT ---
+# Symbols traded on every connected venue (one WebSocket connection per venue and symbol).
+TRADING_SYMBOLS = ['BTC/USDC']
+# 'single': connectors, data engine and strategy share one asyncio loop (default).
+# 'sharded': each venue's connectors run in their own process and publish the top SHARED_BOOK_DEPTH levels
+# of every book to shared memory; STRATEGY_SHARDS strategy processes, each owning a subset of the symbols, read them.
+DEPLOYMENT_MODE = 'single'
+STRATEGY_SHARDS = 1
+SHARED_BOOK_DEPTH = 10
+# Strategy processes check the shared books for changes this often to update the adaptive thresholds.
+SHARED_BOOK_WATCH_S = 0.05
+
+# --- ORDER BOOKS ---
+# Each book side keeps at most BOOK_MAX_DEPTH levels (None: unbounded); with BOOK_PRICE_BAND_PCT, levels further
+# than that percentage from the mid are dropped as well (None: no band). Diffs far from the touch are not always
+# deleted by the venues, so unbounded books grow for the life of the process. The strategy reads 10 levels,
+# the router 20.
+BOOK_MAX_DEPTH = 500
+BOOK_PRICE_BAND_PCT = None
+
+# --- BOOK CHECKPOINTS ---
+# Every BOOK_CHECKPOINT_INTERVAL_S, the valid books and their last update id are written to BOOK_CHECKPOINT_PATH
+# (compact binary, by a worker thread), and once more at shutdown. At startup, a checkpoint younger than
+# BOOK_CHECKPOINT_MAX_AGE_S lets a Binance book restart from it when the first live diff continues it; the REST
+# snapshot is still requested alongside and used otherwise. None disables checkpoints.
+BOOK_CHECKPOINT_PATH = 'logs/book_checkpoint.bin'
+BOOK_CHECKPOINT_INTERVAL_S = 5.0
+BOOK_CHECKPOINT_MAX_AGE_S = 60.0
+
+# --- MARKET DATA CONNECTIONS ---
+# A dropped WebSocket is reopened after a random delay in [0, min(WS_BACKOFF_MAX_S, WS_BACKOFF_BASE_S * 2^attempt)]
+# (exponential backoff with full jitter, reset once a connection is subscribed).
+WS_BACKOFF_BASE_S = 0.5
+WS_BACKOFF_MAX_S = 30.0
+# Every connection is pinged each WS_PING_INTERVAL_S; without a pong within WS_PING_TIMEOUT_S it is closed and reopened.
+WS_PING_INTERVAL_S = 5.0
+WS_PING_TIMEOUT_S = 3.0
+# Number of simultaneous connections per venue and symbol (2 = hot standby, on the venue's alternate endpoint
+# when it has one). Updates are de-duplicated by update id, so losing one socket leaves no gap in the book.
+WS_CONNECTIONS = 1
+# With several connections, out-of-order updates held while waiting for a missing update id (at most this
+# many, for at most WS_REORDER_TIMEOUT_S; the book shows no levels meanwhile); beyond that the book is
+# resynchronised. A single connection is ordered: a missing update id resynchronises at once.
+WS_REORDER_WINDOW = 50
+WS_REORDER_TIMEOUT_S = 0.25
+
+# --- MARKET DATA FEED ---
+# Optional shared market data process (python -m engine.market_data_feed): it runs the connectors once and publishes
+# book deltas, trades and, every MARKET_DATA_FEED_SNAPSHOT_S seconds, full snapshots on MARKET_DATA_FEED_ADDRESS
+# ('unix:/path' or 'host:port') in a compact binary encoding; a bot joining late starts from snapshots.
+# With MARKET_DATA_FROM_FEED, the bot reads that feed instead of opening its own exchange connections.
+MARKET_DATA_FEED_ADDRESS = 'unix:/tmp/arb_market_data.sock'
+MARKET_DATA_FROM_FEED = False
+MARKET_DATA_FEED_SNAPSHOT_S = 30.0
+# A bot with more than this many bytes unsent is disconnected (it reconnects and starts again from snapshots).
+MARKET_DATA_FEED_MAX_BUFFER_BYTES = 8 * 2 ** 20
+
+# --- TRADE STREAMS ---
+# Optional: connectors also subscribe to the venues' public trades (Binance aggTrade, OKX trades). They are aggregated
+# per venue and symbol into OHLCV bars at each of TRADE_BAR_RESOLUTIONS_S (the last TRADE_BAR_CAPACITY bars are kept)
+# and into a VWAP and traded volume over the last TRADE_WINDOW_S seconds, reported by the status reporter (single
+# deployment mode only). The strategy does not use them.
+TRADE_STREAMS = False
+TRADE_BAR_RESOLUTIONS_S = (1, 60, 300)
+TRADE_BAR_CAPACITY = 1440
+TRADE_WINDOW_S = 60.0
+
+# --- EVENT LOOP ---
+# 'asyncio' (standard loop) or 'uvloop' (libuv-based, faster I/O; falls back to asyncio if not installed).
+EVENT_LOOP = 'asyncio'
+# The loop-lag monitor wakes up every LOOP_LAG_CHECK_INTERVAL_S seconds; a scheduling delay above
+# LOOP_LAG_ALERT_S is logged with the stack of the code that was blocking the loop.
+LOOP_LAG_CHECK_INTERVAL_S = 0.05
+LOOP_LAG_ALERT_S = 0.1
+
+# --- MARKET DATA RECORDING ---
+# gzip JSON-lines file the connectors record raw WebSocket frames to. None disables recording.
+RECORD_MARKET_DATA_PATH = None
+# Recording replayed at startup to report message throughput for each available event loop. None skips it.
+LOOP_BENCHMARK_RECORDING = None
+
+# --- HISTORICAL DATA ---
+# `python -m backtest.history_downloader` fetches historical trades and OHLCV through ccxt (from the simulator when
+# SIMULATOR_REST_URL is set) into a recording at HISTORY_OUTPUT_PATH, and resumes from its checkpoint file
+# (<path>.checkpoint.json) after an interruption. At most HISTORY_MAX_CONCURRENT_REQUESTS requests are in flight per
+# venue, on top of ccxt's rate limiter; a failed request is retried HISTORY_RETRIES times with backoff.
+HISTORY_OUTPUT_PATH = 'logs/history.jsonl.gz'
+HISTORY_MAX_CONCURRENT_REQUESTS = 4
+HISTORY_RETRIES = 5
+
+# --- STATUS REPORTING ---
+# Order book display, scheduled separately from the strategy loop:
+# 'terminal' prints tables from a background thread, 'http' serves a JSON snapshot on
+# http://STATUS_HTTP_HOST:STATUS_HTTP_PORT/status, None disables it.
+STATUS_REPORTER = 'terminal'
+STATUS_INTERVAL_S = 10
+STATUS_HTTP_HOST = '127.0.0.1'
+STATUS_HTTP_PORT = 8765
+
+# --- PROFILING ---
+# Sampling profiler of the event loop, started and stopped at runtime with SIGUSR1 or POST /profile/start and
+# /profile/stop on the control API. It samples the loop's stack every PROFILER_INTERVAL_S seconds of CPU time (SIGPROF) and, when stopped,
+# writes collapsed stacks (flamegraph input) to PROFILE_OUTPUT_DIR. The CPU time of each long-running task is
+# always accounted for (status source "cpu").
+PROFILER_INTERVAL_S = 0.01
+PROFILE_OUTPUT_DIR = 'logs/profiles'
+
+# --- CONTROL API ---
+# Local HTTP endpoint (http://CONTROL_HTTP_HOST:CONTROL_HTTP_PORT) to read and change strategy parameters,
+# pause/resume venue pairs, resynchronise books and trip the kill switch without restarting. None disables it.
+# Requests must send CONTROL_TOKEN in an X-Control-Token header (and POSTs Content-Type: application/json);
+# browser requests are refused. Without a token the API is not started. Keep it on localhost all the same.
+CONTROL_HTTP_HOST = '127.0.0.1'
+CONTROL_HTTP_PORT = 8766
+CONTROL_TOKEN = None
+
+# --- LOGGING ---
+# Records are queued by the caller and formatted/written by a background thread.
+LOG_LEVEL = 'INFO'
+# 'text' (human readable) or 'json' (one structured object per line).
+LOG_FORMAT = 'text'
+# A repeating message (same logger and template) is emitted at most once per LOG_RATE_LIMIT_S seconds;
+# the repeats are counted on the next one. Only the market data loggers of LOG_RATE_LIMITED_LOGGERS and
+# the strategy's per-tick messages are limited; ERROR and above never are. 0 disables it.
+LOG_RATE_LIMIT_S = 5.0
+LOG_RATE_LIMITED_LOGGERS = ('BinanceConnector', 'OkxConnector', 'DataEngine', 'SharedBookPublisher', 'MarketDataPublisher',
+                            'MarketDataFeedClient', 'ConsolidatedBooks', 'OpportunityTracker', 'websockets')
+
+# --- EXCHANGE SIMULATOR ---
+# Run `python -m backtest.exchange_simulator` and set these to load-test the whole bot locally.
+# When set, the connectors and ccxt talk to the simulator instead of the real exchanges. None = real exchanges.
+SIMULATOR_REST_URL = None   # e.g. 'http://127.0.0.1:8800'
+SIMULATOR_WS_URL = None     # e.g. 'ws://127.0.0.1:8801'
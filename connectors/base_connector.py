@@ -0,0 +1,233 @@
+# connectors/base_connector.py
+import asyncio, random, time, websockets
+from config import WS_BACKOFF_BASE_S, WS_BACKOFF_MAX_S, WS_PING_INTERVAL_S, WS_PING_TIMEOUT_S, WS_CONNECTIONS, WS_REORDER_WINDOW, WS_REORDER_TIMEOUT_S, TRADE_STREAMS
+
+def backoff_delay(attempt: int, base_s: float = WS_BACKOFF_BASE_S, max_s: float = WS_BACKOFF_MAX_S) -> float:
+    """Exponential backoff with full jitter: uniform in [0, min(max_s, base_s * 2^attempt)]."""
+    return random.uniform(0, min(max_s, base_s * 2 ** attempt))
+
+
+class WebSocketConnector:
+    """
+    Connection handling shared by the venue connectors.
+
+    `run` keeps WS_CONNECTIONS sockets open on `ws_urls` (reconnecting with jittered exponential backoff)
+    and pings each one to measure its round trip. Every socket feeds `handle_message`; subclasses pass the
+    update ids of each frame to `_sequence`, which applies a frame once (the copies from the other sockets
+    are dropped) and calls `resync` on a real gap. With a single socket, frames come in order and any missing
+    update id is a gap. With several, frames that arrive ahead of a missing one are held, for at most
+    WS_REORDER_WINDOW frames and WS_REORDER_TIMEOUT_S, while another socket may still deliver it; the book is
+    suspended (shows no levels) meanwhile. The book is invalidated when the last socket drops or a gap is
+    found, and stays empty until `resync` delivers a snapshot. Connectors with `warm_start` may instead resume from a book checkpoint (saved by
+    the DataEngine before a restart, or the book as it stood when the feed was lost) through
+    `_splice_checkpoint`, when the first live diff continues it. With `trade_stream`, connectors also subscribe to the venue's trades and pass
+    them to `_trades`, which de-duplicates them by trade id the same way.
+    Outside `run` (recording replays), frames are applied as they come, without sequencing.
+    """
+    warm_start = False
+
+    def __init__(self, data_engine, symbol: str, recorder, ws_urls):
+        self.data_engine = data_engine
+        self.symbol_unified = symbol
+        self.recorder = recorder
+        self.ws_urls = [ws_urls[i % len(ws_urls)] for i in range(max(WS_CONNECTIONS, 1))]
+        self.ws_url = self.ws_urls[0]
+        self.last_seq = None
+        self.trade_stream = TRADE_STREAMS
+        self.last_trade_id = None
+        self.resyncing = False
+        self._pending = {}
+        # Minuterie de l'attente d'une mise à jour manquante (None : aucune trame retenue).
+        self._hold_timer = None
+        self._sockets = {}
+        self._running = False
+        self.reconnects = self.duplicates = self.gaps = self.resyncs = 0
+        self.ping_ms = {}
+        # (update id, exchange time, bids, asks) dont le carnet peut repartir, tant qu'aucun diff ne l'a dépassé.
+        take_checkpoint = getattr(data_engine, 'take_checkpoint', None)
+        self._checkpoint = take_checkpoint(self.name, symbol) if self.warm_start and take_checkpoint else None
+        # Temps pour obtenir un carnet valide : au démarrage (depuis `run`) et à la dernière resynchronisation.
+        self._unsynced_since = None
+        self.first_sync_ms = self.sync_ms = None
+        self.syncs = {"snapshot": 0, "checkpoint": 0, "checkpoint_missed": 0}
+
+    # --- à implémenter par les connecteurs ---
+
+    async def subscribe(self, ws):
+        """Sends the subscription, if the venue needs one, once a socket is open."""
+
+    def handle_message(self, message: str):
+        raise NotImplementedError
+
+    def resync(self, reason: str):
+        """Invalidates the book and starts getting a snapshot."""
+        raise NotImplementedError
+
+    # --- séquencement ---
+
+    def _apply(self, raw: str, payload: dict, snapshot: bool = False, seq: int = None):
+        if self.recorder: self.recorder.record(self.name, self.symbol_unified, 'depth', raw)
+        self.data_engine.process_update({"platform": self.name, "symbol": self.symbol_unified, "data": payload, "snapshot": snapshot, "seq": seq})
+
+    def _sequence(self, prev: int, seq: int, raw: str, payload: dict):
+        """Applies a diff covering update ids (prev, seq] if it continues the book; duplicates are dropped, early frames held."""
+        if seq <= self.last_seq:
+            self.duplicates += 1
+            return
+        if prev > self.last_seq:
+            if len(self.ws_urls) == 1:
+                # Une seule connexion, ordonnée : la mise à jour manquante n'arrivera plus.
+                self.gaps += 1
+                self.resync(f"update ids {self.last_seq} -> {prev} missing")
+                return
+            for stale in [key for key, held in self._pending.items() if held[0] <= self.last_seq]: del self._pending[stale]
+            self._pending[prev] = (seq, raw, payload)
+            if len(self._pending) > WS_REORDER_WINDOW:
+                self._reorder_expired()
+            elif self._hold_timer is None:
+                self.data_engine.suspend(self.name, self.symbol_unified)
+                self._hold_timer = asyncio.get_running_loop().call_later(WS_REORDER_TIMEOUT_S, self._reorder_expired)
+            return
+        if self._hold_timer is not None:
+            self._hold_timer.cancel()
+            self._hold_timer = None
+            self.data_engine.resume(self.name, self.symbol_unified)
+        self._apply(raw, payload, seq=seq)
+        self.last_seq = seq
+        while self._pending:
+            held = self._pending.pop(self.last_seq, None)
+            if held is None: break
+            self.last_seq = held[0]
+            self._apply(held[1], held[2], seq=held[0])
+        if self._pending:
+            # Un autre trou derrière celui qui vient d'être comblé.
+            self.data_engine.suspend(self.name, self.symbol_unified)
+            self._hold_timer = asyncio.get_running_loop().call_later(WS_REORDER_TIMEOUT_S, self._reorder_expired)
+
+    def _reorder_expired(self):
+        """The missing update did not come in time (or too many frames are held): resynchronises."""
+        if not self._pending: return
+        self.gaps += 1
+        self.resync(f"update ids {self.last_seq} -> {min(self._pending)} missing")
+
+    def _checkpoint_frame(self, update_id: int, bids, asks) -> str:
+        """Venue-format snapshot frame of a checkpoint, for the recorder (None: not recorded)."""
+        return None
+
+    def _splice_checkpoint(self, prev: int, seq: int) -> bool:
+        """
+        With a checkpoint pending, restores the book from it if the live diff covering update ids (prev, seq]
+        continues it, and resumes sequencing after it (True). Diffs older than the checkpoint are ignored; the
+        first one past it either lines up or shows that updates were missed, and the checkpoint is dropped.
+        """
+        update_id, _, bids, asks = self._checkpoint
+        if seq <= update_id: return False
+        self._checkpoint = None
+        if prev > update_id:
+            self.syncs["checkpoint_missed"] += 1
+            self.logger.info(f"{self.name} {self.symbol_unified} checkpoint at update id {update_id} is behind the stream ({prev}); waiting for the snapshot.")
+            return False
+        self.resyncing = False
+        self._pending.clear()
+        self.last_seq = update_id
+        self._apply(self._checkpoint_frame(update_id, bids, asks), {"bids": bids, "asks": asks}, snapshot=True, seq=update_id)
+        self._synced("checkpoint", f" at update id {update_id}")
+        return True
+
+    def _synced(self, method: str, detail: str = ""):
+        """Records that the book is valid again, from a 'snapshot' or a 'checkpoint', and how long it took."""
+        self.syncs[method] += 1
+        if self._unsynced_since is not None:
+            self.sync_ms = (time.monotonic() - self._unsynced_since) * 1000
+            if self.first_sync_ms is None: self.first_sync_ms = self.sync_ms
+            self._unsynced_since = None
+        self.logger.info(f"{self.name} {self.symbol_unified} book valid from {method}{detail} after {self.sync_ms or 0:.0f}ms.")
+
+    def _trades(self, raw: str, trades):
+        """Applies the (trade id, price, qty, taker side, timestamp ms) of a trade frame once; trades already seen on another socket are dropped."""
+        applied = False
+        for trade_id, price, qty, side, timestamp_ms in trades:
+            if self._running and self.last_trade_id is not None and trade_id <= self.last_trade_id: continue
+            self.last_trade_id = trade_id
+            self.data_engine.process_trade(self.name, self.symbol_unified, float(price), float(qty), side, timestamp_ms / 1000)
+            applied = True
+        if applied and self.recorder: self.recorder.record(self.name, self.symbol_unified, 'trade', raw)
+
+    def _start_resync(self, reason: str):
+        if not self.resyncing:
+            self.resyncs += 1
+            if self._unsynced_since is None: self._unsynced_since = time.monotonic()
+            if reason == "feed lost" and self.warm_start and self.last_seq is not None:
+                # Flux perdu : le carnet tel quel sert de point de contrôle, si la reconnexion reprend à sa suite.
+                book = self.data_engine.order_books.get((self.name, self.symbol_unified))
+                if book is not None and book.valid: self._checkpoint = (self.last_seq, book.exchange_ts, list(book.bids.items()), list(book.asks.items()))
+            elif reason != "connected":
+                # Trou ou demande explicite : le carnet n'est plus fiable.
+                self._checkpoint = None
+        self.resyncing = True
+        self.last_seq = None
+        self._pending.clear()
+        if self._hold_timer is not None:
+            self._hold_timer.cancel()
+            self._hold_timer = None
+        self.data_engine.invalidate(self.name, self.symbol_unified, reason)
+
+    # --- connexions ---
+
+    async def _ping_loop(self, ws, index: int):
+        while True:
+            await asyncio.sleep(WS_PING_INTERVAL_S)
+            start = time.perf_counter()
+            try:
+                await asyncio.wait_for(await ws.ping(), WS_PING_TIMEOUT_S)
+            except asyncio.TimeoutError:
+                self.logger.warning(f"No pong from {self.name} connection #{index} within {WS_PING_TIMEOUT_S}s. Closing it.")
+                await ws.close()
+                return
+            except websockets.exceptions.ConnectionClosed:
+                # La boucle de réception voit aussi la fermeture et reconnecte.
+                return
+            self.ping_ms[index] = (time.perf_counter() - start) * 1000
+
+    async def _connection(self, index: int, url: str):
+        attempt = 0
+        while True:
+            try:
+                async with websockets.connect(url, ping_interval=None) as ws:
+                    await self.subscribe(ws)
+                    attempt = 0
+                    self._sockets[index] = ws
+                    self.logger.info(f"Connected to {self.symbol_unified} on {self.name} (connection #{index}, {len(self._sockets)} open).")
+                    if len(self._sockets) == 1 or self.last_seq is None and not self.resyncing: self.resync("connected")
+                    pinger = asyncio.create_task(self._ping_loop(ws, index))
+                    try:
+                        while True: self.handle_message(await ws.recv())
+                    finally:
+                        pinger.cancel()
+                        del self._sockets[index]
+                        self.ping_ms.pop(index, None)
+                        # Plus aucune connexion : le carnet n'est plus suivi.
+                        if not self._sockets: self._start_resync("feed lost")
+            except (websockets.exceptions.ConnectionClosed, ConnectionRefusedError, OSError, asyncio.TimeoutError) as e:
+                self.logger.error(f"Connection #{index} lost to {self.name} (type: {type(e).__name__}).")
+            except Exception as e:
+                self.logger.error(f"An unexpected error occurred with {self.name} connection #{index}: {e}", exc_info=True)
+            delay = backoff_delay(attempt)
+            attempt += 1
+            self.reconnects += 1
+            self.logger.info(f"Reconnecting {self.name} connection #{index} in {delay:.2f}s (attempt {attempt}).")
+            await asyncio.sleep(delay)
+
+    async def run(self):
+        self._running = True
+        self._unsynced_since = time.monotonic()
+        self.logger.info(f"Connecting to {self.name} data stream over {len(self.ws_urls)} connection(s): {', '.join(dict.fromkeys(self.ws_urls))}")
+        try: await asyncio.gather(*(self._connection(index, url) for index, url in enumerate(self.ws_urls)))
+        finally: self._running = False
+
+    def stats(self) -> dict:
+        book = self.data_engine.order_books.get((self.name, self.symbol_unified))
+        return {"connections": len(self._sockets), "valid": bool(book is not None and book.valid and not self.resyncing),
+                "ping_ms": {index: round(ms, 2) for index, ms in self.ping_ms.items()}, "reconnects": self.reconnects,
+                "duplicates": self.duplicates, "gaps": self.gaps, "resyncs": self.resyncs, "held": len(self._pending),
+                "first_sync_ms": self.first_sync_ms and round(self.first_sync_ms, 1), "last_sync_ms": self.sync_ms and round(self.sync_ms, 1), "syncs": dict(self.syncs)}
@@ -1,39 +1,103 @@
 # connectors/binance_connector.py
-import asyncio, json, logging, websockets
-from config import PAPER_TRADING_MODE
+import asyncio, json, logging
+from config import PAPER_TRADING_MODE, SIMULATOR_WS_URL, SIMULATOR_REST_URL
+from connectors.base_connector import WebSocketConnector, backoff_delay
 
-class BinanceConnector:
-    def __init__(self, data_engine):
+class BinanceConnector(WebSocketConnector):
+    """
+    Binance diff-depth stream. Diffs carry update ids [U, u]; a book is (re)built the documented way:
+    diffs are buffered, a REST snapshot gives `lastUpdateId`, buffered diffs up to it are dropped and
+    the rest applied in sequence. With a book checkpoint pending, the first buffered diff that continues
+    it restores the book at once; the snapshot request still runs alongside, for when it does not.
+    Trades come from the `aggTrade` stream, subscribed on the same socket.
+    """
+    SNAPSHOT_LIMIT = 1000
+    warm_start = True
+
+    def __init__(self, data_engine, symbol: str = "BTC/USDC", recorder=None):
         self.name = "Binance"
-        self.symbol_unified = "BTC/USDC"
-        self.symbol_ws = self.symbol_unified.replace('/', '').lower()
-        
+        self.symbol_ws = symbol.replace('/', '').lower()
+
         # --- CORRECTION : URL DYNAMIQUE ---
-        if PAPER_TRADING_MODE:
+        if SIMULATOR_WS_URL:
+            base_urls = [f"{SIMULATOR_WS_URL}/ws"]
+            self.snapshot_url = f"{SIMULATOR_REST_URL}/api/v3/depth"
+        elif PAPER_TRADING_MODE:
             # URL du Testnet de Binance
-            base_url = "wss://stream.binance.com:9443/ws"
+            base_urls = ["wss://stream.binance.com:9443/ws", "wss://data-stream.binance.vision/ws"]
+            self.snapshot_url = "https://api.binance.com/api/v3/depth"
         else:
-            # URL de Production de Binance
-            base_url = "wss://stream.binance.com:9443/ws" # (Binance utilise la même pour le spot)
-        
-        self.ws_url = f"{base_url}/{self.symbol_ws}@depth@100ms"
+            # URL de Production de Binance ; la seconde (flux de données seul) sert de connexion de secours.
+            base_urls = ["wss://stream.binance.com:9443/ws", "wss://data-stream.binance.vision/ws"]
+            self.snapshot_url = "https://api.binance.com/api/v3/depth"
+
         self.logger = logging.getLogger(self.__class__.__name__)
-        self.data_engine = data_engine
+        super().__init__(data_engine, symbol, recorder, [f"{base_url}/{self.symbol_ws}@depth@100ms" for base_url in base_urls])
+        self._buffer = []
+        self._snapshot_task = None
+
+    async def subscribe(self, ws):
+        if self.trade_stream: await ws.send(json.dumps({"method": "SUBSCRIBE", "params": [f"{self.symbol_ws}@aggTrade"], "id": 1}))
+
+    def handle_message(self, message: str):
+        data = json.loads(message)
+        event = data.get('e')
+        if event == 'aggTrade':
+            # `m` : l'acheteur était le teneur de marché, donc l'agresseur a vendu.
+            self._trades(message, ((data['a'], data['p'], data['q'], 'sell' if data['m'] else 'buy', data['T']),))
+            return
+        if event is None and 'result' in data: return  # réponse à l'abonnement
+        if not self._running:
+            # Rejeu : les instantanés REST enregistrés portent `lastUpdateId`.
+            self._apply(message, data, snapshot='lastUpdateId' in data, seq=data.get('lastUpdateId', data.get('u')))
+            return
+        if self.resyncing:
+            self._buffer.append((data['U'] - 1, data['u'], message, data))
+            if self._checkpoint is not None and self._splice_checkpoint(data['U'] - 1, data['u']):
+                buffered, self._buffer = self._buffer, []
+                for prev, seq, raw, payload in buffered:
+                    if self.resyncing: break
+                    if seq > self.last_seq: self._sequence(prev, seq, raw, payload)
+            return
+        self._sequence(data['U'] - 1, data['u'], message, data)
+
+    def _checkpoint_frame(self, update_id: int, bids, asks) -> str:
+        return json.dumps({"lastUpdateId": update_id, "bids": [[repr(p), repr(q)] for p, q in bids], "asks": [[repr(p), repr(q)] for p, q in asks]})
+
+    def resync(self, reason: str):
+        self._start_resync(reason)
+        self._buffer = []
+        if self._snapshot_task is None or self._snapshot_task.done():
+            self._snapshot_task = asyncio.create_task(self._load_snapshot())
 
-    async def run(self):
-        # ... (le reste du fichier ne change pas)
-        self.logger.info(f"Connecting to {self.name} data stream: {self.ws_url}")
-        while True:
+    async def _load_snapshot(self):
+        import httpx
+        attempt = 0
+        while self.resyncing:
+            # Laisse arriver quelques diffs avant l'instantané, pour qu'il ne soit pas plus récent que le tampon.
+            await asyncio.sleep(backoff_delay(attempt) if attempt else 0.1)
+            attempt += 1
+            if not self._sockets: continue
             try:
-                async with websockets.connect(self.ws_url) as ws:
-                    self.logger.info(f"Successfully connected to {self.symbol_unified} on {self.name}.")
-                    while True:
-                        data = await ws.recv()
-                        update_data = {"platform": self.name, "symbol": self.symbol_unified, "data": json.loads(data)}
-                        self.data_engine.process_update(update_data)
-            except (websockets.exceptions.ConnectionClosedError, ConnectionRefusedError) as e:
-                self.logger.error(f"Connection lost to {self.name} (type: {type(e).__name__}). Reconnecting in 5s...")
-                await asyncio.sleep(5)
+                async with httpx.AsyncClient(timeout=10) as client:
+                    response = await client.get(self.snapshot_url, params={"symbol": self.symbol_ws.upper(), "limit": self.SNAPSHOT_LIMIT})
+                    response.raise_for_status()
+                    snapshot = response.json()
             except Exception as e:
-                self.logger.error(f"An unexpected error occurred with {self.name} connector: {e}", exc_info=True)
-                await asyncio.sleep(5)
+                self.logger.error(f"Could not fetch {self.name} {self.symbol_unified} depth snapshot: {e}")
+                continue
+            # Le point de contrôle a pu rétablir le carnet pendant la requête.
+            if not self.resyncing: break
+            last_update_id = snapshot['lastUpdateId']
+            if self._buffer and self._buffer[0][0] > last_update_id:
+                self.logger.info(f"{self.name} snapshot {last_update_id} older than the first buffered diff; fetching another.")
+                continue
+            buffered, self._buffer = self._buffer, []
+            self.resyncing = False
+            self._checkpoint = None
+            self.last_seq = last_update_id
+            self._apply(json.dumps(snapshot), {"bids": snapshot['bids'], "asks": snapshot['asks']}, snapshot=True, seq=last_update_id)
+            for prev, seq, raw, data in buffered:
+                if self.resyncing: break
+                self._sequence(prev, seq, raw, data)
+            self._synced("snapshot", f" at update id {last_update_id} ({len(buffered)} buffered diff(s))")
@@ -1,45 +1,66 @@
 # connectors/okx_connector.py
-import asyncio, json, logging, websockets
-from config import  PAPER_TRADING_MODE
+import asyncio, json, logging
+from config import  PAPER_TRADING_MODE, SIMULATOR_WS_URL
+from connectors.base_connector import WebSocketConnector
 
-class OkxConnector:
-    def __init__(self, data_engine):
+class OkxConnector(WebSocketConnector):
+    """
+    OKX `books` channel. Every subscription starts with a full snapshot (`action: snapshot`), followed by
+    updates chained by `prevSeqId` -> `seqId`. A snapshot always replaces the book; resynchronising means
+    closing one socket so that its new subscription brings a fresh snapshot, which is why book checkpoints
+    are not used (`warm_start`). Trades come from the `trades` channel of the same socket.
+    """
+    def __init__(self, data_engine, symbol: str = "BTC/USDC", recorder=None):
         self.name = "OKX"
-        self.symbol_unified = "BTC/USDC"
-        self.symbol_ws = self.symbol_unified.replace('/', '-')
-        
+        self.symbol_ws = symbol.replace('/', '-')
+
         # --- CORRECTION : URL DYNAMIQUE ---
-        if PAPER_TRADING_MODE:
+        if SIMULATOR_WS_URL:
+            ws_urls = [f"{SIMULATOR_WS_URL}/ws/v5/public"]
+            self.mode_log = "(Simulator)"
+        elif PAPER_TRADING_MODE:
             # URL du Paper Trading (Démo) de OKX
-            self.ws_url = "wss://wspap.okx.com:8443/ws/v5/public?brokerId=9999"
+            ws_urls = ["wss://wspap.okx.com:8443/ws/v5/public?brokerId=9999"]
             self.mode_log = "(Paper Trading)"
         else:
-            # URL de Production (Réelle) de OKX
-            self.ws_url = "wss://ws.okx.com:8443/ws/v5/public"
+            # URL de Production (Réelle) de OKX ; la seconde (hébergée sur AWS) sert de connexion de secours.
+            ws_urls = ["wss://ws.okx.com:8443/ws/v5/public", "wss://wsaws.okx.com:8443/ws/v5/public"]
             self.mode_log = "(Live)"
 
         self.logger = logging.getLogger(self.__class__.__name__)
-        self.data_engine = data_engine
+        super().__init__(data_engine, symbol, recorder, ws_urls)
+
+    async def subscribe(self, ws):
+        self.logger.info(f"Subscribing to {self.name} order book {self.mode_log} for {self.symbol_ws}.")
+        args = [{"channel": "books", "instId": self.symbol_ws}]
+        if self.trade_stream: args.append({"channel": "trades", "instId": self.symbol_ws})
+        await ws.send(json.dumps({"op": "subscribe", "args": args}))
+        confirmation = await ws.recv()
+        if '"event":"subscribe"' in confirmation:
+            self.logger.info(f"Subscribed to order book for {self.symbol_ws} on {self.name}.")
+
+    def handle_message(self, message: str):
+        if 'data' not in message: return
+        frame = json.loads(message)
+        if frame['arg']['channel'] == 'trades':
+            self._trades(message, [(int(t['tradeId']), t['px'], t['sz'], t['side'], int(t['ts'])) for t in frame['data']])
+            return
+        payload = frame['data'][0]
+        snapshot = frame.get('action') == 'snapshot'
+        if not self._running or snapshot:
+            self._apply(message, payload, snapshot, seq=payload.get('seqId'))
+            if snapshot and self._running:
+                resynced = self.resyncing
+                self.resyncing = False
+                self._pending.clear()
+                self.last_seq = payload.get('seqId')
+                if resynced: self._synced("snapshot", f" at sequence {self.last_seq}")
+            return
+        if self.resyncing: return
+        self._sequence(payload['prevSeqId'], payload['seqId'], message, payload)
 
-    async def run(self):
-        self.logger.info(f"Connecting to {self.name} data stream {self.mode_log}: {self.ws_url}")
-        subscribe_msg = { "op": "subscribe", "args": [{"channel": "books", "instId": self.symbol_ws}] }
-        while True:
-            try:
-                async with websockets.connect(self.ws_url) as ws:
-                    await ws.send(json.dumps(subscribe_msg))
-                    confirmation = await ws.recv()
-                    if '"event":"subscribe"' in confirmation:
-                        self.logger.info(f"Subscribed to order book for {self.symbol_ws} on {self.name}.")
-                    while True:
-                        data = await ws.recv()
-                        if 'data' in data:
-                            payload = json.loads(data)['data'][0]
-                            update_data = {"platform": self.name, "symbol": self.symbol_unified, "data": payload}
-                            self.data_engine.process_update(update_data)
-            except (websockets.exceptions.ConnectionClosedError, ConnectionRefusedError) as e:
-                self.logger.error(f"Connection lost to {self.name} (type: {type(e).__name__}). Reconnecting in 5s...")
-                await asyncio.sleep(5)
-            except Exception as e:
-                self.logger.error(f"An unexpected error occurred with {self.name} connector: {e}", exc_info=True)
-                await asyncio.sleep(5)
+    def resync(self, reason: str):
+        self._start_resync(reason)
+        # À la connexion, l'instantané arrive de lui-même ; sur un trou, une connexion est rouverte pour en obtenir un.
+        if reason != "connected" and self._sockets:
+            asyncio.create_task(next(iter(self._sockets.values())).close())
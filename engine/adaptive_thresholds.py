@@ -0,0 +1,145 @@
+# engine/adaptive_thresholds.py
+import json, math, time
+
+class PairStatistics:
+    """Streaming statistics of one directional pair (buy venue -> sell venue, symbol). Every update is O(1)."""
+    __slots__ = ("spread_mean", "spread_var", "vol_rate", "persistence_s", "fill_rate", "updates", "outcomes", "last_time", "last_mid", "run_start")
+    EXPORTED = ("spread_mean", "spread_var", "vol_rate", "persistence_s", "fill_rate", "updates", "outcomes")
+
+    def __init__(self):
+        self.spread_mean = self.spread_var = self.vol_rate = 0.0
+        self.persistence_s = None
+        self.fill_rate = 1.0
+        self.updates = self.outcomes = 0
+        self.last_time = self.last_mid = self.run_start = None
+
+    def update(self, spread_pct: float, mid: float, now: float, tau_s: float):
+        if self.last_time is None:
+            self.spread_mean, self.last_time, self.last_mid = spread_pct, now, mid
+            self.updates += 1
+            return
+        dt = now - self.last_time
+        if dt > 0:
+            alpha = 1.0 - math.exp(-dt / tau_s)
+            deviation = spread_pct - self.spread_mean
+            self.spread_mean += alpha * deviation
+            self.spread_var += alpha * (deviation * deviation - self.spread_var)
+            log_return = math.log(mid / self.last_mid) if self.last_mid else 0.0
+            self.vol_rate += alpha * (log_return * log_return / dt - self.vol_rate)
+            self.last_time, self.last_mid = now, mid
+        # Persistance : durée des épisodes de spread positif (EWMA par épisode).
+        if spread_pct > 0:
+            if self.run_start is None: self.run_start = now
+        elif self.run_start is not None:
+            duration = now - self.run_start
+            self.persistence_s = duration if self.persistence_s is None else self.persistence_s + 0.2 * (duration - self.persistence_s)
+            self.run_start = None
+        self.updates += 1
+
+    def record_outcome(self, filled_fraction: float):
+        self.fill_rate += 0.1 * (min(max(filled_fraction, 0.0), 1.0) - self.fill_rate)
+        self.outcomes += 1
+
+
+class AdaptiveThresholds:
+    """
+    Opportunity thresholds that follow market conditions, per directional pair.
+
+    Registered as a DataEngine listener (or fed by `watch_views` from shared-memory views), it updates the statistics of every pair involving the updated
+    book (EWMA spread mean/variance, realised volatility of the mid, persistence of positive spreads);
+    trade outcomes feed the fill-rate history. The taker threshold is the floor plus the adverse move
+    expected while our orders travel (`vol_multiplier` standard deviations over `latency_s`), scaled up
+    when spreads typically vanish faster than that latency and when our recent fill rate is poor, then
+    clamped to [floor, ceiling]. The maker threshold is the adverse-move part alone.
+    `export_state` / `load_state` carry the statistics (JSON-friendly) to a restart or a backtest replay;
+    `clock` can be replaced to replay recorded timestamps.
+    """
+    def __init__(self, order_books: dict, floor_pct: float = 0.01, ceiling_pct: float = 0.5, latency_s: float = 0.2,
+                 vol_multiplier: float = 2.0, half_life_s: float = 60.0, clock=time.monotonic):
+        self._order_books = order_books
+        self.floor_pct, self.ceiling_pct = floor_pct, ceiling_pct
+        self.latency_s = latency_s
+        self.vol_multiplier = vol_multiplier
+        self.half_life_s = half_life_s
+        self._tau = half_life_s / math.log(2)
+        self.clock = clock
+        self._stats = {}
+        self._venues = {}
+
+    def pair(self, buy_venue: str, sell_venue: str, symbol: str) -> PairStatistics:
+        key = (buy_venue, sell_venue, symbol)
+        stats = self._stats.get(key)
+        if stats is None: stats = self._stats[key] = PairStatistics()
+        return stats
+
+    def _top(self, platform: str, symbol: str):
+        # get_bids/get_asks : marche aussi sur les vues de la mémoire partagée.
+        book = self._order_books.get((platform, symbol))
+        if book is None: return None
+        bids, asks = book.get_bids(1), book.get_asks(1)
+        return (bids[0][0], asks[0][0]) if bids and asks else None
+
+    def on_book_update(self, platform: str, symbol: str, bids=None, asks=None):
+        venues = self._venues.get(symbol)
+        if venues is None: venues = self._venues[symbol] = []
+        if platform not in venues: venues.append(platform)
+        top = self._top(platform, symbol)
+        if top is None: return
+        bid, ask = top
+        now = self.clock()
+        for other in venues:
+            if other == platform: continue
+            other_top = self._top(other, symbol)
+            if other_top is None: continue
+            other_bid, other_ask = other_top
+            self.observe(platform, other, symbol, ask, other_bid, now)
+            self.observe(other, platform, symbol, other_ask, bid, now)
+
+    def observe(self, buy_venue: str, sell_venue: str, symbol: str, best_ask: float, best_bid: float, now: float = None):
+        if best_ask <= 0: return
+        self.pair(buy_venue, sell_venue, symbol).update((best_bid - best_ask) / best_ask * 100, (best_ask + best_bid) / 2,
+                                                        self.clock() if now is None else now, self._tau)
+
+    def record_outcome(self, buy_venue: str, sell_venue: str, symbol: str, filled_fraction: float):
+        self.pair(buy_venue, sell_venue, symbol).record_outcome(filled_fraction)
+
+    def thresholds(self, buy_venue: str, sell_venue: str, symbol: str):
+        """(taker threshold %, maker threshold %) for the pair."""
+        stats = self._stats.get((buy_venue, sell_venue, symbol))
+        if stats is None or stats.updates < 2: return self.floor_pct, 0.0
+        adverse_pct = self.vol_multiplier * math.sqrt(stats.vol_rate * self.latency_s) * 100
+        taker = self.floor_pct + adverse_pct
+        if stats.persistence_s is not None and stats.persistence_s < self.latency_s:
+            taker *= self.latency_s / max(stats.persistence_s, self.latency_s / 10)
+        taker /= max(stats.fill_rate, 0.25)
+        return min(max(taker, self.floor_pct), self.ceiling_pct), min(adverse_pct, self.ceiling_pct)
+
+    # --- export ---
+
+    def export_state(self) -> dict:
+        params = {"floor_pct": self.floor_pct, "ceiling_pct": self.ceiling_pct, "latency_s": self.latency_s,
+                  "vol_multiplier": self.vol_multiplier, "half_life_s": self.half_life_s}
+        pairs = {"|".join(key): {name: getattr(stats, name) for name in PairStatistics.EXPORTED} for key, stats in self._stats.items()}
+        return {"params": params, "pairs": pairs}
+
+    def load_state(self, state: dict, load_params: bool = False):
+        """Restores exported statistics; timing references restart from the next update."""
+        if load_params:
+            params = state.get("params", {})
+            for name in ("floor_pct", "ceiling_pct", "latency_s", "vol_multiplier", "half_life_s"):
+                if name in params: setattr(self, name, params[name])
+            self._tau = self.half_life_s / math.log(2)
+        for key, values in state.get("pairs", {}).items():
+            stats = self.pair(*key.split("|"))
+            for name in PairStatistics.EXPORTED:
+                if name in values: setattr(stats, name, values[name])
+
+    def save(self, path: str):
+        with open(path, "w") as f: json.dump(self.export_state(), f)
+
+    def load(self, path: str, load_params: bool = False):
+        with open(path) as f: self.load_state(json.load(f), load_params)
+
+    def summary(self) -> dict:
+        return {"|".join(key): {"taker_pct": round(taker, 5), "maker_pct": round(maker, 5), "fill_rate": round(stats.fill_rate, 3)}
+                for key, stats in list(self._stats.items()) for taker, maker in [self.thresholds(*key)]}
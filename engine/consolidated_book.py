@@ -0,0 +1,125 @@
+# engine/consolidated_book.py
+import logging
+from sortedcontainers import SortedDict
+
+class ConsolidatedBook:
+    """
+    Aggregated order book of one symbol across venues.
+
+    Each side maps price -> total quantity, and `contributions` keeps price -> {venue: qty} for both sides.
+    `apply` takes the same diffs the per-venue OrderBooks receive, so a delta costs O(changed levels)
+    (a level's total is re-summed over its few venues; a SortedDict insertion/removal only when a level
+    appears or disappears).
+    """
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.bids, self.asks = SortedDict(), SortedDict()
+        self.contributions = {'bids': {}, 'asks': {}}
+
+    def _apply_side(self, side: str, venue: str, levels):
+        totals, contributions = (self.bids, self.contributions['bids']) if side == 'bids' else (self.asks, self.contributions['asks'])
+        for item in levels:
+            price, qty = float(item[0]), float(item[1])
+            venues = contributions.get(price)
+            previous = venues.get(venue, 0.0) if venues else 0.0
+            if qty == previous: continue
+            if venues is None: venues = contributions[price] = {}
+            if qty == 0: venues.pop(venue, None)
+            else: venues[venue] = qty
+            if venues: totals[price] = sum(venues.values())
+            else:
+                totals.pop(price, None)
+                contributions.pop(price, None)
+
+    def apply(self, venue: str, bids, asks):
+        self._apply_side('bids', venue, bids)
+        self._apply_side('asks', venue, asks)
+
+    def remove_venue(self, venue: str):
+        """Drops every level contributed by `venue` (its book was reset or its feed lost)."""
+        for side in ('bids', 'asks'):
+            self._apply_side(side, venue, [(price, 0) for price, venues in list(self.contributions[side].items()) if venue in venues])
+
+    # --- lectures (même forme que OrderBook) ---
+
+    def get_bids(self, n: int):
+        top_bids = self.bids.items()[-n:] if n > 0 else []
+        return top_bids[::-1]
+
+    def get_asks(self, n: int):
+        return self.asks.items()[:n] if n > 0 else []
+
+    def levels(self, side: str, n: int):
+        """Top `n` levels of 'bids' or 'asks' as (price, total_qty, {venue: qty})."""
+        top = self.get_bids(n) if side == 'bids' else self.get_asks(n)
+        return [(price, qty, dict(self.contributions[side][price])) for price, qty in top]
+
+    def sweep(self, side: str, size: float, venues=None, fees: dict = None, limit_price: float = None):
+        """
+        Best execution of `size` taking liquidity on `side` ('buy' takes asks, 'sell' takes bids) across all
+        venues, or only `venues`. With `fees` ({venue: taker fee %}) levels are consumed by effective price
+        (fee included); the walk still stops after the raw price that cannot be beaten once fees are applied.
+        Levels beyond `limit_price` (raw) are never used.
+        Returns {"filled", "vwap" (raw), "cost" (fee included), "worst_price", "allocation": {venue: (qty, worst price)}}.
+        """
+        fees = fees or {}
+        buying = side == 'buy'
+        prices = self.asks.irange() if buying else self.bids.irange(reverse=True)
+        contributions = self.contributions['asks' if buying else 'bids']
+        allowed = set(venues) if venues is not None else None
+        # Sans liste de plateformes, une plateforme absente de `fees` compte pour 0 %.
+        fee_rates = [fees.get(v, 0.0) / 100 for v in allowed] if allowed is not None else [rate / 100 for rate in fees.values()] + [0.0]
+        fee_rates = fee_rates or [0.0]
+        f_min, f_max = min(fee_rates), max(fee_rates)
+        candidates, gathered, limit = [], 0.0, None
+        for price in prices:
+            if limit is not None and (price > limit if buying else price < limit): break
+            if limit_price is not None and (price > limit_price if buying else price < limit_price): break
+            for venue, qty in contributions[price].items():
+                if allowed is not None and venue not in allowed: continue
+                fee = fees.get(venue, 0.0) / 100
+                candidates.append((price * (1 + fee) if buying else -price * (1 - fee), price, qty, venue))
+                gathered += qty
+            if limit is None and gathered >= size:
+                limit = price * (1 + f_max) / (1 + f_min) if buying else price * (1 - f_max) / (1 - f_min)
+        candidates.sort()
+        remaining, notional, cost, worst, allocation = size, 0.0, 0.0, None, {}
+        for effective, price, qty, venue in candidates:
+            if remaining <= 0: break
+            take = min(qty, remaining)
+            notional += take * price
+            cost += take * abs(effective)
+            worst = price if worst is None or (price > worst if buying else price < worst) else worst
+            allocation[venue] = (allocation.get(venue, (0.0, price))[0] + take, price)
+            remaining -= take
+        filled = size - max(remaining, 0.0)
+        return {"filled": filled, "vwap": notional / filled if filled else None, "cost": cost, "worst_price": worst, "allocation": allocation}
+
+
+class ConsolidatedBooks:
+    """One ConsolidatedBook per symbol, kept up to date as a DataEngine listener."""
+    def __init__(self):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.books = {}
+
+    def get(self, symbol: str):
+        return self.books.get(symbol)
+
+    def on_book_update(self, platform: str, symbol: str, bids, asks):
+        book = self.books.get(symbol)
+        if book is None:
+            book = self.books[symbol] = ConsolidatedBook(symbol)
+            self.logger.info(f"Consolidated book created for {symbol}.")
+        book.apply(platform, bids, asks)
+
+    def snapshot(self, depth: int = 3) -> dict:
+        """Top levels of every consolidated book with their venue breakdown (status reporter source)."""
+        return {symbol: {"bids": book.levels('bids', depth), "asks": book.levels('asks', depth)} for symbol, book in list(self.books.items())}
+
+    @staticmethod
+    def from_order_books(order_books: dict, symbol: str, depth: int = 20) -> ConsolidatedBook:
+        """Builds a consolidated view from the top `depth` levels of per-venue books (e.g. shared-memory views, which carry no deltas)."""
+        book = ConsolidatedBook(symbol)
+        for (platform, book_symbol), venue_book in list(order_books.items()):
+            if book_symbol == symbol: book.apply(platform, venue_book.get_bids(depth), venue_book.get_asks(depth))
+        return book
@@ -1,11 +1,26 @@
 # engine/data_engine.py
-import asyncio, logging
+import asyncio, logging, os, struct, sys, threading, time
+from array import array
 from sortedcontainers import SortedDict
 
 class OrderBook:
-    def __init__(self):
+    """
+    One venue's book. With `max_depth`, each side keeps at most that many levels; with `band_pct`, levels
+    further than that percentage from the mid are dropped too. Pruning is amortised: a side may overrun
+    its limit by a quarter before `prune` trims it back, so most updates only pay an O(1) check.
+    """
+    def __init__(self, max_depth: int = None, band_pct: float = None):
         self.bids = SortedDict()
         self.asks = SortedDict()
+        # Faux entre une perte de flux (ou un trou de séquence) et la resynchronisation : le carnet reste vide.
+        # Aussi faux, sans être vidé, tant que son connecteur attend une mise à jour manquante (suspend) : il ne montre alors aucun niveau.
+        self.valid = True
+        # Dernier identifiant de mise à jour appliqué (séquence de la venue) et son horodatage exchange, en s.
+        self.update_id = None
+        self.exchange_ts = None
+        self.max_depth, self.band_pct = max_depth, band_pct
+        self._prune_above = max_depth + max(max_depth // 4, 1) if max_depth else None
+        self.pruned = 0
 
     def update(self, bids, asks):
         for item in bids:
@@ -18,28 +33,215 @@ class OrderBook:
             if qty == 0: self.asks.pop(price, None)
             else: self.asks[price] = qty
 
+    def prune(self):
+        """Trims both sides to the configured depth/band when they overrun it. Returns the removed (bid prices, ask prices)."""
+        bids, asks = self.bids, self.asks
+        removed_bids, removed_asks = [], []
+        if self.band_pct and bids and asks:
+            mid = (bids.peekitem(-1)[0] + asks.peekitem(0)[0]) / 2
+            band = mid * self.band_pct / 100
+            if bids.peekitem(0)[0] < mid - 1.25 * band:
+                cut = bids.bisect_left(mid - band)
+                removed_bids = bids.keys()[:cut]
+                del bids.keys()[:cut]
+            if asks.peekitem(-1)[0] > mid + 1.25 * band:
+                cut = asks.bisect_right(mid + band)
+                removed_asks = asks.keys()[cut:]
+                del asks.keys()[cut:]
+        if self._prune_above:
+            if len(bids) > self._prune_above:
+                cut = len(bids) - self.max_depth
+                removed_bids += bids.keys()[:cut]
+                del bids.keys()[:cut]
+            if len(asks) > self._prune_above:
+                removed_asks += asks.keys()[self.max_depth:]
+                del asks.keys()[self.max_depth:]
+        self.pruned += len(removed_bids) + len(removed_asks)
+        return removed_bids, removed_asks
+
+    # Par niveau, hors table de hachage : clé et quantité float, plus le pointeur de la liste triée des clés et sa marge.
+    LEVEL_BYTES = 2 * sys.getsizeof(0.0) + 10
+
+    def memory_bytes(self) -> int:
+        """Approximate footprint from public data only: each side's hash table plus LEVEL_BYTES per level."""
+        return sys.getsizeof(self.bids) + sys.getsizeof(self.asks) + (len(self.bids) + len(self.asks)) * self.LEVEL_BYTES
+
+    # Le SortedItemsView se découpe directement : O(n) au lieu de copier tout le carnet.
     def get_bids(self, n: int):
-        all_bids = list(self.bids.items())
-        top_bids = all_bids[-n:]
+        if not self.valid: return []
+        top_bids = self.bids.items()[-n:] if n > 0 else []
         return top_bids[::-1]
 
     def get_asks(self, n: int):
-        all_asks = list(self.asks.items())
-        top_asks = all_asks[:n]
+        if not self.valid: return []
+        top_asks = self.asks.items()[:n] if n > 0 else []
         return top_asks
 
+# Point de contrôle des carnets : en-tête (magique, date, nombre de carnets) puis, par carnet, la clé
+# "venue\0symbole", l'identifiant de mise à jour, l'horodatage exchange, les tailles et les niveaux en float64.
+_CHECKPOINT_MAGIC = b"BOOKCKP1"
+_CHECKPOINT_HEADER = struct.Struct("<8sdI")
+_CHECKPOINT_KEY = struct.Struct("<H")
+_CHECKPOINT_BOOK = struct.Struct("<qdII")
+
+
+def write_book_checkpoint(path: str, books) -> int:
+    """
+    Writes `books`, (platform, symbol, update id, exchange time, bids, asks) tuples with (price, qty) levels,
+    to `path` (through a temporary file of this process and thread, then a rename, so a reader never sees half
+    a file and two writers never share one). Returns its size.
+    """
+    parts = [_CHECKPOINT_HEADER.pack(_CHECKPOINT_MAGIC, time.time(), len(books))]
+    for platform, symbol, update_id, exchange_ts, bids, asks in books:
+        key = f"{platform}\0{symbol}".encode()
+        levels = array('d', [value for level in bids for value in level])
+        levels.extend(value for level in asks for value in level)
+        parts += [_CHECKPOINT_KEY.pack(len(key)), key, _CHECKPOINT_BOOK.pack(update_id, exchange_ts or 0.0, len(bids), len(asks)), levels.tobytes()]
+    data = b"".join(parts)
+    directory = os.path.dirname(path)
+    if directory: os.makedirs(directory, exist_ok=True)
+    # Pas de fsync : un fichier perdu ou tronqué ne coûte qu'un démarrage à froid.
+    temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporary, 'wb') as f: f.write(data)
+    os.replace(temporary, path)
+    return len(data)
+
+
+def read_book_checkpoint(path: str):
+    """(saved at, {(platform, symbol): (update id, exchange time, bids, asks)}) of a checkpoint file; ValueError if it is not one."""
+    with open(path, 'rb') as f: data = f.read()
+    try:
+        magic, saved_at, count = _CHECKPOINT_HEADER.unpack_from(data)
+        if magic != _CHECKPOINT_MAGIC: raise ValueError(f"{path} is not a book checkpoint")
+        offset, books = _CHECKPOINT_HEADER.size, {}
+        for _ in range(count):
+            (key_length,) = _CHECKPOINT_KEY.unpack_from(data, offset)
+            offset += _CHECKPOINT_KEY.size
+            platform, symbol = data[offset:offset + key_length].decode().split("\0")
+            offset += key_length
+            update_id, exchange_ts, bid_count, ask_count = _CHECKPOINT_BOOK.unpack_from(data, offset)
+            offset += _CHECKPOINT_BOOK.size
+            levels = array('d')
+            levels.frombytes(data[offset:offset + (bid_count + ask_count) * 16])
+            offset += (bid_count + ask_count) * 16
+            pairs = list(zip(levels[0::2], levels[1::2]))
+            books[(platform, symbol)] = (update_id, exchange_ts or None, pairs[:bid_count], pairs[bid_count:])
+    except (struct.error, UnicodeDecodeError) as e:
+        raise ValueError(f"{path}: truncated or corrupt book checkpoint ({e})") from e
+    return saved_at, books
+
+
 class DataEngine:
-    def __init__(self):
+    def __init__(self, book_max_depth: int = None, book_band_pct: float = None):
         self.order_books = {}
+        # Points de contrôle chargés au démarrage, retirés par les connecteurs (take_checkpoint).
+        self.checkpoints = {}
+        self.checkpoint_saves = 0
+        self.checkpoint_bytes = 0
+        # Écriture périodique en cours dans un thread : l'annulation de run_checkpoints ne l'arrête pas.
+        self._checkpoint_write = None
+        self.book_max_depth, self.book_band_pct = book_max_depth, book_band_pct
         self.logger = logging.getLogger(self.__class__.__name__)
+        # --- MÉTRIQUES ---
+        # Latence = réception - horodatage de l'exchange ('E' Binance, 'ts' OKX), en ms.
+        self.messages = 0
+        self.latency_ms_avg = 0.0
+        self.latency_ms_max = 0.0
+        self._stats_time, self._stats_messages = time.monotonic(), 0
+        self._listeners = []
+        self._trade_listeners = []
+        self.trades = 0
+        self.invalidations = 0
+        self.suspensions = 0
+        self.dropped_while_invalid = 0
+
+    def add_listener(self, callback):
+        """
+        Registers `callback(platform, symbol, bids, asks)`, called synchronously after each applied update
+        with the raw [price, qty, ...] levels of the diff. Listeners must return quickly: they run on the
+        connector's receive path.
+        """
+        self._listeners.append(callback)
+
+    def add_trade_listener(self, callback):
+        """Registers `callback(platform, symbol, price, qty, side, timestamp)`, called for each trade of the trade streams (side of the taker, timestamp in s)."""
+        self._trade_listeners.append(callback)
+
+    def process_trade(self, platform: str, symbol: str, price: float, qty: float, side: str, timestamp: float):
+        self.trades += 1
+        for listener in self._trade_listeners: listener(platform, symbol, price, qty, side, timestamp)
+
+    def stats(self) -> dict:
+        """Message rate since the previous call, exchange-to-apply latency (EWMA and max since the previous call)."""
+        now = time.monotonic()
+        rate = (self.messages - self._stats_messages) / max(now - self._stats_time, 1e-9)
+        stats = {"messages": self.messages, "messages_per_s": rate, "trades": self.trades, "latency_ms_avg": self.latency_ms_avg, "latency_ms_max": self.latency_ms_max,
+                 "invalid_books": ["/".join(key) for key, book in list(self.order_books.items()) if not getattr(book, 'valid', True)],
+                 "invalidations": self.invalidations, "suspensions": self.suspensions, "dropped_while_invalid": self.dropped_while_invalid,
+                 "checkpoint_saves": self.checkpoint_saves, "checkpoint_kb": round(self.checkpoint_bytes / 1024, 1),
+                 "books": {"/".join(key): {"levels": len(book.bids) + len(book.asks), "pruned": book.pruned, "memory_kb": round(book.memory_bytes() / 1024, 1)}
+                           for key, book in list(self.order_books.items()) if isinstance(book, OrderBook)}}
+        self._stats_time, self._stats_messages, self.latency_ms_max = now, self.messages, 0.0
+        return stats
+
+    def _book(self, platform: str, symbol: str) -> OrderBook:
+        book = self.order_books.get((platform, symbol))
+        if book is None:
+            book = self.order_books[(platform, symbol)] = OrderBook(self.book_max_depth, self.book_band_pct)
+            self.logger.info(f"Order book created for {platform}-{symbol}.")
+        return book
+
+    def invalidate(self, platform: str, symbol: str, reason: str = ""):
+        """
+        Empties a book and marks it invalid until the next snapshot update: the strategy sees no levels and
+        listeners receive the removal of every level. Diffs received meanwhile are dropped.
+        """
+        book = self._book(platform, symbol)
+        removed_bids, removed_asks = [[price, 0] for price in book.bids.keys()], [[price, 0] for price in book.asks.keys()]
+        book.bids.clear(); book.asks.clear()
+        was_valid = book.valid
+        if was_valid:
+            self.invalidations += 1
+            self.logger.warning(f"Order book {platform}-{symbol} invalid until resynchronised{f' ({reason})' if reason else ''}.")
+        book.valid = False
+        book.update_id = None
+        # Un carnet suspendu a déjà annoncé la suppression de ses niveaux.
+        if was_valid and (removed_bids or removed_asks):
+            for listener in self._listeners: listener(platform, symbol, removed_bids, removed_asks)
+
+    def suspend(self, platform: str, symbol: str):
+        """
+        Marks a book invalid without emptying it, while its connector waits for a missing update: readers see
+        no levels and listeners receive the removal of every level, until `resume` or `invalidate`.
+        """
+        book = self._book(platform, symbol)
+        if not book.valid: return
+        self.suspensions += 1
+        book.valid = False
+        if book.bids or book.asks:
+            removed_bids, removed_asks = [[price, 0] for price in book.bids.keys()], [[price, 0] for price in book.asks.keys()]
+            for listener in self._listeners: listener(platform, symbol, removed_bids, removed_asks)
+
+    def resume(self, platform: str, symbol: str):
+        """Makes a suspended book valid again; listeners receive all its levels."""
+        book = self._book(platform, symbol)
+        if book.valid or book.update_id is None: return
+        book.valid = True
+        if book.bids or book.asks:
+            bids, asks = [list(level) for level in book.bids.items()], [list(level) for level in book.asks.items()]
+            for listener in self._listeners: listener(platform, symbol, bids, asks)
 
     def process_update(self, packaged_data: dict):
         try:
             platform, symbol, data = packaged_data["platform"], packaged_data["symbol"], packaged_data["data"]
-            book_key = (platform, symbol)
-            if book_key not in self.order_books:
-                self.order_books[book_key] = OrderBook()
-                self.logger.info(f"Order book created for {platform}-{symbol}.")
+            self.messages += 1
+            event_time = data.get('E') or data.get('ts')
+            if event_time:
+                latency_ms = time.time() * 1000 - float(event_time)
+                self.latency_ms_avg += 0.01 * (latency_ms - self.latency_ms_avg)
+                if latency_ms > self.latency_ms_max: self.latency_ms_max = latency_ms
+            book = self._book(platform, symbol)
+            seq = packaged_data.get("seq")
             
             # --- CORRECTION DÉFINITIVE APPLIQUÉE ICI ---
             # Gère les deux formats de données :
@@ -49,14 +251,83 @@ class DataEngine:
             asks_data = data.get('asks', data.get('a'))
 
             if bids_data is None or asks_data is None:
-                self.logger.warning(f"Received malformed data from {platform}: missing bids or asks.")
+                self.logger.warning("Received malformed data from %s: missing bids or asks.", platform)
                 return
 
-            self.order_books[book_key].update(bids_data, asks_data)
+            if packaged_data.get("snapshot"):
+                # Instantané complet : remplace le carnet et le rend valide ; les listeners reçoivent aussi la suppression des anciens niveaux.
+                bids_data = [[price, 0] for price in book.bids.keys()] + list(bids_data)
+                asks_data = [[price, 0] for price in book.asks.keys()] + list(asks_data)
+                book.bids.clear(); book.asks.clear()
+                book.valid = True
+            elif not book.valid:
+                self.dropped_while_invalid += 1
+                return
+            book.update(bids_data, asks_data)
+            if seq is not None: book.update_id = seq
+            if event_time: book.exchange_ts = float(event_time) / 1000
+            for listener in self._listeners: listener(platform, symbol, bids_data, asks_data)
+            removed_bids, removed_asks = book.prune()
+            if removed_bids or removed_asks:
+                # Les niveaux élagués sont annoncés comme supprimés, pour que le carnet consolidé suive.
+                removed_bids, removed_asks = [[price, 0] for price in removed_bids], [[price, 0] for price in removed_asks]
+                for listener in self._listeners: listener(platform, symbol, removed_bids, removed_asks)
             
         except Exception as e:
             self.logger.error(f"Error processing direct update in DataEngine: {e}", exc_info=True)
 
+    # --- points de contrôle ---
+
+    def checkpoint(self):
+        """Copy of the valid, sequenced books, for write_book_checkpoint (call from the loop: the copy is consistent)."""
+        return [(platform, symbol, book.update_id, book.exchange_ts, list(book.bids.items()), list(book.asks.items()))
+                for (platform, symbol), book in list(self.order_books.items())
+                if isinstance(book, OrderBook) and book.valid and book.update_id is not None and (book.bids or book.asks)]
+
+    def save_checkpoint(self, path: str) -> int:
+        """Writes the books' checkpoint now, from the calling thread (shutdown). Returns the number of books saved."""
+        books = self.checkpoint()
+        self.checkpoint_bytes = write_book_checkpoint(path, books)
+        self.checkpoint_saves += 1
+        return len(books)
+
+    async def run_checkpoints(self, path: str, interval_s: float):
+        """Checkpoints the books every `interval_s`: copied on the loop, encoded and written by a worker thread."""
+        self.logger.info(f"Order book checkpoints every {interval_s}s to {path}.")
+        while True:
+            await asyncio.sleep(interval_s)
+            books = self.checkpoint()
+            if not books: continue
+            self._checkpoint_write = asyncio.ensure_future(asyncio.to_thread(write_book_checkpoint, path, books))
+            try: self.checkpoint_bytes = await asyncio.shield(self._checkpoint_write)
+            except OSError as e:
+                self.logger.error(f"Could not write the order book checkpoint {path}: {e}")
+                continue
+            self.checkpoint_saves += 1
+
+    async def checkpoint_written(self):
+        """Waits for the periodic write still running in its thread, if any, so it cannot replace a later checkpoint."""
+        if self._checkpoint_write is not None: await asyncio.gather(self._checkpoint_write, return_exceptions=True)
+
+    def load_checkpoints(self, path: str, max_age_s: float) -> int:
+        """Loads the checkpoints saved less than `max_age_s` ago, for the connectors to warm start from. Returns how many."""
+        try: saved_at, books = read_book_checkpoint(path)
+        except FileNotFoundError: return 0
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring the order book checkpoint: {e}")
+            return 0
+        age = time.time() - saved_at
+        if age > max_age_s:
+            self.logger.info(f"Order book checkpoint {path} is {age:.0f}s old (max {max_age_s}s); starting from snapshots.")
+            return 0
+        self.checkpoints = books
+        self.logger.info(f"Loaded {len(books)} order book checkpoint(s) saved {age:.1f}s ago: {', '.join('/'.join(key) for key in books)}.")
+        return len(books)
+
+    def take_checkpoint(self, platform: str, symbol: str):
+        """The loaded (update id, exchange time, bids, asks) checkpoint of a book, once; None if there is none."""
+        return self.checkpoints.pop((platform, symbol), None)
+
     async def run(self):
         # Cette tâche ne fait plus rien d'actif, mais elle maintient le moteur "en vie"
         # pour la cohérence de l'architecture.
@@ -0,0 +1,134 @@
+# engine/hedge_engine.py
+import asyncio, itertools, logging, time
+from collections import deque
+
+class HedgeEngine:
+    """
+    Flattens the inventory left unbalanced by one-sided or partial fills.
+
+    `flatten(symbol, exposure, open_legs)` is called as soon as an imbalance is seen; `exposure` is the signed
+    base quantity filled and not yet offset (+ long). Cancelling the trade's open legs and sending the hedge
+    run concurrently. Fills the cancelled legs still got in the meantime are folded back into the residual,
+    which is re-hedged against fresh depth until it is flat. Hedges go through the SmartOrderRouter, which
+    splits them across every connected venue by fee-inclusive price, as reduce-only orders: the risk limits
+    and the kill switch stop new entries, never the flattening of what is already open.
+    Every incident records its time-to-flat; incidents over the latency budget are reported.
+    """
+    def __init__(self, router, order_manager, notifier, max_slippage_pct: float = 0.2, fill_timeout_s: float = 2.0,
+                 max_attempts: int = 5, latency_budget_s: float = 3.0, flat_tolerance: float = 1e-5):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._router = router
+        self._order_manager = order_manager
+        self.notifier = notifier
+        self.max_slippage_pct = max_slippage_pct
+        self.fill_timeout_s = fill_timeout_s
+        self.max_attempts = max_attempts
+        self.latency_budget_s = latency_budget_s
+        self.flat_tolerance = flat_tolerance
+        self.residuals = {}
+        self.open_incidents = {}
+        self.time_to_flat = deque(maxlen=500)
+        self.counters = {"incidents": 0, "flat": 0, "over_budget": 0, "gave_up": 0}
+        self._incident_ids = itertools.count(1)
+
+    @staticmethod
+    def _filled(order) -> float:
+        return float(order.get('filled') or 0.0) if order else 0.0
+
+    @staticmethod
+    def _signed(side: str, qty: float) -> float:
+        return qty if side == 'buy' else -qty
+
+    def _adjust_residual(self, symbol: str, delta: float):
+        self.residuals[symbol] = self.residuals.get(symbol, 0.0) + delta
+
+    # --- execution ---
+
+    async def _cancel_leg(self, symbol: str, platform: str, order_id: str, side: str, counted: float) -> float:
+        """Cancels an open leg; returns the signed exposure of the fills it got after `counted` was read."""
+        order = await self._order_manager.settle_order(platform, order_id, symbol)
+        if order is None:
+            self.logger.warning("Could not read the final state of %s order %s on %s; assuming no further fill.", side, order_id, platform)
+            return 0.0
+        return self._signed(side, self._filled(order) - counted)
+
+    async def _hedge(self, symbol: str, exposure: float, attempt: int = 1) -> float:
+        """Routes the orders offsetting `exposure`; returns the signed exposure they removed."""
+        if abs(exposure) <= self.flat_tolerance: return 0.0
+        side = 'sell' if exposure > 0 else 'buy'
+        report = await self._router.route(symbol, side, abs(exposure), slippage_pct=self.max_slippage_pct * attempt,
+                                          timeout_s=self.fill_timeout_s, journal_event='HEDGING_EXEC', reduce_only=True)
+        if report is None:
+            self.logger.error("No connected venue has a %s book to hedge %.8f on.", symbol, exposure)
+            return 0.0
+        return -self._signed(side, report["filled"])
+
+    async def flatten(self, symbol: str, exposure: float, open_legs=(), origin: str = ""):
+        """
+        Brings `exposure` back to flat. `open_legs` are the trade's still-open orders as
+        (platform, order_id, side, filled_so_far); they are cancelled while the hedge is in flight.
+        Returns the incident record.
+        """
+        incident_id = next(self._incident_ids)
+        started = time.monotonic()
+        incident = {"id": incident_id, "symbol": symbol, "origin": origin, "exposure": exposure, "started": time.time(), "attempts": 0}
+        self.open_incidents[incident_id] = incident
+        self.counters["incidents"] += 1
+        self._adjust_residual(symbol, exposure)
+        self.logger.warning("Unbalanced exposure of %.8f %s (%s). Hedging.", exposure, symbol, origin)
+        residual = exposure
+        try:
+            removed, *late_fills = await asyncio.gather(self._hedge(symbol, residual), *(self._cancel_leg(symbol, *leg) for leg in open_legs))
+            delta = sum(late_fills) - removed
+            residual += delta
+            self._adjust_residual(symbol, delta)
+            incident["attempts"] = 1
+            while abs(residual) > self.flat_tolerance and incident["attempts"] < self.max_attempts:
+                incident["attempts"] += 1
+                removed = await self._hedge(symbol, residual, incident["attempts"])
+                residual -= removed
+                self._adjust_residual(symbol, -removed)
+        finally:
+            self.open_incidents.pop(incident_id, None)
+        incident["residual"] = residual
+        if abs(residual) > self.flat_tolerance:
+            self.counters["gave_up"] += 1
+            self.logger.critical("Could not flatten %s after %d attempts: residual %.8f (%s).", symbol, incident["attempts"], residual, origin)
+            await self.notifier.send_message(f"🚨 *HEDGE FAILED* 🚨\n{symbol}: residual exposure `{residual:.8f}` after {incident['attempts']} attempts ({origin}).")
+            return incident
+        incident["time_to_flat_s"] = time.monotonic() - started
+        self.time_to_flat.append(incident["time_to_flat_s"])
+        self.counters["flat"] += 1
+        if incident["time_to_flat_s"] > self.latency_budget_s:
+            self.counters["over_budget"] += 1
+            self.logger.warning("Flat on %s after %.2fs, over the %.2fs budget (%d attempts).", symbol, incident["time_to_flat_s"], self.latency_budget_s, incident["attempts"])
+        else:
+            self.logger.info("Flat on %s after %.3fs (%d attempts).", symbol, incident["time_to_flat_s"], incident["attempts"])
+        await self.notifier.send_message(f"🛡️ *Hedged* 🛡️\n{symbol}: {exposure:+.8f} flattened in {incident['time_to_flat_s']:.2f}s ({origin}).")
+        return incident
+
+    async def reconcile(self, symbol: str, legs, wait_s: float = 0.0, origin: str = ""):
+        """
+        Settles a trade's legs [(platform, order_id, side[, earlier fills])] and flattens whatever imbalance their
+        fills left; earlier fills are those of orders the leg's order replaced (cancel-replace amendments).
+        Legs still open after `wait_s` are cancelled, concurrently with the hedge when an imbalance is already visible.
+        """
+        deadline = time.monotonic() + wait_s
+        while True:
+            orders = await asyncio.gather(*(self._order_manager.fetch_order_status(platform, order_id, symbol) for platform, order_id, *_ in legs))
+            open_legs = [(platform, order_id, side, self._filled(order)) for (platform, order_id, side, *_), order in zip(legs, orders)
+                         if not order or order.get('status') == 'open']
+            if not open_legs or time.monotonic() >= deadline: break
+            await asyncio.sleep(0.1)
+        exposure = sum(self._signed(side, self._filled(order) + sum(earlier)) for (_, _, side, *earlier), order in zip(legs, orders))
+        if abs(exposure) > self.flat_tolerance: return await self.flatten(symbol, exposure, open_legs, origin)
+        if open_legs:
+            late = sum(await asyncio.gather(*(self._cancel_leg(symbol, *leg) for leg in open_legs)))
+            if abs(late) > self.flat_tolerance: return await self.flatten(symbol, late, (), origin)
+        return None
+
+    def stats(self) -> dict:
+        samples = sorted(self.time_to_flat)
+        percentile = lambda q: samples[min(int(q * len(samples)), len(samples) - 1)] if samples else None
+        return {**self.counters, "open": len(self.open_incidents), "residuals": {s: r for s, r in self.residuals.items() if abs(r) > self.flat_tolerance},
+                "time_to_flat_s": {"p50": percentile(0.5), "p90": percentile(0.9), "max": samples[-1] if samples else None}}
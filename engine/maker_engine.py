@@ -0,0 +1,168 @@
+# engine/maker_engine.py
+import logging, math, time
+
+class QueuePositionEstimator:
+    """
+    Incremental estimate of how much quantity rests ahead of one of our orders at its price level.
+
+    At placement everything already at the level is ahead of us. Later increases of the level join
+    behind us. Decreases are fills or cancellations: fills always come from the front, cancellations
+    from anywhere, so a decrease is charged to the queue ahead in proportion to the share of the
+    level that is ahead of us. The depletion rate of the level (EWMA, qty/s) gives the fill probability.
+    """
+    def __init__(self, side: str, price: float, size: float, level_qty: float, now: float = None):
+        now = now if now is not None else time.monotonic()
+        self.side, self.price, self.size = side, price, size
+        self.ahead = level_qty
+        self.last_level_qty = level_qty
+        self.depletion_rate = 0.0
+        self.created, self._last_time = now, now
+
+    def on_level_update(self, level_qty: float, now: float = None):
+        now = now if now is not None else time.monotonic()
+        decrease = self.last_level_qty - level_qty
+        if decrease > 0:
+            others = max(self.last_level_qty - self.size, 1e-12)
+            self.ahead = max(self.ahead - decrease * min(self.ahead / others, 1.0), 0.0)
+        if level_qty <= 0: self.ahead = 0.0
+        elapsed = max(now - self._last_time, 1e-3)
+        self.depletion_rate += min(elapsed, 1.0) * (max(decrease, 0.0) / elapsed - self.depletion_rate)
+        self.last_level_qty, self._last_time = level_qty, now
+
+    def fill_probability(self, horizon_s: float) -> float:
+        """Probability that the level depletes through the queue ahead and our size within `horizon_s`."""
+        if self.ahead <= 0: return 1.0
+        expected_depletion = self.depletion_rate * horizon_s
+        return 1.0 - math.exp(-expected_depletion / (self.ahead + self.size))
+
+
+class MakerEngine:
+    """
+    Prices, sizes and manages resting maker quotes.
+
+    Pricing is depth-aware: join the best level when the queue there is short, otherwise improve it by
+    one tick without crossing. Each tracked quote keeps a QueuePositionEstimator fed by DataEngine deltas
+    at its price (`on_book_update`, registered as a DataEngine listener) and resynchronised from the book
+    on every check, which also covers the sharded mode where no deltas reach the strategy process.
+    `decide` returns 'hold', 'amend' (with the new price) or 'cancel' for one quote.
+    """
+    def __init__(self, order_books: dict, tick: float = 0.01, join_max_queue_usd: float = 500.0, fill_horizon_s: float = 5.0,
+                 min_fill_probability: float = 0.2, min_amend_interval_s: float = 1.0, hedge_depth_fraction: float = 0.5, metadata=None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._order_books = order_books
+        self._metadata = metadata
+        self.tick = tick
+        self.join_max_queue_usd = join_max_queue_usd
+        self.fill_horizon_s = fill_horizon_s
+        self.min_fill_probability = min_fill_probability
+        self.min_amend_interval_s = min_amend_interval_s
+        self.hedge_depth_fraction = hedge_depth_fraction
+        self._quotes = {}
+        self._by_book = {}
+        self.counters = {"placed": 0, "amended": 0, "cancelled": 0, "filled": 0}
+        self.fill_latency_avg_s = 0.0
+
+    # --- pricing ---
+
+    def tick_for(self, platform: str, symbol: str) -> float:
+        return self._metadata.tick_size(platform, symbol, self.tick) if self._metadata else self.tick
+
+    def quote_price(self, book, side: str, own_price: float = None, own_qty: float = 0.0, tick: float = None):
+        """Depth-aware quote for `side` on `book`; our own resting quantity (if any) is not counted as queue."""
+        tick = tick or self.tick
+        best = book.get_bids(1) if side == 'buy' else book.get_asks(1)
+        opposite = book.get_asks(1) if side == 'buy' else book.get_bids(1)
+        if not best: return None
+        best_price, best_qty = float(best[0][0]), float(best[0][1])
+        if own_price is not None and abs(best_price - own_price) < tick / 2: best_qty -= own_qty
+        if best_qty <= 0: return best_price
+        if best_qty * best_price <= self.join_max_queue_usd: return best_price
+        improved = round(best_price + tick if side == 'buy' else best_price - tick, 8)
+        if opposite:
+            opposite_price = float(opposite[0][0])
+            if (side == 'buy' and improved >= opposite_price) or (side == 'sell' and improved <= opposite_price): return best_price
+        return improved
+
+    def quote_size(self, max_size_usd: float, buy_price: float, book_buy_on, book_sell_on, levels: int = 5) -> float:
+        """MAX_TRADE_SIZE_USD worth, capped to a fraction of the visible touch liquidity the other leg would have to trade against."""
+        size = max_size_usd / buy_price
+        hedge_buy = sum(float(q) for _, q in book_buy_on.get_asks(levels))
+        hedge_sell = sum(float(q) for _, q in book_sell_on.get_bids(levels))
+        depth_cap = self.hedge_depth_fraction * min(hedge_buy, hedge_sell)
+        return min(size, depth_cap) if depth_cap > 0 else size
+
+    # --- tracking ---
+
+    @staticmethod
+    def _level_qty(book, side: str, price: float, levels: int = 20) -> float:
+        for level_price, qty in (book.get_bids(levels) if side == 'buy' else book.get_asks(levels)):
+            if abs(float(level_price) - price) < 1e-9: return float(qty)
+        return 0.0
+
+    def track(self, order_id: str, platform: str, symbol: str, side: str, price: float, size: float):
+        book = self._order_books.get((platform, symbol))
+        level_qty = self._level_qty(book, side, price) if book else 0.0
+        self._quotes[order_id] = {"estimator": QueuePositionEstimator(side, price, size, level_qty), "platform": platform, "symbol": symbol, "last_amend": 0.0}
+        self._by_book.setdefault((platform, symbol), set()).add(order_id)
+        self.counters["placed"] += 1
+
+    def untrack(self, order_id: str, filled: bool = False):
+        quote = self._quotes.pop(order_id, None)
+        if not quote: return
+        self._by_book.get((quote["platform"], quote["symbol"]), set()).discard(order_id)
+        if filled:
+            self.counters["filled"] += 1
+            latency = time.monotonic() - quote["estimator"].created
+            self.fill_latency_avg_s += 0.2 * (latency - self.fill_latency_avg_s)
+
+    def retrack(self, old_id: str, new_id: str, price: float, size: float):
+        """Moves a quote to its amended price (and id, if the venue replaced the order)."""
+        quote = self._quotes.get(old_id)
+        if not quote: return
+        self.untrack(old_id)
+        self.track(new_id, quote["platform"], quote["symbol"], quote["estimator"].side, price, size)
+        self.counters["placed"] -= 1
+        self.counters["amended"] += 1
+        self._quotes[new_id]["last_amend"] = time.monotonic()
+
+    def on_book_update(self, platform: str, symbol: str, bids, asks):
+        """DataEngine listener: feeds the deltas at our price levels to the estimators. O(1) for books without quotes."""
+        order_ids = self._by_book.get((platform, symbol))
+        if not order_ids: return
+        for order_id in order_ids:
+            estimator = self._quotes[order_id]["estimator"]
+            for level in (bids if estimator.side == 'buy' else asks):
+                if abs(float(level[0]) - estimator.price) < 1e-9:
+                    estimator.on_level_update(float(level[1])); break
+
+    # --- decisions ---
+
+    def decide(self, order_id: str, price_bound: float):
+        """
+        'cancel' when the quote is behind the market and cannot be repriced within `price_bound` (the worst
+        price that still leaves the trade profitable), 'amend' to the depth-aware price when we were outbid
+        or the fill probability fell below the threshold, otherwise 'hold'.
+        """
+        quote = self._quotes.get(order_id)
+        if not quote: return 'hold', None
+        estimator = quote["estimator"]
+        book = self._order_books.get((quote["platform"], quote["symbol"]))
+        if not book: return 'hold', None
+        estimator.on_level_update(self._level_qty(book, estimator.side, estimator.price))
+        best = book.get_bids(1) if estimator.side == 'buy' else book.get_asks(1)
+        if not best: return 'hold', None
+        best_price = float(best[0][0])
+        behind = best_price > estimator.price + 1e-9 if estimator.side == 'buy' else best_price < estimator.price - 1e-9
+        target = self.quote_price(book, estimator.side, estimator.price, estimator.size, self.tick_for(quote["platform"], quote["symbol"]))
+        within_bound = target is not None and (target <= price_bound if estimator.side == 'buy' else target >= price_bound)
+        if behind and not within_bound:
+            self.counters["cancelled"] += 1
+            return 'cancel', None
+        if time.monotonic() - quote["last_amend"] < self.min_amend_interval_s or not within_bound or abs(target - estimator.price) < 1e-9:
+            return 'hold', None
+        if behind or estimator.fill_probability(self.fill_horizon_s) < self.min_fill_probability:
+            return 'amend', target
+        return 'hold', None
+
+    def stats(self) -> dict:
+        return {**self.counters, "tracked": len(self._quotes), "fill_latency_avg_s": self.fill_latency_avg_s}
@@ -0,0 +1,305 @@
+# engine/market_data_feed.py
+"""
+Shared market data process: runs the connectors of every venue and symbol once and publishes the books
+and trades to any number of bots over a local socket (MARKET_DATA_FEED_ADDRESS), so that several
+strategy configurations share one set of exchange connections.
+
+Usage: python -m engine.market_data_feed [--address unix:/tmp/arb_market_data.sock] [--symbols BTC/USDC ...]
+
+Wire format: frames of `<IBHd` (length of the rest, type, book key index, publish time in s) followed by
+  KEY       b"<platform>\\0<symbol>", declaring the key index used by the frames of that book;
+  SNAPSHOT  `<II` level counts, then (price, qty) doubles, bids then asks: replaces the book (now valid);
+  DELTA     same layout, qty 0 deleting the level;
+  INVALID   no body: the book is empty and invalid until its next snapshot;
+  TRADE     `<ddBd` price, qty, taker side (0 buy, 1 sell), trade time in s.
+"""
+import argparse, asyncio, logging, os, struct, time
+from array import array
+from engine.data_engine import DataEngine
+
+KEY, SNAPSHOT, DELTA, INVALID, TRADE = range(5)
+_LENGTH = struct.Struct('<I')
+_META = struct.Struct('<BHd')
+_COUNTS = struct.Struct('<II')
+_TRADE = struct.Struct('<ddBd')
+_SIDES = {'buy': 0, 'sell': 1}
+
+def _frame(kind: int, key: int, body: bytes = b'', timestamp: float = None) -> bytes:
+    return _LENGTH.pack(_META.size + len(body)) + _META.pack(kind, key, time.time() if timestamp is None else timestamp) + body
+
+def _levels_frame(kind: int, key: int, bids, asks) -> bytes:
+    values = array('d', [float(x) for level in bids for x in level[:2]])
+    values.extend([float(x) for level in asks for x in level[:2]])
+    return _frame(kind, key, _COUNTS.pack(len(bids), len(asks)) + values.tobytes())
+
+def _split_address(address: str):
+    """'unix:/path' -> (path, None); 'host:port' -> (host, port)."""
+    if address.startswith("unix:"): return address[5:], None
+    host, port = address.rsplit(':', 1)
+    return host, int(port)
+
+async def open_feed_connection(address: str):
+    path_or_host, port = _split_address(address)
+    if port is None: return await asyncio.open_unix_connection(path_or_host)
+    return await asyncio.open_connection(path_or_host, port)
+
+
+class MarketDataPublisher(DataEngine):
+    """
+    DataEngine that publishes every change of its books, and the trades, to the connected feed clients.
+
+    Applied diffs (including the levels removed by pruning) go out as DELTA frames, snapshots and
+    invalidations as SNAPSHOT and INVALID frames. Frames produced during one loop iteration are sent
+    together, with one write per client. A client joining late first receives every book as a snapshot;
+    all clients also get a snapshot of every book each `snapshot_interval_s`. A client that does not read
+    fast enough (more than `max_buffer_bytes` unsent) is disconnected; it reconnects and starts again
+    from snapshots.
+    """
+    def __init__(self, book_max_depth: int = None, book_band_pct: float = None, snapshot_interval_s: float = 30.0, max_buffer_bytes: int = 8 * 2 ** 20):
+        super().__init__(book_max_depth, book_band_pct)
+        self.snapshot_interval_s = snapshot_interval_s
+        self.max_buffer_bytes = max_buffer_bytes
+        self._key_index = {}
+        self._key_frames = bytearray()
+        self._clients = set()
+        self._pending = bytearray()
+        self._flush_scheduled = False
+        self._snapshotting = False
+        self.frames_published = self.bytes_sent = self.clients_dropped = 0
+        self.add_listener(self._on_levels)
+        self.add_trade_listener(self._on_trade)
+
+    def _key(self, platform: str, symbol: str) -> int:
+        index = self._key_index.get((platform, symbol))
+        if index is None:
+            index = self._key_index[(platform, symbol)] = len(self._key_index)
+            frame = _frame(KEY, index, f"{platform}\0{symbol}".encode())
+            self._key_frames += frame
+            self._publish(frame)
+        return index
+
+    def _snapshot_frame(self, platform: str, symbol: str) -> bytes:
+        book = self.order_books[(platform, symbol)]
+        if not book.valid: return _frame(INVALID, self._key(platform, symbol))
+        return _levels_frame(SNAPSHOT, self._key(platform, symbol), book.bids.items(), book.asks.items())
+
+    # --- publication ---
+
+    def _publish(self, frame: bytes):
+        self._pending += frame
+        self.frames_published += 1
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            asyncio.get_running_loop().call_soon(self._flush)
+
+    def _flush(self):
+        self._flush_scheduled = False
+        if not self._pending: return
+        data, self._pending = bytes(self._pending), bytearray()
+        for writer in list(self._clients):
+            if writer.transport.get_write_buffer_size() > self.max_buffer_bytes:
+                self._drop(writer, f"more than {self.max_buffer_bytes} bytes unsent")
+                continue
+            writer.write(data)
+            self.bytes_sent += len(data)
+
+    def _drop(self, writer, reason: str):
+        self._clients.discard(writer)
+        self.clients_dropped += 1
+        self.logger.warning(f"Feed client {writer.get_extra_info('peername') or writer.get_extra_info('sockname')} disconnected: {reason}.")
+        writer.transport.abort()
+
+    def _on_levels(self, platform: str, symbol: str, bids, asks):
+        if not self._clients or self._snapshotting: return
+        book = self.order_books.get((platform, symbol))
+        # Suppression des niveaux d'un carnet invalidé : la trame INVALID suffit.
+        if book is not None and not book.valid: return
+        self._publish(_levels_frame(DELTA, self._key(platform, symbol), bids, asks))
+
+    def _on_trade(self, platform: str, symbol: str, price: float, qty: float, side: str, timestamp: float):
+        if self._clients: self._publish(_frame(TRADE, self._key(platform, symbol), _TRADE.pack(price, qty, _SIDES[side], timestamp)))
+
+    def process_update(self, packaged_data: dict):
+        if not packaged_data.get("snapshot"): return super().process_update(packaged_data)
+        # Un instantané part en entier, après application (et élagage), plutôt que comme un diff.
+        self._snapshotting = True
+        try: super().process_update(packaged_data)
+        finally: self._snapshotting = False
+        if self._clients and (packaged_data.get("platform"), packaged_data.get("symbol")) in self.order_books:
+            self._publish(self._snapshot_frame(packaged_data["platform"], packaged_data["symbol"]))
+
+    def invalidate(self, platform: str, symbol: str, reason: str = ""):
+        super().invalidate(platform, symbol, reason)
+        if self._clients: self._publish(_frame(INVALID, self._key(platform, symbol)))
+
+    def suspend(self, platform: str, symbol: str):
+        super().suspend(platform, symbol)
+        if self._clients: self._publish(_frame(INVALID, self._key(platform, symbol)))
+
+    def resume(self, platform: str, symbol: str):
+        # Les clients ont un carnet invalide : il repart en instantané, comme après une resynchronisation.
+        self._snapshotting = True
+        try: super().resume(platform, symbol)
+        finally: self._snapshotting = False
+        if self._clients and (platform, symbol) in self.order_books: self._publish(self._snapshot_frame(platform, symbol))
+
+    # --- service ---
+
+    async def _on_client(self, reader, writer):
+        for platform, symbol in list(self.order_books): self._key(platform, symbol)
+        # Ce qui est en attente part d'abord aux clients déjà là ; le nouveau commence aux instantanés.
+        self._flush()
+        writer.write(bytes(self._key_frames))
+        for platform, symbol in list(self.order_books): writer.write(self._snapshot_frame(platform, symbol))
+        self._clients.add(writer)
+        self.logger.info(f"Feed client connected ({len(self._clients)} connected).")
+        try:
+            # Les clients n'envoient rien : la lecture ne sert qu'à voir la déconnexion.
+            while await reader.read(1024): pass
+        except (ConnectionError, OSError, asyncio.CancelledError):
+            # Annulé à l'arrêt du service : asyncio (3.11) signalerait sinon l'annulation du gestionnaire comme une erreur.
+            pass
+        finally:
+            if writer in self._clients:
+                self._clients.discard(writer)
+                self.logger.info(f"Feed client disconnected ({len(self._clients)} connected).")
+            writer.close()
+
+    async def _snapshot_loop(self):
+        while True:
+            await asyncio.sleep(self.snapshot_interval_s)
+            if self._clients:
+                for platform, symbol in list(self.order_books): self._publish(self._snapshot_frame(platform, symbol))
+
+    async def serve(self, address: str):
+        path_or_host, port = _split_address(address)
+        if port is None:
+            if os.path.exists(path_or_host): os.unlink(path_or_host)
+            server = await asyncio.start_unix_server(self._on_client, path_or_host)
+        else:
+            server = await asyncio.start_server(self._on_client, path_or_host, port)
+        self.logger.info(f"Publishing market data on {address}.")
+        snapshots = asyncio.create_task(self._snapshot_loop())
+        try:
+            async with server: await server.serve_forever()
+        finally:
+            snapshots.cancel()
+            for writer in list(self._clients): writer.close()
+
+    def stats(self) -> dict:
+        return {**super().stats(), "clients": len(self._clients), "frames_published": self.frames_published,
+                "bytes_sent": self.bytes_sent, "clients_dropped": self.clients_dropped}
+
+
+class MarketDataFeedClient:
+    """
+    Feeds a local DataEngine from a MarketDataPublisher, in place of the connectors: snapshots, deltas,
+    invalidations and trades are applied through the DataEngine's usual methods, so listeners and the
+    strategy work unchanged. The publish time of each frame serves as the exchange timestamp, so the
+    DataEngine's latency measures publisher-to-apply. When the feed is lost every book is invalidated;
+    the connection is reopened with the connectors' backoff and starts again from snapshots.
+    """
+    READ_SIZE = 2 ** 16
+
+    def __init__(self, data_engine, address: str):
+        from connectors.base_connector import backoff_delay
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.data_engine = data_engine
+        self.address = address
+        self._backoff_delay = backoff_delay
+        self._keys = {}
+        self.connected = False
+        self.frames = self.bytes_received = self.reconnects = 0
+
+    def _parse(self, buffer: bytearray) -> int:
+        """Handles every complete frame at the start of `buffer`; returns the bytes consumed."""
+        offset, size = 0, len(buffer)
+        while size - offset >= 4:
+            (length,) = _LENGTH.unpack_from(buffer, offset)
+            end = offset + 4 + length
+            if end > size: break
+            kind, key, sent = _META.unpack_from(buffer, offset + 4)
+            self._handle(kind, key, sent, buffer, offset + 4 + _META.size, end)
+            offset = end
+        return offset
+
+    def _handle(self, kind: int, key: int, sent: float, buffer, start: int, end: int):
+        self.frames += 1
+        if kind == KEY:
+            self._keys[key] = tuple(bytes(buffer[start:end]).decode().split("\0", 1))
+            return
+        platform, symbol = self._keys[key]
+        if kind == DELTA or kind == SNAPSHOT:
+            n_bids, n_asks = _COUNTS.unpack_from(buffer, start)
+            values = struct.unpack_from(f'<{2 * (n_bids + n_asks)}d', buffer, start + _COUNTS.size)
+            levels = iter(values)
+            pairs = list(zip(levels, levels))
+            self.data_engine.process_update({"platform": platform, "symbol": symbol, "data": {"b": pairs[:n_bids], "a": pairs[n_bids:], "E": sent * 1000},
+                                             "snapshot": kind == SNAPSHOT})
+        elif kind == INVALID:
+            self.data_engine.invalidate(platform, symbol, "invalid at the feed")
+        elif kind == TRADE:
+            price, qty, side, timestamp = _TRADE.unpack_from(buffer, start)
+            self.data_engine.process_trade(platform, symbol, price, qty, 'sell' if side else 'buy', timestamp)
+
+    async def run(self):
+        attempt = 0
+        while True:
+            try:
+                reader, writer = await open_feed_connection(self.address)
+                attempt = 0
+                self.connected = True
+                self._keys.clear()
+                self.logger.info(f"Connected to the market data feed on {self.address}.")
+                buffer = bytearray()
+                try:
+                    while True:
+                        chunk = await reader.read(self.READ_SIZE)
+                        if not chunk: raise ConnectionError("closed by the publisher")
+                        self.bytes_received += len(chunk)
+                        buffer += chunk
+                        del buffer[:self._parse(buffer)]
+                finally:
+                    self.connected = False
+                    writer.close()
+                    for platform, symbol in list(self.data_engine.order_books): self.data_engine.invalidate(platform, symbol, "feed lost")
+            except (ConnectionError, OSError) as e:
+                self.logger.error(f"Market data feed on {self.address} lost: {e}")
+            delay = self._backoff_delay(attempt)
+            attempt += 1
+            self.reconnects += 1
+            self.logger.info(f"Reconnecting to the market data feed in {delay:.2f}s (attempt {attempt}).")
+            await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        return {"connected": self.connected, "frames": self.frames, "bytes": self.bytes_received, "reconnects": self.reconnects}
+
+
+async def run_feed_server(address: str, symbols, venues=("Binance", "OKX")):
+    from config import BOOK_MAX_DEPTH, BOOK_PRICE_BAND_PCT, MARKET_DATA_FEED_SNAPSHOT_S, MARKET_DATA_FEED_MAX_BUFFER_BYTES, RECORD_MARKET_DATA_PATH
+    from connectors.binance_connector import BinanceConnector
+    from connectors.okx_connector import OkxConnector
+    from backtest.recording import MarketDataRecorder
+    connector_classes = {"Binance": BinanceConnector, "OKX": OkxConnector}
+    publisher = MarketDataPublisher(BOOK_MAX_DEPTH, BOOK_PRICE_BAND_PCT, MARKET_DATA_FEED_SNAPSHOT_S, MARKET_DATA_FEED_MAX_BUFFER_BYTES)
+    recorder = MarketDataRecorder(RECORD_MARKET_DATA_PATH) if RECORD_MARKET_DATA_PATH else None
+    connectors = [connector_classes[venue](publisher, symbol=symbol, recorder=recorder) for symbol in symbols for venue in venues]
+    tasks = [asyncio.create_task(connector.run()) for connector in connectors] + [asyncio.create_task(publisher.serve(address))]
+    try: await asyncio.gather(*tasks)
+    finally:
+        for task in tasks: task.cancel()
+        if recorder: recorder.close()
+
+def main():
+    from config import MARKET_DATA_FEED_ADDRESS, TRADING_SYMBOLS, LOG_LEVEL, LOG_FORMAT, LOG_RATE_LIMIT_S, LOG_RATE_LIMITED_LOGGERS
+    from utils.log_setup import setup_logging
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--address", default=MARKET_DATA_FEED_ADDRESS)
+    parser.add_argument("--symbols", nargs="+", default=TRADING_SYMBOLS)
+    args = parser.parse_args()
+    setup_logging(LOG_LEVEL, LOG_FORMAT, LOG_RATE_LIMIT_S, rate_limited_loggers=LOG_RATE_LIMITED_LOGGERS)
+    try: asyncio.run(run_feed_server(args.address, args.symbols))
+    except KeyboardInterrupt: pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# engine/opportunity_tracker.py
+import bisect, json, logging, time
+
+class OpportunityTracker:
+    """
+    Measures how long cross-venue opportunities survive.
+
+    Registered as a DataEngine listener, it checks every directional pair involving the updated book: an
+    episode opens when the top-of-book spread net of both taker fees turns positive and closes when it
+    disappears, recording its lifetime, peak net spread and the top-of-book depth at the peak. Closed
+    episodes feed fixed-bucket histograms and are queued for the journal, written in batches
+    (`batch_size` episodes, or whatever is pending once `flush_interval_s` has passed at the next book update)
+    by TradeLogger's background thread. Episodes open on a venue whose book empties or turns invalid (feed
+    lost, resynchronisation) are discarded and counted as interrupted: their true end was not seen.
+    """
+    LIFETIME_BUCKETS_S = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+    PEAK_BUCKETS_PCT = (0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0)
+
+    def __init__(self, order_books: dict, get_fees, journal=None, batch_size: int = 100, flush_interval_s: float = 30.0,
+                 latency_s: float = 0.2, clock=time.monotonic):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._order_books = order_books
+        self._get_fees = get_fees
+        self._journal = journal
+        self.batch_size, self.flush_interval_s = batch_size, flush_interval_s
+        self.latency_s = latency_s
+        self.clock = clock
+        self._venues = {}
+        # (buy, sell, symbol) -> [début, début (horloge murale), pic net %, profondeur au pic, ask au pic, bid au pic, mises à jour]
+        self._open = {}
+        self._pending = []
+        self._last_flush = clock()
+        self.lifetime_histogram = [0] * (len(self.LIFETIME_BUCKETS_S) + 1)
+        self.peak_histogram = [0] * (len(self.PEAK_BUCKETS_PCT) + 1)
+        self.episodes = 0
+        self.interrupted = 0
+        self.outlived_latency = 0
+        self.lifetime_max_s = 0.0
+
+    def on_book_update(self, platform: str, symbol: str, bids=None, asks=None):
+        venues = self._venues.get(symbol)
+        if venues is None: venues = self._venues[symbol] = []
+        if platform not in venues: venues.append(platform)
+        now = self.clock()
+        # Vérifié à chaque mise à jour : sans nouvelle clôture, les épisodes en attente partent quand même.
+        if self._pending and now - self._last_flush >= self.flush_interval_s: self.flush()
+        book = self._order_books.get((platform, symbol))
+        if not self._usable(book):
+            if self._open: self._interrupt(platform, symbol)
+            return
+        bid, ask = book.bids.peekitem(-1), book.asks.peekitem(0)
+        for other in venues:
+            if other == platform: continue
+            other_book = self._order_books.get((other, symbol))
+            if not self._usable(other_book): continue
+            self._observe(platform, other, symbol, ask, other_book.bids.peekitem(-1), now)
+            self._observe(other, platform, symbol, other_book.asks.peekitem(0), bid, now)
+
+    @staticmethod
+    def _usable(book) -> bool:
+        return book is not None and book.valid and bool(book.bids) and bool(book.asks)
+
+    def _interrupt(self, platform: str, symbol: str):
+        """Drops the open episodes involving a book that stopped being followed; the outage would count in their lifetime."""
+        for key in [key for key in self._open if key[2] == symbol and platform in key[:2]]:
+            del self._open[key]
+            self.interrupted += 1
+
+    def _observe(self, buy_venue: str, sell_venue: str, symbol: str, ask, bid, now: float):
+        key = (buy_venue, sell_venue, symbol)
+        ask_price, ask_qty = ask
+        bid_price, bid_qty = bid
+        net_pct = (bid_price - ask_price) / ask_price * 100 - self._get_fees(buy_venue, symbol)['taker'] - self._get_fees(sell_venue, symbol)['taker']
+        episode = self._open.get(key)
+        if net_pct > 0:
+            if episode is None:
+                self._open[key] = [now, time.time(), net_pct, min(ask_qty, bid_qty), ask_price, bid_price, 1]
+                return
+            episode[6] += 1
+            if net_pct > episode[2]: episode[2:6] = net_pct, min(ask_qty, bid_qty), ask_price, bid_price
+        elif episode is not None:
+            del self._open[key]
+            self._close(key, episode, now)
+
+    def _close(self, key, episode, now: float):
+        start, opened_at, peak_pct, depth, ask_price, bid_price, updates = episode
+        lifetime = now - start
+        self.episodes += 1
+        self.lifetime_histogram[bisect.bisect_left(self.LIFETIME_BUCKETS_S, lifetime)] += 1
+        self.peak_histogram[bisect.bisect_left(self.PEAK_BUCKETS_PCT, peak_pct)] += 1
+        if lifetime >= self.latency_s: self.outlived_latency += 1
+        if lifetime > self.lifetime_max_s: self.lifetime_max_s = lifetime
+        if self._journal is None: return
+        self._pending.append({
+            "event_type": "OPPORTUNITY", "platform_buy": key[0], "platform_sell": key[1], "symbol": key[2], "volume": depth,
+            "buy_price": ask_price, "sell_price": bid_price, "profit_pct": peak_pct,
+            "details": json.dumps({"opened_at": opened_at, "lifetime_s": round(lifetime, 6), "updates": updates})})
+        if len(self._pending) >= self.batch_size: self.flush()
+
+    def flush(self):
+        """Hands the closed episodes to the journal in one batch."""
+        self._last_flush = self.clock()
+        if not self._pending or self._journal is None: return
+        self._journal.log_trades(self._pending)
+        self._pending = []
+
+    @staticmethod
+    def _histogram(bounds, counts, unit: str) -> dict:
+        labels = [f"<={bound:g}{unit}" for bound in bounds] + [f">{bounds[-1]:g}{unit}"]
+        return dict(zip(labels, counts))
+
+    def _lifetime_quantile(self, q: float):
+        """Upper bound of the histogram bucket holding the q-quantile (None above the last bound)."""
+        if not self.episodes: return None
+        rank, seen = q * self.episodes, 0
+        for bound, count in zip(self.LIFETIME_BUCKETS_S, self.lifetime_histogram):
+            seen += count
+            if seen >= rank: return bound
+        return None
+
+    def stats(self) -> dict:
+        return {"episodes": self.episodes, "open": len(self._open), "interrupted": self.interrupted, "pending_journal": len(self._pending),
+                "lifetime_p50_s_le": self._lifetime_quantile(0.5), "lifetime_p90_s_le": self._lifetime_quantile(0.9),
+                "lifetime_max_s": self.lifetime_max_s,
+                "outlived_latency_pct": self.outlived_latency / self.episodes * 100 if self.episodes else None,
+                "lifetime_histogram": self._histogram(self.LIFETIME_BUCKETS_S, self.lifetime_histogram, "s"),
+                "peak_net_histogram": self._histogram(self.PEAK_BUCKETS_PCT, self.peak_histogram, "%")}
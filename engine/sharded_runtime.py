@@ -0,0 +1,122 @@
+# engine/sharded_runtime.py
+import asyncio, logging, multiprocessing, os, signal
+from config import TELEGRAM_TOKEN, TELEGRAM_CHAT_ID, LOG_LEVEL, LOG_FORMAT, LOG_RATE_LIMIT_S, LOG_RATE_LIMITED_LOGGERS, BOOK_MAX_DEPTH, BOOK_PRICE_BAND_PCT
+from config import ORDER_JOURNAL_PATH, RECOVERY_BOOK_WAIT_S, RISK_ENGINE, RISK_MAX_ORDER_USD, RISK_MAX_VENUE_INVENTORY_USD, RISK_MAX_DAILY_LOSS_USD
+from config import RISK_MAX_ORDERS_PER_S, RISK_MAX_OPEN_ORDERS, RISK_MARK_INTERVAL_S, SHARED_BOOK_WATCH_S
+from engine.shared_book import SharedBookTable, SharedOrderBookView, SharedBookPublisher, watch_views
+from utils.log_setup import setup_logging
+
+def _connector_classes():
+    from connectors.binance_connector import BinanceConnector
+    from connectors.okx_connector import OkxConnector
+    return {"Binance": BinanceConnector, "OKX": OkxConnector}
+
+def shard_symbols(symbols, shard_count: int):
+    """Round-robin split of the symbols over the strategy processes. Empty shards are dropped."""
+    return [shard for shard in (list(symbols[i::shard_count]) for i in range(shard_count)) if shard]
+
+async def _wait_for_shutdown(tasks, logger):
+    shutdown_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try: loop.add_signal_handler(sig, shutdown_event.set)
+        except NotImplementedError: pass
+    waiter = asyncio.create_task(shutdown_event.wait())
+    await asyncio.wait([waiter, *tasks], return_when=asyncio.FIRST_COMPLETED)
+    logger.info("Shutting down worker...")
+    for task in [waiter, *tasks]: task.cancel()
+    await asyncio.gather(waiter, *tasks, return_exceptions=True)
+
+async def _run_connectors(venue: str, symbols, table: SharedBookTable):
+    logger = logging.getLogger(f"ConnectorWorker[{venue}]")
+    publisher = SharedBookPublisher(table, BOOK_MAX_DEPTH, BOOK_PRICE_BAND_PCT)
+    connector_class = _connector_classes()[venue]
+    tasks = [asyncio.create_task(connector_class(publisher, symbol=symbol).run()) for symbol in symbols]
+    logger.info(f"Publishing {venue} books for {symbols} to shared memory '{table.name}'.")
+    await _wait_for_shutdown(tasks, logger)
+
+async def _run_strategy(symbols, table: SharedBookTable, balance_share: float = 1.0):
+    from execution.live_order_manager import LiveOrderManager
+    from engine.strategy_engine import StrategyEngine
+    from execution.risk_engine import RiskEngine
+    from utils.notifier import Notifier
+    from utils.trade_logger import TradeLogger
+    logger = logging.getLogger(f"StrategyWorker{symbols}")
+    notifier = Notifier(token=TELEGRAM_TOKEN, chat_id=TELEGRAM_CHAT_ID)
+    trade_logger = TradeLogger()
+    # Un journal par processus de stratégie, limité à ses symboles.
+    journal_path = None
+    if ORDER_JOURNAL_PATH:
+        root, extension = os.path.splitext(ORDER_JOURNAL_PATH)
+        journal_path = f"{root}.{'_'.join(symbol.replace('/', '') for symbol in symbols)}{extension}"
+    # Les processus de stratégie partagent les mêmes comptes : chacun n'engage que sa part des soldes.
+    order_manager = LiveOrderManager(notifier, trade_logger, symbols, journal_path, balance_share)
+    await order_manager.initialize()
+    unbalanced_trades = await order_manager.reconcile_journal()
+    await order_manager.refresh_balances()
+    books = {key: SharedOrderBookView(table, key) for key in table.keys if key[1] in symbols}
+    # Limites par processus : chacun ne voit que les ordres de ses symboles.
+    risk_engine = RiskEngine(order_manager, notifier, RISK_MAX_ORDER_USD, RISK_MAX_VENUE_INVENTORY_USD, RISK_MAX_DAILY_LOSS_USD,
+                             RISK_MAX_ORDERS_PER_S, RISK_MAX_OPEN_ORDERS, order_books=books) if RISK_ENGINE else None
+    if risk_engine:
+        for info in unbalanced_trades.values():
+            for symbol, exposure in info['exposure'].items(): risk_engine.adopt_position(symbol, exposure)
+    strategy_engine = StrategyEngine(books, risk_engine or order_manager, notifier)
+    logger.info(f"Strategy worker reading {len(books)} shared books.")
+    recovery = asyncio.create_task(strategy_engine.recover(unbalanced_trades, RECOVERY_BOOK_WAIT_S))
+    try:
+        # Les vues partagées n'ont pas de listener : les positions sont revalorisées périodiquement.
+        background = [asyncio.create_task(risk_engine.run_marks(RISK_MARK_INTERVAL_S))] if risk_engine else []
+        # Ni listener ni DataEngine ici : les seuils adaptatifs suivent les vues partagées quand elles changent.
+        if strategy_engine.thresholds:
+            logger.info(f"Adaptive thresholds fed from the shared books every {SHARED_BOOK_WATCH_S}s.")
+            background.append(asyncio.create_task(watch_views(books, strategy_engine.thresholds.on_book_update, SHARED_BOOK_WATCH_S)))
+        await _wait_for_shutdown([asyncio.create_task(strategy_engine.run()), *background], logger)
+    finally:
+        recovery.cancel()
+        strategy_engine.process_pool.shutdown(wait=True)
+        await order_manager.cancel_all_orders()
+        await order_manager.close_all()
+        trade_logger.close()
+
+def _connector_process(venue, symbols, table_name, keys, depth):
+    setup_logging(LOG_LEVEL, LOG_FORMAT, LOG_RATE_LIMIT_S, include_process=True, rate_limited_loggers=LOG_RATE_LIMITED_LOGGERS)
+    table = SharedBookTable(keys, depth, name=table_name)
+    try: asyncio.run(_run_connectors(venue, symbols, table))
+    finally: table.close()
+
+def _strategy_process(symbols, table_name, keys, depth, balance_share):
+    setup_logging(LOG_LEVEL, LOG_FORMAT, LOG_RATE_LIMIT_S, include_process=True, rate_limited_loggers=LOG_RATE_LIMITED_LOGGERS)
+    table = SharedBookTable(keys, depth, name=table_name)
+    try: asyncio.run(_run_strategy(symbols, table, balance_share))
+    finally: table.close()
+
+def _raise_keyboard_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+def run_sharded(venues, symbols, strategy_shards: int = 1, depth: int = 10):
+    """
+    Runs one connector process per venue and `strategy_shards` strategy processes sharded by symbol.
+    Connectors own the books and publish them to a SharedBookTable created (and unlinked) here. Each
+    strategy process may use a share of the venue balances proportional to its number of symbols.
+    """
+    logger = logging.getLogger("ShardedRuntime")
+    keys = [(venue, symbol) for venue in venues for symbol in symbols]
+    table = SharedBookTable(keys, depth, create=True)
+    ctx = multiprocessing.get_context("spawn")
+    signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
+    processes = [ctx.Process(target=_connector_process, name=f"connector-{venue}", args=(venue, list(symbols), table.name, keys, depth)) for venue in venues]
+    processes += [ctx.Process(target=_strategy_process, name=f"strategy-{i}", args=(shard, table.name, keys, depth, len(shard) / len(symbols))) for i, shard in enumerate(shard_symbols(symbols, strategy_shards))]
+    logger.info(f"Starting {len(processes)} processes over shared memory '{table.name}' ({len(keys)} books, depth {depth}).")
+    try:
+        for process in processes: process.start()
+        for process in processes: process.join()
+    except KeyboardInterrupt:
+        logger.warning("Shutdown signal received. Stopping worker processes...")
+    finally:
+        for process in processes:
+            if process.is_alive(): process.terminate()
+        for process in processes: process.join(timeout=30)
+        table.close()
+        table.unlink()
+        logger.info("All worker processes stopped and shared memory released.")
@@ -0,0 +1,166 @@
+# engine/shared_book.py
+import asyncio, time
+from array import array
+from itertools import chain
+from multiprocessing.shared_memory import SharedMemory
+from engine.data_engine import DataEngine
+
+class SharedBookTable:
+    """
+    Fixed table of top-N order book levels in shared memory, one slot per (platform, symbol).
+
+    Each slot is protected by a seqlock: the single writer (the connector process that owns the
+    book) makes the sequence odd, writes the levels, then makes it even again. Readers read both sides
+    under one sequence check and retry while the sequence is odd or changed during their read, so they
+    never see a torn book or sides of two versions, and never take a lock or pickle. After READ_RETRIES
+    failed attempts (a writer that died mid-publish) the read reports the book invalid instead of spinning.
+
+    Slot layout, in 8-byte words: seq, timestamp (time.monotonic of the writer), n_bids, n_asks,
+    then `depth` (price, qty) pairs for bids (best first) and `depth` pairs for asks (best first).
+    """
+    HEADER_WORDS = 4
+    READ_RETRIES = 1000
+
+    def __init__(self, keys, depth: int = 10, name: str = None, create: bool = False):
+        self.keys = [tuple(key) for key in keys]
+        self.index = {key: i for i, key in enumerate(self.keys)}
+        self.depth = depth
+        self.slot_words = self.HEADER_WORDS + 4 * depth
+        size = max(len(self.keys), 1) * self.slot_words * 8
+        self.shm = SharedMemory(name=name, create=create, size=size if create else 0)
+        self.name = self.shm.name
+        self._seqs = self.shm.buf.cast('Q')
+        self._words = self.shm.buf.cast('d')
+        if create:
+            for i in range(len(self._seqs)): self._seqs[i] = 0
+
+    def publish(self, key, bids, asks, timestamp: float = None):
+        base = self.index[key] * self.slot_words
+        seqs, words, depth = self._seqs, self._words, self.depth
+        n_bids, n_asks = min(len(bids), depth), min(len(asks), depth)
+        seqs[base] += 1
+        words[base + 1] = timestamp if timestamp is not None else time.monotonic()
+        words[base + 2] = n_bids
+        words[base + 3] = n_asks
+        offset = base + self.HEADER_WORDS
+        words[offset:offset + 2 * n_bids] = array('d', chain.from_iterable(bids[:n_bids]))
+        offset += 2 * depth
+        words[offset:offset + 2 * n_asks] = array('d', chain.from_iterable(asks[:n_asks]))
+        seqs[base] += 1
+
+    def read(self, slot: int, n: int = None):
+        """
+        Consistent read of the best `n` levels (all by default) of both sides. Returns (seq, timestamp, bids, asks);
+        seq is None, and the sides empty, when no consistent read succeeded within READ_RETRIES attempts.
+        """
+        base = slot * self.slot_words
+        seqs, words = self._seqs, self._words
+        n = self.depth if n is None else min(n, self.depth)
+        bids_offset = base + self.HEADER_WORDS
+        asks_offset = bids_offset + 2 * self.depth
+        for _ in range(self.READ_RETRIES):
+            seq = seqs[base]
+            if seq & 1:
+                time.sleep(0); continue
+            n_bids, n_asks = min(int(words[base + 2]), n), min(int(words[base + 3]), n)
+            bids = [(words[bids_offset + 2 * i], words[bids_offset + 2 * i + 1]) for i in range(n_bids)]
+            asks = [(words[asks_offset + 2 * i], words[asks_offset + 2 * i + 1]) for i in range(n_asks)]
+            timestamp = words[base + 1]
+            if seqs[base] == seq: return seq, timestamp, bids, asks
+        return None, None, [], []
+
+    def sequence(self, slot: int) -> int:
+        return self._seqs[slot * self.slot_words]
+
+    def close(self):
+        self._seqs.release()
+        self._words.release()
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+class SharedOrderBookView:
+    """
+    Read-only view of one slot with the same get_bids/get_asks interface as OrderBook. Both sides are read
+    together and kept until the event loop's next step: code running between two awaits sees one version
+    of the book, as it would with a local OrderBook. `valid` is False while the slot cannot be read.
+    """
+    def __init__(self, table: SharedBookTable, key):
+        self._table = table
+        self._slot = table.index[tuple(key)]
+        self._levels = None
+        self.valid = True
+
+    def _expire(self):
+        self._levels = None
+
+    def _read(self):
+        levels = self._levels
+        if levels is None:
+            seq, _, bids, asks = self._table.read(self._slot)
+            self.valid = seq is not None
+            levels = (bids, asks)
+            try:
+                asyncio.get_running_loop().call_soon(self._expire)
+                self._levels = levels
+            except RuntimeError: pass  # hors de la boucle : pas de cache
+        return levels
+
+    def get_bids(self, n: int):
+        return self._read()[0][:n] if n > 0 else []
+
+    def get_asks(self, n: int):
+        return self._read()[1][:n] if n > 0 else []
+
+    @property
+    def sequence(self) -> int:
+        return self._table.sequence(self._slot)
+
+
+async def watch_views(views: dict, callback, interval_s: float = 0.05):
+    """Calls `callback(platform, symbol)` for every view of {(platform, symbol): view} whose slot changed, every `interval_s`."""
+    seen = {}
+    while True:
+        for key, view in list(views.items()):
+            sequence = view.sequence
+            if seen.get(key) != sequence:
+                seen[key] = sequence
+                callback(*key)
+        await asyncio.sleep(interval_s)
+
+
+class SharedBookPublisher(DataEngine):
+    """DataEngine that publishes the top levels of every book it owns to a SharedBookTable after each update."""
+    def __init__(self, table: SharedBookTable, book_max_depth: int = None, book_band_pct: float = None):
+        super().__init__(book_max_depth, book_band_pct)
+        self.table = table
+        self._unshared = set()
+
+    def process_update(self, packaged_data: dict):
+        super().process_update(packaged_data)
+        self._publish((packaged_data.get("platform"), packaged_data.get("symbol")))
+
+    def invalidate(self, platform: str, symbol: str, reason: str = ""):
+        super().invalidate(platform, symbol, reason)
+        self._publish((platform, symbol))
+
+    def suspend(self, platform: str, symbol: str):
+        super().suspend(platform, symbol)
+        self._publish((platform, symbol))
+
+    def resume(self, platform: str, symbol: str):
+        super().resume(platform, symbol)
+        self._publish((platform, symbol))
+
+    def _publish(self, key):
+        book = self.order_books.get(key)
+        if book is None: return
+        if key not in self.table.index:
+            if key not in self._unshared:
+                self._unshared.add(key)
+                self.logger.warning(f"No shared memory slot for {key}; its updates stay local to this process.")
+            return
+        depth = self.table.depth
+        self.table.publish(key, book.get_bids(depth), book.get_asks(depth))
@@ -0,0 +1,132 @@
+# engine/strategy_dispatcher.py
+import asyncio, inspect, logging, time
+from execution.order_journal import current_strategy
+
+
+class Strategy:
+    """
+    Interface of a strategy run by the StrategyDispatcher.
+
+    `subscriptions` names the (venue, symbol) books the strategy reads (None: every book). `on_book_update`
+    is called, sequentially, with the updated book; it may be a coroutine, and should start long work
+    (order placement, monitoring) as tasks rather than await it. `run` is started alongside for the
+    strategy's own periodic work. Orders placed from these, and from the tasks they create, are attributed
+    to `name` in the order journal. `budget_ms` overrides the dispatcher's time budget per update.
+    """
+    name = "strategy"
+    budget_ms = None
+    # Renseigné par StrategyDispatcher.register.
+    dispatcher = None
+
+    def subscriptions(self):
+        return None
+
+    def on_book_update(self, platform: str, symbol: str, book):
+        pass
+
+    async def run(self):
+        pass
+
+    def status(self) -> dict:
+        return {}
+
+
+class _Slot:
+    """Dispatch state of one strategy: books updated since its last delivery, and its time accounting."""
+    __slots__ = ("strategy", "subscriptions", "budget_s", "pending", "wakeup", "updates", "deliveries", "busy_s", "max_s", "overruns", "overrun_s")
+
+    def __init__(self, strategy, budget_ms: float):
+        self.strategy = strategy
+        subscriptions = strategy.subscriptions()
+        self.subscriptions = None if subscriptions is None else frozenset(subscriptions)
+        self.budget_s = (strategy.budget_ms if strategy.budget_ms is not None else budget_ms) / 1000
+        self.pending = {}
+        self.wakeup = asyncio.Event()
+        self.updates = self.deliveries = self.overruns = 0
+        self.busy_s = self.max_s = self.overrun_s = 0.0
+
+    def stats(self) -> dict:
+        return {"subscriptions": "all" if self.subscriptions is None else sorted(" ".join(key) for key in self.subscriptions),
+                "updates": self.updates, "deliveries": self.deliveries, "coalesced": self.updates - self.deliveries - len(self.pending),
+                "busy_ms_avg": round(self.busy_s / self.deliveries * 1000, 3) if self.deliveries else 0.0, "busy_ms_max": round(self.max_s * 1000, 3),
+                "budget_ms": self.budget_s * 1000, "overruns": self.overruns, "overrun_ms_total": round(self.overrun_s * 1000, 1),
+                "status": self.strategy.status()}
+
+
+class StrategyDispatcher:
+    """
+    Runs several strategies off one DataEngine listener.
+
+    The listener routes each book update to the strategies subscribed to that (venue, symbol) only, by
+    marking the book pending for them: the connectors never wait for a strategy. Each strategy has its own
+    task, which delivers its pending books one at a time, oldest first, with the book as it stands; updates
+    of a book arriving before its delivery are coalesced into it, so a slow strategy gets fewer, fresher
+    updates instead of a backlog and never delays another one. Each delivery is timed against the
+    strategy's budget (`budget_ms`, wall time including the callback's awaits); overruns are counted and logged.
+    Strategies share the order manager; the orders they place are attributed to them in the journal.
+    """
+    def __init__(self, data_engine, budget_ms: float = 5.0):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.data_engine = data_engine
+        self.budget_ms = budget_ms
+        self._slots = {}
+        # (venue, symbol) -> créneaux abonnés, calculé à la première mise à jour du carnet.
+        self._routes = {}
+        data_engine.add_listener(self.on_book_update)
+
+    def register(self, strategy: Strategy):
+        if strategy.name in self._slots: raise ValueError(f"strategy '{strategy.name}' is already registered")
+        self._slots[strategy.name] = _Slot(strategy, self.budget_ms)
+        strategy.dispatcher = self
+        self._routes.clear()
+        return strategy
+
+    def on_book_update(self, platform: str, symbol: str, bids=None, asks=None):
+        key = (platform, symbol)
+        slots = self._routes.get(key)
+        if slots is None:
+            slots = self._routes[key] = [slot for slot in self._slots.values() if slot.subscriptions is None or key in slot.subscriptions]
+        for slot in slots:
+            slot.updates += 1
+            slot.pending[key] = None
+            slot.wakeup.set()
+
+    async def _deliver(self, slot: _Slot):
+        current_strategy.set(slot.strategy.name)
+        strategy, order_books = slot.strategy, self.data_engine.order_books
+        while True:
+            await slot.wakeup.wait()
+            slot.wakeup.clear()
+            while slot.pending:
+                key = next(iter(slot.pending))
+                del slot.pending[key]
+                book = order_books.get(key)
+                if book is None: continue
+                start = time.perf_counter()
+                try:
+                    result = strategy.on_book_update(key[0], key[1], book)
+                    if inspect.isawaitable(result): await result
+                except Exception as e:
+                    self.logger.error(f"Strategy '{strategy.name}' failed on {key[0]} {key[1]}: {e}", exc_info=True)
+                elapsed = time.perf_counter() - start
+                slot.deliveries += 1
+                slot.busy_s += elapsed
+                if elapsed > slot.max_s: slot.max_s = elapsed
+                if elapsed > slot.budget_s:
+                    slot.overruns += 1
+                    slot.overrun_s += elapsed - slot.budget_s
+                    self.logger.warning(f"Strategy '{strategy.name}' took {elapsed * 1000:.1f}ms on {key[0]} {key[1]} (budget {slot.budget_s * 1000:.1f}ms).")
+                # Rend la main : les autres stratégies et les connecteurs passent entre deux livraisons.
+                await asyncio.sleep(0)
+
+    async def _run_strategy(self, strategy: Strategy):
+        current_strategy.set(strategy.name)
+        await strategy.run()
+
+    async def run(self):
+        self.logger.info(f"Strategy dispatcher running: {', '.join(self._slots)} ({self.budget_ms}ms budget per update).")
+        await asyncio.gather(*(task for slot in self._slots.values()
+                               for task in (self._deliver(slot), self._run_strategy(slot.strategy))))
+
+    def stats(self) -> dict:
+        return {name: slot.stats() for name, slot in self._slots.items()}
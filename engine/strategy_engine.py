@@ -1,8 +1,33 @@
 # engine/strategy_engine.py
-import asyncio, logging, time, json
-from config import MAX_TRADE_SIZE_USD
+import asyncio, logging, math, time, json
+from config import (MAX_TRADE_SIZE_USD, MAX_CONCURRENT_TRADES, PAIR_COOLDOWN_SECONDS,
+                    HEDGE_MAX_SLIPPAGE_PCT, HEDGE_FILL_TIMEOUT_S, HEDGE_MAX_ATTEMPTS, HEDGE_LATENCY_BUDGET_S, ROUTER_CHILD_TIMEOUT_S,
+                    ADAPTIVE_THRESHOLDS, THRESHOLD_FLOOR_PCT, THRESHOLD_CEILING_PCT, THRESHOLD_LATENCY_S, THRESHOLD_VOL_MULTIPLIER, THRESHOLD_HALF_LIFE_S)
 # --- NOUVEL IMPORT ---
 from concurrent.futures import ProcessPoolExecutor
+from engine.maker_engine import MakerEngine
+from engine.hedge_engine import HedgeEngine
+from engine.adaptive_thresholds import AdaptiveThresholds
+from engine.strategy_dispatcher import Strategy
+from execution.smart_order_router import SmartOrderRouter
+from execution.order_journal import current_trade, current_strategy
+from utils.log_setup import RATE_LIMITED
+
+def _non_negative(value) -> float:
+    value = float(value)
+    # NaN passerait un simple `value < 0` et désactiverait toute comparaison de seuil.
+    if not (math.isfinite(value) and value >= 0): raise ValueError("must be a finite number >= 0")
+    return value
+
+def _at_least_one(value) -> int:
+    value = int(value)
+    if value < 1: raise ValueError("must be >= 1")
+    return value
+
+def _venue_set(value):
+    """'Binance,OKX' or a list -> frozenset; None, '' or 'all' -> None (every venue)."""
+    if value is None or value in ("", "all"): return None
+    return frozenset(venue.strip() for venue in (value.split(',') if isinstance(value, str) else value) if venue.strip())
 
 # --- NOUVELLE FONCTION (en dehors de la classe) ---
 # Cette fonction doit être en dehors de la classe pour que multiprocessing puisse la "sérialiser"
@@ -12,6 +37,7 @@ def calculate_real_profit_sync(asks_to_buy, bids_to_sell, buy_fee_pct: float, se
     Cette version est synchrone et conçue pour être exécutée dans un processus séparé.
     """
     volume_traded, buy_cost, sell_revenue = 0, 0, 0
+    max_buy_price, min_sell_price = None, None
     buy_idx, sell_idx = 0, 0
     
     # S'assurer que les données sont des listes et non des tuples pour la modification
@@ -41,6 +67,7 @@ def calculate_real_profit_sync(asks_to_buy, bids_to_sell, buy_fee_pct: float, se
             break
 
         volume_traded += vol
+        max_buy_price, min_sell_price = buy_price, sell_price
         buy_cost += current_cost
         sell_revenue += current_revenue
 
@@ -64,70 +91,256 @@ def calculate_real_profit_sync(asks_to_buy, bids_to_sell, buy_fee_pct: float, se
             "buy_cost": buy_cost, 
             "sell_revenue": sell_revenue, 
             "net_profit_usd": net_profit_usd, 
-            "net_profit_pct": net_profit_pct
+            "net_profit_pct": net_profit_pct,
+            "max_buy_price": max_buy_price,
+            "min_sell_price": min_sell_price
         }
     return None
 
 
-class StrategyEngine:
-    def __init__(self, order_books: dict, order_manager, notifier):
+class StrategyEngine(Strategy):
+    """
+    Cross-venue arbitrage: taker trades when a pair's spread beats both taker fees, post-only maker quotes otherwise.
+    Taker and maker share the per-pair claims and capital reservations, hence one strategy. Registered with a
+    StrategyDispatcher, it evaluates the pairs of each updated book; on its own (`run` without a dispatcher,
+    sharded workers) it polls every pair every 100ms.
+    """
+    name = "arbitrage"
+
+    # Paramètres modifiables à chaud (API de contrôle) : nom -> (attribut, éventuellement pointé, conversion/validation).
+    PARAMETERS = {
+        "taker_threshold_pct": ("taker_profit_threshold_pct", _non_negative),
+        "maker_threshold_pct": ("maker_spread_threshold_pct", _non_negative),
+        "max_trade_size_usd": ("max_trade_size_usd", _non_negative),
+        "pair_cooldown_s": ("_cooldown", _non_negative),
+        "max_concurrent_trades": ("_max_concurrent_trades", _at_least_one),
+        "enabled_venues": ("enabled_venues", _venue_set),
+        "threshold_floor_pct": ("thresholds.floor_pct", _non_negative),
+        "threshold_ceiling_pct": ("thresholds.ceiling_pct", _non_negative),
+    }
+
+    def __init__(self, order_books: dict, order_manager, notifier, consolidated_books=None):
         self._order_books = order_books
+        self._consolidated = consolidated_books
         self._order_manager = order_manager
         self.notifier = notifier
         self.logger = logging.getLogger(self.__class__.__name__)
         self.taker_profit_threshold_pct = 0.05
         self.maker_spread_threshold_pct = 0.0
-        self._is_trading_enabled = True
-        self._cooldown = 5
-        self._last_print_time = 0
-        self._print_interval = 10
-        self.active_maker_trade = None
+        self._cooldown = PAIR_COOLDOWN_SECONDS
+        self._max_concurrent_trades = MAX_CONCURRENT_TRADES
+        self.max_trade_size_usd = MAX_TRADE_SIZE_USD
+        # Plateformes autorisées (None : toutes) et paires suspendues, réglées par l'API de contrôle.
+        self.enabled_venues = None
+        self._paused_pairs = set()
+        # Modifications en attente, appliquées par `run` entre deux passes d'évaluation : le chemin critique ne prend aucun verrou.
+        self._pending_changes = []
+        self._evaluating = False
+        # --- ÉTAT PAR PAIRE ---
+        # (platform_a, platform_b, symbol) -> 'trading' | 'cooldown'. Absent = libre.
+        self._pair_states = {}
+        self._active_trades = 0
+        self.active_maker_trades = {}
+        self.maker_engine = MakerEngine(order_books, metadata=order_manager.metadata)
+        self.router = SmartOrderRouter(order_manager, order_books, consolidated_books, ROUTER_CHILD_TIMEOUT_S)
+        self.hedge_engine = HedgeEngine(self.router, order_manager, notifier, HEDGE_MAX_SLIPPAGE_PCT, HEDGE_FILL_TIMEOUT_S, HEDGE_MAX_ATTEMPTS, HEDGE_LATENCY_BUDGET_S)
+        # Seuils par paire, alimentés par main.py (listener du DataEngine) ; sans eux, les seuils fixes ci-dessus.
+        self.thresholds = AdaptiveThresholds(order_books, THRESHOLD_FLOOR_PCT, THRESHOLD_CEILING_PCT, THRESHOLD_LATENCY_S,
+                                             THRESHOLD_VOL_MULTIPLIER, THRESHOLD_HALF_LIFE_S) if ADAPTIVE_THRESHOLDS else None
         
         # --- NOUVEAUX ATTRIBUTS ---
         # Crée un pool de processus. Par défaut, il utilisera tous les cœurs disponibles.
         self.process_pool = ProcessPoolExecutor()
         self.loop = asyncio.get_event_loop()
 
-    def _print_order_books(self):
-        print("\n" + "="*80 + f"\n--- ORDER BOOK SNAPSHOT ({time.strftime('%H:%M:%S')}) ---")
-        order_books_copy = dict(self._order_books)
-        if not order_books_copy: print("No order books available.")
-        for (platform, symbol), book in order_books_copy.items():
-            print(f"\n--- {platform} ({symbol}) ---")
-            asks, bids = book.get_asks(3), book.get_bids(3)
-            if not asks or not bids: print("Order book is empty or incomplete."); continue
-            print("ASKS (Sell)                  | BIDS (Buy)")
-            print("Price (USDC)   | Qty (BTC)     | Price (USDC)   | Qty (BTC)")
-            print("--------------|---------------|----------------|---------------")
-            for i in range(3):
-                ask_price, ask_qty = asks[i] if i < len(asks) else ('-', '-')
-                bid_price, bid_qty = bids[i] if i < len(bids) else ('-', '-')
-                print(f"{str(ask_price):<14} | {str(ask_qty):<13} | {str(bid_price):<14} | {str(bid_qty):<13}")
-        print("="*80 + "\n")
+    @staticmethod
+    def _pair_key(platform_x: str, platform_y: str, symbol: str):
+        return (min(platform_x, platform_y), max(platform_x, platform_y), symbol)
+
+    def _is_pair_available(self, pair_key) -> bool:
+        return (pair_key not in self._pair_states and pair_key not in self._paused_pairs and self._active_trades < self._max_concurrent_trades
+                and (self.enabled_venues is None or (pair_key[0] in self.enabled_venues and pair_key[1] in self.enabled_venues)))
+
+    def _acquire_pair(self, pair_key, requirements: dict):
+        """
+        Claims a pair for one trade and reserves its capital in the balance ledger.
+        Synchronous on purpose: no await between the check and the claim, so two tasks can never
+        acquire the same pair or the same funds. Returns a reservation id, or None if refused.
+        """
+        if not self._is_pair_available(pair_key): return None
+        reservation_id = self._order_manager.ledger.reserve(requirements)
+        if reservation_id is None: return None
+        self._pair_states[pair_key] = 'trading'
+        self._active_trades += 1
+        return reservation_id
+
+    async def _release_pair(self, pair_key, reservation_id, venues=None):
+        """Refreshes the traded balances, frees the reservation and the concurrency slot, then cools the pair down."""
+        try:
+            await self._order_manager.refresh_balances(list(venues or (pair_key[0], pair_key[1])))
+        finally:
+            self._order_manager.ledger.release(reservation_id)
+            self._active_trades -= 1
+            self._pair_states[pair_key] = 'cooldown'
+        await self.cooldown_trading(pair_key)
+
+    def _pair_thresholds(self, platform_buy: str, platform_sell: str, symbol: str):
+        """(taker %, maker %) thresholds of the directional pair. The adaptive taker threshold may go down to THRESHOLD_FLOOR_PCT."""
+        if self.thresholds is None: return self.taker_profit_threshold_pct, self.maker_spread_threshold_pct
+        taker, maker = self.thresholds.thresholds(platform_buy, platform_sell, symbol)
+        # Le seuil fixe n'est pas un plancher : il annulerait toute baisse du seuil adaptatif.
+        return max(taker, self.thresholds.floor_pct), max(maker, self.maker_spread_threshold_pct)
+
+    def _record_outcome(self, platform_buy: str, platform_sell: str, symbol: str, filled_fraction: float):
+        if self.thresholds is not None: self.thresholds.record_outcome(platform_buy, platform_sell, symbol, filled_fraction)
+
+    def _open_trade(self, origin: str):
+        """Journals the orders of the current task (and of the tasks it creates) as one trade; None without an order journal."""
+        journal = self._order_manager.journal
+        return journal.open_trade(origin) if journal else None
+
+    def _close_trade(self, trade_id):
+        if trade_id: self._order_manager.journal.close_trade(trade_id)
+
+    async def recover(self, trades: dict, wait_s: float = 30.0):
+        """
+        Flattens the exposure of trades left unbalanced by a crash ({trade id: {"origin", "exposure"}}, from
+        LiveOrderManager.reconcile_journal) as soon as the symbol has a live book, within the trade's journal context.
+        """
+        async def recover_trade(trade_id, info):
+            current_trade.set(trade_id)
+            current_strategy.set(info.get('strategy'))
+            for symbol, exposure in info['exposure'].items():
+                deadline = time.monotonic() + wait_s
+                while not any(book.get_bids(1) and book.get_asks(1) for (_, s), book in list(self._order_books.items()) if s == symbol):
+                    if time.monotonic() >= deadline:
+                        self.logger.critical(f"No live {symbol} book after {wait_s:.0f}s: exposure {exposure:+.8f} of trade {trade_id} left unhedged.")
+                        return
+                    await asyncio.sleep(0.1)
+                await self.hedge_engine.flatten(symbol, exposure, origin=f"recovery of {info['origin'] or trade_id}")
+            self._close_trade(trade_id)
+        if trades: await asyncio.gather(*(recover_trade(trade_id, info) for trade_id, info in trades.items()))
+
+    @staticmethod
+    def _capital_requirements(platform_buy: str, platform_sell: str, symbol: str, volume: float, buy_price: float, buy_fee_pct: float):
+        base, quote = symbol.split('/')
+        return {(platform_buy, quote): volume * buy_price * (1 + buy_fee_pct / 100), (platform_sell, base): volume}
 
     async def run(self):
-        self.logger.info("Strategy Engine is running.")
+        self.logger.info(f"Strategy Engine is running (max {self._max_concurrent_trades} concurrent trades, {'dispatched' if self.dispatcher else 'polling'}).")
         while True:
             await asyncio.sleep(0.1)
-            current_time = time.time()
-            if current_time - self._last_print_time > self._print_interval:
-                self._print_order_books()
-                self._last_print_time = current_time
-            if not self._is_trading_enabled or self.active_maker_trade:
+            # Sous un dispatcher, les modifications attendent la fin de l'évaluation en cours.
+            if self._pending_changes and not self._evaluating: self._apply_pending_changes()
+            if self.dispatcher is not None: continue
+            if self._active_trades >= self._max_concurrent_trades:
                 continue
             try: order_books_copy = dict(self._order_books)
             except Exception: continue
             if len(order_books_copy) < 2: continue
             platforms = list(order_books_copy.keys())
+            quiet_symbols = self._uncrossed_symbols()
             for i in range(len(platforms)):
                 for j in range(i + 1, len(platforms)):
                     platform_A_key, platform_B_key = platforms[i], platforms[j]
-                    if platform_A_key not in order_books_copy or platform_B_key not in order_books_copy: continue
+                    if platform_A_key[1] != platform_B_key[1] or platform_A_key[1] in quiet_symbols: continue
+                    if not self._is_pair_available(self._pair_key(platform_A_key[0], platform_B_key[0], platform_A_key[1])): continue
                     book_A, book_B = order_books_copy[platform_A_key], order_books_copy[platform_B_key]
                     await self.evaluate_market_pair(book_A, book_B, platform_A_key[0], platform_B_key[0], platform_A_key[1])
                     await self.evaluate_market_pair(book_B, book_A, platform_B_key[0], platform_A_key[0], platform_B_key[1])
 
+    async def on_book_update(self, platform: str, symbol: str, book):
+        """Dispatcher callback: evaluates the updated book against every other venue's book of the symbol, both ways."""
+        if self._pending_changes: self._apply_pending_changes()
+        if self._active_trades >= self._max_concurrent_trades or self._uncrossed(symbol): return
+        self._evaluating = True
+        try:
+            for (other, other_symbol), other_book in list(self._order_books.items()):
+                if other_symbol != symbol or other == platform: continue
+                if not self._is_pair_available(self._pair_key(platform, other, symbol)): continue
+                await self.evaluate_market_pair(book, other_book, platform, other, symbol)
+                await self.evaluate_market_pair(other_book, book, other, platform, symbol)
+        finally:
+            self._evaluating = False
+
+    # --- réglages à chaud ---
+
+    def _parameter_target(self, name: str):
+        path, _ = self.PARAMETERS[name]
+        owner_path, _, attribute = path.rpartition('.')
+        return (getattr(self, owner_path) if owner_path else self), attribute
+
+    def parameters(self) -> dict:
+        values = {}
+        for name in self.PARAMETERS:
+            owner, attribute = self._parameter_target(name)
+            if owner is None: continue
+            value = getattr(owner, attribute)
+            values[name] = sorted(value) if isinstance(value, frozenset) else value
+        return values
+
+    def _stage(self, apply):
+        future = asyncio.get_running_loop().create_future()
+        self._pending_changes.append((apply, future))
+        return future
+
+    def _apply_pending_changes(self):
+        pending, self._pending_changes = self._pending_changes, []
+        for apply, future in pending:
+            try: result = apply()
+            except Exception as e:
+                if not future.done(): future.set_exception(e)
+            else:
+                if not future.done(): future.set_result(result)
+
+    def update_parameters(self, changes: dict):
+        """
+        Validates {name: value} (raises ValueError) and stages the changes; they are applied together by `run`
+        between two evaluation passes. Returns a future resolving to the parameters once applied.
+        """
+        converted = {}
+        for name, value in changes.items():
+            if name not in self.PARAMETERS: raise ValueError(f"unknown parameter '{name}' (known: {', '.join(self.PARAMETERS)})")
+            if self._parameter_target(name)[0] is None: raise ValueError(f"'{name}' needs ADAPTIVE_THRESHOLDS")
+            try: converted[name] = self.PARAMETERS[name][1](value)
+            except (TypeError, ValueError) as e: raise ValueError(f"invalid value for '{name}': {value!r} ({e})")
+        venues = converted.get("enabled_venues")
+        if venues and self._order_manager.exchanges and not venues <= set(self._order_manager.exchanges):
+            raise ValueError(f"unknown venue(s): {', '.join(sorted(venues - set(self._order_manager.exchanges)))}")
+        def apply():
+            for name, value in converted.items():
+                setattr(*self._parameter_target(name), value)
+            self.logger.warning(f"Parameters updated at runtime: {converted}")
+            return self.parameters()
+        return self._stage(apply)
+
+    def set_pair_paused(self, venue_a: str, venue_b: str, symbol: str, paused: bool):
+        """Stages pausing (or resuming) new trades on a venue pair; trades in flight finish normally."""
+        pair_key = self._pair_key(venue_a, venue_b, symbol)
+        def apply():
+            if paused: self._paused_pairs.add(pair_key)
+            else: self._paused_pairs.discard(pair_key)
+            self.logger.warning(f"Pair {'/'.join(pair_key)} {'paused' if paused else 'resumed'}.")
+            return sorted("/".join(key) for key in self._paused_pairs)
+        return self._stage(apply)
+
+    def _uncrossed(self, symbol: str) -> bool:
+        """
+        True if the symbol's consolidated book is not crossed: no venue bids above another venue's ask, so no pair
+        can show a positive spread and the pairwise evaluation is skipped (only valid with non-negative thresholds).
+        """
+        if not self._consolidated or min(self.taker_profit_threshold_pct, self.maker_spread_threshold_pct) < 0: return False
+        book = self._consolidated.books.get(symbol)
+        if book is None: return False
+        best_bid, best_ask = book.get_bids(1), book.get_asks(1)
+        return bool(best_bid and best_ask and best_bid[0][0] <= best_ask[0][0])
+
+    def _uncrossed_symbols(self) -> set:
+        if not self._consolidated: return set()
+        return {symbol for symbol in list(self._consolidated.books) if self._uncrossed(symbol)}
+
     async def evaluate_market_pair(self, book_buy_on, book_sell_on, buy_platform_name, sell_platform_name, symbol):
+        if not self._is_pair_available(self._pair_key(buy_platform_name, sell_platform_name, symbol)): return
         asks, bids = book_buy_on.get_asks(1), book_sell_on.get_bids(1)
         if not asks or not bids: return
         
@@ -136,123 +349,231 @@ class StrategyEngine:
         
         spread_pct = ((best_bid_price - best_ask_price) / best_ask_price) * 100
         
-        taker_fee_buy = self._order_manager.get_fees(buy_platform_name)['taker']
-        taker_fee_sell = self._order_manager.get_fees(sell_platform_name)['taker']
+        taker_fee_buy = self._order_manager.get_fees(buy_platform_name, symbol)['taker']
+        taker_fee_sell = self._order_manager.get_fees(sell_platform_name, symbol)['taker']
         taker_profit_pct = spread_pct - taker_fee_buy - taker_fee_sell
+        taker_threshold_pct, maker_threshold_pct = self._pair_thresholds(buy_platform_name, sell_platform_name, symbol)
         
-        if taker_profit_pct > self.taker_profit_threshold_pct:
-            self.logger.warning(f"[TAKER STRATEGY] Opportunity found! Est. Net Profit: {taker_profit_pct:.4f}%. (Spread: {spread_pct:.4f}%, Fees: {taker_fee_buy + taker_fee_sell:.4f}%)")
+        if taker_profit_pct > taker_threshold_pct:
+            self.logger.warning("[TAKER STRATEGY] Opportunity found! Est. Net Profit: %.4f%%. (Spread: %.4f%%, Fees: %.4f%%)", taker_profit_pct, spread_pct, taker_fee_buy + taker_fee_sell, extra=RATE_LIMITED)
             await self.execute_taker_strategy(book_buy_on, book_sell_on, buy_platform_name, sell_platform_name, symbol)
-        elif spread_pct > self.maker_spread_threshold_pct and not self.active_maker_trade:
-            self.logger.info(f"[MAKER STRATEGY] Favorable spread ({spread_pct:.4f}%). Triggering Maker logic.")
+        elif spread_pct > maker_threshold_pct:
+            self.logger.info("[MAKER STRATEGY] Favorable spread (%.4f%%). Triggering Maker logic.", spread_pct, extra=RATE_LIMITED)
             asyncio.create_task(self.execute_maker_strategy(book_buy_on, book_sell_on, buy_platform_name, sell_platform_name, symbol))
 
     async def execute_taker_strategy(self, book_buy, book_sell, platform_buy_name, platform_sell_name, symbol):
         asks, bids = book_buy.get_asks(10), book_sell.get_bids(10)
         if not asks or not bids: return
         
-        taker_fee_buy = self._order_manager.get_fees(platform_buy_name)['taker']
-        taker_fee_sell = self._order_manager.get_fees(platform_sell_name)['taker']
+        taker_fee_buy = self._order_manager.get_fees(platform_buy_name, symbol)['taker']
+        taker_fee_sell = self._order_manager.get_fees(platform_sell_name, symbol)['taker']
         
         # --- MODIFICATION : Délégation du calcul lourd ---
         result = await self.loop.run_in_executor(
             self.process_pool, 
             calculate_real_profit_sync, 
-            asks, bids, taker_fee_buy, taker_fee_sell, MAX_TRADE_SIZE_USD
+            asks, bids, taker_fee_buy, taker_fee_sell, self.max_trade_size_usd
         )
         
-        if result and result['net_profit_pct'] > self.taker_profit_threshold_pct:
+        if result and result['net_profit_pct'] > self._pair_thresholds(platform_buy_name, platform_sell_name, symbol)[0]:
+            pair_key = self._pair_key(platform_buy_name, platform_sell_name, symbol)
+            # Chaque jambe est routée sur toutes les plateformes connectées (sauf celle de l'autre jambe),
+            # sans dépasser les prix limites rentables de la paire.
+            venues = list(self._order_manager.exchanges)
+            buy_venues, sell_venues = [v for v in venues if v != platform_sell_name], [v for v in venues if v != platform_buy_name]
+            buy_plan = self.router.plan(symbol, 'buy', result['volume'], result['max_buy_price'], buy_venues)
+            sell_plan = self.router.plan(symbol, 'sell', result['volume'], result['min_sell_price'], sell_venues)
+            volume = min(buy_plan['estimate']['filled'], sell_plan['estimate']['filled'])
+            if volume <= 1e-9:
+                self.logger.info("Taker opportunity on %s->%s (%s) skipped: no routable depth on the connected venues.", platform_buy_name, platform_sell_name, symbol, extra=RATE_LIMITED)
+                return
+            if volume < result['volume']:
+                buy_plan = self.router.plan(symbol, 'buy', volume, result['max_buy_price'], buy_venues)
+                sell_plan = self.router.plan(symbol, 'sell', volume, result['min_sell_price'], sell_venues)
+            requirements = {**self.router.capital_requirements(buy_plan), **self.router.capital_requirements(sell_plan)}
+            reservation_id = self._acquire_pair(pair_key, requirements)
+            if reservation_id is None:
+                self.logger.info("Taker opportunity on %s->%s (%s) skipped: pair busy, concurrency limit reached or capital unavailable.", platform_buy_name, platform_sell_name, symbol, extra=RATE_LIMITED)
+                return
             self.logger.info(f"--- Triggering TAKER order for {result['net_profit_pct']:.4f}% profit. ---")
-            self._is_trading_enabled = False
-            asyncio.create_task(self.notifier.send_message(f"🚀 *Taker Opportunity Found* 🚀\nProfit: *{result['net_profit_pct']:.4f}%*\nBuy on {platform_buy_name}, Sell on {platform_sell_name}."))
-            asyncio.create_task(self._order_manager.execute_arbitrage(
-                volume=result['volume'], 
-                platform_buy=platform_buy_name, 
-                platform_sell=platform_sell_name, 
-                max_buy_price=float(asks[0][0]), 
-                min_sell_price=float(bids[0][0]), 
-                symbol=symbol
-            ))
-            asyncio.create_task(self.cooldown_trading())
+            asyncio.create_task(self.notifier.send_message(f"🚀 *Taker Opportunity Found* 🚀\nProfit: *{result['net_profit_pct']:.4f}%*\nBuy on {', '.join(buy_plan['children'])}, Sell on {', '.join(sell_plan['children'])}."))
+            asyncio.create_task(self._run_taker_trade(pair_key, reservation_id, buy_plan, sell_plan, (platform_buy_name, platform_sell_name)))
+
+    async def _run_taker_trade(self, pair_key, reservation_id, buy_plan, sell_plan, direction):
+        symbol = buy_plan['symbol']
+        trade_id = self._open_trade(f"taker {'->'.join(direction)} {symbol}")
+        try:
+            buy_report, sell_report = await asyncio.gather(self.router.execute(buy_plan, journal_event='TAKER_EXEC'), self.router.execute(sell_plan, journal_event='TAKER_EXEC'))
+            self._record_outcome(*direction, symbol, min(buy_report['filled'], sell_report['filled']) / buy_plan['requested'])
+            # Les deux jambes doivent être remplies à l'identique ; sinon l'écart est couvert immédiatement.
+            imbalance = buy_report['filled'] - sell_report['filled']
+            if abs(imbalance) > self.hedge_engine.flat_tolerance:
+                await self.hedge_engine.flatten(symbol, imbalance, origin=f"taker {'/'.join(pair_key)}")
+        except Exception as e:
+            self.logger.error(f"Taker trade on {pair_key} failed: {e}", exc_info=True)
+        finally:
+            self._close_trade(trade_id)
+            await self._release_pair(pair_key, reservation_id, {*buy_plan['children'], *sell_plan['children']})
 
     async def execute_maker_strategy(self, book_buy_on, book_sell_on, buy_platform, sell_platform, symbol):
-        if self.active_maker_trade: return
-        buy_bids = book_buy_on.get_bids(1)
-        sell_asks = book_sell_on.get_asks(1)
-        if not buy_bids or not sell_asks: return
-        our_buy_price = float(buy_bids[0][0]) + 0.01
-        our_sell_price = float(sell_asks[0][0]) - 0.01
+        pair_key = self._pair_key(buy_platform, sell_platform, symbol)
+        if not self._is_pair_available(pair_key): return
+        our_buy_price = self.maker_engine.quote_price(book_buy_on, 'buy', tick=self.maker_engine.tick_for(buy_platform, symbol))
+        our_sell_price = self.maker_engine.quote_price(book_sell_on, 'sell', tick=self.maker_engine.tick_for(sell_platform, symbol))
+        if our_buy_price is None or our_sell_price is None: return
         if our_buy_price >= our_sell_price:
-            self.logger.info(f"Maker prices crossed or invalid. Buy: {our_buy_price}, Sell: {our_sell_price}. Aborting.")
+            self.logger.info("Maker prices crossed or invalid. Buy: %s, Sell: %s. Aborting.", our_buy_price, our_sell_price, extra=RATE_LIMITED)
             return
+        volume = self.maker_engine.quote_size(self.max_trade_size_usd, our_buy_price, book_buy_on, book_sell_on)
+        maker_fee_buy = self._order_manager.get_fees(buy_platform, symbol)['maker']
+        # Le prix d'achat peut être amendé jusqu'au prix de vente : on réserve au pire cas.
+        reservation_id = self._acquire_pair(pair_key, self._capital_requirements(buy_platform, sell_platform, symbol, volume, our_sell_price, maker_fee_buy))
+        if reservation_id is None: return
         self.logger.info("--- Triggering MAKER orders (Post-Only) ---")
-        self._is_trading_enabled = False
-        volume = MAX_TRADE_SIZE_USD / our_buy_price
-        buy_order_task = asyncio.create_task(self._order_manager.create_limit_order(buy_platform, symbol, 'buy', volume, our_buy_price, post_only=True))
-        sell_order_task = asyncio.create_task(self._order_manager.create_limit_order(sell_platform, symbol, 'sell', volume, our_sell_price, post_only=True))
-        buy_result, sell_result = await asyncio.gather(buy_order_task, sell_order_task)
-        if buy_result and buy_result.get('id') and sell_result and sell_result.get('id'):
-            self.active_maker_trade = {
-                "buy_leg": buy_result, "sell_leg": sell_result, 
-                "status": "active", "creation_time": time.time(),
-                "buy_platform": buy_platform, "sell_platform": sell_platform, "symbol": symbol
-            }
-            self.logger.info(f"Active Maker trade created. Buy ID: {buy_result['id']}, Sell ID: {sell_result['id']}")
-            asyncio.create_task(self.maker_trade_monitoring_loop())
-        else:
-            self.logger.error("Failed to place one or both Maker (Post-Only) orders. Cleaning up.")
-            if buy_result and buy_result.get('id'): await self._order_manager.cancel_order(buy_platform, buy_result['id'], symbol)
-            if sell_result and sell_result.get('id'): await self._order_manager.cancel_order(sell_platform, sell_result['id'], symbol)
-            self._is_trading_enabled = True
-
-    async def maker_trade_monitoring_loop(self):
-        self.logger.info("Starting Maker trade monitoring loop...")
-        while self.active_maker_trade:
-            await self.check_maker_trade_status()
-            await asyncio.sleep(1)
-        self.logger.info("Exiting Maker trade monitoring loop.")
-        await self.cooldown_trading()
-
-    async def check_maker_trade_status(self):
-        if not self.active_maker_trade: return
-        trade_info = self.active_maker_trade
-        buy_leg, sell_leg = trade_info['buy_leg'], trade_info['sell_leg']
+        trade_id = self._open_trade(f"maker {buy_platform}->{sell_platform} {symbol}")
+        monitored = False
+        try:
+            buy_order_task = asyncio.create_task(self._order_manager.create_limit_order(buy_platform, symbol, 'buy', volume, our_buy_price, post_only=True))
+            sell_order_task = asyncio.create_task(self._order_manager.create_limit_order(sell_platform, symbol, 'sell', volume, our_sell_price, post_only=True))
+            # Les deux jambes vont jusqu'au bout : une jambe posée ne doit pas être perdue parce que l'autre a levé une exception.
+            buy_result, sell_result = await asyncio.gather(buy_order_task, sell_order_task, return_exceptions=True)
+            for platform, result in ((buy_platform, buy_result), (sell_platform, sell_result)):
+                if isinstance(result, BaseException): self.logger.error(f"Maker order on {platform} raised: {result!r}")
+            buy_result, sell_result = (None if isinstance(r, BaseException) else r for r in (buy_result, sell_result))
+            if buy_result and buy_result.get('id') and sell_result and sell_result.get('id'):
+                self.active_maker_trades[pair_key] = {
+                    "buy_leg": buy_result, "sell_leg": sell_result, 
+                    "status": "active", "creation_time": time.time(),
+                    "buy_platform": buy_platform, "sell_platform": sell_platform, "symbol": symbol,
+                    "reservation_id": reservation_id, "trade_id": trade_id
+                }
+                self.maker_engine.track(buy_result['id'], buy_platform, symbol, 'buy', our_buy_price, volume)
+                self.maker_engine.track(sell_result['id'], sell_platform, symbol, 'sell', our_sell_price, volume)
+                self.logger.info(f"Active Maker trade created. Buy ID: {buy_result['id']}, Sell ID: {sell_result['id']}")
+                asyncio.create_task(self.maker_trade_monitoring_loop(pair_key))
+                monitored = True
+            else:
+                self.logger.error("Failed to place one or both Maker (Post-Only) orders. Cleaning up.")
+                # La jambe posée est annulée et ce qu'elle a pu remplir entre-temps est couvert tout de suite.
+                legs = [(p, r['id'], side) for p, r, side in ((buy_platform, buy_result, 'buy'), (sell_platform, sell_result, 'sell')) if r and r.get('id')]
+                if legs: await self.hedge_engine.reconcile(symbol, legs, origin=f"maker {'/'.join(pair_key)}")
+        finally:
+            # La boucle de suivi libère la paire elle-même.
+            if not monitored:
+                self._close_trade(trade_id)
+                await self._release_pair(pair_key, reservation_id)
+
+    async def maker_trade_monitoring_loop(self, pair_key):
+        self.logger.info(f"Starting Maker trade monitoring loop for {pair_key}...")
+        reservation_id, trade_id = self.active_maker_trades[pair_key]['reservation_id'], self.active_maker_trades[pair_key]['trade_id']
+        try:
+            while pair_key in self.active_maker_trades:
+                await self.check_maker_trade_status(pair_key)
+                await asyncio.sleep(1)
+        finally:
+            self.logger.info(f"Exiting Maker trade monitoring loop for {pair_key}.")
+            self._close_trade(trade_id)
+            await self._release_pair(pair_key, reservation_id)
+
+    async def check_maker_trade_status(self, pair_key):
+        trade_info = self.active_maker_trades.get(pair_key)
+        if not trade_info: return
         buy_platform, sell_platform, symbol = trade_info['buy_platform'], trade_info['sell_platform'], trade_info['symbol']
-        buy_book = self._order_books.get((buy_platform, symbol))
-        sell_book = self._order_books.get((sell_platform, symbol))
-        if not buy_book or not sell_book: return
-        current_best_bid_buy_platform = float(buy_book.get_bids(1)[0][0]) if buy_book.get_bids(1) else 0
-        current_best_ask_sell_platform = float(sell_book.get_asks(1)[0][0]) if sell_book.get_asks(1) else float('inf')
-        if current_best_bid_buy_platform > buy_leg['price']:
-            self.logger.info("Queue Jump: Market moved against our Buy Maker order. Repositioning...")
-            await self.cancel_and_reset_maker_trade(); return
-        if current_best_ask_sell_platform < sell_leg['price']:
-            self.logger.info("Queue Jump: Market moved against our Sell Maker order. Repositioning...")
-            await self.cancel_and_reset_maker_trade(); return
+        if not self._order_books.get((buy_platform, symbol)) or not self._order_books.get((sell_platform, symbol)): return
+        if not await self._manage_maker_quotes(pair_key, trade_info): return
+        buy_leg, sell_leg = trade_info['buy_leg'], trade_info['sell_leg']
         buy_status_task = self._order_manager.fetch_order_status(buy_platform, buy_leg['id'], symbol)
         sell_status_task = self._order_manager.fetch_order_status(sell_platform, sell_leg['id'], symbol)
         buy_order, sell_order = await asyncio.gather(buy_status_task, sell_status_task)
+        if buy_order and buy_order['status'] == 'closed': self.maker_engine.untrack(buy_leg['id'], filled=True)
+        if sell_order and sell_order['status'] == 'closed': self.maker_engine.untrack(sell_leg['id'], filled=True)
         if buy_order and buy_order['status'] == 'closed' and sell_order and sell_order['status'] == 'closed':
-            self.logger.info("SUCCESS: Both Maker legs filled! Profit captured."); await self.notifier.send_message("✅ *Maker Arbitrage Success* ✅\nBoth passive orders were filled."); self.active_maker_trade = None; return
+            self._record_outcome(buy_platform, sell_platform, symbol, 1.0)
+            self.logger.info("SUCCESS: Both Maker legs filled! Profit captured."); await self.notifier.send_message("✅ *Maker Arbitrage Success* ✅\nBoth passive orders were filled."); self.active_maker_trades.pop(pair_key, None); return
         if (buy_order and buy_order['status'] == 'closed') and (sell_order and sell_order['status'] == 'open'):
-            self.logger.warning("Maker leg filled (Buy). Chasing the Sell leg."); await self.notifier.send_message("🏃‍♂️ *Chasing Maker Leg* 🏃‍♂️\nBuy order filled. Converting Sell order to Taker to complete trade."); await self._order_manager.cancel_order(sell_platform, sell_leg['id'], symbol); await self._order_manager.create_limit_order(sell_platform, symbol, 'sell', sell_leg['amount'], sell_order['price'] * 0.99); self.active_maker_trade = None; return
+            self.logger.warning("Maker leg filled (Buy). Hedging while the Sell leg is cancelled.")
+            self._record_outcome(buy_platform, sell_platform, symbol, 0.5)
+            await self._hedge_one_sided_fill(pair_key, buy_order, sell_order, (sell_platform, sell_leg['id'], 'sell')); return
         if (sell_order and sell_order['status'] == 'closed') and (buy_order and buy_order['status'] == 'open'):
-            self.logger.warning("Maker leg filled (Sell). Chasing the Buy leg."); await self.notifier.send_message("🏃‍♂️ *Chasing Maker Leg* 🏃‍♂️\nSell order filled. Converting Buy order to Taker to complete trade."); await self._order_manager.cancel_order(buy_platform, buy_leg['id'], symbol); await self._order_manager.create_limit_order(buy_platform, symbol, 'buy', buy_leg['amount'], buy_order['price'] * 1.01); self.active_maker_trade = None; return
+            self.logger.warning("Maker leg filled (Sell). Hedging while the Buy leg is cancelled.")
+            self._record_outcome(buy_platform, sell_platform, symbol, 0.5)
+            await self._hedge_one_sided_fill(pair_key, buy_order, sell_order, (buy_platform, buy_leg['id'], 'buy')); return
+        # Une jambe annulée ou rejetée par la plateforme (post-only, expiration) ne se remplira plus : inutile d'attendre l'expiration.
+        dead = [order for order in (buy_order, sell_order) if order and order['status'] not in ('open', 'closed')]
+        if dead:
+            self._record_outcome(buy_platform, sell_platform, symbol, 0.5 if any(o and o['status'] == 'closed' for o in (buy_order, sell_order)) else 0.0)
+            self.logger.warning("Maker leg %s is %s on the venue. Cancelling and hedging now.", dead[0].get('id'), dead[0]['status'])
+            await self.cancel_and_reset_maker_trade(pair_key); return
         if time.time() - trade_info['creation_time'] > 30:
-            self.logger.info("Maker orders timed out. Cancelling and resetting."); await self.cancel_and_reset_maker_trade(); return
+            self._record_outcome(buy_platform, sell_platform, symbol, 0.0)
+            self.logger.info("Maker orders timed out. Cancelling and resetting."); await self.cancel_and_reset_maker_trade(pair_key); return
+
+    async def _hedge_one_sided_fill(self, pair_key, buy_order, sell_order, open_leg):
+        trade_info = self.active_maker_trades.pop(pair_key, None)
+        if not trade_info: return
+        platform, order_id, side = open_leg
+        self.maker_engine.untrack(order_id)
+        # Les remplissages des ordres remplacés par un amendement (annule-remplace) comptent aussi.
+        exposure = (float(buy_order.get('filled') or 0.0) + trade_info['buy_leg'].get('filled_before', 0.0)
+                    - float(sell_order.get('filled') or 0.0) - trade_info['sell_leg'].get('filled_before', 0.0))
+        counted = float((buy_order if side == 'buy' else sell_order).get('filled') or 0.0)
+        await self.hedge_engine.flatten(trade_info['symbol'], exposure, [(platform, order_id, side, counted)], origin=f"maker {'/'.join(pair_key)}")
 
-    async def cancel_and_reset_maker_trade(self):
-        if not self.active_maker_trade: return
+    async def _manage_maker_quotes(self, pair_key, trade_info) -> bool:
+        """
+        Asks the MakerEngine what to do with each resting leg: hold, amend in place (one round trip) or cancel.
+        A leg may only be repriced while the pair stays profitable net of both maker fees, and only for what it
+        has left to fill; a remainder below the venue minimum cancels the trade. Returns False if the trade was cancelled.
+        """
+        fees_pct = self._order_manager.get_fees(trade_info['buy_platform'], trade_info['symbol'])['maker'] + self._order_manager.get_fees(trade_info['sell_platform'], trade_info['symbol'])['maker']
+        bounds = {'buy_leg': trade_info['sell_leg']['price'] * (1 - fees_pct / 100), 'sell_leg': trade_info['buy_leg']['price'] * (1 + fees_pct / 100)}
+        for leg_name, side, platform in (('buy_leg', 'buy', trade_info['buy_platform']), ('sell_leg', 'sell', trade_info['sell_platform'])):
+            leg = trade_info[leg_name]
+            decision, new_price = self.maker_engine.decide(leg['id'], bounds[leg_name])
+            if decision == 'cancel':
+                self.logger.info("Maker %s leg is behind the market and cannot be repriced profitably. Cancelling.", side)
+                await self.cancel_and_reset_maker_trade(pair_key); return False
+            if decision == 'amend':
+                order = await self._order_manager.fetch_order_status(platform, leg['id'], trade_info['symbol'])
+                # Rempli ou annulé entre-temps : le contrôle d'état qui suit s'en occupe.
+                if not order or order.get('status') != 'open': continue
+                filled = float(order.get('filled') or 0.0)
+                remaining = float(leg['amount']) - leg.get('filled_before', 0.0) - filled
+                _, _, too_small = self._order_manager.metadata.validate(platform, trade_info['symbol'], side, remaining, new_price)
+                if too_small:
+                    self.logger.info("Maker %s leg has %.8f left to fill, too little to requote (%s). Cancelling.", side, remaining, too_small)
+                    await self.cancel_and_reset_maker_trade(pair_key); return False
+                amended = await self._order_manager.amend_order(platform, leg['id'], trade_info['symbol'], side, remaining, new_price, filled=filled)
+                if not amended:
+                    await self.cancel_and_reset_maker_trade(pair_key); return False
+                # Annule-remplace : les remplissages de l'ancien ordre restent acquis à la jambe.
+                filled_before = leg.get('filled_before', 0.0) + (filled if str(amended['id']) != str(leg['id']) else 0.0)
+                self.maker_engine.retrack(leg['id'], amended['id'], new_price, remaining)
+                trade_info[leg_name] = {**leg, **amended, 'amount': leg['amount'], 'filled_before': filled_before}
+        return True
+
+    async def cancel_and_reset_maker_trade(self, pair_key):
+        trade_info = self.active_maker_trades.get(pair_key)
+        if not trade_info: return
         self.logger.info("Cancelling active maker orders to reposition.")
-        buy_leg, sell_leg = self.active_maker_trade['buy_leg'], self.active_maker_trade['sell_leg']
-        await asyncio.gather(
-            self._order_manager.cancel_order(buy_leg['info']['platform'], buy_leg['id'], buy_leg['symbol']),
-            self._order_manager.cancel_order(sell_leg['info']['platform'], sell_leg['id'], sell_leg['symbol'])
-        )
-        self.active_maker_trade = None
-        self.logger.info("Maker trade reset. Resuming general strategy evaluation.")
+        buy_leg, sell_leg = trade_info['buy_leg'], trade_info['sell_leg']
+        self.maker_engine.untrack(buy_leg['id'])
+        self.maker_engine.untrack(sell_leg['id'])
+        self.active_maker_trades.pop(pair_key, None)
+        # Annule les deux jambes ; un remplissage partiel de l'une d'elles est couvert par le HedgeEngine.
+        legs = [(trade_info['buy_platform'], buy_leg['id'], 'buy', buy_leg.get('filled_before', 0.0)),
+                (trade_info['sell_platform'], sell_leg['id'], 'sell', sell_leg.get('filled_before', 0.0))]
+        await self.hedge_engine.reconcile(trade_info['symbol'], legs, origin=f"maker {'/'.join(pair_key)}")
+        self.logger.info(f"Maker trade on {pair_key} reset. Pair will resume after cooldown.")
+
+    def status(self) -> dict:
+        return {"active_trades": self._active_trades, "max_concurrent_trades": self._max_concurrent_trades,
+                "pairs": {"/".join(key): state for key, state in self._pair_states.items()}, "maker": self.maker_engine.stats(),
+                "hedge": self.hedge_engine.stats(), "router": self.router.stats(),
+                "paused_pairs": sorted("/".join(key) for key in self._paused_pairs), "parameters": self.parameters(),
+                "thresholds": self.thresholds.summary() if self.thresholds else None}
 
-    async def cooldown_trading(self):
+    async def cooldown_trading(self, pair_key):
         await asyncio.sleep(self._cooldown)
-        self.logger.info(f"Trading re-enabled after {self._cooldown}s cooldown.")
-        self._is_trading_enabled = True
+        self.logger.info(f"Trading re-enabled for {pair_key} after {self._cooldown}s cooldown.")
+        self._pair_states.pop(pair_key, None)
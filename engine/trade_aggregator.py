@@ -0,0 +1,153 @@
+# engine/trade_aggregator.py
+import time
+import numpy as np
+
+# Colonnes d'une barre.
+START, OPEN, HIGH, LOW, CLOSE, VOLUME, QUOTE_VOLUME, BUY_VOLUME, TRADES = range(9)
+COLUMNS = ("start", "open", "high", "low", "close", "volume", "quote_volume", "buy_volume", "trades")
+
+
+class _Series:
+    """Bars of one (venue, symbol): a ring and the open bar per resolution, plus the running sums of the rolling window."""
+    __slots__ = ("rings", "open", "heads", "counts", "tail", "window_bars", "expires_at", "window_volume", "window_quote", "window_buy", "last_price", "trades")
+
+    def __init__(self, resolutions: int, capacity: int):
+        self.rings = [np.zeros((capacity, len(COLUMNS))) for _ in range(resolutions)]
+        # Barre ouverte en flottants Python (bien moins chers à mettre à jour qu'un élément NumPy), copiée dans l'anneau à sa clôture.
+        self.open = [[float('-inf')] + [0.0] * (len(COLUMNS) - 1) for _ in range(resolutions)]
+        self.heads = [-1] * resolutions
+        self.counts = [0] * resolutions
+        self.tail = 0
+        self.window_bars = 0
+        self.expires_at = float('inf')
+        self.window_volume = self.window_quote = self.window_buy = 0.0
+        self.last_price = None
+        self.trades = 0
+
+
+class TradeAggregator:
+    """
+    OHLCV bars, rolling VWAP and traded volume of the trade streams, per (venue, symbol).
+
+    Each resolution keeps its last `capacity` bars in a fixed NumPy ring (columns: COLUMNS); only intervals
+    with trades get a bar. A trade updates the open bar of every resolution, or closes it into the ring and
+    starts the next one, in O(1). The rolling window (`window_s`) is a running sum over the bars of the
+    finest resolution, so it is exact to within one of those bars; bars leaving it are subtracted.
+    `on_trade` is a DataEngine trade listener. The scalar queries (`vwap`, `volume`, `buy_ratio`, `last_price`)
+    allocate nothing; `bar` returns a view of the ring row, `bars` a chronological copy for analysis.
+    """
+    def __init__(self, resolutions_s=(1, 60, 300), capacity: int = 1440, window_s: float = 60.0):
+        self.resolutions = tuple(float(resolution) for resolution in sorted(resolutions_s))
+        self.capacity = int(capacity)
+        self.window_s = float(window_s)
+        if self.window_s < self.resolutions[0] or self.window_s / self.resolutions[0] + 2 >= self.capacity:
+            raise ValueError(f"window_s must span between one and {self.capacity - 3} bars of {self.resolutions[0]}s")
+        self._series = {}
+
+    def on_trade(self, platform: str, symbol: str, price: float, qty: float, side: str, timestamp: float):
+        series = self._series.get((platform, symbol))
+        if series is None: series = self._series[(platform, symbol)] = _Series(len(self.resolutions), self.capacity)
+        quote = price * qty
+        buy = qty if side == 'buy' else 0.0
+        series.window_volume += qty
+        series.window_quote += quote
+        series.window_buy += buy
+        for index, resolution in enumerate(self.resolutions):
+            bar = series.open[index]
+            start = timestamp - timestamp % resolution
+            if start > bar[START]:
+                closed = bar[TRADES] > 0
+                if closed: series.rings[index][series.heads[index]] = bar
+                series.heads[index] = (series.heads[index] + 1) % self.capacity
+                if series.counts[index] < self.capacity: series.counts[index] += 1
+                if index == 0:
+                    series.window_bars += 1
+                    # La barre close quittera la fenêtre la première si elle est seule avec la nouvelle.
+                    if closed: series.expires_at = min(series.expires_at, bar[START] + resolution + self.window_s)
+                bar[:] = (start, price, price, price, price, qty, quote, buy, 1)
+            else:
+                # Même barre (ou transaction en retard d'une barre déjà close : comptée dans la barre ouverte).
+                if price > bar[HIGH]: bar[HIGH] = price
+                elif price < bar[LOW]: bar[LOW] = price
+                bar[CLOSE] = price
+                bar[VOLUME] += qty
+                bar[QUOTE_VOLUME] += quote
+                bar[BUY_VOLUME] += buy
+                bar[TRADES] += 1
+        if timestamp >= series.expires_at: self._expire(series, timestamp)
+        series.last_price = price
+        series.trades += 1
+
+    def _expire(self, series: _Series, now: float):
+        """Subtracts from the window the finest bars that ended before it; the open bar always stays."""
+        ring, resolution, cutoff = series.rings[0], self.resolutions[0], now - self.window_s
+        while series.window_bars > 1:
+            tail = ring[series.tail]
+            if tail[START] + resolution > cutoff:
+                series.expires_at = float(tail[START]) + resolution + self.window_s
+                return
+            series.window_volume -= float(tail[VOLUME])
+            series.window_quote -= float(tail[QUOTE_VOLUME])
+            series.window_buy -= float(tail[BUY_VOLUME])
+            series.tail = (series.tail + 1) % self.capacity
+            series.window_bars -= 1
+        # Seule la barre ouverte reste : on repart de ses valeurs, sans l'erreur d'arrondi accumulée.
+        bar = series.open[0]
+        series.window_volume, series.window_quote, series.window_buy = bar[VOLUME], bar[QUOTE_VOLUME], bar[BUY_VOLUME]
+        series.expires_at = float('inf')
+
+    def _window(self, platform: str, symbol: str, now: float = None):
+        series = self._series.get((platform, symbol))
+        if series is None: return None
+        now = time.time() if now is None else now
+        if now >= series.expires_at: self._expire(series, now)
+        # Plus aucune transaction dans la fenêtre.
+        if series.open[0][START] + self.resolutions[0] <= now - self.window_s: return None
+        return series
+
+    def _flush(self, series: _Series, index: int):
+        if series.open[index][TRADES]: series.rings[index][series.heads[index]] = series.open[index]
+
+    # --- requêtes ---
+
+    def vwap(self, platform: str, symbol: str, now: float = None):
+        """Volume-weighted average price over the rolling window, or None without trades in it."""
+        series = self._window(platform, symbol, now)
+        return series.window_quote / series.window_volume if series is not None and series.window_volume > 0 else None
+
+    def volume(self, platform: str, symbol: str, now: float = None) -> float:
+        """Base quantity traded over the rolling window."""
+        series = self._window(platform, symbol, now)
+        return series.window_volume if series is not None else 0.0
+
+    def buy_ratio(self, platform: str, symbol: str, now: float = None):
+        """Share of the window's volume bought by takers (0.5: balanced flow), or None without trades."""
+        series = self._window(platform, symbol, now)
+        return series.window_buy / series.window_volume if series is not None and series.window_volume > 0 else None
+
+    def last_price(self, platform: str, symbol: str):
+        series = self._series.get((platform, symbol))
+        return series.last_price if series is not None else None
+
+    def bar(self, platform: str, symbol: str, resolution_s: float, ago: int = 0):
+        """Row view (COLUMNS) of the bar `ago` bars before the latest at that resolution, or None. The open bar (`ago=0`) is as of the call."""
+        series = self._series.get((platform, symbol))
+        index = self.resolutions.index(float(resolution_s))
+        if series is None or ago >= series.counts[index]: return None
+        if ago == 0: self._flush(series, index)
+        return series.rings[index][(series.heads[index] - ago) % self.capacity]
+
+    def bars(self, platform: str, symbol: str, resolution_s: float, n: int = None) -> np.ndarray:
+        """Copy of the last `n` bars (all kept by default) at that resolution, oldest first."""
+        series = self._series.get((platform, symbol))
+        index = self.resolutions.index(float(resolution_s))
+        if series is None: return np.empty((0, len(COLUMNS)))
+        self._flush(series, index)
+        count = series.counts[index] if n is None else min(n, series.counts[index])
+        rows = np.arange(series.heads[index] - count + 1, series.heads[index] + 1) % self.capacity
+        return series.rings[index][rows]
+
+    def stats(self) -> dict:
+        return {f"{platform} {symbol}": {"trades": series.trades, "last_price": series.last_price, "vwap": self.vwap(platform, symbol),
+                                         "volume": self.volume(platform, symbol), "buy_ratio": self.buy_ratio(platform, symbol)}
+                for (platform, symbol), series in list(self._series.items())}
@@ -0,0 +1,56 @@
+# execution/balance_ledger.py
+import itertools, logging
+
+class BalanceLedger:
+    """
+    Free balances per (platform, currency) as last reported by the exchanges, minus the capital
+    reserved by trades that are still in flight. Concurrent opportunities reserve here first so
+    two trades can never commit the same funds. With `share` < 1, only that fraction of each reported
+    balance is usable: strategy processes trading from the same accounts split the capital up front
+    instead of each committing all of it.
+    """
+    def __init__(self, share: float = 1.0):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.share = share
+        self._balances = {}
+        self._reserved = {}
+        self._reservations = {}
+        self._ids = itertools.count(1)
+
+    def update_balances(self, platform: str, balances: dict):
+        for currency, amount in balances.items():
+            if amount is not None: self._balances[(platform, currency)] = float(amount) * self.share
+
+    def balance(self, platform: str, currency: str) -> float:
+        return self._balances.get((platform, currency), 0.0)
+
+    def available(self, platform: str, currency: str) -> float:
+        key = (platform, currency)
+        return self._balances.get(key, 0.0) - self._reserved.get(key, 0.0)
+
+    def reserve(self, requirements: dict):
+        """
+        Reserves every {(platform, currency): amount} in `requirements` atomically.
+        Returns a reservation id, or None (and reserves nothing) if any amount is not available.
+        """
+        for (platform, currency), amount in requirements.items():
+            if self.available(platform, currency) < amount:
+                self.logger.info("Insufficient %s on %s to reserve %.6f (available: %.6f).", currency, platform, amount, self.available(platform, currency))
+                return None
+        reservation_id = next(self._ids)
+        for key, amount in requirements.items():
+            self._reserved[key] = self._reserved.get(key, 0.0) + amount
+        self._reservations[reservation_id] = dict(requirements)
+        return reservation_id
+
+    def release(self, reservation_id):
+        requirements = self._reservations.pop(reservation_id, None)
+        if not requirements: return
+        for key, amount in requirements.items():
+            remaining = self._reserved.get(key, 0.0) - amount
+            if remaining <= 1e-12: self._reserved.pop(key, None)
+            else: self._reserved[key] = remaining
+
+    @property
+    def open_reservations(self) -> int:
+        return len(self._reservations)
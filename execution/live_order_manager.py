@@ -1,15 +1,63 @@
 # execution/live_order_manager.py
-import asyncio, logging
+import asyncio, logging, time
 import ccxt.async_support as ccxt
-from config import API_KEYS, PAPER_TRADING_MODE, MAX_TRADE_SIZE_USD
+from config import API_KEYS, PAPER_TRADING_MODE, SIMULATOR_REST_URL, TRADING_SYMBOLS, METADATA_REFRESH_INTERVAL_S
+from config import ORDER_JOURNAL_PATH, ORDER_JOURNAL_FSYNC, INSTANCE_ID
+from execution.balance_ledger import BalanceLedger
+from execution.market_metadata import MarketMetadataRegistry
+from execution.order_journal import OrderJournal
+
+TERMINAL_STATUSES = ('closed', 'canceled', 'expired', 'rejected')
+
+def create_exchange(name: str, keys: dict = None, paper_trading: bool = PAPER_TRADING_MODE, logger=None):
+    """ccxt client of a venue with rate limiting, pointed at the simulator or the testnet per config. Without keys, public endpoints only."""
+    logger = logger or logging.getLogger(__name__)
+    # Configuration de base
+    config = {'enableRateLimit': True}
+    if keys:
+        config.update(apiKey=keys['apiKey'], secret=keys['secret'])
+        if name == 'OKX': config['password'] = keys['password']
+
+    exchange_class = getattr(ccxt, name.lower())
+    instance = exchange_class(config)
+
+    # --- CORRECTION DÉFINITIVE APPLIQUÉE ICI ---
+    # Si on est en Paper Trading, on doit ajouter des options spécifiques
+    if SIMULATOR_REST_URL:
+        from backtest.exchange_simulator import point_exchange_at
+        point_exchange_at(instance, SIMULATOR_REST_URL)
+        logger.info(f"{name} pointed at the local exchange simulator: {SIMULATOR_REST_URL}")
+    elif paper_trading:
+        logger.info(f"Paper Trading (Testnet) mode enabled for {name}.")
+        if name == 'OKX':
+            # Solution trouvée par vous ! Nécessaire pour le Paper Trading OKX.
+            instance.options['x-simulated-trading'] = '1'
+
+        # La méthode set_sandbox_mode est plus générale pour les autres plateformes
+        if instance.has['test']:
+            instance.set_sandbox_mode(True)
+        else:
+            if name != 'OKX': # OKX est géré manuellement, on ne log que pour les autres
+               logger.warning(f"Exchange {name} does not have a standard testnet via ccxt.set_sandbox_mode().")
+    return instance
+
 
 class LiveOrderManager:
-    def __init__(self, notifier, trade_logger):
+    # Plateformes dont l'amendement modifie l'ordre sur place (la taille envoyée inclut la partie remplie) ;
+    # les autres (Binance cancelReplace) placent un nouvel ordre pour le reste.
+    AMEND_IN_PLACE = {'OKX'}
+
+    def __init__(self, notifier, trade_logger, symbols=TRADING_SYMBOLS, journal_path: str = ORDER_JOURNAL_PATH, balance_share: float = 1.0):
         self.logger = logging.getLogger(self.__class__.__name__)
         self.exchanges = {}
-        self.fees = {}
+        self.metadata = MarketMetadataRegistry(METADATA_REFRESH_INTERVAL_S)
         self.notifier = notifier
         self.trade_logger = trade_logger
+        # Part des soldes utilisable par ce processus (voir BalanceLedger).
+        self.ledger = BalanceLedger(balance_share)
+        # Symboles dont les ordres ouverts sont réconciliés et annulés (ceux d'un processus de stratégie en mode shardé).
+        self.symbols = list(symbols)
+        self.journal = OrderJournal(journal_path, ORDER_JOURNAL_FSYNC, instance_id=INSTANCE_ID) if journal_path else None
 
     async def initialize(self):
         self.logger.info("Initializing LiveOrderManager...")
@@ -17,44 +65,23 @@ class LiveOrderManager:
             if not keys['apiKey'] or 'YOUR' in keys['apiKey']:
                 self.logger.warning(f"Invalid API keys for {name}. This exchange will be skipped."); continue
             try:
-                # Configuration de base
-                config = {'apiKey': keys['apiKey'], 'secret': keys['secret'], 'enableRateLimit': True}
-                if name == 'OKX': config['password'] = keys['password']
-                
-                exchange_class = getattr(ccxt, name.lower())
-                instance = exchange_class(config)
-
-                # --- CORRECTION DÉFINITIVE APPLIQUÉE ICI ---
-                # Si on est en Paper Trading, on doit ajouter des options spécifiques
-                if PAPER_TRADING_MODE:
-                    self.logger.info(f"Paper Trading (Testnet) mode enabled for {name}.")
-                    if name == 'OKX':
-                        # Solution trouvée par vous ! Nécessaire pour le Paper Trading OKX.
-                        instance.options['x-simulated-trading'] = '1'
-                    
-                    # La méthode set_sandbox_mode est plus générale pour les autres plateformes
-                    if instance.has['test']:
-                        instance.set_sandbox_mode(True)
-                    else:
-                        if name != 'OKX': # OKX est géré manuellement, on ne log que pour les autres
-                           self.logger.warning(f"Exchange {name} does not have a standard testnet via ccxt.set_sandbox_mode().")
-
+                instance = create_exchange(name, keys, logger=self.logger)
                 await instance.load_markets(reload=True)
                 self.exchanges[name] = instance
                 self.logger.info(f"Successfully connected and synced with: {name}")
-                
-                symbol_to_trade = "BTC/USDC"
-
-                if symbol_to_trade in instance.markets:
-                    market = instance.markets[symbol_to_trade]
-                    self.fees[name] = {'maker': market['maker'] * 100, 'taker': market['taker'] * 100}
-                    self.logger.info(f"Fees for {name} ({symbol_to_trade}): Maker {self.fees[name]['maker']:.4f}%, Taker {self.fees[name]['taker']:.4f}%")
-                else: self.logger.error(f"Could not find market {symbol_to_trade} for {name} to fetch fees.")
+
+                await self.metadata.refresh_venue(name, instance, TRADING_SYMBOLS)
+                for symbol in TRADING_SYMBOLS:
+                    entry = self.metadata.get(name, symbol)
+                    if entry: self.logger.info(f"{name} {symbol}: Maker {entry.maker_pct:.4f}%, Taker {entry.taker_pct:.4f}%, tick {entry.tick_size}, lot {entry.lot_size}, min notional {entry.min_notional}")
             except Exception as e: self.logger.error(f"Failed to initialize {name}: {e}", exc_info=True)
 
     # ... (le reste du fichier ne change pas) ...
-    def get_fees(self, platform: str) -> dict:
-        return self.fees.get(platform, {'maker': 0.1, 'taker': 0.1})
+    def get_fees(self, platform: str, symbol: str = None) -> dict:
+        return self.metadata.fees(platform, symbol)
+
+    async def run_metadata_refresh(self):
+        await self.metadata.run(self.exchanges, TRADING_SYMBOLS)
 
     async def get_balance(self, platform: str, currency: str):
         if platform not in self.exchanges: return None
@@ -64,31 +91,71 @@ class LiveOrderManager:
         except Exception as e:
             self.logger.error(f"Error fetching balance for {currency} on {platform}: {e}"); return None
 
-    async def execute_arbitrage(self, volume: float, platform_buy: str, platform_sell: str, max_buy_price: float, min_sell_price: float, symbol: str):
-        # ... (logique de vérification des soldes, etc.) ...
-        buy_order_task = asyncio.create_task(self.create_limit_order(platform_buy, symbol, 'buy', volume, max_buy_price))
-        sell_order_task = asyncio.create_task(self.create_limit_order(platform_sell, symbol, 'sell', volume, min_sell_price))
-        buy_result, sell_result = await asyncio.gather(buy_order_task, sell_order_task, return_exceptions=True)
-        buy_id = buy_result.get('id') if isinstance(buy_result, dict) else None
-        sell_id = sell_result.get('id') if isinstance(sell_result, dict) else None
-        self.trade_logger.log_trade(event_type='TAKER_ATTEMPT', strategy_type='TAKER', symbol=symbol, volume=volume, buy_platform=platform_buy, sell_platform=platform_sell, buy_order_id=buy_id, sell_order_id=sell_id, status='ATTEMPTED')
+    async def refresh_balances(self, platforms=None):
+        """Re-reads the free balances of the given platforms (all by default) into the ledger, concurrently."""
+        targets = [p for p in (platforms or self.exchanges.keys()) if p in self.exchanges]
+        results = await asyncio.gather(*(self.exchanges[p].fetch_free_balance() for p in targets), return_exceptions=True)
+        for platform, balance in zip(targets, results):
+            if isinstance(balance, Exception):
+                self.logger.error(f"Error refreshing balances on {platform}: {balance}"); continue
+            self.ledger.update_balances(platform, balance)
 
-    async def create_limit_order(self, platform: str, symbol: str, side: str, amount: float, price: float, post_only: bool = False):
+    async def create_limit_order(self, platform: str, symbol: str, side: str, amount: float, price: float, post_only: bool = False, reduce_only: bool = False):
+        # `reduce_only` ne concerne que le RiskEngine : en spot, la plateforme n'a pas de position à réduire.
         if platform not in self.exchanges:
             self.logger.error(f"Attempted to place order on uninitialized platform: {platform}")
             return None
+        amount, price, error = self.metadata.validate(platform, symbol, side, amount, price)
+        if error:
+            self.logger.warning(f"{side} order on {platform} ({symbol}) rejected locally: {error}")
+            return None
+        params = {}
+        if post_only: params['postOnly'] = True
+        # L'intention est journalisée avant l'envoi : un arrêt brutal pendant la requête laisse une trace à réconcilier.
+        client_id = self.journal.intent(platform, symbol, side, amount, price) if self.journal else None
+        if client_id: params['clientOrderId'] = client_id
         try:
-            params = {}
-            if post_only: params['postOnly'] = True
             self.logger.info(f"Placing LIMIT {side} order: {amount:.6f} {symbol} @ {price:.2f} on {platform} {'(Post-Only)' if post_only else ''}")
             order = await self.exchanges[platform].create_limit_order(symbol, side, amount, price, params)
+            if client_id: self.journal.ack(client_id, order['id'])
             self.logger.info(f"Successfully placed order on {platform}. Order ID: {order['id']}")
             return order
         except Exception as e:
             self.logger.error(f"Failed to place order on {platform}: {e}")
+            # Une erreur réseau ne dit pas si l'ordre est arrivé : il reste à réconcilier. Un refus de la plateforme est définitif.
+            if client_id and not isinstance(e, ccxt.NetworkError): self.journal.done(client_id, 0.0, 'rejected')
             await self.notifier.send_message(f"🔥 *ORDER FAILED* 🔥\nFailed to place {side} order on {platform}.\nReason: `{e}`")
             return None
 
+    async def amend_order(self, platform: str, order_id: str, symbol: str, side: str, amount: float, price: float, post_only: bool = True, filled: float = 0.0):
+        """
+        Reprices a resting limit order in one round trip where the venue supports it (ccxt edit_order:
+        Binance cancelReplace, OKX amend-order), otherwise cancels and places a new one. `amount` is what
+        should still rest after the amendment; `filled` is what the order has filled so far.
+        Returns the order as a dict with the new id, price and amount, or None on failure.
+        """
+        if platform not in self.exchanges: return None
+        amount, price, error = self.metadata.validate(platform, symbol, side, amount, price)
+        if error:
+            self.logger.warning(f"Amendment of {order_id} on {platform} rejected locally: {error}")
+            return None
+        exchange = self.exchanges[platform]
+        if exchange.has.get('editOrder'):
+            try:
+                self.logger.info(f"Amending order {order_id} on {platform}: {side} {amount:.6f} {symbol} @ {price:.2f}")
+                size = amount + filled if platform in self.AMEND_IN_PLACE else amount
+                order = await exchange.edit_order(order_id, symbol, 'limit', side, size, price, {'postOnly': True} if post_only else {})
+                if self.journal and order.get('id') and str(order['id']) != str(order_id):
+                    # Annule-remplace : l'état final de l'ancien ordre donne ce qu'il a rempli avant d'être remplacé.
+                    self.journal.replace(platform, order_id, order['id'])
+                    await self.fetch_order_status(platform, order_id, symbol)
+                return {**{k: v for k, v in order.items() if v is not None}, 'id': order.get('id') or order_id, 'price': price, 'amount': amount}
+            except Exception as e:
+                self.logger.error(f"Failed to amend order {order_id} on {platform}: {e}"); return None
+        if not await self.cancel_order(platform, order_id, symbol): return None
+        if self.journal: await self.fetch_order_status(platform, order_id, symbol)
+        return await self.create_limit_order(platform, symbol, side, amount, price, post_only=post_only)
+
     async def cancel_order(self, platform: str, order_id: str, symbol: str):
         if platform not in self.exchanges: return False
         try:
@@ -101,9 +168,133 @@ class LiveOrderManager:
     async def fetch_order_status(self, platform: str, order_id: str, symbol: str):
         if platform not in self.exchanges: return None
         try:
-            return await self.exchanges[platform].fetch_order(order_id, symbol)
+            order = await self.exchanges[platform].fetch_order(order_id, symbol)
         except Exception as e:
             self.logger.error(f"Failed to fetch status for order {order_id} on {platform}: {e}"); return None
+        if self.journal and order and order.get('status') in TERMINAL_STATUSES: self.journal.done_by_venue_id(platform, order_id, order.get('filled'), order['status'])
+        return order
+
+    async def fetch_open_orders(self, platform: str, symbol: str):
+        if platform not in self.exchanges: return []
+        try:
+            return await self.exchanges[platform].fetch_open_orders(symbol)
+        except Exception as e:
+            self.logger.error(f"Failed to fetch open {symbol} orders on {platform}: {e}"); return None
+
+    async def settle_order(self, platform: str, order_id: str, symbol: str, timeout_s: float = 0.0):
+        """Waits up to `timeout_s` for the order to finish, cancels what is left and returns its final state (None if unknown)."""
+        deadline = time.monotonic() + timeout_s
+        order = None
+        while True:
+            order = await self.fetch_order_status(platform, order_id, symbol) or order
+            if order and order.get('status') in TERMINAL_STATUSES: return order
+            if time.monotonic() >= deadline: break
+            await asyncio.sleep(0.1)
+        await self.cancel_order(platform, order_id, symbol)
+        return await self.fetch_order_status(platform, order_id, symbol) or order
+
+    # --- journal des ordres ---
+
+    async def _open_orders_by_venue(self):
+        """{(platform, symbol): open orders} for every venue and traded symbol, fetched concurrently (None where the fetch failed)."""
+        keys = [(platform, symbol) for platform in self.exchanges for symbol in self.symbols]
+        return dict(zip(keys, await asyncio.gather(*(self.fetch_open_orders(*key) for key in keys))))
+
+    async def _fetch_journaled(self, platform: str, symbol: str, client_id: str, order_id: str = None):
+        """A journaled venue order, by venue id, or by client order id without one; None if it cannot be read."""
+        if platform not in self.exchanges: return None
+        try:
+            if order_id: return await self.exchanges[platform].fetch_order(order_id, symbol)
+            return await self.exchanges[platform].fetch_order(None, symbol, {'clientOrderId': client_id})
+        except ccxt.OrderNotFound:
+            self.logger.warning(f"Journaled order {client_id} ({order_id or 'no venue id'}) not found on {platform}.")
+        except Exception as e:
+            self.logger.error(f"Could not look up journaled order {client_id} on {platform}: {e}")
+        return None
+
+    async def _locate(self, record: dict):
+        """
+        Current state of a journaled order: by its latest venue id, or by client order id if it was never
+        acknowledged or its id is not found. An order the venue does not know either way stays of unknown
+        outcome (None): a missing order proves neither a rejection nor the absence of fills.
+        """
+        platform, symbol, client_id = record['platform'], record['symbol'], record['client_id']
+        order = await self._fetch_journaled(platform, symbol, client_id, record['ids'][-1]) if record['ids'] else None
+        # Après un annule-remplace, l'identifiant client désigne le premier ordre, pas le dernier.
+        if order is None and len(record['ids']) <= 1: order = await self._fetch_journaled(platform, symbol, client_id)
+        return order
+
+    async def _cancel_and_settle(self, platform: str, symbol: str, order: dict):
+        await self.cancel_order(platform, order['id'], symbol)
+        try:
+            return await self.exchanges[platform].fetch_order(order['id'], symbol)
+        except Exception as e:
+            self.logger.error(f"Failed to fetch status for order {order['id']} on {platform}: {e}"); return None
+
+    def _replaced_unknown(self, client_id: str) -> bool:
+        """Whether an id the order replaced could not be read: its total fill is unknown, the order stays pending."""
+        order = self.journal.orders.get(client_id)
+        return bool(order and self.journal.replaced_ids(order))
+
+    async def reconcile_journal(self) -> dict:
+        """
+        Startup reconciliation of the order journal against the venues. Every order of ours still open is
+        cancelled, every journaled order of unknown outcome is looked up, all concurrently, and their final
+        fills recorded. Trades whose fills balance are closed; returns the others as
+        {trade id: {"origin", "exposure": {symbol: signed qty}}} for the strategy to flatten.
+        """
+        if not self.journal: return {}
+        started = time.monotonic()
+        pending = self.journal.pending_orders()
+        open_orders = await self._open_orders_by_venue()
+        resting = [(platform, symbol, order) for (platform, symbol), orders in open_orders.items() for order in orders or ()
+                   if self.journal.client_id_of(platform, order) or self.journal.is_ours(order)]
+        resting_ids = {self.journal.client_id_of(platform, order) for platform, _, order in resting}
+        to_locate = [record for record in pending if record['client_id'] not in resting_ids]
+        # Identifiants remplacés par un amendement : leurs remplissages comptent dans celui de l'ordre.
+        replaced = [(record, order_id) for record in pending for order_id in self.journal.replaced_ids(record)]
+        cancelled, located, earlier = await asyncio.gather(
+            asyncio.gather(*(self._cancel_and_settle(*entry) for entry in resting)),
+            asyncio.gather(*(self._locate(record) for record in to_locate)),
+            asyncio.gather(*(self._fetch_journaled(record['platform'], record['symbol'], record['client_id'], order_id) for record, order_id in replaced)))
+        for (record, order_id), final in zip(replaced, earlier):
+            if final and final.get('status') in TERMINAL_STATUSES: self.journal.done_by_venue_id(record['platform'], order_id, final.get('filled'), final['status'])
+        orphans = 0
+        for (platform, symbol, order), final in zip(resting, cancelled):
+            client_id = self.journal.client_id_of(platform, order)
+            if client_id is None:
+                orphans += 1
+                self.logger.warning(f"Cancelled order {order['id']} on {platform} ({symbol}), not in the journal.")
+            elif final and final.get('status') in TERMINAL_STATUSES and not self._replaced_unknown(client_id):
+                self.journal.done(client_id, final.get('filled'), final['status'])
+        for record, final in zip(to_locate, located):
+            if final and final.get('status') in TERMINAL_STATUSES and not self._replaced_unknown(record['client_id']):
+                self.journal.done(record['client_id'], final.get('filled'), final['status'])
+        unresolved = {}
+        for trade_id, info in list(self.journal.trades.items()):
+            exposure = {symbol: qty for symbol, qty in self.journal.exposure(trade_id).items() if abs(qty) > self.journal.flat_tolerance}
+            if not exposure and self.journal.close_trade(trade_id): continue
+            unresolved[trade_id] = {"origin": info['origin'], "strategy": info['strategy'], "exposure": exposure}
+        self.journal.compact()
+        still_pending = len(self.journal.pending_orders())
+        self.logger.info(f"Journal reconciled in {time.monotonic() - started:.2f}s: {len(pending)} order(s) in flight, {len(resting)} cancelled "
+                         f"({orphans} not journaled), {len(unresolved)} trade(s) to flatten, {still_pending} order(s) still unknown.")
+        if unresolved or still_pending:
+            await self.notifier.send_message(f"⚠️ *Restart reconciliation* ⚠️\n{len(unresolved)} trade(s) left unbalanced, {still_pending} order(s) of unknown outcome.")
+        return unresolved
+
+    async def cancel_all_orders(self):
+        """Cancels all our open orders on every venue concurrently (graceful shutdown) and journals their final fills."""
+        open_orders = await self._open_orders_by_venue()
+        resting = [(platform, symbol, order) for (platform, symbol), orders in open_orders.items() for order in orders or ()
+                   if not self.journal or self.journal.client_id_of(platform, order) or self.journal.is_ours(order)]
+        if not resting: return
+        self.logger.warning(f"Cancelling {len(resting)} open order(s) before shutdown.")
+        finals = await asyncio.gather(*(self._cancel_and_settle(*entry) for entry in resting))
+        if not self.journal: return
+        for (platform, symbol, order), final in zip(resting, finals):
+            client_id = self.journal.client_id_of(platform, order)
+            if client_id and final and final.get('status') in TERMINAL_STATUSES: self.journal.done(client_id, final.get('filled'), final['status'])
 
     async def close_all(self):
         self.logger.info("Closing all exchange connections...")
@@ -113,3 +304,4 @@ class LiveOrderManager:
                 self.logger.info(f"Connection to {name} closed.")
             except Exception as e:
                 self.logger.error(f"Error closing connection to {name}: {e}")
+        if self.journal: self.journal.close()
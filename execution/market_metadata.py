@@ -0,0 +1,122 @@
+# execution/market_metadata.py
+import asyncio, logging, math, time
+
+# Mode de précision ccxt où `precision` contient le pas lui-même (sinon : un nombre de décimales).
+TICK_SIZE = 4
+
+class SymbolMetadata:
+    """Trading rules of one symbol on one venue. Fees are in percent, like LiveOrderManager.get_fees."""
+    __slots__ = ("maker_pct", "taker_pct", "tick_size", "lot_size", "min_amount", "min_notional", "updated", "price_decimals", "amount_decimals")
+
+    def __init__(self, maker_pct: float, taker_pct: float, tick_size: float, lot_size: float, min_amount: float = 0.0, min_notional: float = 0.0):
+        self.maker_pct, self.taker_pct = maker_pct, taker_pct
+        self.tick_size, self.lot_size = tick_size, lot_size
+        self.min_amount, self.min_notional = min_amount, min_notional
+        self.updated = time.time()
+        self.price_decimals, self.amount_decimals = self._decimals(tick_size), self._decimals(lot_size)
+
+    @staticmethod
+    def _decimals(step: float) -> int:
+        return len(f"{step:.12f}".rstrip('0').split('.')[1]) if step else 12
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class MarketMetadataRegistry:
+    """
+    Fees, tick size, lot size and minimums per (venue, symbol), read from the ccxt markets and, where the
+    venue exposes it, the account's own fee tier. Lookups are a dict access; `run` reloads everything in
+    the background. `validate` rounds an order to the venue's precision and rejects it locally when it is
+    below the minimums, instead of losing a round trip to an exchange rejection.
+    """
+    DEFAULT_FEES = {'maker': 0.1, 'taker': 0.1}
+
+    def __init__(self, refresh_interval_s: float = 3600):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.refresh_interval_s = refresh_interval_s
+        self._entries = {}
+        self._venue_fees = {}
+        self.rejected = 0
+        self.last_refresh = None
+
+    def set(self, venue: str, symbol: str, metadata: SymbolMetadata):
+        self._entries[(venue, symbol)] = metadata
+        self._venue_fees[venue] = {'maker': metadata.maker_pct, 'taker': metadata.taker_pct}
+
+    def get(self, venue: str, symbol: str):
+        return self._entries.get((venue, symbol))
+
+    def fees(self, venue: str, symbol: str = None) -> dict:
+        """{'maker': %, 'taker': %} for the symbol, else the venue's last loaded fees, else DEFAULT_FEES."""
+        entry = self._entries.get((venue, symbol)) if symbol else None
+        if entry is not None: return {'maker': entry.maker_pct, 'taker': entry.taker_pct}
+        return self._venue_fees.get(venue, self.DEFAULT_FEES)
+
+    def tick_size(self, venue: str, symbol: str, default: float = 0.01) -> float:
+        entry = self._entries.get((venue, symbol))
+        return entry.tick_size if entry is not None else default
+
+    def validate(self, venue: str, symbol: str, side: str, amount: float, price: float):
+        """
+        Returns (amount, price, error). The amount is rounded down to the lot size; the price to the tick,
+        down for a buy and up for a sell so a limit never becomes more aggressive. Unknown symbols pass unchanged.
+        """
+        entry = self._entries.get((venue, symbol))
+        if entry is None: return amount, price, None
+        if entry.lot_size: amount = round(math.floor(amount / entry.lot_size + 1e-9) * entry.lot_size, entry.amount_decimals)
+        if entry.tick_size:
+            ticks = price / entry.tick_size
+            price = round((math.floor(ticks + 1e-9) if side == 'buy' else math.ceil(ticks - 1e-9)) * entry.tick_size, entry.price_decimals)
+        error = None
+        if amount <= 0 or amount < entry.min_amount: error = f"amount {amount:.8f} below minimum {entry.min_amount:.8f}"
+        elif amount * price < entry.min_notional: error = f"notional {amount * price:.4f} below minimum {entry.min_notional:.4f}"
+        if error: self.rejected += 1
+        return amount, price, error
+
+    # --- chargement ---
+
+    @staticmethod
+    def _step(value, precision_mode) -> float:
+        if value is None: return 0.0
+        return float(value) if precision_mode == TICK_SIZE else 10 ** -float(value)
+
+    async def _account_fees(self, instance, symbols) -> dict:
+        """Fees of the account's tier as {symbol: (maker %, taker %)}, from the venue's fee endpoint when ccxt has one."""
+        try:
+            if instance.has.get('fetchTradingFees'):
+                fees = await instance.fetch_trading_fees()
+            elif instance.has.get('fetchTradingFee'):
+                results = await asyncio.gather(*(instance.fetch_trading_fee(symbol) for symbol in symbols))
+                fees = dict(zip(symbols, results))
+            else: return {}
+        except Exception as e:
+            self.logger.warning(f"Could not fetch account fee tier on {instance.id}: {e}. Using the market fees.")
+            return {}
+        return {symbol: (fee['maker'] * 100, fee['taker'] * 100) for symbol, fee in fees.items() if symbol in symbols and fee.get('maker') is not None}
+
+    async def refresh_venue(self, venue: str, instance, symbols, reload_markets: bool = False):
+        if reload_markets: await instance.load_markets(reload=True)
+        account_fees = await self._account_fees(instance, symbols)
+        for symbol in symbols:
+            market = instance.markets.get(symbol)
+            if market is None:
+                self.logger.error(f"Could not find market {symbol} on {venue}."); continue
+            maker, taker = account_fees.get(symbol, (market['maker'] * 100, market['taker'] * 100))
+            limits, precision = market.get('limits') or {}, market.get('precision') or {}
+            self.set(venue, symbol, SymbolMetadata(
+                maker, taker, self._step(precision.get('price'), instance.precisionMode), self._step(precision.get('amount'), instance.precisionMode),
+                float((limits.get('amount') or {}).get('min') or 0.0), float((limits.get('cost') or {}).get('min') or 0.0)))
+        self.last_refresh = time.time()
+
+    async def run(self, exchanges: dict, symbols):
+        """Background refresh of every venue's markets and fee tier."""
+        while True:
+            await asyncio.sleep(self.refresh_interval_s)
+            results = await asyncio.gather(*(self.refresh_venue(name, instance, symbols, reload_markets=True) for name, instance in exchanges.items()), return_exceptions=True)
+            for name, result in zip(exchanges, results):
+                if isinstance(result, Exception): self.logger.error(f"Metadata refresh failed on {name}: {result}")
+            self.logger.info(f"Market metadata refreshed for {len(self._entries)} (venue, symbol) pairs.")
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "rejected_locally": self.rejected, "last_refresh": self.last_refresh}
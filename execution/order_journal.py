@@ -0,0 +1,218 @@
+# execution/order_journal.py
+import contextvars, itertools, json, logging, os, re, time
+
+CLIENT_ID_PREFIX = "arb"
+
+# Transaction courante ; les tâches créées dans son contexte (jambes, routage, couverture) en héritent.
+current_trade = contextvars.ContextVar('current_trade', default=None)
+# Stratégie courante (StrategyDispatcher) : transactions et ordres lui sont attribués au journal.
+current_strategy = contextvars.ContextVar('current_strategy', default=None)
+
+
+class OrderJournal:
+    """
+    Append-only journal of order intents and acknowledgements, one JSON object per line.
+
+    An `intent` line is written before an order is sent, with the client order id it is sent under; `ack`
+    adds the venue's order id (`replace` the new one after an amendment, `fill` the final fill of the id it
+    replaced) and `done` its final fill over all its ids. Client order ids start with CLIENT_ID_PREFIX and
+    the bot instance's `instance_id`, so instances sharing an account only ever reconcile their own orders. Orders
+    belong to the trade open in the current context (`open_trade`), so that after a crash the fills of a
+    trade's orders, including those still resting or never acknowledged, give the exposure left to flatten.
+    A trade is forgotten by `close_trade` once all its orders are done and their fills balance. Trades and
+    orders carry the strategy of the current context (`current_strategy`), if any.
+    Lines are flushed as they are written, which survives a crash of the process; `fsync` also survives
+    one of the machine, at about a disk write per order.
+    """
+    def __init__(self, path: str, fsync: bool = False, flat_tolerance: float = 1e-5, instance_id: str = ""):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        if not re.fullmatch(r"[A-Za-z0-9]{0,8}", instance_id): raise ValueError(f"instance id {instance_id!r}: up to 8 letters or digits")
+        self.path = path
+        self.fsync = fsync
+        self.flat_tolerance = flat_tolerance
+        self.trades = {}
+        self.orders = {}
+        self._venue_ids = {}
+        # Préfixe de session : des identifiants client uniques d'un démarrage à l'autre (alphanumériques, imposé par OKX).
+        # L'horodatage a une largeur fixe : l'instance "a" ne reconnaît pas les ordres de l'instance "ab".
+        self._session = f"{CLIENT_ID_PREFIX}{instance_id}{int(time.time() * 1000):011x}"
+        self._ours = re.compile(rf"{CLIENT_ID_PREFIX}{instance_id}[0-9a-f]{{11}}n[0-9]+")
+        self._order_ids = itertools.count(1)
+        self._trade_ids = itertools.count(1)
+        self.counters = {"intents": 0, "done": 0, "trades": 0, "closed": 0}
+        self.by_strategy = {}
+        directory = os.path.dirname(path)
+        if directory: os.makedirs(directory, exist_ok=True)
+        self._replay()
+        self._file = open(path, 'a', encoding='utf-8')
+
+    # --- écriture ---
+
+    def _write(self, record: dict):
+        self._file.write(json.dumps(record, separators=(',', ':')) + '\n')
+        self._file.flush()
+        if self.fsync: os.fsync(self._file.fileno())
+
+    def _apply(self, record: dict):
+        event = record['event']
+        if event == 'trade':
+            self.trades[record['trade']] = {"origin": record.get('origin', ''), "strategy": record.get('strategy'), "opened": record['ts']}
+        elif event == 'intent':
+            self.orders[record['client_id']] = {key: record.get(key) for key in ('client_id', 'trade', 'strategy', 'platform', 'symbol', 'side', 'amount', 'price', 'ts')}
+            self.orders[record['client_id']].update(ids=[], fills={}, filled=None, status=None)
+        elif event in ('ack', 'replace'):
+            order = self.orders.get(record['client_id'])
+            if order is None: return
+            order['ids'].append(record['order_id'])
+            self._venue_ids[(order['platform'], record['order_id'])] = record['client_id']
+        elif event == 'fill':
+            order = self.orders.get(record['client_id'])
+            if order is not None: order['fills'][record['order_id']] = record['filled']
+        elif event == 'done':
+            order = self.orders.get(record['client_id'])
+            if order is None: return
+            order['filled'], order['status'] = record['filled'], record['status']
+            if order['trade'] is None: self._forget(record['client_id'])
+        elif event == 'close':
+            self.trades.pop(record['trade'], None)
+            for client_id in [c for c, order in self.orders.items() if order['trade'] == record['trade']]: self._forget(client_id)
+
+    def _record(self, event: str, **fields):
+        record = {"ts": time.time(), "event": event, **fields}
+        self._write(record)
+        self._apply(record)
+
+    def _forget(self, client_id: str):
+        order = self.orders.pop(client_id, None)
+        for order_id in (order['ids'] if order else ()): self._venue_ids.pop((order['platform'], order_id), None)
+
+    def _replay(self):
+        if not os.path.exists(self.path): return
+        lines = 0
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try: record = json.loads(line)
+                except json.JSONDecodeError:
+                    # Dernière ligne tronquée par l'arrêt brutal : l'intention n'a pas pu être envoyée.
+                    self.logger.warning("Skipping a truncated line in %s.", self.path); continue
+                self._apply(record)
+                lines += 1
+        if self.trades or self.orders:
+            self.logger.warning("Order journal %s: %d line(s) replayed, %d open trade(s), %d order(s) not known to be done.",
+                                self.path, lines, len(self.trades), len(self.pending_orders()))
+
+    # --- transactions ---
+
+    def open_trade(self, origin: str = "") -> str:
+        """Opens a trade and makes it the current context's: orders placed from here on (and from tasks created here) belong to it."""
+        trade_id = f"{self._session}-{next(self._trade_ids)}"
+        strategy = current_strategy.get()
+        self._record('trade', trade=trade_id, origin=origin, strategy=strategy)
+        self.counters["trades"] += 1
+        self._count(strategy, "trades")
+        current_trade.set(trade_id)
+        return trade_id
+
+    def exposure(self, trade_id: str) -> dict:
+        """Signed base quantity filled by the trade's orders, per symbol (+ long); orders not known to be done are left out."""
+        exposure = {}
+        for order in self.orders.values():
+            if order['trade'] != trade_id or not order['filled']: continue
+            exposure[order['symbol']] = exposure.get(order['symbol'], 0.0) + (order['filled'] if order['side'] == 'buy' else -order['filled'])
+        return exposure
+
+    def close_trade(self, trade_id: str) -> bool:
+        """Forgets a finished trade. Refused (and kept for reconciliation) while an order is not done or the fills do not balance."""
+        if trade_id not in self.trades: return True
+        undone = [o['client_id'] for o in self.orders.values() if o['trade'] == trade_id and o['status'] is None]
+        unbalanced = {symbol: qty for symbol, qty in self.exposure(trade_id).items() if abs(qty) > self.flat_tolerance}
+        if undone or unbalanced:
+            self.logger.warning("Trade %s (%s) left open in the journal: %d order(s) of unknown outcome, exposure %s.",
+                                trade_id, self.trades[trade_id]['origin'], len(undone), unbalanced or {})
+            return False
+        self._record('close', trade=trade_id)
+        self.counters["closed"] += 1
+        return True
+
+    # --- ordres ---
+
+    def intent(self, platform: str, symbol: str, side: str, amount: float, price: float) -> str:
+        """Records an order about to be sent; returns the client order id to send it with."""
+        client_id = f"{self._session}n{next(self._order_ids)}"
+        strategy = current_strategy.get()
+        self._record('intent', client_id=client_id, trade=current_trade.get(), strategy=strategy, platform=platform, symbol=symbol, side=side, amount=amount, price=price)
+        self.counters["intents"] += 1
+        self._count(strategy, "intents")
+        return client_id
+
+    def _count(self, strategy: str, counter: str):
+        if strategy is None: return
+        counts = self.by_strategy.get(strategy)
+        if counts is None: counts = self.by_strategy[strategy] = {"trades": 0, "intents": 0}
+        counts[counter] += 1
+
+    def ack(self, client_id: str, order_id: str):
+        self._record('ack', client_id=client_id, order_id=str(order_id))
+
+    def replace(self, platform: str, old_order_id: str, new_order_id: str):
+        """An amendment gave the order a new venue id (Binance cancel-replace)."""
+        client_id = self._venue_ids.get((platform, str(old_order_id)))
+        if client_id and str(new_order_id) != str(old_order_id): self._record('replace', client_id=client_id, order_id=str(new_order_id))
+
+    def done(self, client_id: str, filled: float, status: str):
+        """Final state of the order's latest venue order; the fills of the ids it replaced are added to `filled`."""
+        order = self.orders.get(client_id)
+        if order is None or order['status'] is not None: return
+        self._record('done', client_id=client_id, filled=float(filled or 0.0) + sum(order['fills'].values()), status=status)
+        self.counters["done"] += 1
+
+    def done_by_venue_id(self, platform: str, order_id: str, filled: float, status: str):
+        """Final state of a venue order: the order's if it is its latest id, otherwise the fill of an id replaced by an amendment."""
+        client_id = self._venue_ids.get((platform, str(order_id)))
+        if not client_id: return
+        order = self.orders[client_id]
+        if order['ids'][-1] == str(order_id): self.done(client_id, filled, status)
+        elif order['fills'].get(str(order_id)) != float(filled or 0.0):
+            self._record('fill', client_id=client_id, order_id=str(order_id), filled=float(filled or 0.0))
+
+    @staticmethod
+    def replaced_ids(order: dict) -> list:
+        """Venue ids of a journaled order replaced by amendments whose final fill is not known yet."""
+        return [order_id for order_id in order['ids'][:-1] if order_id not in order['fills']]
+
+    def client_id_of(self, platform: str, order: dict):
+        """The journal's client id for a venue order (ccxt dict), or None if it is not one of ours."""
+        client_id = self._venue_ids.get((platform, str(order.get('id'))))
+        if client_id: return client_id
+        client_id = order.get('clientOrderId')
+        return client_id if client_id in self.orders else None
+
+    def is_ours(self, order: dict) -> bool:
+        """Whether a venue order was placed by this bot instance (from any session), by its client order id."""
+        return bool(self._ours.fullmatch(str(order.get('clientOrderId') or '')))
+
+    def pending_orders(self) -> list:
+        return [order for order in self.orders.values() if order['status'] is None]
+
+    def compact(self):
+        """Rewrites the file with only the open trades and their orders (atomic replace)."""
+        records = [{"ts": info['opened'], "event": 'trade', "trade": trade_id, "origin": info['origin'], "strategy": info['strategy']} for trade_id, info in self.trades.items()]
+        for order in self.orders.values():
+            records.append({"ts": order['ts'], "event": 'intent', **{key: order[key] for key in ('client_id', 'trade', 'strategy', 'platform', 'symbol', 'side', 'amount', 'price')}})
+            records.extend({"ts": order['ts'], "event": 'ack', "client_id": order['client_id'], "order_id": order_id} for order_id in order['ids'])
+            records.extend({"ts": order['ts'], "event": 'fill', "client_id": order['client_id'], "order_id": order_id, "filled": filled} for order_id, filled in order['fills'].items())
+            if order['status'] is not None: records.append({"ts": order['ts'], "event": 'done', "client_id": order['client_id'], "filled": order['filled'], "status": order['status']})
+        temporary = f"{self.path}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            for record in records: f.write(json.dumps(record, separators=(',', ':')) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self._file.close()
+        os.replace(temporary, self.path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def stats(self) -> dict:
+        return {**self.counters, "open_trades": len(self.trades), "pending_orders": len(self.pending_orders()), "by_strategy": self.by_strategy}
+
+    def close(self):
+        self._file.close()
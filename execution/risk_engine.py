@@ -0,0 +1,260 @@
+# execution/risk_engine.py
+import asyncio, logging, time
+
+class RiskEngine:
+    """
+    Pre-trade risk checks between the strategy and the order manager.
+
+    Exposes the order manager's interface (anything not overridden here is delegated), so the strategy,
+    router and hedge engine use it unchanged. Every order and fill the order manager reports updates
+    running state: per-venue inventory and open quantity, open orders, cash and the position of each
+    symbol marked to the mid of `order_books` (hence the day's PnL), and per-venue order-rate token
+    buckets. `check` evaluates every limit from that state in constant time, without any request. A
+    rejected order is not sent (create_limit_order returns None, as for the local metadata checks).
+    Reduce-only orders (hedges and crash recovery) pass the kill switch and the inventory, open-order and
+    loss limits, but only in the direction that reduces the symbol's position, for at most what is left of
+    it once the reduce-only orders already open are counted; the order-notional limit still applies.
+    The kill switch blocks every new entry and cancels all open orders on all venues concurrently, while
+    hedges can still flatten what it leaves; it trips by itself as soon as a fill or a new mark (`on_book_update`,
+    a DataEngine listener, or `run_marks`) takes the day's loss to its limit.
+    """
+    def __init__(self, order_manager, notifier, max_order_usd: float = None, max_venue_inventory_usd: float = None,
+                 max_daily_loss_usd: float = None, max_orders_per_s: float = None, max_open_orders: int = None, clock=time.monotonic,
+                 order_books: dict = None, reduce_tolerance: float = 1e-5):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._order_manager = order_manager
+        self.notifier = notifier
+        self.max_order_usd = max_order_usd
+        self.max_venue_inventory_usd = max_venue_inventory_usd
+        self.max_daily_loss_usd = max_daily_loss_usd
+        self.max_orders_per_s = max_orders_per_s
+        self.max_open_orders = max_open_orders
+        self.clock = clock
+        self._order_books = order_books or {}
+        self.reduce_tolerance = reduce_tolerance
+        self.killed = None
+        self._kill_task = None
+        # (plateforme, id) -> [symbole, côté, quantité, rempli vu, coût vu, post-only, reduce-only]
+        self._orders = {}
+        self._open_count = {}
+        self._open_qty = {}
+        self._inventory = {}
+        self._position = {}
+        self._mark = {}
+        # Positions reprises d'un arrêt brutal (adopt_position), pas encore valorisées faute de carnet.
+        self._unmarked = {}
+        # (symbole, côté) -> quantité restante des ordres reduce-only ouverts.
+        self._reducing = {}
+        self._cash = self._mark_value = 0.0
+        self._day, self._day_start_pnl = self._today(), 0.0
+        self._buckets = {}
+        self.rejections = {}
+        self.reduce_only_orders = 0
+
+    def __getattr__(self, name):
+        return getattr(self._order_manager, name)
+
+    @staticmethod
+    def _today() -> int:
+        return int(time.time() // 86400)
+
+    # --- état ---
+
+    def pnl(self) -> float:
+        """Cash flow of all fills since start, net of fees, plus the open positions at their mark (venue mid, else last fill price)."""
+        return self._cash + self._mark_value
+
+    def daily_pnl(self) -> float:
+        today = self._today()
+        if today != self._day: self._day, self._day_start_pnl = today, self.pnl()
+        return self.pnl() - self._day_start_pnl
+
+    def _set_mark(self, symbol: str, position: float, price: float):
+        self._mark_value += position * price - self._position.get(symbol, 0.0) * self._mark.get(symbol, 0.0)
+        self._position[symbol], self._mark[symbol] = position, price
+
+    def _mid(self, platform: str, symbol: str):
+        book = self._order_books.get((platform, symbol))
+        if book is None or not getattr(book, 'valid', True): return None
+        bids, asks = book.get_bids(1), book.get_asks(1)
+        return (bids[0][0] + asks[0][0]) / 2 if bids and asks else None
+
+    def _mark_to(self, symbol: str, price: float, delta: float = 0.0):
+        # Position reprise : valorisée au premier prix connu, contre une sortie de trésorerie égale (PnL inchangé).
+        adopted = self._unmarked.pop(symbol, 0.0)
+        self._cash -= adopted * price
+        self._set_mark(symbol, self._position.get(symbol, 0.0) + adopted + delta, price)
+
+    def position(self, symbol: str) -> float:
+        return self._position.get(symbol, 0.0) + self._unmarked.get(symbol, 0.0)
+
+    def adopt_position(self, symbol: str, qty: float):
+        """Takes over a position left by a crash (from the order journal), so reduce-only orders may flatten it."""
+        self._unmarked[symbol] = self._unmarked.get(symbol, 0.0) + qty
+
+    def on_book_update(self, platform: str, symbol: str, bids=None, asks=None):
+        """DataEngine listener: marks an open position to the venue's mid and checks the daily loss."""
+        if not self._position.get(symbol) and symbol not in self._unmarked: return
+        mid = self._mid(platform, symbol)
+        if mid is None: return
+        self._mark_to(symbol, mid)
+        self._check_loss()
+
+    async def run_marks(self, interval_s: float):
+        """Marks the open positions every `interval_s`, for books without listeners (shared-memory views)."""
+        while True:
+            await asyncio.sleep(interval_s)
+            for platform, symbol in list(self._order_books): self.on_book_update(platform, symbol)
+
+    def _check_loss(self):
+        """Trips the kill switch when the day's loss reaches its limit; returns the breach detail, or None."""
+        if not self.max_daily_loss_usd: return None
+        loss = self.daily_pnl()
+        if loss > -self.max_daily_loss_usd: return None
+        if not self.killed and (self._kill_task is None or self._kill_task.done()):
+            self._kill_task = asyncio.create_task(self.kill(f"daily loss {loss:.2f} USD reached the {self.max_daily_loss_usd} limit"))
+        return f"{loss:.2f} USD"
+
+    def _apply_fill(self, platform: str, entry, filled: float, cost: float):
+        symbol, side, _, seen_filled, seen_cost, post_only, reduce_only = entry
+        delta, delta_cost = filled - seen_filled, cost - seen_cost
+        if delta <= 0: return
+        entry[3], entry[4] = filled, cost
+        signed = delta if side == 'buy' else -delta
+        fee_pct = self._order_manager.get_fees(platform, symbol)['maker' if post_only else 'taker']
+        self._cash += (-delta_cost if side == 'buy' else delta_cost) - delta_cost * fee_pct / 100
+        self._inventory[(platform, symbol)] = self._inventory.get((platform, symbol), 0.0) + signed
+        self._open_qty[(platform, symbol, side)] = self._open_qty.get((platform, symbol, side), 0.0) - delta
+        if reduce_only: self._reducing[(symbol, side)] -= delta
+        self._mark_to(symbol, self._mid(platform, symbol) or delta_cost / delta, signed)
+        self._check_loss()
+
+    def _on_order(self, platform: str, order, symbol: str = None, side: str = None, amount: float = None, price: float = None, post_only: bool = False,
+                  reduce_only: bool = False):
+        """Folds an order state reported by the order manager (creation, amendment, status) into the running state."""
+        if not order or not order.get('id'): return
+        key = (platform, str(order['id']))
+        entry = self._orders.get(key)
+        if entry is None:
+            if symbol is None: return
+            entry = self._orders[key] = [symbol, side, amount, 0.0, 0.0, post_only, reduce_only]
+            self._open_count[platform] = self._open_count.get(platform, 0) + 1
+            if reduce_only: self._reducing[(symbol, side)] = self._reducing.get((symbol, side), 0.0) + amount
+            self._open_qty[(platform, symbol, side)] = self._open_qty.get((platform, symbol, side), 0.0) + amount
+        filled = float(order.get('filled') or 0.0)
+        if filled > entry[3]:
+            average = order.get('average') or order.get('price') or price or 0.0
+            cost = float(order.get('cost') or filled * float(average))
+            self._apply_fill(platform, entry, filled, cost)
+        if order.get('status') in ('closed', 'canceled', 'expired', 'rejected'):
+            del self._orders[key]
+            self._open_count[platform] -= 1
+            self._open_qty[(platform, entry[0], entry[1])] -= entry[2] - entry[3]
+            if entry[6]: self._reducing[(entry[0], entry[1])] -= entry[2] - entry[3]
+
+    def _take_token(self, platform: str) -> bool:
+        if not self.max_orders_per_s: return True
+        now = self.clock()
+        tokens, last = self._buckets.get(platform, (self.max_orders_per_s, now))
+        tokens = min(self.max_orders_per_s, tokens + (now - last) * self.max_orders_per_s)
+        if tokens < 1:
+            self._buckets[platform] = (tokens, now)
+            return False
+        self._buckets[platform] = (tokens - 1, now)
+        return True
+
+    def check(self, platform: str, symbol: str, side: str, amount: float, price: float):
+        """(limit, detail) of the first limit the order would breach, or None. Takes an order-rate token when it passes."""
+        if self.killed: return "kill_switch", self.killed
+        notional = amount * price
+        if self.max_order_usd and notional > self.max_order_usd: return "order_notional", f"{notional:.2f} USD above {self.max_order_usd}"
+        if self.max_open_orders and self._open_count.get(platform, 0) >= self.max_open_orders: return "open_orders", f"{self.max_open_orders} already open on {platform}"
+        if self.max_venue_inventory_usd:
+            # Pire cas : tous les ordres ouverts du même côté remplis, plus celui-ci.
+            position = self._inventory.get((platform, symbol), 0.0)
+            worst = (position if side == 'buy' else -position) + self._open_qty.get((platform, symbol, side), 0.0) + amount
+            if worst * price > self.max_venue_inventory_usd: return "venue_inventory", f"{platform} {symbol} could reach {worst * price:.2f} USD (limit {self.max_venue_inventory_usd})"
+        loss = self._check_loss()
+        if loss: return "daily_loss", loss
+        if not self._take_token(platform): return "order_rate", f"above {self.max_orders_per_s}/s on {platform}"
+        return None
+
+    def check_reduce_only(self, platform: str, symbol: str, side: str, amount: float, price: float):
+        """
+        (amount, breach) of a reduce-only order: refused when it does not reduce the symbol's position, clamped to
+        what is left of the position after the reduce-only orders already open. Takes an order-rate token.
+        """
+        position = self.position(symbol)
+        room = (position if side == 'sell' else -position) - self._reducing.get((symbol, side), 0.0)
+        if room <= self.reduce_tolerance: return amount, ("reduce_only", f"{side} {amount:.8f} would not reduce the {symbol} position ({position:+.8f})")
+        if amount > room + self.reduce_tolerance:
+            self.logger.warning(f"Reduce-only {side} on {platform} ({symbol}) clamped from {amount:.8f} to {room:.8f}.")
+            amount = room
+        notional = amount * price
+        if self.max_order_usd and notional > self.max_order_usd: return amount, ("order_notional", f"{notional:.2f} USD above {self.max_order_usd}")
+        # Couverture : la bloquer sur le débit laisserait l'exposition ouverte. Elle consomme quand même un jeton.
+        self._take_token(platform)
+        return amount, None
+
+    def _reject(self, platform: str, symbol: str, side: str, breach):
+        limit, detail = breach
+        self.rejections[limit] = self.rejections.get(limit, 0) + 1
+        self.logger.warning(f"{side} order on {platform} ({symbol}) blocked by the {limit} limit: {detail}")
+
+    # --- interface LiveOrderManager ---
+
+    async def create_limit_order(self, platform: str, symbol: str, side: str, amount: float, price: float, post_only: bool = False, reduce_only: bool = False):
+        if reduce_only: amount, breach = self.check_reduce_only(platform, symbol, side, amount, price)
+        else: breach = self.check(platform, symbol, side, amount, price)
+        if breach:
+            self._reject(platform, symbol, side, breach)
+            return None
+        if reduce_only: self.reduce_only_orders += 1
+        order = await self._order_manager.create_limit_order(platform, symbol, side, amount, price, post_only=post_only, reduce_only=reduce_only)
+        self._on_order(platform, order, symbol, side, float(order.get('amount') or amount) if order else amount, price, post_only, reduce_only)
+        return order
+
+    async def amend_order(self, platform: str, order_id: str, symbol: str, side: str, amount: float, price: float, post_only: bool = True, filled: float = 0.0):
+        if self.killed:
+            self._reject(platform, symbol, side, ("kill_switch", self.killed))
+            return None
+        order = await self._order_manager.amend_order(platform, order_id, symbol, side, amount, price, post_only=post_only, filled=filled)
+        entry = self._orders.get((platform, str(order_id)))
+        if order and entry is not None and str(order.get('id')) != str(order_id):
+            # Nouvel identifiant (annule-remplace) : le suivi passe au nouvel ordre.
+            self._on_order(platform, {"id": order_id, "status": "canceled", "filled": entry[3]})
+            self._on_order(platform, order, symbol, side, amount, price, post_only, entry[6])
+        return order
+
+    async def fetch_order_status(self, platform: str, order_id: str, symbol: str):
+        order = await self._order_manager.fetch_order_status(platform, order_id, symbol)
+        self._on_order(platform, order)
+        return order
+
+    async def settle_order(self, platform: str, order_id: str, symbol: str, timeout_s: float = 0.0):
+        order = await self._order_manager.settle_order(platform, order_id, symbol, timeout_s)
+        self._on_order(platform, order)
+        return order
+
+    # --- coupe-circuit ---
+
+    async def kill(self, reason: str):
+        """Blocks all new entries and cancels every open order on every venue concurrently; reduce-only orders still go through."""
+        if self.killed: return
+        self.killed = reason
+        self.logger.critical(f"KILL SWITCH: {reason}. Cancelling all open orders.")
+        await self._order_manager.cancel_all_orders()
+        # Relit l'état final des ordres suivis (remplissages de dernière minute compris).
+        await asyncio.gather(*(self.fetch_order_status(platform, order_id, entry[0]) for (platform, order_id), entry in list(self._orders.items())))
+        await self.notifier.send_message(f"🛑 *KILL SWITCH* 🛑\n{reason}\nAll open orders cancelled; trading halted until reset.")
+
+    def reset(self):
+        """Re-enables trading; the day's loss is counted again from here."""
+        self.logger.warning(f"Kill switch reset (was: {self.killed}).")
+        self.killed = None
+        self._day_start_pnl = self.pnl()
+
+    def stats(self) -> dict:
+        return {"killed": self.killed, "pnl": self.pnl(), "daily_pnl": self.daily_pnl(), "open_orders": dict(self._open_count),
+                "inventory": {f"{platform} {symbol}": qty for (platform, symbol), qty in self._inventory.items() if qty},
+                "rejections": dict(self.rejections), "reduce_only_orders": self.reduce_only_orders}
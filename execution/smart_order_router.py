@@ -0,0 +1,116 @@
+# execution/smart_order_router.py
+import asyncio, itertools, json, logging
+from engine.consolidated_book import ConsolidatedBooks
+
+class SmartOrderRouter:
+    """
+    Splits a taker order across venues to minimise its fee-inclusive cost.
+
+    `plan` sweeps the consolidated book of the symbol (levels consumed by price including each venue's
+    taker fee from `get_fees`) and returns one child per venue with its quantity and the worst price it
+    reaches. `execute` sends the children concurrently as limit orders at that price (plus an optional
+    slippage allowance), settles them and reports the realised average price and cost against the
+    pre-trade estimate. Children below a venue's minimums are merged into the best one. `reduce_only`
+    routes (hedges) are sent as reduce-only orders, which the RiskEngine lets through its limits.
+    Works with LiveOrderManager and with backtest.simulated_broker.SimulatedBroker.
+    """
+    def __init__(self, order_manager, order_books: dict, consolidated_books=None, child_timeout_s: float = 2.0, depth: int = 20):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._order_manager = order_manager
+        self._order_books = order_books
+        self._consolidated = consolidated_books
+        self.child_timeout_s = child_timeout_s
+        self.depth = depth
+        self._route_ids = itertools.count(1)
+        self.counters = {"routes": 0, "children": 0, "requested": 0.0, "filled": 0.0}
+        self.slippage_bps_avg = 0.0
+
+    def _book(self, symbol: str):
+        book = self._consolidated.get(symbol) if self._consolidated else None
+        return book if book is not None else ConsolidatedBooks.from_order_books(self._order_books, symbol, self.depth)
+
+    def fees(self, venues, symbol: str = None) -> dict:
+        return {venue: self._order_manager.get_fees(venue, symbol)['taker'] for venue in venues}
+
+    def plan(self, symbol: str, side: str, quantity: float, limit_price: float = None, venues=None) -> dict:
+        """Pre-trade split of `quantity`; `children` maps venue -> (qty, worst price). `estimate` may cover less than `quantity`."""
+        venues = [v for v in (venues if venues is not None else self._order_manager.exchanges) if v in self._order_manager.exchanges]
+        sweep = self._book(symbol).sweep(side, quantity, venues, self.fees(venues, symbol), limit_price)
+        children = sweep["allocation"]
+        # Un enfant sous les minimums de sa plateforme serait rejeté : il rejoint le meilleur enfant.
+        for venue, (qty, price) in list(children.items()):
+            entry = self._order_manager.metadata.get(venue, symbol)
+            if len(children) > 1 and entry and (qty < entry.min_amount or qty * price < entry.min_notional):
+                del children[venue]
+                best = next(iter(children))
+                best_qty, best_price = children[best]
+                children[best] = (best_qty + qty, max(best_price, price) if side == 'buy' else min(best_price, price))
+        return {"symbol": symbol, "side": side, "requested": quantity, "children": children,
+                "estimate": {"filled": sweep["filled"], "vwap": sweep["vwap"], "cost": sweep["cost"]}}
+
+    def capital_requirements(self, plan: dict, price_cap: float = None) -> dict:
+        """Ledger requirements of a plan: quote currency (fee included) per buying venue, base currency per selling venue."""
+        base, quote = plan["symbol"].split('/')
+        requirements = {}
+        for venue, (qty, price) in plan["children"].items():
+            if plan["side"] == 'buy':
+                fee = self._order_manager.get_fees(venue, plan["symbol"])['taker'] / 100
+                requirements[(venue, quote)] = qty * (price_cap or price) * (1 + fee)
+            else:
+                requirements[(venue, base)] = qty
+        return requirements
+
+    async def _child(self, route_id: int, symbol: str, side: str, venue: str, qty: float, limit_price: float, timeout_s: float, journal_event: str, reduce_only: bool = False):
+        order = await self._order_manager.create_limit_order(venue, symbol, side, qty, limit_price, reduce_only=reduce_only)
+        if not order or not order.get('id'):
+            return {"venue": venue, "order_id": None, "requested": qty, "limit_price": limit_price, "filled": 0.0, "average": None}
+        final = await self._order_manager.settle_order(venue, order['id'], symbol, timeout_s) or order
+        filled = float(final.get('filled') or 0.0)
+        average = float(final.get('average') or limit_price) if filled else None
+        if journal_event and filled:
+            self._order_manager.trade_logger.log_trade(
+                event_type=journal_event, platform_buy=venue if side == 'buy' else None, platform_sell=venue if side == 'sell' else None,
+                symbol=symbol, volume=filled, buy_price=average if side == 'buy' else None, sell_price=average if side == 'sell' else None,
+                details=json.dumps({"route_id": route_id, "order_id": order['id'], "requested": qty, "limit_price": limit_price}))
+        return {"venue": venue, "order_id": order['id'], "requested": qty, "limit_price": limit_price, "filled": filled, "average": average}
+
+    async def execute(self, plan: dict, slippage_pct: float = 0.0, timeout_s: float = None, journal_event: str = None, reduce_only: bool = False) -> dict:
+        """Sends the plan's children concurrently; returns the plan with `children_results`, `filled`, `avg_price`, `cost` and `slippage_bps` (> 0 is worse than estimated)."""
+        route_id = next(self._route_ids)
+        symbol, side = plan["symbol"], plan["side"]
+        timeout_s = self.child_timeout_s if timeout_s is None else timeout_s
+        buffer = slippage_pct / 100
+        results = await asyncio.gather(*(
+            self._child(route_id, symbol, side, venue, qty, price * (1 + buffer) if side == 'buy' else price * (1 - buffer), timeout_s, journal_event, reduce_only)
+            for venue, (qty, price) in plan["children"].items()))
+        filled = sum(r["filled"] for r in results)
+        notional = sum(r["filled"] * r["average"] for r in results if r["filled"])
+        fees = self.fees((r["venue"] for r in results), symbol)
+        cost = sum(r["filled"] * r["average"] * (1 + fees[r["venue"]] / 100 if side == 'buy' else 1 - fees[r["venue"]] / 100) for r in results if r["filled"])
+        avg_price = notional / filled if filled else None
+        estimate = plan["estimate"]["vwap"]
+        slippage_bps = ((avg_price - estimate) / estimate * 10_000 * (1 if side == 'buy' else -1)) if avg_price and estimate else None
+        self.counters["routes"] += 1
+        self.counters["children"] += len(results)
+        self.counters["requested"] += plan["requested"]
+        self.counters["filled"] += filled
+        if slippage_bps is not None: self.slippage_bps_avg += 0.1 * (slippage_bps - self.slippage_bps_avg)
+        self.logger.info("Route %d %s %.8f %s: filled %.8f over %d venue(s), avg %s vs est. %s (%s bps).", route_id, side, plan["requested"], symbol, filled,
+                         len(results), f"{avg_price:.2f}" if avg_price else "-", f"{estimate:.2f}" if estimate else "-", f"{slippage_bps:+.2f}" if slippage_bps is not None else "-")
+        return {**plan, "route_id": route_id, "children_results": results, "filled": filled, "avg_price": avg_price, "cost": cost, "slippage_bps": slippage_bps}
+
+    async def route(self, symbol: str, side: str, quantity: float, limit_price: float = None, venues=None, slippage_pct: float = 0.0, timeout_s: float = None, journal_event: str = None,
+                    reduce_only: bool = False):
+        """plan + execute. Returns None when no venue has depth for the order."""
+        plan = self.plan(symbol, side, quantity, limit_price, venues)
+        if not plan["children"]: return None
+        if plan["estimate"]["filled"] < quantity:
+            # Le reste va sur la meilleure plateforme, au pire prix connu.
+            venue = next(iter(plan["children"]))
+            qty, price = plan["children"][venue]
+            plan["children"][venue] = (qty + quantity - plan["estimate"]["filled"], price)
+        return await self.execute(plan, slippage_pct, timeout_s, journal_event, reduce_only)
+
+    def stats(self) -> dict:
+        return {**self.counters, "fill_ratio": self.counters["filled"] / self.counters["requested"] if self.counters["requested"] else None,
+                "slippage_bps_avg": self.slippage_bps_avg}
@@ -1,15 +1,35 @@
 # main.py
-import asyncio, logging, signal
-from config import PAPER_TRADING_MODE, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID, API_KEYS
+import asyncio, logging, os, signal
+from config import PAPER_TRADING_MODE, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID, API_KEYS, TRADING_SYMBOLS, DEPLOYMENT_MODE, STRATEGY_SHARDS, SHARED_BOOK_DEPTH
+from config import EVENT_LOOP, LOOP_LAG_CHECK_INTERVAL_S, LOOP_LAG_ALERT_S, RECORD_MARKET_DATA_PATH, LOOP_BENCHMARK_RECORDING
+from config import STATUS_REPORTER, STATUS_INTERVAL_S, STATUS_HTTP_HOST, STATUS_HTTP_PORT, CONTROL_HTTP_HOST, CONTROL_HTTP_PORT, CONTROL_TOKEN
+from config import LOG_LEVEL, LOG_FORMAT, LOG_RATE_LIMIT_S, LOG_RATE_LIMITED_LOGGERS, THRESHOLD_STATE_PATH, THRESHOLD_LATENCY_S
+from config import OPPORTUNITY_TRACKER, OPPORTUNITY_JOURNAL_BATCH, OPPORTUNITY_JOURNAL_FLUSH_S, BOOK_MAX_DEPTH, BOOK_PRICE_BAND_PCT
+from config import MARKET_DATA_FROM_FEED, MARKET_DATA_FEED_ADDRESS, PROFILER_INTERVAL_S, PROFILE_OUTPUT_DIR
+from config import TRADE_STREAMS, TRADE_BAR_RESOLUTIONS_S, TRADE_BAR_CAPACITY, TRADE_WINDOW_S, STRATEGY_BUDGET_MS
+from config import BOOK_CHECKPOINT_PATH, BOOK_CHECKPOINT_INTERVAL_S, BOOK_CHECKPOINT_MAX_AGE_S
+from config import RECOVERY_BOOK_WAIT_S, RISK_ENGINE, RISK_MAX_ORDER_USD, RISK_MAX_VENUE_INVENTORY_USD, RISK_MAX_DAILY_LOSS_USD, RISK_MAX_ORDERS_PER_S, RISK_MAX_OPEN_ORDERS
 from execution.live_order_manager import LiveOrderManager
+from execution.risk_engine import RiskEngine
 from engine.data_engine import DataEngine
 from engine.strategy_engine import StrategyEngine
+from engine.strategy_dispatcher import StrategyDispatcher
+from engine.consolidated_book import ConsolidatedBooks
+from engine.opportunity_tracker import OpportunityTracker
+from engine.trade_aggregator import TradeAggregator
+from engine.market_data_feed import MarketDataFeedClient
 from connectors.binance_connector import BinanceConnector
 from connectors.okx_connector import OkxConnector
 from utils.notifier import Notifier
 from utils.trade_logger import TradeLogger
+from utils.loop_monitor import LoopLagMonitor, install_event_loop
+from utils.status_reporter import StatusReporter
+from utils.control_server import ControlServer
+from utils.profiler import SamplingProfiler
+from utils.log_setup import setup_logging
+from backtest.recording import MarketDataRecorder
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)-20s - %(levelname)-8s - %(message)s')
+setup_logging(LOG_LEVEL, LOG_FORMAT, LOG_RATE_LIMIT_S, rate_limited_loggers=LOG_RATE_LIMITED_LOGGERS)
 
 async def main_bot():
     shutdown_event = asyncio.Event()
@@ -24,25 +44,94 @@ async def main_bot():
         order_manager = LiveOrderManager(notifier, trade_logger)
     
     await order_manager.initialize()
+    # Ordres laissés par un arrêt brutal : annulés avant de lire les soldes ; l'exposition restante est couverte plus bas.
+    unbalanced_trades = await order_manager.reconcile_journal()
 
     logging.info("--- Initial Balance Check ---")
+    await order_manager.refresh_balances()
     for platform in order_manager.exchanges.keys():
         for currency in ['USDC', 'BTC']:
-            balance = await order_manager.get_balance(platform, currency)
-            if balance is not None: logging.info(f"[{platform}] Available balance: {balance:.4f} {currency}")
+            logging.info(f"[{platform}] Available balance: {order_manager.ledger.available(platform, currency):.4f} {currency}")
     logging.info("-----------------------------")
 
-    data_engine = DataEngine()
-    strategy_engine = StrategyEngine(data_engine.order_books, order_manager, notifier)
+    data_engine = DataEngine(BOOK_MAX_DEPTH, BOOK_PRICE_BAND_PCT)
+    consolidated_books = ConsolidatedBooks()
+    data_engine.add_listener(consolidated_books.on_book_update)
+    # La stratégie passe ses ordres à travers les limites de risque.
+    risk_engine = RiskEngine(order_manager, notifier, RISK_MAX_ORDER_USD, RISK_MAX_VENUE_INVENTORY_USD, RISK_MAX_DAILY_LOSS_USD,
+                             RISK_MAX_ORDERS_PER_S, RISK_MAX_OPEN_ORDERS, order_books=data_engine.order_books) if RISK_ENGINE else None
+    if risk_engine:
+        # Positions valorisées au mid à chaque mise à jour ; celles d'un arrêt brutal sont reprises pour être couvertes.
+        data_engine.add_listener(risk_engine.on_book_update)
+        for info in unbalanced_trades.values():
+            for symbol, exposure in info['exposure'].items(): risk_engine.adopt_position(symbol, exposure)
+    strategy_engine = StrategyEngine(data_engine.order_books, risk_engine or order_manager, notifier, consolidated_books)
+    # Les stratégies partagent la diffusion des carnets et le gestionnaire d'ordres ; d'autres s'enregistrent ici.
+    dispatcher = StrategyDispatcher(data_engine, STRATEGY_BUDGET_MS)
+    dispatcher.register(strategy_engine)
+    data_engine.add_listener(strategy_engine.maker_engine.on_book_update)
+    if strategy_engine.thresholds:
+        if THRESHOLD_STATE_PATH and os.path.exists(THRESHOLD_STATE_PATH):
+            strategy_engine.thresholds.load(THRESHOLD_STATE_PATH)
+            logging.info(f"Adaptive threshold statistics restored from {THRESHOLD_STATE_PATH}")
+        data_engine.add_listener(strategy_engine.thresholds.on_book_update)
+    trade_flow = None
+    if TRADE_STREAMS:
+        # Barres, VWAP et volume des transactions : exposés dans le rapport d'état.
+        trade_flow = TradeAggregator(TRADE_BAR_RESOLUTIONS_S, TRADE_BAR_CAPACITY, TRADE_WINDOW_S)
+        data_engine.add_trade_listener(trade_flow.on_trade)
+    opportunity_tracker = None
+    if OPPORTUNITY_TRACKER:
+        opportunity_tracker = OpportunityTracker(data_engine.order_books, order_manager.get_fees, trade_logger, OPPORTUNITY_JOURNAL_BATCH,
+                                                 OPPORTUNITY_JOURNAL_FLUSH_S, THRESHOLD_LATENCY_S)
+        data_engine.add_listener(opportunity_tracker.on_book_update)
 
-    binance_connector = BinanceConnector(data_engine)
-    okx_connector = OkxConnector(data_engine)
+    recorder = MarketDataRecorder(RECORD_MARKET_DATA_PATH) if RECORD_MARKET_DATA_PATH else None
+    # Chargés avant les connecteurs, qui prennent leur point de contrôle à la construction.
+    if BOOK_CHECKPOINT_PATH and not MARKET_DATA_FROM_FEED: data_engine.load_checkpoints(BOOK_CHECKPOINT_PATH, BOOK_CHECKPOINT_MAX_AGE_S)
+    connectors = [connector_class(data_engine, symbol=symbol, recorder=recorder) for symbol in TRADING_SYMBOLS for connector_class in (BinanceConnector, OkxConnector)]
+    feed_client = None
+    if MARKET_DATA_FROM_FEED:
+        # Les carnets viennent du processus de données partagé : aucune connexion aux plateformes ici.
+        logging.info(f"Market data: shared feed on {MARKET_DATA_FEED_ADDRESS}")
+        connectors, feed_client = [], MarketDataFeedClient(data_engine, MARKET_DATA_FEED_ADDRESS)
+    loop_monitor = LoopLagMonitor(LOOP_LAG_CHECK_INTERVAL_S, LOOP_LAG_ALERT_S, notifier)
+    profiler = SamplingProfiler(PROFILER_INTERVAL_S, PROFILE_OUTPUT_DIR)
+    status_reporter = None
+    if STATUS_REPORTER:
+        status_reporter = StatusReporter(data_engine.order_books, STATUS_REPORTER, STATUS_INTERVAL_S, host=STATUS_HTTP_HOST, port=STATUS_HTTP_PORT)
+        status_reporter.add_source("loop", loop_monitor.stats)
+        status_reporter.add_source("market_data", data_engine.stats)
+        status_reporter.add_source("connections", lambda: {f"{c.name} {c.symbol_unified}": c.stats() for c in connectors})
+        if feed_client: status_reporter.add_source("feed", feed_client.stats)
+        status_reporter.add_source("strategies", dispatcher.stats)
+        status_reporter.add_source("consolidated", consolidated_books.snapshot)
+        if trade_flow: status_reporter.add_source("trades", trade_flow.stats)
+        status_reporter.add_source("metadata", order_manager.metadata.stats)
+        if opportunity_tracker: status_reporter.add_source("opportunities", opportunity_tracker.stats)
+        if order_manager.journal: status_reporter.add_source("orders", order_manager.journal.stats)
+        if risk_engine: status_reporter.add_source("risk", risk_engine.stats)
+        status_reporter.add_source("cpu", profiler.cpu_stats)
+
+    control_server = None
+    if CONTROL_HTTP_PORT and not CONTROL_TOKEN: logging.warning("CONTROL_TOKEN is not set: the control API is disabled.")
+    elif CONTROL_HTTP_PORT: control_server = ControlServer(strategy_engine, connectors, risk_engine, CONTROL_HTTP_HOST, CONTROL_HTTP_PORT, profiler, CONTROL_TOKEN)
+
+    # Tâches nommées ; leur temps CPU (et celui des tâches qu'elles créent) est compté par le profileur.
+    start_task = profiler.create_task
 
     logging.info("Starting all arbitrage bot tasks...")
+    checkpoint_task = start_task(data_engine.run_checkpoints(BOOK_CHECKPOINT_PATH, BOOK_CHECKPOINT_INTERVAL_S), "book checkpoints") if BOOK_CHECKPOINT_PATH and connectors else None
     tasks = [
-        asyncio.create_task(binance_connector.run()),
-        asyncio.create_task(okx_connector.run()),
-        asyncio.create_task(strategy_engine.run()),
+        *(start_task(connector.run(), f"connector {connector.name} {connector.symbol_unified}") for connector in connectors),
+        *([start_task(feed_client.run(), "feed client")] if feed_client else []),
+        *([checkpoint_task] if checkpoint_task else []),
+        start_task(dispatcher.run(), "strategies"),
+        start_task(strategy_engine.recover(unbalanced_trades, RECOVERY_BOOK_WAIT_S), "recovery"),
+        start_task(order_manager.run_metadata_refresh(), "metadata refresh"),
+        start_task(loop_monitor.run(), "loop monitor"),
+        *([start_task(status_reporter.run(), "status reporter")] if status_reporter else []),
+        *([start_task(control_server.run(), "control server")] if control_server else []),
         # --- CORRECTION : La tâche du Notifier est supprimée ---
         # asyncio.create_task(notifier.run()) 
     ]
@@ -55,20 +144,48 @@ async def main_bot():
     try:
         loop.add_signal_handler(signal.SIGINT, handle_shutdown_signal)
         loop.add_signal_handler(signal.SIGTERM, handle_shutdown_signal)
-    except NotImplementedError: pass
+        # kill -USR1 <pid> : démarre le profileur, ou l'arrête et écrit le profil.
+        loop.add_signal_handler(signal.SIGUSR1, profiler.toggle)
+    except (NotImplementedError, AttributeError): pass
 
     try:
         await shutdown_event.wait()
     finally:
         logging.info("Initiating shutdown procedure...")
         if hasattr(strategy_engine, 'process_pool'): strategy_engine.process_pool.shutdown(wait=True); logging.info("Process pool shut down.")
+        if profiler.running: profiler.stop()
+        # Avant l'arrêt des connecteurs, qui invalident les carnets.
+        if checkpoint_task:
+            # L'écriture périodique en cours finit d'abord : plus ancienne, elle remplacerait sinon celle-ci.
+            checkpoint_task.cancel()
+            await asyncio.gather(checkpoint_task, return_exceptions=True)
+            await data_engine.checkpoint_written()
+            try: logging.info(f"Saved {data_engine.save_checkpoint(BOOK_CHECKPOINT_PATH)} order book checkpoint(s).")
+            except OSError as e: logging.error(f"Could not save the order book checkpoints: {e}")
         for task in tasks: task.cancel()
         await asyncio.gather(*tasks, return_exceptions=True)
+        await order_manager.cancel_all_orders()
         await order_manager.close_all()
+        if opportunity_tracker: opportunity_tracker.flush()
         trade_logger.close()
+        if strategy_engine.thresholds and THRESHOLD_STATE_PATH:
+            try: strategy_engine.thresholds.save(THRESHOLD_STATE_PATH)
+            except Exception as e: logging.error(f"Could not save adaptive threshold statistics: {e}")
+        if recorder: recorder.close()
         logging.info("All tasks have been cancelled and connections closed.")
 
 if __name__ == "__main__":
-    try: asyncio.run(main_bot())
+    try:
+        if DEPLOYMENT_MODE == 'sharded':
+            from engine.sharded_runtime import run_sharded
+            logging.info(f"Deployment mode: SHARDED ({STRATEGY_SHARDS} strategy process(es), shared book depth {SHARED_BOOK_DEPTH})")
+            run_sharded(["Binance", "OKX"], TRADING_SYMBOLS, STRATEGY_SHARDS, SHARED_BOOK_DEPTH)
+        else:
+            if LOOP_BENCHMARK_RECORDING:
+                from benchmarks.loop_bench import benchmark_event_loops
+                for loop_name, rate in benchmark_event_loops(LOOP_BENCHMARK_RECORDING).items():
+                    logging.info(f"[Loop benchmark] {loop_name}: {rate:,.0f} msg/s on {LOOP_BENCHMARK_RECORDING}")
+            install_event_loop(EVENT_LOOP)
+            asyncio.run(main_bot())
     except KeyboardInterrupt: logging.info("Bot stopped by user.")
     finally: logging.info("Bot has been shut down.")
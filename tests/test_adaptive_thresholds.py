@@ -0,0 +1,32 @@
+# tests/test_adaptive_thresholds.py
+import asyncio
+from engine.adaptive_thresholds import AdaptiveThresholds
+from engine.shared_book import SharedBookTable, SharedOrderBookView, watch_views
+
+SYMBOL = "BTC/USDC"
+
+
+def test_thresholds_follow_shared_book_views():
+    keys = [("Binance", SYMBOL), ("OKX", SYMBOL)]
+    table = SharedBookTable(keys, 5, create=True)
+    try:
+        views = {key: SharedOrderBookView(table, key) for key in keys}
+        now = [0.0]
+        thresholds = AdaptiveThresholds(views, floor_pct=0.01, clock=lambda: now[0])
+        async def scenario():
+            watcher = asyncio.create_task(watch_views(views, thresholds.on_book_update, 0.001))
+            for step in range(5):
+                now[0] = float(step)
+                table.publish(keys[0], [(60000.0 + 10 * step, 1.0)], [(60001.0 + 10 * step, 1.0)])
+                table.publish(keys[1], [(60000.5 + 5 * step, 1.0)], [(60001.5 + 5 * step, 1.0)])
+                await asyncio.sleep(0.01)
+            watcher.cancel()
+            await asyncio.gather(watcher, return_exceptions=True)
+        asyncio.run(scenario())
+        stats = thresholds.pair("Binance", "OKX", SYMBOL)
+        # Sans les mises à jour, le seuil resterait au plancher.
+        assert stats.updates >= 5 and stats.vol_rate > 0
+        assert thresholds.thresholds("Binance", "OKX", SYMBOL)[0] > 0.01
+    finally:
+        table.close()
+        table.unlink()
@@ -0,0 +1,59 @@
+# tests/test_balance_ledger.py
+import asyncio
+from backtest.simulated_broker import SimulatedBroker
+from engine.data_engine import OrderBook
+from engine.strategy_engine import StrategyEngine
+from execution.balance_ledger import BalanceLedger
+from utils.notifier import Notifier
+
+SYMBOL = "BTC/USDC"
+
+
+def test_reservations_are_all_or_nothing_and_released_once():
+    ledger = BalanceLedger()
+    ledger.update_balances("Binance", {"USDC": 1000.0, "BTC": None})
+    ledger.update_balances("OKX", {"BTC": 0.5})
+    first = ledger.reserve({("Binance", "USDC"): 600.0, ("OKX", "BTC"): 0.3})
+    assert first is not None and ledger.available("Binance", "USDC") == 400.0
+    # La seconde demande dépasse l'USDC restant : rien n'est réservé, pas même le BTC.
+    assert ledger.reserve({("OKX", "BTC"): 0.1, ("Binance", "USDC"): 500.0}) is None
+    assert abs(ledger.available("OKX", "BTC") - 0.2) < 1e-12 and ledger.open_reservations == 1
+    ledger.release(first)
+    ledger.release(first)
+    assert ledger.available("Binance", "USDC") == 1000.0 and ledger.available("OKX", "BTC") == 0.5
+    assert ledger.open_reservations == 0 and ledger._reserved == {}
+
+
+def test_share_splits_reported_balances():
+    ledger = BalanceLedger(share=0.25)
+    ledger.update_balances("Binance", {"USDC": 1000.0})
+    assert ledger.balance("Binance", "USDC") == 250.0
+    assert ledger.reserve({("Binance", "USDC"): 300.0}) is None
+    assert ledger.reserve({("Binance", "USDC"): 250.0}) is not None
+
+
+def test_pairs_are_claimed_once_and_released_with_their_capital():
+    async def scenario():
+        books = {}
+        for venue in ("Binance", "OKX"):
+            books[(venue, SYMBOL)] = OrderBook()
+            books[(venue, SYMBOL)].update([[59990.0, 5.0]], [[60010.0, 5.0]])
+        broker = SimulatedBroker(books, balances={venue: {"BTC": 10.0, "USDC": 1_000_000.0} for venue in ("Binance", "OKX")})
+        engine = StrategyEngine(books, broker, Notifier(None, None))
+        engine.process_pool.shutdown()
+        await broker.refresh_balances()
+        pair_key = engine._pair_key("OKX", "Binance", SYMBOL)
+        requirements = {("Binance", "USDC"): 60_000.0, ("OKX", "BTC"): 1.0}
+        first = engine._acquire_pair(pair_key, requirements)
+        # Même paire déjà en cours : refusée sans toucher au registre.
+        assert engine._acquire_pair(pair_key, requirements) is None and broker.ledger.open_reservations == 1
+        assert engine._active_trades == 1 and engine._pair_states[pair_key] == 'trading'
+        # Capital insuffisant : refus, la paire reste libre.
+        other = engine._pair_key("Binance", "OKX", "ETH/USDC")
+        assert engine._acquire_pair(other, {("OKX", "USDC"): 10_000_000.0}) is None and other not in engine._pair_states
+        engine._cooldown = 0
+        await engine._release_pair(pair_key, first)
+        return broker, engine, pair_key
+    broker, engine, pair_key = asyncio.run(scenario())
+    assert broker.ledger.open_reservations == 0 and engine._active_trades == 0
+    assert pair_key not in engine._pair_states
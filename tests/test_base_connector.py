@@ -0,0 +1,125 @@
+# tests/test_base_connector.py
+import asyncio, logging
+from websockets.exceptions import ConnectionClosed
+import connectors.base_connector as base_connector
+from connectors.base_connector import WebSocketConnector
+from engine.data_engine import DataEngine
+
+SYMBOL = "BTC/USDC"
+
+
+class _Connector(WebSocketConnector):
+    """Connector without sockets: frames are passed to `_sequence` by the test, `resync` only records the reason."""
+    warm_start = True
+
+    def __init__(self, data_engine, connections: int = 1):
+        self.name = "Binance"
+        self.logger = logging.getLogger("TestConnector")
+        super().__init__(data_engine, SYMBOL, None, ["ws://test"])
+        self.ws_urls = ["ws://test"] * connections
+        self.resync_reasons = []
+
+    def resync(self, reason: str):
+        self.resync_reasons.append(reason)
+        self._start_resync(reason)
+
+    def snapshot(self, update_id: int, bid: float = 100.0):
+        self._apply("", {"bids": [[bid, 1.0]], "asks": [[bid + 1, 1.0]]}, snapshot=True, seq=update_id)
+        self.resyncing, self.last_seq = False, update_id
+
+    def diff(self, prev: int, seq: int, bid: float):
+        self._sequence(prev, seq, "", {"bids": [[bid, 1.0]], "asks": []})
+
+
+def _bids(data_engine):
+    return [price for price, _ in data_engine.order_books[("Binance", SYMBOL)].get_bids(10)]
+
+
+def test_duplicates_from_the_other_socket_are_dropped():
+    async def scenario():
+        data_engine = DataEngine()
+        connector = _Connector(data_engine, connections=2)
+        connector.snapshot(10)
+        for _ in range(2):
+            connector.diff(10, 11, 99.0)
+            connector.diff(11, 12, 98.0)
+        return data_engine, connector
+    data_engine, connector = asyncio.run(scenario())
+    assert connector.duplicates == 2 and connector.last_seq == 12
+    assert _bids(data_engine) == [100.0, 99.0, 98.0]
+
+
+def test_out_of_order_frames_are_held_and_the_book_suspended():
+    async def scenario():
+        data_engine = DataEngine()
+        connector = _Connector(data_engine, connections=2)
+        connector.snapshot(10)
+        connector.diff(11, 12, 98.0)
+        # Trame 11 en retard : le carnet ne montre rien tant qu'elle manque.
+        held = (_bids(data_engine), dict(connector._pending))
+        connector.diff(10, 11, 99.0)
+        return data_engine, connector, held
+    data_engine, connector, (bids_while_held, pending) = asyncio.run(scenario())
+    assert bids_while_held == [] and list(pending) == [11]
+    assert connector.last_seq == 12 and not connector._pending and connector.resync_reasons == []
+    assert _bids(data_engine) == [100.0, 99.0, 98.0] and data_engine.suspensions == 1
+
+
+def test_missing_frame_resyncs_after_the_reorder_timeout(monkeypatch):
+    monkeypatch.setattr(base_connector, "WS_REORDER_TIMEOUT_S", 0.01)
+    async def scenario():
+        data_engine = DataEngine()
+        connector = _Connector(data_engine, connections=2)
+        connector.snapshot(10)
+        connector.diff(11, 12, 98.0)
+        await asyncio.sleep(0.05)
+        return data_engine, connector
+    data_engine, connector = asyncio.run(scenario())
+    assert connector.gaps == 1 and connector.resync_reasons == ["update ids 10 -> 11 missing"]
+    assert connector.resyncing and not data_engine.order_books[("Binance", SYMBOL)].valid
+
+
+def test_gap_on_a_single_socket_resyncs_at_once():
+    async def scenario():
+        data_engine = DataEngine()
+        connector = _Connector(data_engine)
+        connector.snapshot(10)
+        connector.diff(11, 12, 98.0)
+        return data_engine, connector
+    data_engine, connector = asyncio.run(scenario())
+    assert connector.gaps == 1 and connector.resync_reasons == ["update ids 10 -> 11 missing"]
+    assert not connector._pending and _bids(data_engine) == []
+
+
+def test_checkpoint_splices_only_when_the_stream_continues_it():
+    data_engine = DataEngine()
+    data_engine.checkpoints = {("Binance", SYMBOL): (10, None, [(100.0, 1.0)], [(101.0, 1.0)])}
+    connector = _Connector(data_engine)
+    connector._start_resync("connected")
+    # Diff antérieur au point de contrôle : ignoré ; le suivant le prolonge.
+    assert not connector._splice_checkpoint(8, 9)
+    assert connector._splice_checkpoint(10, 11)
+    assert not connector.resyncing and connector.last_seq == 10 and connector.syncs["checkpoint"] == 1
+    assert _bids(data_engine) == [100.0]
+
+    data_engine = DataEngine()
+    data_engine.checkpoints = {("Binance", SYMBOL): (10, None, [(100.0, 1.0)], [(101.0, 1.0)])}
+    connector = _Connector(data_engine)
+    connector._start_resync("connected")
+    # Des mises à jour ont été manquées : le point de contrôle est abandonné au profit de l'instantané.
+    assert not connector._splice_checkpoint(12, 13)
+    assert connector.resyncing and connector._checkpoint is None and connector.syncs["checkpoint_missed"] == 1
+
+
+def test_ping_loop_returns_when_the_socket_closes(monkeypatch):
+    monkeypatch.setattr(base_connector, "WS_PING_INTERVAL_S", 0)
+    class _ClosedSocket:
+        async def ping(self): raise ConnectionClosed(None, None)
+    connector = _Connector(DataEngine())
+    assert asyncio.run(asyncio.wait_for(connector._ping_loop(_ClosedSocket(), 0), 1)) is None
+
+
+def test_backoff_is_jittered_below_an_exponential_cap():
+    delays = [base_connector.backoff_delay(attempt, base_s=0.5, max_s=4.0) for attempt in range(8) for _ in range(50)]
+    assert all(0 <= delay <= min(4.0, 0.5 * 2 ** (i // 50)) for i, delay in enumerate(delays))
+    assert len(set(delays)) > 1
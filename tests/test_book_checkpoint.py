@@ -0,0 +1,71 @@
+# tests/test_book_checkpoint.py
+import asyncio, os, struct, tempfile, time
+import pytest
+from engine.data_engine import DataEngine, read_book_checkpoint, write_book_checkpoint
+
+SYMBOL = "BTC/USDC"
+
+
+def _engine():
+    engine = DataEngine()
+    engine.process_update({"platform": "Binance", "symbol": SYMBOL, "data": {"b": [[100.0, 1.0], [99.5, 2.0]], "a": [[101.0, 3.0]], "E": 1_700_000_000_000},
+                           "snapshot": True, "seq": 42})
+    engine.process_update({"platform": "OKX", "symbol": SYMBOL, "data": {"bids": [[100.2, 1.0]], "asks": [[100.8, 1.0]]}, "snapshot": True, "seq": 7})
+    # Carnet non séquencé, carnet invalidé : jamais sauvegardés.
+    engine.process_update({"platform": "Kraken", "symbol": SYMBOL, "data": {"bids": [[100.1, 1.0]], "asks": [[100.9, 1.0]]}, "snapshot": True})
+    engine.invalidate("OKX", SYMBOL, "test")
+    return engine
+
+
+def test_saved_books_load_back_for_warm_start():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "books", "checkpoint.bin")
+        assert _engine().save_checkpoint(path) == 1
+        restarted = DataEngine()
+        assert restarted.load_checkpoints(path, max_age_s=60) == 1
+        assert os.listdir(os.path.dirname(path)) == ["checkpoint.bin"]
+    assert restarted.take_checkpoint("Binance", SYMBOL) == (42, 1_700_000_000.0, [(99.5, 2.0), (100.0, 1.0)], [(101.0, 3.0)])
+    assert restarted.take_checkpoint("Binance", SYMBOL) is None
+
+
+def test_corrupt_or_truncated_files_raise_value_error():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "checkpoint.bin")
+        size = write_book_checkpoint(path, [("Binance", SYMBOL, 42, None, [(100.0, 1.0)], [(101.0, 1.0)])])
+        assert read_book_checkpoint(path)[1] == {("Binance", SYMBOL): (42, None, [(100.0, 1.0)], [(101.0, 1.0)])}
+        with open(path, 'rb') as f: data = f.read()
+        assert len(data) == size
+        for broken in (b"NOTABOOK" + data[8:], data[:size // 2], data[:10]):
+            with open(path, 'wb') as f: f.write(broken)
+            with pytest.raises(ValueError):
+                read_book_checkpoint(path)
+            # Au démarrage : ignoré, démarrage à froid.
+            assert DataEngine().load_checkpoints(path, max_age_s=60) == 0
+        assert DataEngine().load_checkpoints(os.path.join(directory, "missing.bin"), max_age_s=60) == 0
+
+
+def test_stale_checkpoints_are_not_loaded():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "checkpoint.bin")
+        write_book_checkpoint(path, [("Binance", SYMBOL, 42, None, [(100.0, 1.0)], [(101.0, 1.0)])])
+        with open(path, 'r+b') as f:
+            f.seek(8)
+            f.write(struct.pack("<d", time.time() - 120))
+        engine = DataEngine()
+        assert engine.load_checkpoints(path, max_age_s=60) == 0 and engine.checkpoints == {}
+        assert engine.load_checkpoints(path, max_age_s=300) == 1
+
+
+def test_periodic_checkpoints_are_written_off_the_loop():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "checkpoint.bin")
+        engine = _engine()
+        async def scenario():
+            task = asyncio.create_task(engine.run_checkpoints(path, 0.02))
+            await asyncio.sleep(0.07)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            await engine.checkpoint_written()
+        asyncio.run(scenario())
+        assert engine.checkpoint_saves >= 2 and engine.checkpoint_bytes == os.path.getsize(path)
+        assert list(read_book_checkpoint(path)[1]) == [("Binance", SYMBOL)]
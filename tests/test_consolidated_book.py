@@ -0,0 +1,43 @@
+# tests/test_consolidated_book.py
+from engine.consolidated_book import ConsolidatedBook
+
+
+def _book():
+    book = ConsolidatedBook("BTC/USDC")
+    book.apply("Binance", [[99.0, 1.0], [98.0, 2.0]], [[100.0, 1.0], [101.0, 2.0]])
+    book.apply("OKX", [[99.0, 0.5], [98.5, 1.0]], [[100.5, 1.0], [102.0, 5.0]])
+    return book
+
+
+def test_levels_sum_venues_and_drop_with_them():
+    book = _book()
+    assert book.get_bids(2) == [(99.0, 1.5), (98.5, 1.0)]
+    assert book.levels('bids', 1) == [(99.0, 1.5, {"Binance": 1.0, "OKX": 0.5})]
+    book.apply("OKX", [[99.0, 0.0]], [])
+    assert book.levels('bids', 1) == [(99.0, 1.0, {"Binance": 1.0})]
+    book.remove_venue("Binance")
+    assert book.get_bids(5) == [(98.5, 1.0)] and book.get_asks(5) == [(100.5, 1.0), (102.0, 5.0)]
+    assert 100.0 not in book.contributions['asks']
+
+
+def test_sweep_walks_the_best_prices_across_venues():
+    result = _book().sweep('buy', 2.5)
+    assert result["filled"] == 2.5 and abs(result["vwap"] - 100.4) < 1e-12 and result["worst_price"] == 101.0
+    assert result["allocation"] == {"Binance": (1.5, 101.0), "OKX": (1.0, 100.5)}
+    sell = _book().sweep('sell', 2.0)
+    assert sell["allocation"] == {"Binance": (1.0, 99.0), "OKX": (1.0, 98.5)} and sell["worst_price"] == 98.5
+
+
+def test_sweep_orders_levels_by_price_after_fees():
+    # 1 % chez Binance : son 101 (102.01 effectif) passe après le 102 d'OKX.
+    result = _book().sweep('buy', 2.5, fees={"Binance": 1.0, "OKX": 0.0})
+    assert result["allocation"] == {"OKX": (1.5, 102.0), "Binance": (1.0, 100.0)}
+    assert abs(result["cost"] - (100.5 + 101.0 + 0.5 * 102.0)) < 1e-9 and result["worst_price"] == 102.0
+
+
+def test_sweep_respects_venue_filter_and_limit_price():
+    only_okx = _book().sweep('buy', 2.5, venues=["OKX"])
+    assert only_okx["allocation"] == {"OKX": (2.5, 102.0)}
+    capped = _book().sweep('buy', 5.0, limit_price=100.5)
+    assert capped["filled"] == 2.0 and capped["worst_price"] == 100.5
+    assert ConsolidatedBook("BTC/USDC").sweep('buy', 1.0) == {"filled": 0.0, "vwap": None, "cost": 0.0, "worst_price": None, "allocation": {}}
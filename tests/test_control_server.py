@@ -0,0 +1,59 @@
+# tests/test_control_server.py
+import asyncio, json, socket
+import pytest
+from engine.strategy_engine import _non_negative
+from utils.control_server import ControlServer
+from utils.http_server import JsonHttpServer
+
+
+class _Strategy:
+    def parameters(self): return {"taker_threshold_pct": 0.05}
+    def status(self): return {"paused_pairs": []}
+
+
+async def _request(port: int, method: str, path: str, headers: dict, body: bytes = b""):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    lines = [f"{method} {path} HTTP/1.1", f"Content-Length: {len(body)}"] + [f"{name}: {value}" for name, value in headers.items()]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(payload)
+
+
+def _exchange(requests):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    control = ControlServer(_Strategy(), host="127.0.0.1", port=port, token="secret")
+    good = {"Host": f"127.0.0.1:{port}", "X-Control-Token": "secret"}
+
+    async def run():
+        server = JsonHttpServer("127.0.0.1", port, control.routes(), guard=control._guard)
+        await server.start()
+        try: return [await _request(port, method, path, {**good, **headers}) for method, path, headers in requests]
+        finally: await server.stop()
+    return asyncio.run(run())
+
+
+def test_control_requests_need_token_json_and_local_host():
+    statuses = [status for status, _ in _exchange([
+        ("GET", "/params", {}),
+        ("GET", "/params", {"X-Control-Token": "wrong"}),
+        ("GET", "/params", {"Host": "evil.example:80"}),
+        ("GET", "/params", {"Origin": "http://evil.example"}),
+        ("POST", "/kill", {"Content-Type": "application/x-www-form-urlencoded"}),
+        ("POST", "/kill", {"Content-Type": "text/plain"}),
+    ])]
+    assert statuses == [200, 401, 403, 403, 415, 415]
+
+
+def test_control_server_refuses_to_run_without_a_token():
+    with pytest.raises(ValueError):
+        ControlServer(_Strategy(), token=None)
+
+
+@pytest.mark.parametrize("value", ["nan", "inf", "-0.1", float("nan")])
+def test_thresholds_must_be_finite_and_non_negative(value):
+    with pytest.raises(ValueError):
+        _non_negative(value)
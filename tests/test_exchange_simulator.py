@@ -0,0 +1,24 @@
+# tests/test_exchange_simulator.py
+import asyncio
+from backtest.exchange_simulator import ExchangeSimulator
+
+
+def test_slow_connection_is_closed_when_its_queue_fills():
+    class _Socket:
+        closed_with = None
+        async def close(self, code, reason): self.closed_with = (code, reason)
+
+    async def scenario():
+        simulator = ExchangeSimulator(rate=2000, max_queue=20)
+        slow, fast, socket = simulator._subscribe("Binance", "BTC/USDC"), simulator._subscribe("Binance", "BTC/USDC"), _Socket()
+        simulator._sockets[slow] = socket
+        # Connexion rapide : vidée en continu ; la lente ne lit jamais.
+        async def drain():
+            while True: await fast.get()
+        reader = asyncio.create_task(drain())
+        await asyncio.sleep(0.1)
+        reader.cancel()
+        return simulator, slow, fast, socket
+    simulator, slow, fast, socket = asyncio.run(scenario())
+    assert simulator.slow_disconnects == 1 and socket.closed_with == (1008, "slow consumer")
+    assert slow.qsize() == 20 and list(simulator._feeds[("Binance", "BTC/USDC")]) == [fast]
@@ -0,0 +1,109 @@
+# tests/test_history_downloader.py
+import asyncio, json, socket, time
+import ccxt.async_support as ccxt
+from backtest.exchange_simulator import ExchangeSimulator, SimulatedHistory, point_exchange_at
+from backtest.history_downloader import HistoryDownloader
+from backtest.recording import read_recording
+
+SYMBOL = "BTC/USDC"
+HOUR_MS = SimulatedHistory.HOUR_MS
+# Début d'une heure passée : l'historique simulé ne sert rien après l'heure courante.
+SINCE = (int(time.time() * 1000) // HOUR_MS - 6) * HOUR_MS
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class _Interrupted:
+    """ccxt client proxy recording the time cursor of every fetch_trades, failing from `fail_from_ms` on like a download cut short."""
+    def __init__(self, exchange, fail_from_ms: int = None):
+        self._exchange, self.fail_from_ms = exchange, fail_from_ms
+        self.cursors = []
+
+    def __getattr__(self, name):
+        return getattr(self._exchange, name)
+
+    async def fetch_trades(self, symbol, since=None, limit=None, params=None):
+        cursor = int(since if since is not None else (params or {}).get('after'))
+        self.cursors.append(cursor)
+        if self.fail_from_ms is not None and cursor >= self.fail_from_ms: raise ccxt.ExchangeError("interrupted")
+        return await self._exchange.fetch_trades(symbol, since, limit, params or {})
+
+
+def _with_simulator(scenario):
+    async def run():
+        simulator, rest_port = ExchangeSimulator(symbols=(SYMBOL,)), _free_port()
+        server = asyncio.create_task(simulator.run(rest_port=rest_port, ws_port=_free_port()))
+        await asyncio.sleep(0.2)
+        exchanges = {}
+        try:
+            for venue in ("Binance", "OKX"):
+                exchanges[venue] = getattr(ccxt, venue.lower())({'enableRateLimit': False})
+                point_exchange_at(exchanges[venue], f"http://127.0.0.1:{rest_port}")
+                await exchanges[venue].load_markets()
+            return await scenario(simulator, exchanges)
+        finally:
+            for exchange in exchanges.values(): await exchange.close()
+            server.cancel()
+            await asyncio.gather(server, return_exceptions=True)
+    return asyncio.run(run())
+
+
+def _trade_ids(path: str) -> dict:
+    ids = {"Binance": [], "OKX": []}
+    for _, venue, _, kind, raw in read_recording(path, kinds={'trade'}):
+        frame = json.loads(raw)
+        ids[venue].append(int(frame["a"]) if venue == "Binance" else int(frame["data"][0]["tradeId"]))
+    return ids
+
+
+def _expected_ids(simulator, venue: str, until_ms: int) -> list:
+    return [trade[0] for trade in simulator.history[(venue, SYMBOL)].trades(SINCE, until_ms)]
+
+
+def test_pages_are_deduplicated_and_complete(tmp_path):
+    output = str(tmp_path / "history.jsonl.gz")
+    until = SINCE + 2 * HOUR_MS
+
+    async def scenario(simulator, exchanges):
+        downloader = HistoryDownloader(exchanges, output)
+        # Pages de 100 (OKX) : les rafales dans la même milliseconde chevauchent les bords de page.
+        summary = await downloader.download([(venue, SYMBOL, 'trade', SINCE, until, '1m') for venue in exchanges])
+        return simulator, summary
+
+    simulator, summary = _with_simulator(scenario)
+    ids = _trade_ids(output)
+    for venue in ("Binance", "OKX"):
+        assert ids[venue] == _expected_ids(simulator, venue, until)
+        assert summary[f"{venue} {SYMBOL} trade"] == len(ids[venue])
+
+
+def test_interrupted_download_resumes_from_its_checkpoint(tmp_path):
+    output = str(tmp_path / "history.jsonl.gz")
+    until = SINCE + 3 * HOUR_MS
+
+    async def scenario(simulator, exchanges):
+        interrupted = {venue: _Interrupted(exchange, SINCE + 2 * HOUR_MS) for venue, exchange in exchanges.items()}
+        jobs = [(venue, SYMBOL, 'trade', SINCE, until, '1m') for venue in exchanges]
+        downloader = HistoryDownloader(interrupted, output)
+        first = await downloader.download(jobs)
+        checkpoints = {venue: downloader.state["jobs"][f"{venue} {SYMBOL} trade"]["cursor_ms"] for venue in exchanges}
+        # Arrêt brutal pendant l'écriture d'un morceau : des octets sans point de contrôle.
+        with open(output, 'ab') as f: f.write(b"\x1f\x8b partial member")
+        recorded = {venue: _Interrupted(exchange) for venue, exchange in exchanges.items()}
+        summary = await HistoryDownloader(recorded, output).download(jobs)
+        return simulator, first, summary, checkpoints, {venue: proxy.cursors for venue, proxy in recorded.items()}
+
+    simulator, first, summary, checkpoints, cursors = _with_simulator(scenario)
+    assert all(str(result).startswith("failed") for result in first.values())
+    ids = _trade_ids(output)
+    for venue in ("Binance", "OKX"):
+        assert ids[venue] == _expected_ids(simulator, venue, until)
+        assert len(set(ids[venue])) == len(ids[venue])
+        assert summary[f"{venue} {SYMBOL} trade"] == len(ids[venue])
+        # Seules les heures après le point de contrôle sont redemandées.
+        assert SINCE < checkpoints[venue] < until
+        assert cursors[venue] and min(cursors[venue]) >= checkpoints[venue]
@@ -0,0 +1,51 @@
+# tests/test_log_setup.py
+import io, json, logging
+from utils.log_setup import RATE_LIMITED, LazyQueueHandler, RateLimitFilter, setup_logging, stop_logging
+
+
+def _record(name: str, msg: str, level=logging.WARNING, extra=None):
+    record = logging.LogRecord(name, level, __file__, 0, msg, (1,), None)
+    record.__dict__.update(extra or {})
+    return record
+
+
+def test_only_listed_loggers_and_marked_records_are_limited():
+    limiter = RateLimitFilter(60.0, loggers=("DataEngine",))
+    assert [limiter.filter(_record("DataEngine", "gap %s")) for _ in range(3)] == [True, False, False]
+    # Enfant d'un logger listé, ou message marqué RATE_LIMITED : limités aussi.
+    assert [limiter.filter(_record("DataEngine.books", "gap %s")) for _ in range(2)] == [True, False]
+    assert [limiter.filter(_record("StrategyEngine", "skip %s", extra=RATE_LIMITED)) for _ in range(2)] == [True, False]
+    # Couverture, risque, erreurs : jamais écrêtés.
+    assert all(limiter.filter(_record("HedgeEngine", "residual %s")) for _ in range(3))
+    assert all(limiter.filter(_record("DataEngine", "gap %s", level=logging.ERROR)) for _ in range(3))
+
+
+def test_suppressed_repeats_are_counted_on_the_next_record():
+    limiter = RateLimitFilter(60.0, loggers=("DataEngine",))
+    for _ in range(4): limiter.filter(_record("DataEngine", "gap %s"))
+    limiter._last.clear()  # l'intervalle est écoulé
+    record = _record("DataEngine", "gap %s")
+    assert limiter.filter(record) and record.suppressed == 3
+
+
+def test_records_are_queued_unformatted_and_written_as_json():
+    record = _record("DataEngine", "gap %s")
+    # Le formatage (msg % args) reste au thread d'écoute.
+    assert LazyQueueHandler(None).prepare(record) is record and record.args == (1,) and record.msg == "gap %s"
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    stream = io.StringIO()
+    try:
+        setup_logging('INFO', fmt='json', rate_limit_s=60.0, stream=stream, rate_limited_loggers=("DataEngine",))
+        for _ in range(3): logging.getLogger("DataEngine").warning("gap on %s", "Binance", extra={"seq": 7})
+        logging.getLogger("HedgeEngine").warning("residual %.2f", 0.5)
+        logging.getLogger("HedgeEngine").debug("hidden")
+        stop_logging()
+    finally:
+        stop_logging()
+        for handler in list(root.handlers): root.removeHandler(handler)
+        for handler in handlers: root.addHandler(handler)
+        root.setLevel(level)
+    entries = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [(entry["logger"], entry["msg"]) for entry in entries] == [("DataEngine", "gap on Binance"), ("HedgeEngine", "residual 0.50")]
+    assert entries[0]["template"] == "gap on %s" and entries[0]["seq"] == 7
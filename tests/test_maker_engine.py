@@ -0,0 +1,54 @@
+# tests/test_maker_engine.py
+import math
+from engine.data_engine import OrderBook
+from engine.maker_engine import MakerEngine, QueuePositionEstimator
+
+SYMBOL = "BTC/USDC"
+
+
+def _engine(bids, asks, **settings):
+    book = OrderBook()
+    book.update(bids, asks)
+    return MakerEngine({("Binance", SYMBOL): book}, **settings), book
+
+
+def test_queue_ahead_only_shrinks_by_its_share_of_decreases():
+    estimator = QueuePositionEstimator('buy', 100.0, 1.0, level_qty=2.0, now=0.0)
+    # Arrivées après nous : derrière, la file devant ne bouge pas.
+    estimator.on_level_update(5.0, now=1.0)
+    assert estimator.ahead == 2.0 and estimator.depletion_rate == 0.0
+    # 2 retirés sur 4 autres, dont la moitié devant nous.
+    estimator.on_level_update(3.0, now=2.0)
+    assert abs(estimator.ahead - 1.0) < 1e-12 and abs(estimator.depletion_rate - 2.0) < 1e-12
+    assert abs(estimator.fill_probability(5.0) - (1.0 - math.exp(-5.0))) < 1e-12
+    estimator.on_level_update(0.0, now=3.0)
+    assert estimator.ahead == 0.0 and estimator.fill_probability(5.0) == 1.0
+
+
+def test_quote_joins_short_queues_and_improves_long_ones_without_crossing():
+    maker, book = _engine([[100.0, 1.0]], [[100.5, 1.0]], join_max_queue_usd=500.0, tick=0.1)
+    assert maker.quote_price(book, 'buy') == 100.0
+    book.update([[100.0, 10.0]], [])
+    assert maker.quote_price(book, 'buy') == 100.1 and maker.quote_price(book, 'sell') == 100.5
+    # Notre propre quantité ne compte pas comme file d'attente.
+    assert maker.quote_price(book, 'buy', own_price=100.0, own_qty=9.5) == 100.0
+    # Écart d'un tick : améliorer croiserait, on rejoint.
+    book.update([], [[100.5, 0.0], [100.1, 10.0]])
+    assert maker.quote_price(book, 'buy') == 100.0
+
+
+def test_deltas_feed_tracked_quotes_and_decide_amends_or_cancels():
+    maker, book = _engine([[100.0, 4.0]], [[101.0, 4.0]], join_max_queue_usd=0.0, tick=0.1, min_amend_interval_s=0.0)
+    maker.track("q1", "Binance", SYMBOL, 'buy', 100.0, 1.0)
+    estimator = maker._quotes["q1"]["estimator"]
+    assert estimator.ahead == 4.0
+    book.update([[100.0, 2.0]], [])
+    maker.on_book_update("Binance", SYMBOL, [[100.0, 2.0]], [])
+    assert estimator.ahead == 2.0
+    # Surenchéri à 100.2 : rattrapable sous la borne, abandon au-delà.
+    book.update([[100.2, 3.0]], [])
+    assert maker.decide("q1", price_bound=100.5) == ('amend', 100.3)
+    assert maker.decide("q1", price_bound=100.1) == ('cancel', None)
+    maker.retrack("q1", "q2", 100.3, 1.0)
+    maker.untrack("q2", filled=True)
+    assert maker.stats()["tracked"] == 0 and maker.counters == {"placed": 1, "amended": 1, "cancelled": 1, "filled": 1}
@@ -0,0 +1,81 @@
+# tests/test_market_data_feed.py
+import asyncio, os, tempfile
+from engine.data_engine import DataEngine
+from engine.market_data_feed import MarketDataFeedClient, MarketDataPublisher
+
+SYMBOL = "BTC/USDC"
+
+
+def _snapshot(engine, platform, bids, asks, seq=1):
+    engine.process_update({"platform": platform, "symbol": SYMBOL, "data": {"bids": bids, "asks": asks}, "snapshot": True, "seq": seq})
+
+
+def _levels(engine, platform):
+    book = engine.order_books[(platform, SYMBOL)]
+    return list(book.bids.items()), list(book.asks.items()), book.valid
+
+
+def _mirror(publisher, frames):
+    client_engine = DataEngine()
+    client = MarketDataFeedClient(client_engine, "unix:/unused")
+    buffer = bytearray(bytes(publisher._key_frames) + b"".join(frames))
+    assert client._parse(buffer) == len(buffer)
+    return client_engine
+
+
+def test_snapshot_frames_carry_more_than_65535_levels():
+    publisher = MarketDataPublisher()
+    async def scenario():
+        _snapshot(publisher, "Binance", [[50000.0 - i * 0.01, 1.0 + i] for i in range(70000)], [[60000.0 + i * 0.01, 2.0] for i in range(70000)])
+        return publisher._snapshot_frame("Binance", SYMBOL)
+    client_engine = _mirror(publisher, [asyncio.run(scenario())])
+    assert len(client_engine.order_books[("Binance", SYMBOL)].bids) == 70000
+    assert _levels(client_engine, "Binance") == _levels(publisher, "Binance")
+
+
+def test_deltas_invalidations_and_trades_round_trip():
+    publisher = MarketDataPublisher()
+    async def scenario():
+        publisher._clients.add(object())  # publie sans client réel ; le flush n'est jamais appelé
+        publisher._flush_scheduled = True
+        _snapshot(publisher, "OKX", [[100.0, 1.0], [99.0, 2.0]], [[101.0, 1.0]])
+        publisher.process_update({"platform": "OKX", "symbol": SYMBOL, "data": {"bids": [[99.0, 0.0], [99.5, 3.0]], "asks": [[102.0, 1.5]]}, "seq": 2})
+        publisher.process_trade("OKX", SYMBOL, 100.5, 0.25, 'sell', 1700000000.0)
+        first = bytes(publisher._pending)
+        publisher.invalidate("OKX", SYMBOL, "test")
+        return first, bytes(publisher._pending)
+    first, everything = asyncio.run(scenario())
+    trades = []
+    client_engine = _mirror(publisher, [first])
+    client_engine.add_trade_listener(lambda *trade: trades.append(trade))
+    assert _levels(client_engine, "OKX") == ([(99.5, 3.0), (100.0, 1.0)], [(101.0, 1.0), (102.0, 1.5)], True)
+    client_engine = DataEngine()
+    client_engine.add_trade_listener(lambda *trade: trades.append(trade))
+    client = MarketDataFeedClient(client_engine, "unix:/unused")
+    client._parse(bytearray(bytes(publisher._key_frames) + everything))
+    assert trades == [("OKX", SYMBOL, 100.5, 0.25, 'sell', 1700000000.0)]
+    assert _levels(client_engine, "OKX") == ([], [], False)
+
+
+def test_late_joiner_starts_from_snapshots():
+    async def scenario(address):
+        publisher = MarketDataPublisher()
+        _snapshot(publisher, "Binance", [[100.0, 1.0]], [[101.0, 1.0]])
+        _snapshot(publisher, "OKX", [[100.5, 2.0]], [[101.5, 2.0]])
+        publisher.process_update({"platform": "Binance", "symbol": SYMBOL, "data": {"bids": [[100.2, 0.5]], "asks": []}, "seq": 2})
+        server = asyncio.create_task(publisher.serve(address))
+        await asyncio.sleep(0.05)
+        client_engine = DataEngine()
+        client = asyncio.create_task(MarketDataFeedClient(client_engine, address).run())
+        await asyncio.sleep(0.1)
+        # Après l'arrivée : diffusé en delta.
+        publisher.process_update({"platform": "OKX", "symbol": SYMBOL, "data": {"bids": [], "asks": [[101.2, 1.0]]}, "seq": 2})
+        await asyncio.sleep(0.1)
+        mirrored = [(_levels(client_engine, platform), _levels(publisher, platform)) for platform in ("Binance", "OKX")]
+        for task in (client, server): task.cancel()
+        await asyncio.gather(client, server, return_exceptions=True)
+        return mirrored
+    with tempfile.TemporaryDirectory() as directory:
+        mirrored = asyncio.run(scenario(f"unix:{os.path.join(directory, 'feed.sock')}"))
+    for received, published in mirrored:
+        assert received == published and received[2]
@@ -0,0 +1,50 @@
+# tests/test_market_metadata.py
+import asyncio
+from execution.market_metadata import TICK_SIZE, MarketMetadataRegistry, SymbolMetadata
+
+SYMBOL = "BTC/USDC"
+
+
+def _registry():
+    registry = MarketMetadataRegistry()
+    registry.set("Binance", SYMBOL, SymbolMetadata(0.1, 0.1, tick_size=0.01, lot_size=0.001, min_amount=0.002, min_notional=10.0))
+    return registry
+
+
+def test_prices_round_away_from_aggression_and_amounts_down_to_the_lot():
+    registry = _registry()
+    assert registry.validate("Binance", SYMBOL, 'buy', 0.12349, 60000.019) == (0.123, 60000.01, None)
+    assert registry.validate("Binance", SYMBOL, 'sell', 0.12349, 60000.011) == (0.123, 60000.02, None)
+    # Déjà sur le pas : inchangé malgré l'erreur de représentation binaire.
+    assert registry.validate("Binance", SYMBOL, 'sell', 0.3, 0.07) == (0.3, 0.07, "notional 0.0210 below minimum 10.0000")
+    assert registry.validate("Binance", SYMBOL, 'buy', 0.3, 60000.07)[:2] == (0.3, 60000.07)
+
+
+def test_orders_below_the_minimums_are_rejected_locally():
+    registry = _registry()
+    amount, _, error = registry.validate("Binance", SYMBOL, 'buy', 0.0019, 60000.0)
+    assert amount == 0.001 and error.startswith("amount")
+    assert registry.validate("Binance", SYMBOL, 'buy', 0.0009, 60000.0)[2].startswith("amount")
+    assert registry.rejected == 2 and registry.stats()["rejected_locally"] == 2
+    # Symbole inconnu : transmis tel quel.
+    assert registry.validate("OKX", SYMBOL, 'buy', 0.12349, 60000.019) == (0.12349, 60000.019, None)
+
+
+class _Exchange:
+    id, precisionMode = "okx", TICK_SIZE
+    has = {'fetchTradingFees': True}
+    markets = {SYMBOL: {"maker": 0.0008, "taker": 0.001, "precision": {"price": 0.1, "amount": 0.0001}, "limits": {"amount": {"min": 0.0001}, "cost": {"min": 5}}}}
+
+    async def fetch_trading_fees(self):
+        return {SYMBOL: {"maker": 0.0005, "taker": 0.0007}, "ETH/USDC": {"maker": 0.0, "taker": 0.0}}
+
+
+def test_refresh_reads_precision_limits_and_the_account_fee_tier():
+    registry = MarketMetadataRegistry()
+    asyncio.run(registry.refresh_venue("OKX", _Exchange(), [SYMBOL]))
+    entry = registry.get("OKX", SYMBOL)
+    assert (entry.tick_size, entry.lot_size, entry.min_amount, entry.min_notional) == (0.1, 0.0001, 0.0001, 5.0)
+    fees = registry.fees("OKX", SYMBOL)
+    assert abs(fees['maker'] - 0.05) < 1e-12 and abs(fees['taker'] - 0.07) < 1e-12 and registry.fees("OKX") == fees
+    assert registry.fees("Kraken") == MarketMetadataRegistry.DEFAULT_FEES
+    assert registry.validate("OKX", SYMBOL, 'sell', 0.00015, 60000.01) == (0.0001, 60000.1, None)
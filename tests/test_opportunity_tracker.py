@@ -0,0 +1,41 @@
+# tests/test_opportunity_tracker.py
+from engine.data_engine import DataEngine
+from engine.opportunity_tracker import OpportunityTracker
+
+SYMBOL = "BTC/USDC"
+FEES = lambda platform, symbol: {'maker': 0.0, 'taker': 0.01}
+
+
+def _setup():
+    now = [0.0]
+    data_engine = DataEngine()
+    tracker = OpportunityTracker(data_engine.order_books, FEES, clock=lambda: now[0])
+    data_engine.add_listener(tracker.on_book_update)
+    book = lambda platform, bid, ask: data_engine.process_update(
+        {"platform": platform, "symbol": SYMBOL, "data": {"bids": [[bid, 1.0]], "asks": [[ask, 1.0]]}, "snapshot": True, "seq": 1})
+    book("Binance", 59990.0, 60000.0)
+    book("OKX", 59980.0, 60010.0)
+    return now, data_engine, tracker, book
+
+
+def test_episode_lifetime_is_recorded():
+    now, _, tracker, book = _setup()
+    now[0] = 1.0
+    book("OKX", 60100.0, 60110.0)
+    assert len(tracker._open) == 1
+    now[0] = 1.3
+    book("OKX", 59980.0, 60010.0)
+    assert tracker.episodes == 1 and abs(tracker.lifetime_max_s - 0.3) < 1e-9 and tracker.outlived_latency == 1
+
+
+def test_episode_open_through_an_outage_is_discarded():
+    now, data_engine, tracker, book = _setup()
+    now[0] = 1.0
+    book("OKX", 60100.0, 60110.0)
+    now[0] = 1.1
+    data_engine.invalidate("OKX", SYMBOL, "feed lost")
+    assert not tracker._open and tracker.interrupted == 1
+    # Resynchronisé 30 s plus tard, spread disparu : aucun épisode de 30 s n'est compté.
+    now[0] = 31.0
+    book("OKX", 59980.0, 60010.0)
+    assert tracker.episodes == 0 and tracker.stats()["interrupted"] == 1
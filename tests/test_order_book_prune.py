@@ -0,0 +1,88 @@
+# tests/test_order_book_prune.py
+import random
+from engine.consolidated_book import ConsolidatedBooks
+from engine.data_engine import DataEngine, OrderBook
+
+SYMBOL = "BTC/USDC"
+
+
+def _random_diff(rng, mid: float, levels: int = 400, tick: float = 0.01):
+    bids = [[round(mid - tick * rng.randint(1, levels), 2), 0.0 if rng.random() < 0.2 else round(rng.uniform(0.001, 2), 5)] for _ in range(rng.randint(1, 12))]
+    asks = [[round(mid + tick * rng.randint(1, levels), 2), 0.0 if rng.random() < 0.2 else round(rng.uniform(0.001, 2), 5)] for _ in range(rng.randint(1, 12))]
+    return bids, asks
+
+
+def test_depth_prune_keeps_the_best_levels_within_its_slack():
+    max_depth = 40
+    engine, reference = DataEngine(book_max_depth=max_depth), OrderBook()
+    removals = []
+    engine.add_listener(lambda platform, symbol, bids, asks: removals.append((bids, asks)))
+    rng = random.Random(7)
+    engine.process_update({"platform": "Binance", "symbol": SYMBOL, "data": {"bids": [], "asks": []}, "snapshot": True})
+    book = engine.order_books[("Binance", SYMBOL)]
+    for _ in range(2000):
+        bids, asks = _random_diff(rng, 60000.0)
+        reference.update(bids, asks)
+        pruned_before = book.pruned
+        removals.clear()
+        engine.process_update({"platform": "Binance", "symbol": SYMBOL, "data": {"bids": bids, "asks": asks}})
+        # Jamais plus d'un quart au-delà de la profondeur ; ce qui reste est tel que dans le carnet complet.
+        assert len(book.bids) <= book._prune_above and len(book.asks) <= book._prune_above
+        assert all(reference.bids.get(price) == qty for price, qty in book.bids.items())
+        assert all(reference.asks.get(price) == qty for price, qty in book.asks.items())
+        if book.pruned > pruned_before:
+            # Élagage : seuls les pires niveaux partent, annoncés comme supprimés aux listeners.
+            removed_bids, removed_asks = removals[-1]
+            assert all(qty == 0 for _, qty in removed_bids + removed_asks)
+            if removed_bids:
+                assert len(book.bids) == max_depth and max(price for price, _ in removed_bids) < book.bids.peekitem(0)[0]
+            if removed_asks:
+                assert len(book.asks) == max_depth and min(price for price, _ in removed_asks) > book.asks.peekitem(-1)[0]
+    assert book.pruned > 0
+    # Le meilleur niveau n'est jamais élagué.
+    assert book.bids.peekitem(-1) == reference.bids.peekitem(-1) and book.asks.peekitem(0) == reference.asks.peekitem(0)
+
+
+def test_band_prune_drops_levels_outside_the_band():
+    book = OrderBook(band_pct=1.0)
+    book.update([[99.5, 1.0], [99.2, 1.0]], [[100.5, 1.0], [100.8, 1.0]])
+    assert book.prune() == ([], [])
+    # Sous 1.25 bande de la mi : toléré ; au-delà, la bande est rétablie à 1 %.
+    book.update([[98.9, 1.0], [98.5, 1.0]], [[101.1, 1.0], [101.6, 1.0]])
+    removed_bids, removed_asks = book.prune()
+    assert list(removed_bids) == [98.5, 98.9] and list(removed_asks) == [101.1, 101.6]
+    assert list(book.bids) == [99.2, 99.5] and list(book.asks) == [100.5, 100.8]
+
+
+def test_consolidated_book_follows_pruned_venue_books():
+    engine, consolidated = DataEngine(book_max_depth=25), ConsolidatedBooks()
+    engine.add_listener(consolidated.on_book_update)
+    rng = random.Random(11)
+    for venue in ("Binance", "OKX"):
+        engine.process_update({"platform": venue, "symbol": SYMBOL, "data": {"bids": [], "asks": []}, "snapshot": True})
+    for _ in range(1000):
+        venue = rng.choice(("Binance", "OKX"))
+        bids, asks = _random_diff(rng, 60000.0, levels=200)
+        engine.process_update({"platform": venue, "symbol": SYMBOL, "data": {"bids": bids, "asks": asks}})
+    book = consolidated.get(SYMBOL)
+    for side in ("bids", "asks"):
+        expected = {}
+        for venue in ("Binance", "OKX"):
+            for price, qty in getattr(engine.order_books[(venue, SYMBOL)], side).items():
+                expected.setdefault(price, {})[venue] = qty
+        assert {price: venues for price, venues in book.contributions[side].items()} == expected
+    assert sum(b.pruned for b in engine.order_books.values()) > 0
+
+
+def test_memory_estimate_tracks_the_allocated_levels():
+    import tracemalloc
+    bids = [[str(60000 - i * 0.01), str(1.5 + i)] for i in range(20000)]
+    asks = [[str(60001 + i * 0.01), str(2.5 + i)] for i in range(20000)]
+    tracemalloc.start()
+    try:
+        book = OrderBook()
+        book.update(bids, asks)
+        allocated = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    assert 0.75 * allocated < book.memory_bytes() < 1.25 * allocated
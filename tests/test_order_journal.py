@@ -0,0 +1,34 @@
+# tests/test_order_journal.py
+from execution.order_journal import OrderJournal
+
+
+def test_client_ids_are_scoped_to_the_instance(tmp_path):
+    journal = OrderJournal(str(tmp_path / "ab.jsonl"), instance_id="ab")
+    other = OrderJournal(str(tmp_path / "a.jsonl"), instance_id="a")
+    client_id = journal.intent("Binance", "BTC/USDC", "buy", 1.0, 60000.0)
+    assert journal.is_ours({"clientOrderId": client_id})
+    # "arba..." est aussi un préfixe de l'instance "ab" : l'horodatage de largeur fixe les distingue.
+    assert not other.is_ours({"clientOrderId": client_id})
+    assert not journal.is_ours({"clientOrderId": other.intent("Binance", "BTC/USDC", "buy", 1.0, 60000.0)})
+
+
+def test_fills_of_replaced_ids_add_up_across_a_restart(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = OrderJournal(path, instance_id="main")
+    trade_id = journal.open_trade("maker")
+    client_id = journal.intent("Binance", "BTC/USDC", "buy", 1.0, 60000.0)
+    journal.ack(client_id, "1")
+    # Annule-remplace : l'ordre 1 a rempli 0.4 avant d'être remplacé par l'ordre 2.
+    journal.replace("Binance", "1", "2")
+    assert journal.replaced_ids(journal.orders[client_id]) == ["1"]
+    journal.done_by_venue_id("Binance", "1", 0.4, "canceled")
+    assert journal.orders[client_id]["status"] is None
+    journal.compact()
+    journal.close()
+
+    journal = OrderJournal(path, instance_id="main")
+    assert journal.replaced_ids(journal.orders[client_id]) == []
+    journal.done_by_venue_id("Binance", "2", 0.6, "closed")
+    assert journal.orders[client_id]["filled"] == 1.0
+    assert journal.exposure(trade_id) == {"BTC/USDC": 1.0}
+    journal.close()
@@ -0,0 +1,32 @@
+# tests/test_profiler.py
+import asyncio, time
+from utils.profiler import SamplingProfiler
+
+
+def _profile(workload, tmp_path):
+    async def run():
+        profiler = SamplingProfiler(0.002, str(tmp_path))
+        assert profiler.start()
+        await workload()
+        return profiler.stop()
+    return asyncio.run(run())
+
+
+def test_busy_loop_is_not_reported_idle(tmp_path):
+    async def busy():
+        # La boucle repasse par select (timeout 0) entre deux étapes, sans jamais attendre.
+        deadline = time.monotonic() + 0.4
+        while time.monotonic() < deadline:
+            sum(i * i for i in range(5000))
+            await asyncio.sleep(0)
+    summary = _profile(busy, tmp_path)
+    with open(summary["file"], encoding="utf-8") as f:
+        counts = {line.rsplit(" ", 1)[0]: int(line.rsplit(" ", 1)[1]) for line in f}
+    assert summary["samples"] > 0 and counts.get("idle", 0) <= summary["samples"] * 0.1
+    assert summary["loop_cpu_s"] > 0.1
+    assert any("test_profiler" in frame for frame in summary["top_frames_pct"])
+
+
+def test_waiting_loop_is_reported_idle(tmp_path):
+    summary = _profile(lambda: asyncio.sleep(0.4), tmp_path)
+    assert summary["idle_pct"] > 70
@@ -0,0 +1,73 @@
+# tests/test_risk_engine.py
+import asyncio
+from backtest.simulated_broker import SimulatedBroker
+from engine.data_engine import OrderBook
+from engine.hedge_engine import HedgeEngine
+from execution.risk_engine import RiskEngine
+from execution.smart_order_router import SmartOrderRouter
+from utils.notifier import Notifier
+
+SYMBOL = "BTC/USDC"
+
+
+def _setup(**limits):
+    books = {}
+    for venue in ("Binance", "OKX"):
+        book = OrderBook()
+        book.update([[59990.0, 5.0]], [[60010.0, 5.0]])
+        books[(venue, SYMBOL)] = book
+    broker = SimulatedBroker(books, balances={venue: {"BTC": 10.0, "USDC": 1_000_000.0} for venue in ("Binance", "OKX")})
+    risk = RiskEngine(broker, Notifier(None, None), order_books=books, **limits)
+    router = SmartOrderRouter(risk, books)
+    return risk, HedgeEngine(router, risk, Notifier(None, None), fill_timeout_s=0.05), books
+
+
+def test_kill_switch_blocks_entries_but_not_the_hedge():
+    risk, hedge_engine, _ = _setup()
+    async def scenario():
+        await risk.create_limit_order("Binance", SYMBOL, 'buy', 0.5, 60010.0)
+        risk.killed = "test"
+        assert await risk.create_limit_order("Binance", SYMBOL, 'buy', 0.1, 60010.0) is None
+        return await hedge_engine.flatten(SYMBOL, 0.5, origin="test")
+    incident = asyncio.run(scenario())
+    assert abs(incident["residual"]) < 1e-9 and abs(risk.position(SYMBOL)) < 1e-9
+    assert risk.reduce_only_orders >= 1 and risk.rejections == {"kill_switch": 1}
+
+
+def test_hedge_goes_through_the_entry_limits():
+    # Inventaire et débit bloqueraient la couverture ; le notionnel par ordre s'applique toujours.
+    risk, hedge_engine, _ = _setup(max_order_usd=40000.0, max_venue_inventory_usd=1000.0, max_orders_per_s=0.001)
+    risk.adopt_position(SYMBOL, 0.5)
+    assert asyncio.run(risk.create_limit_order("Binance", SYMBOL, 'sell', 0.5, 59990.0)) is None
+    incident = asyncio.run(hedge_engine.flatten(SYMBOL, 0.5, origin="test"))
+    assert abs(incident["residual"]) < 1e-9
+    assert sum(qty for qty in risk._inventory.values()) == -0.5
+
+
+def test_reduce_only_must_reduce_the_position():
+    risk, _, _ = _setup(max_order_usd=20000.0)
+    risk.killed = "test"
+    assert asyncio.run(risk.create_limit_order("Binance", SYMBOL, 'sell', 0.1, 59990.0, reduce_only=True)) is None
+    risk.adopt_position(SYMBOL, 0.2)
+    # Mauvais sens, puis au-delà du plafond de notionnel.
+    assert asyncio.run(risk.create_limit_order("Binance", SYMBOL, 'buy', 0.1, 60010.0, reduce_only=True)) is None
+    risk.adopt_position(SYMBOL, 0.3)
+    assert asyncio.run(risk.create_limit_order("Binance", SYMBOL, 'sell', 0.5, 59990.0, reduce_only=True)) is None
+    assert risk.rejections == {"reduce_only": 2, "order_notional": 1}
+    # Plus grand que la position : ramené à ce qu'il en reste.
+    risk.max_order_usd = None
+    order = asyncio.run(risk.create_limit_order("Binance", SYMBOL, 'sell', 2.0, 59990.0, reduce_only=True))
+    assert order["filled"] == 0.5 and abs(risk.position(SYMBOL)) < 1e-9
+
+
+def test_loss_on_a_marked_position_trips_the_kill_switch():
+    risk, _, books = _setup(max_daily_loss_usd=100.0)
+    async def scenario():
+        await risk.create_limit_order("Binance", SYMBOL, 'buy', 1.0, 60010.0)
+        assert not risk.killed
+        # Le marché baisse sans nouvel ordre ni remplissage : la position valorisée au mid suffit.
+        books[("Binance", SYMBOL)].update([[59990.0, 0.0], [59800.0, 5.0]], [[60010.0, 0.0], [59820.0, 5.0]])
+        risk.on_book_update("Binance", SYMBOL)
+        await asyncio.sleep(0)
+        return risk.killed
+    assert asyncio.run(scenario()).startswith("daily loss")
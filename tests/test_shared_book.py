@@ -0,0 +1,79 @@
+# tests/test_shared_book.py
+import threading
+from engine.shared_book import SharedBookPublisher, SharedBookTable, SharedOrderBookView
+
+KEY = ("Binance", "BTC/USDC")
+
+
+def _tables(depth=3):
+    writer = SharedBookTable([KEY, ("OKX", "BTC/USDC")], depth=depth, create=True)
+    return writer, SharedBookTable(writer.keys, depth=depth, name=writer.name)
+
+
+def _close(*tables):
+    for table in tables: table.close()
+    tables[0].unlink()
+
+
+def test_reader_sees_published_levels_truncated_to_depth():
+    writer, reader = _tables()
+    try:
+        writer.publish(KEY, [(100.0 - i, 1.0 + i) for i in range(5)], [(101.0, 2.0)], timestamp=12.5)
+        seq, timestamp, bids, asks = reader.read(reader.index[KEY])
+        assert seq == 2 and timestamp == 12.5
+        assert bids == [(100.0, 1.0), (99.0, 2.0), (98.0, 3.0)] and asks == [(101.0, 2.0)]
+        assert reader.read(reader.index[KEY], n=1)[2] == [(100.0, 1.0)]
+        # L'autre emplacement n'a jamais été écrit.
+        assert reader.read(reader.index[("OKX", "BTC/USDC")]) == (0, 0.0, [], [])
+    finally:
+        _close(reader, writer)
+
+
+def test_odd_sequence_gives_up_after_read_retries():
+    writer, reader = _tables()
+    try:
+        writer.publish(KEY, [(100.0, 1.0)], [(101.0, 1.0)])
+        # Un écrivain mort en pleine publication laisse la séquence impaire.
+        writer._seqs[writer.index[KEY] * writer.slot_words] += 1
+        reader.READ_RETRIES = 5
+        assert reader.read(reader.index[KEY]) == (None, None, [], [])
+        view = SharedOrderBookView(reader, KEY)
+        assert view.get_bids(1) == [] and not view.valid
+        writer._seqs[writer.index[KEY] * writer.slot_words] += 1
+        assert view.get_bids(1) == [(100.0, 1.0)] and view.valid
+    finally:
+        _close(reader, writer)
+
+
+def test_reads_never_mix_two_versions():
+    writer, reader = _tables(depth=10)
+    slot, done, torn = reader.index[KEY], threading.Event(), []
+    def write():
+        for version in range(1, 20000):
+            writer.publish(KEY, [(float(version), 1.0)] * 10, [(version + 0.5, 1.0)] * 10)
+        done.set()
+    thread = threading.Thread(target=write)
+    try:
+        thread.start()
+        while not done.is_set():
+            seq, _, bids, asks = reader.read(slot)
+            if seq is None or not bids: continue
+            prices = {price for price, _ in bids} | {price - 0.5 for price, _ in asks}
+            if len(prices) != 1: torn.append((seq, bids, asks))
+        thread.join()
+        assert torn == []
+    finally:
+        _close(reader, writer)
+
+
+def test_publisher_shares_invalidated_books_as_empty():
+    table = SharedBookTable([KEY], depth=2, create=True)
+    try:
+        publisher = SharedBookPublisher(table)
+        publisher.process_update({"platform": KEY[0], "symbol": KEY[1], "data": {"bids": [[100.0, 1.0]], "asks": [[101.0, 1.0]]}, "snapshot": True, "seq": 1})
+        view = SharedOrderBookView(table, KEY)
+        assert view.get_bids(5) == [(100.0, 1.0)] and view.get_asks(5) == [(101.0, 1.0)]
+        publisher.invalidate(*KEY, "test")
+        assert view.get_bids(5) == [] and view.get_asks(5) == []
+    finally:
+        _close(table)
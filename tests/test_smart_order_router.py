@@ -0,0 +1,74 @@
+# tests/test_smart_order_router.py
+import asyncio
+from backtest.simulated_broker import SimulatedBroker
+from engine.data_engine import OrderBook
+from execution.smart_order_router import SmartOrderRouter
+
+SYMBOL = "BTC/USDC"
+FEES = {"Binance": {'maker': 0.08, 'taker': 0.1}, "OKX": {'maker': 0.08, 'taker': 0.1}}
+RICH = {venue: {"BTC": 100.0, "USDC": 10_000_000.0} for venue in FEES}
+
+
+def _books(asks_by_venue, bids_by_venue=None):
+    books = {}
+    for venue, asks in asks_by_venue.items():
+        book = OrderBook()
+        book.update((bids_by_venue or {}).get(venue, [[59990.0, 5.0]]), asks)
+        books[(venue, SYMBOL)] = book
+    return books
+
+
+def _router(books, fees=FEES):
+    broker = SimulatedBroker(books, venues=tuple(fees), balances=RICH, fees=fees)
+    return SmartOrderRouter(broker, books), broker
+
+
+def test_thin_top_of_book_splits_across_venues():
+    # 0.5 BTC au meilleur prix sur chaque venue : 1 BTC ne tient sur aucune seule.
+    books = _books({"Binance": [[60000.0, 0.5], [60050.0, 5.0]], "OKX": [[60001.0, 0.5], [60060.0, 5.0]]})
+    router, broker = _router(books)
+    report = asyncio.run(router.route(SYMBOL, 'buy', 1.0, timeout_s=0.1))
+    assert set(report["children"]) == {"Binance", "OKX"}
+    assert report["children"]["Binance"] == (0.5, 60000.0)
+    assert report["children"]["OKX"] == (0.5, 60001.0)
+    assert [r["filled"] for r in report["children_results"]] == [0.5, 0.5]
+    assert report["filled"] == 1.0
+    assert abs(report["avg_price"] - 60000.5) < 1e-6
+    assert broker.exchanges["Binance"].balances["BTC"] == 100.5 and broker.exchanges["OKX"].balances["BTC"] == 100.5
+
+
+def test_split_ranks_levels_by_fee_inclusive_price():
+    # OKX est moins cher avant frais, plus cher après : Binance est balayée d'abord.
+    fees = {"Binance": {'maker': 0.0, 'taker': 0.0}, "OKX": {'maker': 0.1, 'taker': 0.5}}
+    books = _books({"Binance": [[60100.0, 0.4], [60400.0, 5.0]], "OKX": [[60000.0, 5.0]]})
+    router, _ = _router(books, fees)
+    plan = router.plan(SYMBOL, 'buy', 1.0)
+    assert list(plan["children"]) == ["Binance", "OKX"]
+    assert plan["children"]["Binance"] == (0.4, 60100.0)
+    assert abs(plan["children"]["OKX"][0] - 0.6) < 1e-9
+
+
+def test_child_below_venue_minimum_is_merged():
+    # Le reste sur OKX ferait 0.00005 BTC (3 USDC), sous le notionnel minimum de 5 USDC.
+    books = _books({"Binance": [[60000.0, 0.01], [60100.0, 5.0]], "OKX": [[60001.0, 5.0]]})
+    router, _ = _router(books)
+    report = asyncio.run(router.route(SYMBOL, 'buy', 0.01005, timeout_s=0.1))
+    assert list(report["children"]) == ["Binance"]
+    assert abs(report["children"]["Binance"][0] - 0.01005) < 1e-12
+    # Envoyé en un seul ordre accepté (au pire prix des deux), au lieu d'un enfant rejeté sur OKX.
+    [child] = report["children_results"]
+    assert child["order_id"] is not None and child["limit_price"] == 60001.0
+    assert report["filled"] >= 0.01
+
+
+def test_sell_split_and_partial_depth_remainder_goes_to_best_venue():
+    books = _books({"Binance": [[60010.0, 5.0]], "OKX": [[60010.0, 5.0]]},
+                   {"Binance": [[60000.0, 0.3]], "OKX": [[59999.0, 0.2]]})
+    router, _ = _router(books)
+    plan = router.plan(SYMBOL, 'sell', 1.0)
+    assert plan["estimate"]["filled"] == 0.5
+    report = asyncio.run(router.route(SYMBOL, 'sell', 1.0, timeout_s=0.05))
+    # 0.5 sans profondeur connue : ajouté à la meilleure venue, à son pire prix.
+    assert report["children"]["Binance"] == (0.8, 60000.0)
+    assert report["children"]["OKX"] == (0.2, 59999.0)
+    assert abs(sum(r["filled"] for r in report["children_results"]) - report["filled"]) < 1e-12
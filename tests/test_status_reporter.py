@@ -0,0 +1,67 @@
+# tests/test_status_reporter.py
+import asyncio, json, socket, threading
+from engine.data_engine import OrderBook
+from utils.status_reporter import StatusReporter
+
+SYMBOL = "BTC/USDC"
+
+
+def _books():
+    book = OrderBook()
+    book.update([[100.0, 1.0], [99.0, 2.0], [98.0, 3.0]], [[101.0, 1.0], [102.0, 2.0]])
+    return {("Binance", SYMBOL): book, ("OKX", SYMBOL): OrderBook()}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_snapshot_copies_top_levels_and_sources():
+    reporter = StatusReporter(_books(), depth=2)
+    reporter.add_source("strategy", lambda: {"active_trades": 1})
+    reporter.add_source("broken", lambda: 1 / 0)
+    snapshot = reporter.snapshot()
+    binance, okx = snapshot["books"]
+    assert binance["bids"] == [(100.0, 1.0), (99.0, 2.0)] and binance["asks"] == [(101.0, 1.0), (102.0, 2.0)]
+    assert okx["bids"] == [] and okx["asks"] == []
+    assert snapshot["strategy"] == {"active_trades": 1} and "error" in snapshot["broken"] and "cpu_pct" in snapshot["process"]
+    text = StatusReporter.render(snapshot, depth=2)
+    assert "--- Binance (BTC/USDC) ---" in text and "101.0" in text and "Order book is empty or incomplete." in text
+
+
+def test_terminal_mode_skips_a_round_while_stdout_is_blocked():
+    reporter = StatusReporter(_books(), interval=0.01)
+    released, writes = threading.Event(), []
+    def write(snapshot):
+        writes.append(snapshot)
+        released.wait()
+    reporter._write = write
+    async def scenario():
+        task = asyncio.create_task(reporter.run())
+        await asyncio.sleep(0.1)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    try: asyncio.run(scenario())
+    finally: released.set()
+    # Une seule écriture en cours : les tours suivants sont sautés, pas mis en file.
+    assert len(writes) == 1
+
+
+def test_http_mode_serves_the_snapshot():
+    port = _free_port()
+    reporter = StatusReporter(_books(), mode='http', port=port, depth=1)
+    async def scenario():
+        task = asyncio.create_task(reporter.run())
+        await asyncio.sleep(0.05)
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"GET /status HTTP/1.1\r\n\r\n")
+        response = await reader.read()
+        writer.close()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return response
+    head, _, body = asyncio.run(scenario()).partition(b"\r\n\r\n")
+    assert head.split()[1] == b"200"
+    assert json.loads(body)["books"][0] == {"platform": "Binance", "symbol": SYMBOL, "bids": [[100.0, 1.0]], "asks": [[101.0, 1.0]]}
@@ -0,0 +1,59 @@
+# tests/test_strategy_dispatcher.py
+import asyncio
+import pytest
+from engine.data_engine import DataEngine
+from engine.strategy_dispatcher import Strategy, StrategyDispatcher
+from execution.order_journal import current_strategy
+
+SYMBOL = "BTC/USDC"
+
+
+class _Recorder(Strategy):
+    def __init__(self, name, subscriptions=None, delay_s=0.0, budget_ms=None):
+        self.name, self._subscriptions, self.delay_s, self.budget_ms = name, subscriptions, delay_s, budget_ms
+        self.seen = []
+
+    def subscriptions(self):
+        return self._subscriptions
+
+    async def on_book_update(self, platform, symbol, book):
+        self.seen.append((platform, book.get_bids(1)[0][0], current_strategy.get()))
+        await asyncio.sleep(self.delay_s)
+
+
+def _update(engine, platform, bid, seq):
+    engine.process_update({"platform": platform, "symbol": SYMBOL, "data": {"bids": [[bid, 1.0]], "asks": [[bid + 10, 1.0]]}, "snapshot": True, "seq": seq})
+
+
+def test_updates_are_routed_and_coalesced_per_strategy():
+    async def scenario():
+        engine = DataEngine()
+        dispatcher = StrategyDispatcher(engine, budget_ms=5.0)
+        slow = dispatcher.register(_Recorder("slow", delay_s=0.05))
+        okx = dispatcher.register(_Recorder("okx", subscriptions=[("OKX", SYMBOL)], budget_ms=1000.0))
+        task = asyncio.create_task(dispatcher.run())
+        await asyncio.sleep(0)
+        _update(engine, "Binance", 100.0, 1)
+        _update(engine, "OKX", 200.0, 1)
+        await asyncio.sleep(0.01)
+        # Pendant la première livraison lente : trois mises à jour par carnet, une seule livraison chacune.
+        for seq in (2, 3, 4):
+            _update(engine, "Binance", 100.0 + seq, seq)
+            _update(engine, "OKX", 200.0 + seq, seq)
+        await asyncio.sleep(0.3)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return dispatcher, slow, okx
+    dispatcher, slow, okx = asyncio.run(scenario())
+    assert slow.seen == [("Binance", 100.0, "slow"), ("OKX", 204.0, "slow"), ("Binance", 104.0, "slow")]
+    assert [platform for platform, _, _ in okx.seen] == ["OKX"] * len(okx.seen) and okx.seen[-1] == ("OKX", 204.0, "okx")
+    stats = dispatcher.stats()
+    assert stats["slow"]["updates"] == 8 and stats["slow"]["deliveries"] == 3 and stats["slow"]["coalesced"] == 5
+    assert stats["slow"]["overruns"] == 3 and stats["okx"]["overruns"] == 0 and stats["okx"]["subscriptions"] == ["OKX BTC/USDC"]
+
+
+def test_strategy_names_are_unique():
+    dispatcher = StrategyDispatcher(DataEngine())
+    dispatcher.register(_Recorder("arb"))
+    with pytest.raises(ValueError):
+        dispatcher.register(_Recorder("arb"))
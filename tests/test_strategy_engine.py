@@ -0,0 +1,50 @@
+# tests/test_strategy_engine.py
+import asyncio
+from backtest.simulated_broker import SimulatedBroker
+from engine.data_engine import OrderBook
+from engine.strategy_engine import StrategyEngine
+from utils.notifier import Notifier
+
+SYMBOL = "BTC/USDC"
+
+
+def _setup():
+    books = {}
+    for venue in ("Binance", "OKX"):
+        book = OrderBook()
+        book.update([[59990.0, 5.0]], [[60010.0, 5.0]])
+        books[(venue, SYMBOL)] = book
+    broker = SimulatedBroker(books, balances={venue: {"BTC": 10.0, "USDC": 1_000_000.0} for venue in ("Binance", "OKX")})
+    engine = StrategyEngine(books, broker, Notifier(None, None))
+    engine._cooldown = 0
+    engine.hedge_engine.fill_timeout_s = 0.05
+    return books, broker, engine
+
+
+def test_maker_leg_filled_before_the_other_is_rejected_is_hedged():
+    async def scenario():
+        books, broker, engine = _setup()
+        await broker.refresh_balances()
+        place = broker.create_limit_order
+        async def create_limit_order(platform, symbol, side, amount, price, post_only=False, reduce_only=False):
+            if side == 'sell' and post_only: raise RuntimeError("venue unavailable")
+            order = await place(platform, symbol, side, amount, price, post_only, reduce_only)
+            if order and side == 'buy':
+                # Le marché traverse la jambe d'achat avant que l'échec de l'autre soit connu.
+                books[(platform, symbol)].update([], [[price, 5.0]])
+                broker.on_book_update(platform, symbol)
+            return order
+        broker.create_limit_order = create_limit_order
+        try:
+            await engine.execute_maker_strategy(books[("Binance", SYMBOL)], books[("OKX", SYMBOL)], "Binance", "OKX", SYMBOL)
+        finally:
+            engine.process_pool.shutdown()
+        return broker, engine
+    broker, engine = asyncio.run(scenario())
+    buy = next(iter(broker.exchanges["Binance"].orders.values()))
+    assert buy["side"] == 'buy' and buy["filled"] > 0
+    assert engine.hedge_engine.counters["incidents"] == 1 and engine.hedge_engine.counters["flat"] == 1
+    assert abs(sum(venue.balances["BTC"] for venue in broker.exchanges.values()) - 20.0) < 1e-9
+    # Paire et réservation rendues malgré l'exception.
+    assert engine._active_trades == 0 and broker.ledger.open_reservations == 0
+    assert engine._pair_states == {}
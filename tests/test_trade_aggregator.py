@@ -0,0 +1,45 @@
+# tests/test_trade_aggregator.py
+import random
+from engine.trade_aggregator import TradeAggregator, OPEN, HIGH, LOW, CLOSE, VOLUME, BUY_VOLUME, TRADES, START
+
+KEY = ("Binance", "BTC/USDC")
+
+
+def test_bars_aggregate_ohlcv_per_resolution():
+    aggregator = TradeAggregator((1, 60), capacity=10, window_s=5)
+    for timestamp, price, qty, side in ((0.1, 100.0, 1.0, 'buy'), (0.5, 102.0, 2.0, 'sell'), (0.9, 99.0, 1.0, 'buy'), (1.2, 101.0, 0.5, 'sell')):
+        aggregator.on_trade(*KEY, price, qty, side, timestamp)
+    first, latest = aggregator.bar(*KEY, 1, ago=1), aggregator.bar(*KEY, 1)
+    assert (first[START], first[OPEN], first[HIGH], first[LOW], first[CLOSE], first[VOLUME], first[BUY_VOLUME], first[TRADES]) == (0, 100, 102, 99, 99, 4, 2, 3)
+    assert (latest[START], latest[OPEN], latest[VOLUME]) == (1, 101, 0.5)
+    minute = aggregator.bar(*KEY, 60)
+    assert (minute[OPEN], minute[HIGH], minute[LOW], minute[CLOSE], minute[VOLUME], minute[TRADES]) == (100, 102, 99, 101, 4.5, 4)
+    assert aggregator.bar(*KEY, 60, ago=1) is None
+
+
+def test_ring_keeps_the_last_capacity_bars():
+    aggregator = TradeAggregator((1,), capacity=8, window_s=2)
+    for second in range(20): aggregator.on_trade(*KEY, 100.0 + second, 1.0, 'buy', second + 0.5)
+    bars = aggregator.bars(*KEY, 1)
+    assert len(bars) == 8 and list(bars[:, START]) == list(range(12, 20))
+    assert list(bars[:, CLOSE]) == [100.0 + second for second in range(12, 20)]
+    assert aggregator.bar(*KEY, 1, ago=8) is None
+
+
+def test_rolling_window_matches_a_brute_force_sum():
+    rng = random.Random(7)
+    aggregator = TradeAggregator((1, 60), capacity=64, window_s=10)
+    trades, timestamp = [], 1000.0
+    for _ in range(2000):
+        timestamp += rng.expovariate(20) if rng.random() < 0.95 else rng.uniform(5, 15)
+        trade = (timestamp, rng.uniform(99, 101), rng.uniform(0.01, 1), rng.choice(('buy', 'sell')))
+        trades.append(trade)
+        aggregator.on_trade(*KEY, trade[1], trade[2], trade[3], trade[0])
+        # La fenêtre commence au début de la barre d'une seconde la plus ancienne qu'elle touche.
+        cutoff = timestamp - 10
+        inside = [t for t in trades if (t[0] // 1) + 1 > cutoff]
+        volume = sum(t[2] for t in inside)
+        assert abs(aggregator.volume(*KEY, now=timestamp) - volume) < 1e-6
+        assert abs(aggregator.vwap(*KEY, now=timestamp) - sum(t[1] * t[2] for t in inside) / volume) < 1e-6
+        assert abs(aggregator.buy_ratio(*KEY, now=timestamp) - sum(t[2] for t in inside if t[3] == 'buy') / volume) < 1e-6
+    assert aggregator.vwap(*KEY, now=timestamp + 60) is None and aggregator.volume(*KEY, now=timestamp + 60) == 0.0
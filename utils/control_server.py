@@ -0,0 +1,107 @@
+# utils/control_server.py
+import asyncio, hmac, logging
+from utils.http_server import JsonHttpServer
+
+class ControlServer:
+    """
+    Localhost HTTP control of a running bot (JSON in and out):
+      GET  /params                      strategy parameters and paused pairs
+      POST /params        {name: value} validated, then applied together between two evaluation passes
+      POST /pairs/pause   {venue_a, venue_b, symbol}   stops new trades on a venue pair
+      POST /pairs/resume  {venue_a, venue_b, symbol}
+      POST /resync        {platform?, symbol?}   invalidates books and fetches fresh snapshots (all by default)
+      POST /kill          {reason?}   risk engine kill switch; POST /kill/reset re-enables trading
+      GET  /profile                     profiler state and CPU time per task
+      POST /profile/start {interval_s?} starts the sampling profiler; POST /profile/stop writes the profile and returns its summary
+    Strategy changes are staged and applied by StrategyEngine between two evaluations, so evaluation never sees half of an update.
+    Every request must carry `token` in an X-Control-Token header and POSTs a JSON Content-Type. Requests
+    from a browser (Origin or Sec-Fetch-Site header) or naming another host (DNS rebinding) are refused,
+    so a web page cannot reach the API through the operator's browser.
+    """
+    APPLY_TIMEOUT_S = 5.0
+    TOKEN_HEADER = "x-control-token"
+
+    def __init__(self, strategy_engine, connectors=(), risk_engine=None, host: str = '127.0.0.1', port: int = 8766, profiler=None, token: str = None):
+        if not token: raise ValueError("the control API needs a token")
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.strategy = strategy_engine
+        self.connectors = list(connectors)
+        self.risk = risk_engine
+        self.profiler = profiler
+        self.host, self.port = host, port
+        self.token = token
+        self.allowed_hosts = {f"{name}:{port}" for name in (host, 'localhost', '127.0.0.1', '[::1]')}
+
+    def _guard(self, method: str, headers: dict):
+        if 'origin' in headers or 'sec-fetch-site' in headers: return 403, {"error": "browser requests are not accepted"}
+        if headers.get('host', '').lower() not in self.allowed_hosts: return 403, {"error": "unexpected Host header"}
+        if not hmac.compare_digest(headers.get(self.TOKEN_HEADER, '').encode(), self.token.encode()): return 401, {"error": "missing or wrong X-Control-Token"}
+        if method == "POST" and headers.get('content-type', '').split(';')[0].strip().lower() != 'application/json':
+            return 415, {"error": "POST bodies must be application/json"}
+        return None
+
+    async def _applied(self, future):
+        try: return 200, await asyncio.wait_for(future, self.APPLY_TIMEOUT_S)
+        except asyncio.TimeoutError: return 500, {"error": f"not applied within {self.APPLY_TIMEOUT_S}s (is the strategy loop running?)"}
+        except ValueError as e: return 400, {"error": str(e)}
+
+    def _get_params(self, _):
+        return 200, {"parameters": self.strategy.parameters(), "paused_pairs": self.strategy.status()["paused_pairs"]}
+
+    async def _set_params(self, params):
+        if not params: return 400, {"error": "no parameters given"}
+        try: future = self.strategy.update_parameters(params)
+        except ValueError as e: return 400, {"error": str(e)}
+        return await self._applied(future)
+
+    def _pause(self, paused: bool):
+        async def handler(params):
+            params = params or {}
+            missing = [key for key in ("venue_a", "venue_b", "symbol") if not params.get(key)]
+            if missing: return 400, {"error": f"missing {', '.join(missing)}"}
+            status, result = await self._applied(self.strategy.set_pair_paused(params["venue_a"], params["venue_b"], params["symbol"], paused))
+            return status, {"paused_pairs": result} if status == 200 else result
+        return handler
+
+    def _resync(self, params):
+        params = params or {}
+        targets = [c for c in self.connectors if params.get("platform") in (None, c.name) and params.get("symbol") in (None, c.symbol_unified)]
+        if not targets: return 404, {"error": "no matching connector"}
+        for connector in targets: connector.resync("requested through the control API")
+        return 200, {"resynced": [f"{c.name} {c.symbol_unified}" for c in targets]}
+
+    async def _kill(self, params):
+        if self.risk is None: return 404, {"error": "risk engine disabled"}
+        await self.risk.kill((params or {}).get("reason") or "requested through the control API")
+        return 200, self.risk.stats()
+
+    def _reset_kill(self, _):
+        if self.risk is None: return 404, {"error": "risk engine disabled"}
+        self.risk.reset()
+        return 200, self.risk.stats()
+
+    def _profile(self, _):
+        if self.profiler is None: return 404, {"error": "profiler disabled"}
+        return 200, self.profiler.stats()
+
+    def _start_profile(self, params):
+        if self.profiler is None: return 404, {"error": "profiler disabled"}
+        try: interval_s = float((params or {}).get("interval_s") or 0) or None
+        except (TypeError, ValueError): return 400, {"error": "interval_s must be a number"}
+        if interval_s is not None and interval_s <= 0: return 400, {"error": "interval_s must be positive"}
+        if not self.profiler.start(interval_s): return 409, {"error": "profiler already running"}
+        return 200, self.profiler.stats()
+
+    def _stop_profile(self, _):
+        if self.profiler is None: return 404, {"error": "profiler disabled"}
+        summary = self.profiler.stop()
+        return (200, summary) if summary else (409, {"error": "profiler not running"})
+
+    def routes(self) -> dict:
+        return {("GET", "/params"): self._get_params, ("POST", "/params"): self._set_params,
+                ("POST", "/pairs/pause"): self._pause(True), ("POST", "/pairs/resume"): self._pause(False),
+                ("POST", "/resync"): self._resync, ("POST", "/kill"): self._kill, ("POST", "/kill/reset"): self._reset_kill,
+                ("GET", "/profile"): self._profile, ("POST", "/profile/start"): self._start_profile, ("POST", "/profile/stop"): self._stop_profile}
+
+    async def run(self):
+        await JsonHttpServer(self.host, self.port, self.routes(), name=self.__class__.__name__, guard=self._guard).serve_forever()
@@ -0,0 +1,81 @@
+# utils/http_server.py
+import asyncio, inspect, json, logging
+from urllib.parse import parse_qsl
+
+class JsonHttpServer:
+    """
+    Minimal HTTP/1.1 JSON server on asyncio streams, meant for localhost tooling only.
+    `routes` maps (method, path) to a handler taking the request parameters and returning
+    (status_code, payload); handlers may be plain functions or coroutines. Parameters are the query
+    string merged with the body (JSON object or form-encoded), or None when there are none.
+    `guard(method, headers)`, if given, sees every request first (header names lower-cased) and returns
+    None to let it through or the (status_code, payload) to refuse it with.
+    """
+    REASONS = {200: "OK", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden", 404: "Not Found", 409: "Conflict",
+               415: "Unsupported Media Type", 500: "Internal Server Error"}
+
+    def __init__(self, host: str, port: int, routes: dict, name: str = "JsonHttpServer", guard=None):
+        self.host, self.port = host, port
+        self.routes = routes
+        self.guard = guard
+        self.logger = logging.getLogger(name)
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.logger.info(f"Listening on http://{self.host}:{self.port} ({', '.join(f'{m} {p}' for m, p in self.routes)})")
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def serve_forever(self):
+        await self.start()
+        try: await self._server.serve_forever()
+        finally: await self.stop()
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode('latin-1').split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode('latin-1').strip()
+                if not line: break
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+            if len(request_line) < 2:
+                status, payload = 400, {"error": "malformed request line"}
+            else:
+                method, (path, _, query) = request_line[0].upper(), request_line[1].partition('?')
+                refused = self.guard(method, headers) if self.guard else None
+                if refused: status, payload = refused
+                else:
+                    raw_body = await reader.readexactly(int(headers.get('content-length', 0) or 0))
+                    status, payload = await self._dispatch(method, path, query, raw_body, headers.get('content-type', ''))
+            body = json.dumps(payload, default=str).encode()
+            writer.write(f"HTTP/1.1 {status} {self.REASONS.get(status, 'OK')}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body)
+            await writer.drain()
+        except Exception as e:
+            self.logger.error(f"Error handling HTTP request: {e}")
+        finally:
+            writer.close()
+
+    async def _dispatch(self, method: str, path: str, query: str, raw_body: bytes, content_type: str):
+        handler = self.routes.get((method, path))
+        if handler is None: return 404, {"error": f"no route for {method} {path}"}
+        params = dict(parse_qsl(query))
+        try:
+            if raw_body and 'x-www-form-urlencoded' in content_type: params.update(parse_qsl(raw_body.decode()))
+            elif raw_body:
+                body = json.loads(raw_body)
+                if isinstance(body, dict): params.update(body)
+                else: params['body'] = body
+        except ValueError: return 400, {"error": "body is not valid JSON"}
+        try:
+            result = handler(params or None)
+            if inspect.isawaitable(result): result = await result
+            return result
+        except Exception as e:
+            self.logger.error(f"Handler for {method} {path} failed: {e}", exc_info=True)
+            return 500, {"error": str(e)}
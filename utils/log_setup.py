@@ -0,0 +1,102 @@
+# utils/log_setup.py
+import atexit, json, logging, queue, sys, threading, time
+from logging.handlers import QueueHandler, QueueListener
+
+TEXT_FORMAT = '%(asctime)s - %(name)-20s - %(levelname)-8s - %(message)s'
+TEXT_FORMAT_WITH_PROCESS = '%(asctime)s - %(processName)-18s - %(name)-20s - %(levelname)-8s - %(message)s'
+_STANDARD_ATTRS = set(logging.LogRecord('', 0, '', 0, '', (), None).__dict__) | {'message', 'asctime', 'suppressed', 'rate_limit'}
+# `extra` d'un message répétitif du chemin critique que le RateLimitFilter peut écrêter.
+RATE_LIMITED = {"rate_limit": True}
+
+class LazyQueueHandler(QueueHandler):
+    """
+    QueueHandler that enqueues the record untouched. The stdlib version formats the message on the
+    calling thread; here `msg % args`, exception text and all I/O happen on the listener thread.
+    """
+    def prepare(self, record):
+        return record
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets each (logger, message template) through at most once per `interval` seconds and drops the
+    repeats, counting them in the next emitted record's `suppressed` attribute. Keyed on the
+    unformatted template, so it only deduplicates messages logged with lazy %-style arguments.
+    Only records of the `loggers` named (and their children) or logged with `extra=RATE_LIMITED` are
+    limited: hedge, risk and kill switch messages are never dropped. Records at ERROR and above always pass.
+    """
+    def __init__(self, interval: float, loggers=()):
+        super().__init__()
+        self.interval = interval
+        self.loggers = tuple(loggers)
+        self._prefixes = tuple(f"{name}." for name in self.loggers)
+        self._last = {}
+        self._suppressed = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record) -> bool:
+        if record.levelno >= logging.ERROR or self.interval <= 0: return True
+        if not getattr(record, 'rate_limit', False) and record.name not in self.loggers and not record.name.startswith(self._prefixes): return True
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            last = self._last.get(key)
+            if last is not None and now - last < self.interval:
+                self._suppressed[key] = self._suppressed.get(key, 0) + 1
+                return False
+            self._last[key] = now
+            suppressed = self._suppressed.pop(key, 0)
+        if suppressed: record.suppressed = suppressed
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: ts, level, logger, msg, the raw template and args, extras and exception text."""
+    def format(self, record) -> str:
+        entry = {"ts": record.created, "level": record.levelname, "logger": record.name, "process": record.processName, "msg": record.getMessage()}
+        if record.args: entry["template"], entry["args"] = str(record.msg), record.args
+        if getattr(record, 'suppressed', 0): entry["suppressed"] = record.suppressed
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRS: entry[key] = value
+        if record.exc_info: entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record) -> str:
+        text = super().format(record)
+        suppressed = getattr(record, 'suppressed', 0)
+        return f"{text} (+{suppressed} similar suppressed)" if suppressed else text
+
+
+_listener = None
+
+def setup_logging(level: str = 'INFO', fmt: str = 'text', rate_limit_s: float = 0.0, include_process: bool = False, stream=None, rate_limited_loggers=()):
+    """
+    Routes every logger through a LazyQueueHandler to a QueueListener thread that formats (text or
+    JSON) and writes to `stream` (stderr by default). With `rate_limit_s`, the `rate_limited_loggers`
+    and the records marked RATE_LIMITED are rate limited. Idempotent: a second call replaces the first.
+    """
+    global _listener
+    stop_logging()
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if fmt == 'json' else TextFormatter(TEXT_FORMAT_WITH_PROCESS if include_process else TEXT_FORMAT))
+    log_queue = queue.SimpleQueue()
+    handler = LazyQueueHandler(log_queue)
+    if rate_limit_s > 0: handler.addFilter(RateLimitFilter(rate_limit_s, rate_limited_loggers))
+    root = logging.getLogger()
+    for existing in list(root.handlers): root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+def stop_logging():
+    """Flushes the queue and stops the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+atexit.register(stop_logging)
@@ -0,0 +1,95 @@
+# utils/loop_monitor.py
+import asyncio, logging, sys, threading, time, traceback
+
+def install_event_loop(name: str) -> str:
+    """Selects the event loop policy used by asyncio.run(). Returns the loop actually installed."""
+    logger = logging.getLogger("EventLoop")
+    if name == 'uvloop':
+        try:
+            import uvloop
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+            logger.info("Event loop: uvloop")
+            return 'uvloop'
+        except ImportError:
+            logger.warning("uvloop is not installed. Falling back to the standard asyncio event loop.")
+    elif name != 'asyncio':
+        logger.warning(f"Unknown event loop '{name}'. Using the standard asyncio event loop.")
+    asyncio.set_event_loop_policy(None)
+    logger.info("Event loop: asyncio")
+    return 'asyncio'
+
+def event_loop_factories() -> dict:
+    """Loop factories for every loop implementation available here, for benchmarking."""
+    factories = {'asyncio': asyncio.new_event_loop}
+    try:
+        import uvloop
+        factories['uvloop'] = uvloop.new_event_loop
+    except ImportError: pass
+    return factories
+
+
+class LoopLagMonitor:
+    """
+    Measures event loop scheduling delay continuously.
+
+    The coroutine sleeps `interval` seconds and measures how late it wakes up. A watchdog thread
+    watches the coroutine's heartbeat: when it goes stale for more than `threshold` seconds, the loop
+    is blocked right now, so the watchdog captures the loop thread's current stack and the running
+    task. When the loop resumes, the spike is logged with that stack and, at most once per
+    `alert_cooldown` seconds, sent to the notifier.
+    """
+    def __init__(self, interval: float = 0.05, threshold: float = 0.1, notifier=None, alert_cooldown: float = 60):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.interval = interval
+        self.threshold = threshold
+        self.notifier = notifier
+        self.alert_cooldown = alert_cooldown
+        self.max_lag = 0.0
+        self.avg_lag = 0.0
+        self.spikes = 0
+        self._heartbeat = time.monotonic()
+        self._capture = None
+        self._last_alert = 0.0
+        self._loop = None
+        self._loop_thread_id = None
+        self._stop = threading.Event()
+
+    def stats(self) -> dict:
+        return {"avg_lag_ms": self.avg_lag * 1000, "max_lag_ms": self.max_lag * 1000, "spikes": self.spikes}
+
+    def _watchdog(self):
+        while not self._stop.wait(self.interval):
+            if self._capture is None and time.monotonic() - self._heartbeat > self.threshold:
+                frame = sys._current_frames().get(self._loop_thread_id)
+                task = asyncio.current_task(self._loop)
+                self._capture = (task.get_name() if task else "<loop callback>", ''.join(traceback.format_stack(frame)) if frame else "<no frame>")
+
+    async def run(self):
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        watchdog = threading.Thread(target=self._watchdog, name="loop-lag-watchdog", daemon=True)
+        watchdog.start()
+        self.logger.info(f"Loop lag monitor running (interval {self.interval * 1000:.0f}ms, alert above {self.threshold * 1000:.0f}ms).")
+        try:
+            while True:
+                expected = time.monotonic() + self.interval
+                self._heartbeat = time.monotonic()
+                await asyncio.sleep(self.interval)
+                now = time.monotonic()
+                self._heartbeat = now
+                lag = max(now - expected, 0.0)
+                self.avg_lag += 0.05 * (lag - self.avg_lag)
+                self.max_lag = max(self.max_lag, lag)
+                capture, self._capture = self._capture, None
+                if lag > self.threshold: self._report_spike(lag, capture)
+        finally:
+            self._stop.set()
+
+    def _report_spike(self, lag: float, capture):
+        self.spikes += 1
+        task_name, stack = capture or ("<unknown>", "<stall ended before the watchdog sampled it>\n")
+        self.logger.warning(f"Event loop blocked for {lag * 1000:.1f}ms (task: {task_name}). Stack while blocked:\n{stack}")
+        now = time.monotonic()
+        if self.notifier and now - self._last_alert > self.alert_cooldown:
+            self._last_alert = now
+            asyncio.create_task(self.notifier.send_message(f"🐢 *Event loop lag* 🐢\nLoop blocked for *{lag * 1000:.0f}ms* in task `{task_name}`."))
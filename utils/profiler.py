@@ -0,0 +1,206 @@
+# utils/profiler.py
+import asyncio, collections.abc, contextvars, logging, os, signal, sys, threading, time
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Composant d'un fichier du dépôt (premier préfixe qui correspond) ; le plus profond de la pile l'emporte.
+_COMPONENTS = (("connectors/", "connector"), ("engine/data_engine", "data_engine"), ("engine/consolidated_book", "data_engine"),
+               ("engine/shared_book", "data_engine"), ("engine/market_data_feed", "data_engine"), ("engine/trade_aggregator", "data_engine"),
+               ("engine/", "strategy"), ("execution/", "execution"))
+# Compte CPU de la tâche courante ; les tâches créées depuis une tâche comptée en héritent (copie du contexte).
+_account = contextvars.ContextVar('profiler_account', default=None)
+
+
+class _TimedCoroutine(collections.abc.Coroutine):
+    """Coroutine proxy adding the loop thread's CPU time of every step to `account[key]`."""
+    __slots__ = ("coroutine", "_account", "_key")
+
+    def __init__(self, coroutine, account: dict, key: str):
+        self.coroutine, self._account, self._key = coroutine, account, key
+
+    def send(self, value):
+        start = time.thread_time()
+        try: return self.coroutine.send(value)
+        finally: self._account[self._key] += time.thread_time() - start
+
+    def throw(self, *args):
+        start = time.thread_time()
+        try: return self.coroutine.throw(*args)
+        finally: self._account[self._key] += time.thread_time() - start
+
+    def close(self):
+        return self.coroutine.close()
+
+    def __await__(self):
+        return self.coroutine.__await__()
+
+
+class SamplingProfiler:
+    """
+    On-demand sampling profiler of the event loop thread, and CPU accounting of the long-running tasks.
+
+    Between `start` and `stop`, the loop's stack is sampled every `interval_s` of process CPU time, by a
+    SIGPROF handler (setitimer ITIMER_PROF) that runs in the loop thread itself, so busy stretches are
+    sampled as often as they run. The loop's idle share is the wall time its thread spent off the CPU
+    (waiting for I/O, or descheduled on a saturated or throttled host).
+    Where the loop is not in the main thread or there is no setitimer (Windows), a thread samples the
+    loop's stack every `interval_s` of wall time instead; it needs the GIL, so it over-samples the loop
+    waiting in select, and idle is then the share of samples blocked there (a select that only polls,
+    timeout 0, counts as busy). Each sample is attributed to the running task and to a component (connector,
+    data_engine, strategy, execution) from the deepest frame of this repository. `stop` writes the collapsed
+    stacks, `component;task;frame;...;frame count` per line (flamegraph.pl, speedscope, inferno), and
+    returns a summary.
+    `create_task` starts a task whose CPU time, and that of every task it creates, is added to an account
+    of its name: each step of their coroutines is timed, at the cost of two thread_time calls. Loop
+    callbacks outside tasks (protocol data handlers) are not accounted; `cpu_stats` reports them as untracked.
+    """
+    def __init__(self, interval_s: float = 0.01, output_dir: str = 'logs/profiles'):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.interval_s = interval_s
+        self.output_dir = output_dir
+        self.cpu = {}
+        self._process_start = time.process_time()
+        self._labels = {}
+        self._samples = None
+        self._thread = None
+        self._timer = False
+        self._previous_handler = None
+        self._stop = threading.Event()
+        self._started = None
+        self._loop_cpu_start = None
+
+    # --- comptabilité CPU par tâche ---
+
+    def _task_factory(self, loop, coroutine, context=None):
+        key = context.get(_account) if context is not None else _account.get()
+        if key is not None: coroutine = _TimedCoroutine(coroutine, self.cpu, key)
+        return asyncio.Task(coroutine, loop=loop) if context is None else asyncio.Task(coroutine, loop=loop, context=context)
+
+    def create_task(self, coroutine, name: str) -> asyncio.Task:
+        """Named task accounted, with the tasks it creates, under `name` (call from the loop)."""
+        loop = asyncio.get_running_loop()
+        if loop.get_task_factory() is None: loop.set_task_factory(self._task_factory)
+        self.cpu.setdefault(name, 0.0)
+        context = contextvars.copy_context()
+        context.run(_account.set, name)
+        return loop.create_task(coroutine, name=name, context=context)
+
+    def cpu_stats(self) -> dict:
+        total = max(time.process_time() - self._process_start, 1e-9)
+        tracked = sum(self.cpu.values())
+        return {"process_cpu_s": round(total, 3), "untracked_pct": round((total - tracked) / total * 100, 1),
+                "tasks": {name: {"cpu_s": round(cpu, 3), "share_pct": round(cpu / total * 100, 1)} for name, cpu in sorted(self.cpu.items(), key=lambda item: -item[1])}}
+
+    # --- échantillonnage ---
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None or self._timer
+
+    def _label(self, code):
+        """(frame label, component) of a code object, cached."""
+        filename = os.path.abspath(code.co_filename)
+        relative = os.path.relpath(filename, _ROOT).replace(os.sep, '/')
+        if relative.startswith('..') or '/site-packages/' in filename:
+            relative, component = '/'.join(filename.replace(os.sep, '/').split('/')[-2:]), None
+        else:
+            component = next((name for prefix, name in _COMPONENTS if relative.startswith(prefix)), None)
+        label = (f"{relative[:-3] if relative.endswith('.py') else relative}:{code.co_name}".replace(';', ','), component)
+        self._labels[code] = label
+        return label
+
+    @staticmethod
+    def _task_label(task) -> str:
+        if task is None: return "<loop callback>"
+        name = task.get_name()
+        if not name.startswith("Task-"): return name
+        coroutine = task.get_coro()
+        coroutine = getattr(coroutine, "coroutine", coroutine)
+        return getattr(coroutine, "__qualname__", name)
+
+    def _sample(self):
+        frame = sys._current_frames().get(self._thread_id)
+        if frame is not None: self._record(frame)
+
+    def _on_sigprof(self, signum, frame):
+        if frame is not None: self._record(frame)
+
+    def _record(self, frame):
+        if frame.f_code.co_name == 'select' and frame.f_code.co_filename.endswith('selectors.py'):
+            # Timeout déjà converti par le sélecteur : 0 = simple scrutation d'une boucle occupée, sinon attente d'E/S.
+            if frame.f_locals.get('timeout') != 0:
+                self._samples[("idle",)] = self._samples.get(("idle",), 0) + 1
+                return
+        task = asyncio.current_task(self._loop)
+        labels, component = [], None
+        while frame is not None:
+            label, frame_component = self._labels.get(frame.f_code) or self._label(frame.f_code)
+            if label == 'asyncio/events:_run': break  # au-dessus : la boucle elle-même
+            labels.append(label)
+            if component is None: component = frame_component
+            frame = frame.f_back
+        labels.append(self._task_label(task).replace(';', ','))
+        labels.append(component or "other")
+        key = tuple(reversed(labels))
+        self._samples[key] = self._samples.get(key, 0) + 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            try: self._sample()
+            except Exception as e: self.logger.debug(f"Sample skipped: {e}")
+
+    def start(self, interval_s: float = None) -> bool:
+        """Starts sampling the running loop's thread (call from the loop). False if already running."""
+        if self.running: return False
+        if interval_s: self.interval_s = float(interval_s)
+        self._loop, self._thread_id = asyncio.get_running_loop(), threading.get_ident()
+        self._samples, self._started, self._loop_cpu_start = {}, time.time(), time.thread_time()
+        if hasattr(signal, 'setitimer') and threading.current_thread() is threading.main_thread():
+            self._previous_handler = signal.signal(signal.SIGPROF, self._on_sigprof)
+            signal.setitimer(signal.ITIMER_PROF, self.interval_s, self.interval_s)
+            self._timer = True
+        else:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+        self.logger.warning(f"Sampling profiler started ({self.interval_s * 1000:.0f}ms {'of CPU time, SIGPROF' if self._timer else 'interval, sampler thread'}).")
+        return True
+
+    def stop(self):
+        """Stops sampling, writes the collapsed stacks and returns a summary (None if not running)."""
+        if not self.running: return None
+        if self._timer:
+            signal.setitimer(signal.ITIMER_PROF, 0)
+            signal.signal(signal.SIGPROF, self._previous_handler or signal.SIG_DFL)
+            mode, self._timer = "sigprof", False
+        else:
+            self._stop.set()
+            self._thread.join()
+            mode, self._thread = "thread", None
+        samples, duration = self._samples, time.time() - self._started
+        loop_cpu = time.thread_time() - self._loop_cpu_start
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"profile-{time.strftime('%Y%m%d-%H%M%S', time.localtime(self._started))}.collapsed")
+        with open(path, 'w', encoding='utf-8') as f:
+            for key, count in sorted(samples.items(), key=lambda item: -item[1]): f.write(f"{';'.join(key)} {count}\n")
+        total = sum(samples.values())
+        busy = total - samples.get(("idle",), 0)
+        components, leaves = {}, {}
+        for key, count in samples.items():
+            if key == ("idle",): continue
+            components[key[0]] = components.get(key[0], 0) + count
+            leaves[key[-1]] = leaves.get(key[-1], 0) + count
+        # SIGPROF ne compte que du temps CPU : l'inactivité de la boucle se lit sur le CPU de son thread.
+        idle_pct = max(0.0, 1 - loop_cpu / max(duration, 1e-9)) * 100 if mode == "sigprof" else (total - busy) / max(total, 1) * 100
+        summary = {"file": path, "mode": mode, "seconds": round(duration, 1), "samples": total, "idle_pct": round(idle_pct, 1), "loop_cpu_s": round(loop_cpu, 3),
+                   "components_pct": {name: round(count / max(busy, 1) * 100, 1) for name, count in sorted(components.items(), key=lambda item: -item[1])},
+                   "top_frames_pct": {name: round(count / max(busy, 1) * 100, 1) for name, count in sorted(leaves.items(), key=lambda item: -item[1])[:10]}}
+        self.logger.warning(f"Sampling profiler stopped: {total} samples over {duration:.1f}s written to {path}. Busy time by component: {summary['components_pct']}")
+        return summary
+
+    def toggle(self):
+        """Signal handler: starts the profiler, or stops it and writes the profile."""
+        if self.running: self.stop()
+        else: self.start()
+
+    def stats(self) -> dict:
+        return {"profiling": self.running, "interval_s": self.interval_s, "cpu": self.cpu_stats()}
@@ -0,0 +1,87 @@
+# utils/status_reporter.py
+import asyncio, logging, sys, time
+from concurrent.futures import ThreadPoolExecutor
+from utils.http_server import JsonHttpServer
+
+class StatusReporter:
+    """
+    Order book display, scheduled on its own and kept off the trading path.
+
+    `snapshot()` copies the top `depth` levels of every book without awaiting, so it is consistent
+    and costs a few slices per book. In 'terminal' mode, formatting and the blocking stdout write run
+    on a single background thread; if the previous write is still stuck, that round is skipped rather
+    than queued. In 'http' mode nothing is printed: GET /status returns the snapshot as JSON.
+    Extra status sections (loop lag, strategy state...) can be attached with `add_source`.
+    """
+    def __init__(self, order_books: dict, mode: str = 'terminal', interval: float = 10, depth: int = 3, host: str = '127.0.0.1', port: int = 8765):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._order_books = order_books
+        self.mode = mode
+        self.interval = interval
+        self.depth = depth
+        self.host, self.port = host, port
+        self._sources = {}
+        self._printer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="status-printer")
+        self._pending_print = None
+        self._cpu_mark = (time.monotonic(), time.process_time())
+        self.add_source("process", self._process_stats)
+
+    def _process_stats(self) -> dict:
+        """CPU used by this process (all threads) since the previous snapshot, in % of one core."""
+        wall, cpu = time.monotonic(), time.process_time()
+        last_wall, last_cpu = self._cpu_mark
+        self._cpu_mark = (wall, cpu)
+        return {"cpu_pct": 100 * (cpu - last_cpu) / max(wall - last_wall, 1e-9)}
+
+    def add_source(self, name: str, provider):
+        """Adds a section to every snapshot; `provider` is a cheap callable returning a JSON-serializable dict."""
+        self._sources[name] = provider
+
+    def snapshot(self) -> dict:
+        books = []
+        for (platform, symbol), book in list(self._order_books.items()):
+            books.append({"platform": platform, "symbol": symbol, "bids": book.get_bids(self.depth), "asks": book.get_asks(self.depth)})
+        snapshot = {"time": time.time(), "books": books}
+        for name, provider in self._sources.items():
+            try: snapshot[name] = provider()
+            except Exception as e: snapshot[name] = {"error": str(e)}
+        return snapshot
+
+    @staticmethod
+    def render(snapshot: dict, depth: int = 3) -> str:
+        lines = ["", "=" * 80, f"--- ORDER BOOK SNAPSHOT ({time.strftime('%H:%M:%S', time.localtime(snapshot['time']))}) ---"]
+        if not snapshot["books"]: lines.append("No order books available.")
+        for book in snapshot["books"]:
+            lines.append(f"\n--- {book['platform']} ({book['symbol']}) ---")
+            asks, bids = book["asks"], book["bids"]
+            if not asks or not bids: lines.append("Order book is empty or incomplete."); continue
+            lines.append("ASKS (Sell)                  | BIDS (Buy)")
+            lines.append("Price (USDC)   | Qty (BTC)     | Price (USDC)   | Qty (BTC)")
+            lines.append("--------------|---------------|----------------|---------------")
+            for i in range(depth):
+                ask_price, ask_qty = asks[i] if i < len(asks) else ('-', '-')
+                bid_price, bid_qty = bids[i] if i < len(bids) else ('-', '-')
+                lines.append(f"{str(ask_price):<14} | {str(ask_qty):<13} | {str(bid_price):<14} | {str(bid_qty):<13}")
+        for name, section in snapshot.items():
+            if name not in ("time", "books"): lines.append(f"\n[{name}] {section}")
+        lines.append("=" * 80 + "\n")
+        return "\n".join(lines)
+
+    def _write(self, snapshot: dict):
+        sys.stdout.write(self.render(snapshot, self.depth) + "\n")
+        sys.stdout.flush()
+
+    async def run(self):
+        if self.mode == 'http':
+            server = JsonHttpServer(self.host, self.port, {("GET", "/status"): lambda _: (200, self.snapshot())}, name=self.__class__.__name__)
+            await server.serve_forever()
+            return
+        self.logger.info(f"Status reporter printing order books every {self.interval}s.")
+        try:
+            while True:
+                await asyncio.sleep(self.interval)
+                if self._pending_print and not self._pending_print.done():
+                    self.logger.warning("Previous status print still blocked on stdout. Skipping this one."); continue
+                self._pending_print = self._printer.submit(self._write, self.snapshot())
+        finally:
+            self._printer.shutdown(wait=False)
@@ -58,7 +58,8 @@ class TradeLogger:
             try:
                 # Attend un nouvel item pendant 1 seconde, puis vérifie si on doit s'arrêter
                 item = self.queue.get(timeout=1)
-                self._insert_record(item)
+                if isinstance(item, list): self._insert_records(item)
+                else: self._insert_record(item)
                 self.queue.task_done()
             except Empty:
                 continue
@@ -78,6 +79,23 @@ class TradeLogger:
         except sqlite3.Error as e:
             self.logger.error(f"Erreur lors de l'insertion dans la base de données: {e}")
 
+    def _insert_records(self, records):
+        """Insère un lot d'enregistrements en une seule transaction."""
+        if not self.conn or not records: return
+        try:
+            cursor = self.conn.cursor()
+            for record in records:
+                columns = ', '.join(record.keys())
+                placeholders = ', '.join('?' * len(record))
+                cursor.execute(f"INSERT INTO trades ({columns}) VALUES ({placeholders})", tuple(record.values()))
+            self.conn.commit()
+        except sqlite3.Error as e:
+            self.logger.error(f"Erreur lors de l'insertion d'un lot dans la base de données: {e}")
+
+    def log_trades(self, records):
+        """Ajoute un lot d'enregistrements à la file d'attente (un seul commit)."""
+        self.queue.put(list(records))
+
     def log_trade(self, **kwargs):
         """Méthode publique pour ajouter un trade à la file d'attente."""
         self.queue.put(kwargs)